@@ -10,6 +10,9 @@ echo "Postgres listo."
 # Migraciones
 python /app/src/manage.py migrate --noinput
 
+# Catálogo de exports (incluye los escritos antes de existir el catálogo)
+python /app/src/manage.py catalogar_exports
+
 # Crear carpetas media necesarias
 mkdir -p /app/src/media/uploads /app/src/media/outputs
 
@@ -0,0 +1,285 @@
+# src/api/artifacts.py
+from __future__ import annotations
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Artefacto, ArchivoExportado
+
+HASH_CHUNK = 1024 * 1024
+# Espacio ("ARTF") de los advisory locks de Postgres que marcan grupos en uso
+_LOCK_ARTEFACTOS = 0x41525446
+_en_curso: ContextVar[FrozenSet[Tuple[str, str]]] = ContextVar("artefactos_en_curso", default=frozenset())
+
+
+class ArchivoConHash:
+    """Envuelve un archivo binario y calcula sha256/tamaño de lo que se escribe."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.sha = hashlib.sha256()
+        self.size = 0
+
+    def write(self, b) -> int:
+        self.sha.update(b)
+        self.size += len(b)
+        return self.fh.write(b)
+
+    def flush(self) -> None:
+        self.fh.flush()
+
+    def close(self) -> None:
+        self.fh.close()
+
+    def __enter__(self) -> "ArchivoConHash":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def hexdigest(self) -> str:
+        return self.sha.hexdigest()
+
+
+def hash_archivo(path: Path) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        while chunk := fh.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def directorio(tipo: str) -> Path:
+    if tipo == Artefacto.TIPO_UPLOAD:
+        return Path(getattr(settings, "UPLOAD_DIR", "/app/data/uploads"))
+    return Path(settings.EXPORT_DIR)
+
+
+def _presupuesto() -> int:
+    return int(getattr(settings, "ARTIFACT_STORE_BUDGET_BYTES", 0) or 0)
+
+
+def publicar(tmp: Path, final: Path, sha256: str, size: int, tipo: str, grupo: Optional[str] = None) -> Artefacto:
+    """
+    Publica ``tmp`` como ``final`` deduplicando por contenido:
+    - si ``final`` ya tiene ese mismo contenido, se descarta ``tmp`` (mtime y ETag no cambian);
+    - si otro artefacto tiene el mismo sha256, ``final`` pasa a ser un hardlink a él;
+    - si no, ``tmp`` reemplaza a ``final``.
+    """
+    tmp, final = Path(tmp), Path(final)
+    en_sitio = tmp == final
+    previo = Artefacto.objects.filter(tipo=tipo, nombre_archivo=final.name).first()
+
+    if previo and previo.sha256 == sha256 and final.is_file():
+        if not en_sitio:
+            tmp.unlink(missing_ok=True)
+    else:
+        gemelo = _buscar_gemelo(sha256, excluir=(tipo, final.name))
+        if gemelo is not None and final.is_file() and os.path.samefile(gemelo, final):
+            # Ya es un hardlink al mismo contenido (rename entre enlaces del mismo inodo no hace nada)
+            if not en_sitio:
+                tmp.unlink(missing_ok=True)
+        elif gemelo is not None:
+            enlace = final.with_name(f".{final.name}.lnk")
+            enlace.unlink(missing_ok=True)
+            try:
+                os.link(gemelo, enlace)
+                os.replace(enlace, final)
+                os.utime(final)  # el inodo compartido conservaba el mtime del gemelo (Last-Modified, variantes)
+                if not en_sitio:
+                    tmp.unlink(missing_ok=True)
+            except OSError:
+                # Otro filesystem: sin dedup, se publica la copia escrita
+                enlace.unlink(missing_ok=True)
+                os.replace(tmp, final)
+        else:
+            os.replace(tmp, final)
+
+    obj, _ = Artefacto.objects.update_or_create(
+        tipo=tipo, nombre_archivo=final.name,
+        defaults={"grupo": grupo or final.name, "sha256": sha256, "size": size, "publicado_at": timezone.now()},
+    )
+    return obj
+
+
+def registrar(path: Path, tipo: str, grupo: Optional[str] = None) -> Artefacto:
+    """Registra (y deduplica) un archivo que ya está en su sitio."""
+    path = Path(path)
+    return publicar(path, path, hash_archivo(path), path.stat().st_size, tipo, grupo)
+
+
+def _buscar_gemelo(sha256: str, excluir: Tuple[str, str]) -> Optional[Path]:
+    for a in Artefacto.objects.filter(sha256=sha256).exclude(tipo=excluir[0], nombre_archivo=excluir[1]):
+        p = directorio(a.tipo) / a.nombre_archivo
+        if p.is_file():
+            return p
+    return None
+
+
+def registrar_acceso(tipo: str, nombre: str) -> None:
+    """
+    Una descarga de ``nombre`` (o de una variante o shard suyo): suma un hit y
+    refresca el acceso (orden LRU) de su grupo.
+    """
+    grupo = (
+        Artefacto.objects.filter(tipo=tipo, nombre_archivo=nombre).values_list("grupo", flat=True).first()
+        or nombre
+    )
+    Artefacto.objects.filter(tipo=tipo, grupo=grupo, nombre_archivo=grupo).update(
+        hits=F("hits") + 1, last_accessed_at=timezone.now(),
+    )
+
+
+@contextmanager
+def en_uso(*claves: Tuple[str, str]) -> Iterator[None]:
+    """
+    Marca los grupos (tipo, grupo) que la operación en curso escribe o lee para
+    que aplicar_presupuesto no los expulse: en este hilo (aunque la expulsión la
+    dispare la misma operación) y en los demás procesos, con un advisory lock
+    compartido que la expulsión no puede tomar en exclusiva mientras dure.
+    """
+    token = _en_curso.set(_en_curso.get() | frozenset(claves))
+    for tipo, grupo in claves:
+        _advisory_lock("pg_advisory_lock_shared", tipo, grupo)
+    try:
+        yield
+    finally:
+        _en_curso.reset(token)
+        for tipo, grupo in claves:
+            _advisory_lock("pg_advisory_unlock_shared", tipo, grupo)
+
+
+def _advisory_lock(funcion: str, tipo: str, grupo: str):
+    with connection.cursor() as cur:
+        cur.execute(f"SELECT {funcion}(%s, hashtext(%s))", [_LOCK_ARTEFACTOS, f"{tipo}:{grupo}"])
+        return cur.fetchone()[0]
+
+
+def _libre(tipo: str, grupo: str) -> bool:
+    """Toma el grupo en exclusiva hasta el fin de la transacción; False si otra operación lo usa."""
+    return _advisory_lock("pg_try_advisory_xact_lock", tipo, grupo)
+
+
+def uso_fisico() -> int:
+    """Bytes en disco: cada contenido (sha256) cuenta una sola vez."""
+    por_hash = Artefacto.objects.values("sha256").annotate(s=Max("size"))
+    return sum(r["s"] for r in por_hash)
+
+
+def expulsar_grupo(tipo: str, grupo: str) -> int:
+    """Borra todos los archivos de un grupo (y su entrada de catálogo). Devuelve filas borradas."""
+    base = directorio(tipo)
+    with transaction.atomic():
+        filas = list(Artefacto.objects.filter(tipo=tipo, grupo=grupo))
+        for a in filas:
+            (base / a.nombre_archivo).unlink(missing_ok=True)
+        Artefacto.objects.filter(pk__in=[a.pk for a in filas]).delete()
+        if tipo == Artefacto.TIPO_EXPORT:
+            ArchivoExportado.objects.filter(nombre_archivo=grupo).delete()
+    return len(filas)
+
+
+def podar_grupo(tipo: str, grupo: str, conservar: Iterable[str]) -> int:
+    """Borra los archivos del grupo que ya no forman parte de él (p.ej. shards sobrantes)."""
+    base = directorio(tipo)
+    sobran = list(Artefacto.objects.filter(tipo=tipo, grupo=grupo).exclude(nombre_archivo__in=set(conservar)))
+    for a in sobran:
+        (base / a.nombre_archivo).unlink(missing_ok=True)
+    Artefacto.objects.filter(pk__in=[a.pk for a in sobran]).delete()
+    return len(sobran)
+
+
+def aplicar_presupuesto(proteger: Iterable[Tuple[str, str]] = ()) -> int:
+    """
+    Expulsa grupos por LRU (última descarga o publicación, la más reciente)
+    hasta quedar dentro de ARTIFACT_STORE_BUDGET_BYTES. 0 = sin límite.
+    Nunca expulsa ``proteger`` (pares (tipo, grupo)), los grupos marcados con
+    en_uso() en este hilo ni los que otra operación tiene en uso.
+    Devuelve la cantidad de grupos expulsados.
+    """
+    limite = _presupuesto()
+    if limite <= 0:
+        return 0
+    protegidos: Set[Tuple[str, str]] = set(proteger) | _en_curso.get()
+
+    # Una sola lectura del catálogo: el uso se descuenta a medida que se expulsa
+    # (un contenido deja de ocupar disco cuando ya no lo referencia ningún archivo)
+    refs: Counter = Counter()
+    tamano: Dict[str, int] = {}
+    contenidos: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    for tipo, grupo, sha, size in Artefacto.objects.values_list("tipo", "grupo", "sha256", "size"):
+        refs[sha] += 1
+        tamano[sha] = max(size, tamano.get(sha, 0))
+        contenidos[(tipo, grupo)].append(sha)
+    uso = sum(tamano.values())
+    if uso <= limite:
+        return 0
+
+    candidatos = (
+        Artefacto.objects.filter(nombre_archivo=F("grupo"))
+        .annotate(orden=Greatest("last_accessed_at", "publicado_at"))  # Postgres ignora el NULL
+        .order_by("orden", "id")
+        .values_list("tipo", "grupo")
+    )
+    expulsados = 0
+    for tipo, grupo in list(candidatos):
+        if (tipo, grupo) in protegidos:
+            continue
+        with transaction.atomic():
+            if not _libre(tipo, grupo):
+                continue
+            expulsar_grupo(tipo, grupo)
+        expulsados += 1
+        for sha in contenidos.pop((tipo, grupo), ()):
+            refs[sha] -= 1
+            if refs[sha] == 0:
+                uso -= tamano[sha]
+        if uso <= limite:
+            break
+    return expulsados
+
+
+def estadisticas() -> Dict[str, object]:
+    """Uso de disco, ahorro por dedup y descargas, por tipo y en total."""
+    por_tipo = {}
+    for tipo in (Artefacto.TIPO_UPLOAD, Artefacto.TIPO_EXPORT):
+        qs = Artefacto.objects.filter(tipo=tipo)
+        agg = qs.aggregate(archivos=Count("id"), bytes_logicos=Sum("size"), descargas=Sum("hits"))
+        fisicos = sum(r["s"] for r in qs.values("sha256").annotate(s=Max("size")))
+        por_tipo[tipo] = {
+            "archivos": agg["archivos"],
+            "bytes_logicos": agg["bytes_logicos"] or 0,
+            "bytes_fisicos": fisicos,
+            "descargas": agg["descargas"] or 0,
+        }
+
+    logicos = sum(t["bytes_logicos"] for t in por_tipo.values())
+    fisicos = uso_fisico()
+    limite = _presupuesto()
+    top = (
+        Artefacto.objects.filter(tipo=Artefacto.TIPO_EXPORT, nombre_archivo=F("grupo"), hits__gt=0)
+        .order_by("-hits")[:10]
+    )
+    return {
+        "presupuesto_bytes": limite or None,
+        "uso_bytes": fisicos,
+        "libre_bytes": max(0, limite - fisicos) if limite else None,
+        "ahorro_dedup_bytes": logicos - fisicos,
+        "por_tipo": por_tipo,
+        "mas_descargados": [
+            {"name": a.nombre_archivo, "hits": a.hits,
+             "last_accessed_at": a.last_accessed_at.isoformat() if a.last_accessed_at else None}
+            for a in top
+        ],
+    }
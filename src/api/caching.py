@@ -0,0 +1,121 @@
+# src/api/caching.py
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GeneracionDatos
+
+
+class CacheLRU:
+    """
+    Caché en memoria del proceso, segura entre hilos, con expiración por TTL
+    y expulsión LRU al superar ``max_entradas`` o ``max_bytes`` (suma de los
+    pesos declarados en ``set``).
+
+    ``ttl``, ``max_entradas`` y ``max_bytes`` en 0 = sin límite. Cuenta aciertos,
+    fallos, expulsiones e invalidaciones para exponerlos como métricas.
+    """
+
+    def __init__(self, max_entradas: int = 0, ttl: float = 0, max_bytes: int = 0):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._datos: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expulsiones = 0
+        self.expirados = 0
+        self.invalidaciones = 0
+
+    def get(self, clave: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is None:
+                self.misses += 1
+                return None
+            vence, valor, peso = item
+            if vence and vence < time.monotonic():
+                del self._datos[clave]
+                self._bytes -= peso
+                self.expirados += 1
+                self.misses += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def set(self, clave: Hashable, valor: Any, peso: int = 0) -> bool:
+        """Guarda ``valor``; devuelve False si por sí solo supera ``max_bytes``."""
+        if self.max_bytes and peso > self.max_bytes:
+            return False
+        vence = time.monotonic() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            previo = self._datos.pop(clave, None)
+            if previo is not None:
+                self._bytes -= previo[2]
+            self._datos[clave] = (vence, valor, peso)
+            self._bytes += peso
+            while (self.max_entradas and len(self._datos) > self.max_entradas) or \
+                    (self.max_bytes and self._bytes > self.max_bytes):
+                _, (_, _, p) = self._datos.popitem(last=False)
+                self._bytes -= p
+                self.expulsiones += 1
+        return True
+
+    def descartar(self, clave: Hashable) -> None:
+        with self._lock:
+            previo = self._datos.pop(clave, None)
+            if previo is not None:
+                self._bytes -= previo[2]
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+            self.invalidaciones += 1
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._datos),
+            "max_entradas": self.max_entradas or None,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes or None,
+            "ttl_s": self.ttl or None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "expulsiones": self.expulsiones,
+            "expirados": self.expirados,
+            "invalidaciones": self.invalidaciones,
+        }
+
+
+# --------------------------
+# Generación de datos
+# --------------------------
+def generacion_datos(tabla: str) -> int:
+    """Generación actual de ``tabla``: cambia cada vez que una ingesta escribe en ella."""
+    return GeneracionDatos.objects.filter(tabla=tabla).values_list("generacion", flat=True).first() or 0
+
+
+def incrementar_generacion(tabla: str) -> None:
+    """
+    Llamar dentro de la misma transacción que escribe los datos o, en cargas por
+    lotes, una sola vez después de confirmar el último lote.
+    """
+    n = GeneracionDatos.objects.filter(tabla=tabla).update(generacion=F("generacion") + 1, updated_at=timezone.now())
+    if not n:
+        obj, creado = GeneracionDatos.objects.get_or_create(tabla=tabla, defaults={"generacion": 1})
+        if not creado:
+            GeneracionDatos.objects.filter(pk=obj.pk).update(generacion=F("generacion") + 1, updated_at=timezone.now())
@@ -0,0 +1,53 @@
+# src/api/compacto.py
+from __future__ import annotations
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import Optional, Tuple
+import re
+
+# Canales de contacto empaquetados en RegistroDatos.canales: el canal i es el bit i
+CANALES = ("telefono", "whatsapp", "texto", "email", "fisica")
+BIT = {c: 1 << i for i, c in enumerate(CANALES)}
+
+SMALLINT_MIN, SMALLINT_MAX = -32768, 32767
+_CENTAVO = Decimal("0.01")
+_ENTERO_RE = re.compile(r"[0-9]{1,4}")
+
+
+def a_centavos(valor: Optional[Decimal]) -> Optional[int]:
+    """Decimal -> centavos enteros, redondeando como numeric(18,2) (mitad lejos de cero)."""
+    if valor is None:
+        return None
+    return int(Decimal(valor).quantize(_CENTAVO, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+@lru_cache(maxsize=1024)
+def entero_corto(texto: str, ancho: int) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Texto -> (smallint, texto de respaldo). '05' con ancho 2 -> (5, None); lo que
+    no se reconstruye igual desde el número ('5' con ancho 2, '3A', ' 7') va
+    tal cual al respaldo: (None, texto). '' -> (None, None).
+    Misma regla que api_entero_corto() en la base (migración 0009).
+    """
+    if not texto:
+        return None, None
+    if _ENTERO_RE.fullmatch(texto) and texto_corto(int(texto), ancho) == texto:
+        return int(texto), None
+    return None, texto
+
+
+def texto_corto(numero: int, ancho: int) -> str:
+    """Inverso de entero_corto: 5 con ancho 2 -> '05' (= api_texto_corto() en la base)."""
+    return str(numero).zfill(ancho)
+
+
+def dias_corto(dias: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+    """dias -> (smallint, respaldo integer): lo que no cabe en smallint va al respaldo."""
+    if dias is None or SMALLINT_MIN <= dias <= SMALLINT_MAX:
+        return dias, None
+    return None, dias
+
+
+def mascara(**activos: bool) -> int:
+    """mascara(telefono=True, email=True) -> 0b01001."""
+    return sum(BIT[c] for c, si in activos.items() if si)
@@ -0,0 +1,49 @@
+# src/api/dimensiones.py
+from __future__ import annotations
+from typing import Dict, Set
+
+from django.db import connection
+
+from .models import DIMENSIONES, DimEstadoDebito
+
+
+class CacheDimensiones:
+    """
+    valor -> id de cada dimensión, en memoria del proceso. La ingesta resuelve
+    así las columnas de baja cardinalidad sin ir a la base por cada fila; solo un
+    valor nuevo cuesta un get_or_create.
+
+    ``sincronizar()`` recarga todo en una sola consulta (las tablas son pequeñas):
+    se llama al empezar cada archivo, así un rollback nunca deja ids inexistentes.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, Dict[str, int]] = {c: {} for c in DIMENSIONES}
+        self._rechazados: Set[int] = set()  # ids de DimEstadoDebito con rechazado=True
+
+    def sincronizar(self) -> None:
+        partes = [f"SELECT %s, id, valor FROM {m._meta.db_table}" for m in DIMENSIONES.values()]
+        with connection.cursor() as cur:
+            cur.execute(" UNION ALL ".join(partes), list(DIMENSIONES))
+            filas = cur.fetchall()
+        ids: Dict[str, Dict[str, int]] = {c: {} for c in DIMENSIONES}
+        for col, pk, valor in filas:
+            ids[col][valor] = pk
+        self._ids = ids
+        self._rechazados = set(DimEstadoDebito.objects.filter(rechazado=True).values_list("id", flat=True))
+
+    def id(self, columna: str, valor: str) -> int:
+        valor = valor or ""
+        pk = self._ids[columna].get(valor)
+        if pk is None:
+            obj, _ = DIMENSIONES[columna].objects.get_or_create(valor=valor)
+            pk = self._ids[columna][valor] = obj.pk
+            if columna == "estado_debito" and DimEstadoDebito.objects.filter(pk=pk, rechazado=True).exists():
+                self._rechazados.add(pk)
+        return pk
+
+    def rechazado(self, estado_id: int) -> bool:
+        return estado_id in self._rechazados
+
+
+cache = CacheDimensiones()
@@ -0,0 +1,196 @@
+# src/api/downloads.py
+from __future__ import annotations
+from os import stat_result
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangoNoSatisfacible(Exception):
+    """El rango pedido queda fuera del archivo (-> 416)."""
+
+
+def etag_archivo(st: stat_result, variante: str = "") -> str:
+    """ETag fuerte a partir de tamaño y mtime (cambia si el archivo se reescribe)."""
+    sufijo = f"-{variante}" if variante else ""
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}{sufijo}"'
+
+
+def _etag_en_lista(header: str, etag: str, debil: bool) -> bool:
+    if header.strip() == "*":
+        return True
+    for candidato in header.split(","):
+        candidato = candidato.strip()
+        if debil and candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+def no_modificado(request, etag: str, mtime: float) -> bool:
+    """
+    Evalúa If-None-Match / If-Modified-Since (RFC 9110 §13.2.2):
+    si hay If-None-Match, manda sobre la fecha.
+    """
+    inm = request.META.get("HTTP_IF_NONE_MATCH")
+    if inm is not None:
+        return _etag_en_lista(inm, etag, debil=True)
+    ims = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return ims is not None and int(mtime) <= ims
+
+
+def _if_range_vigente(request, etag: str, mtime: float) -> bool:
+    """If-Range: solo se sirve el rango si la representación no cambió."""
+    valor = request.META.get("HTTP_IF_RANGE")
+    if not valor:
+        return True
+    valor = valor.strip()
+    if valor.startswith('"') or valor.startswith("W/"):
+        return valor == etag  # comparación fuerte
+    fecha = parse_http_date_safe(valor)
+    return fecha is not None and int(mtime) == fecha
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Devuelve (inicio, fin) inclusivo para un único rango de bytes.
+    None si no hay rango utilizable (se responde el archivo completo: multi-rango
+    o sintaxis desconocida se ignoran, como permite la RFC).
+    Levanta RangoNoSatisfacible si el rango no se puede servir.
+    """
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m:
+        return None
+    ini_s, fin_s = m.groups()
+    if not ini_s and not fin_s:
+        return None
+    if not ini_s:
+        # sufijo: últimos N bytes
+        n = int(fin_s)
+        if n == 0 or size == 0:
+            raise RangoNoSatisfacible()
+        return max(0, size - n), size - 1
+    inicio = int(ini_s)
+    fin = int(fin_s) if fin_s else size - 1
+    if inicio >= size or fin < inicio:
+        raise RangoNoSatisfacible()
+    return inicio, min(fin, size - 1)
+
+
+def es_descarga_nueva(request, resp: HttpResponse) -> bool:
+    """
+    True si ``resp`` entrega el archivo completo o el primer trozo de una
+    descarga por rangos. Las revalidaciones (304), los 416 y los rangos que no
+    empiezan en el byte 0 (el resto de una descarga en paralelo o reanudada)
+    no son una descarga nueva.
+    """
+    if resp.status_code == 206:
+        return resp["Content-Range"].startswith("bytes 0-")
+    if resp.status_code != 200:
+        return False
+    if resp.has_header("X-Accel-Redirect") or resp.has_header("X-Sendfile"):
+        # El rango lo resuelve el servidor frontal: se mira el que pidió el cliente
+        m = _RANGE_RE.match((request.META.get("HTTP_RANGE") or "").strip())
+        if m is None or not any(m.groups()):
+            return True  # sin rango utilizable: archivo completo
+        return m.group(1) != "" and int(m.group(1)) == 0
+    return True
+
+
+def iter_archivo(path: Path, inicio: int, largo: int, chunk: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with path.open("rb") as fh:
+        fh.seek(inicio)
+        restante = largo
+        while restante > 0:
+            data = fh.read(min(chunk, restante))
+            if not data:
+                break
+            restante -= len(data)
+            yield data
+
+
+def _offload(path: Path, resp: HttpResponse) -> bool:
+    """Delega la transferencia al servidor frontal si EXPORT_SENDFILE lo indica."""
+    modo = (getattr(settings, "EXPORT_SENDFILE", "") or "").lower()
+    if modo == "x-accel":
+        rel = path.resolve().relative_to(Path(settings.EXPORT_DIR).resolve())
+        prefijo = getattr(settings, "EXPORT_ACCEL_PREFIX", "/protected-exports/")
+        resp["X-Accel-Redirect"] = prefijo.rstrip("/") + "/" + quote(rel.as_posix())
+        return True
+    if modo == "x-sendfile":
+        resp["X-Sendfile"] = str(path.resolve())
+        return True
+    return False
+
+
+def servir_archivo(
+    request,
+    path: Path,
+    filename: str,
+    content_type: str,
+    headers: Optional[Dict[str, str]] = None,
+    variante: str = "",
+) -> HttpResponse:
+    """
+    Sirve un archivo con validación condicional (304), rangos de bytes (206/416)
+    y, opcionalmente, offload vía X-Accel-Redirect / X-Sendfile.
+    """
+    st = path.stat()
+    etag = etag_archivo(st, variante)
+    comunes = {
+        "ETag": etag,
+        "Last-Modified": http_date(st.st_mtime),
+        "Cache-Control": "no-cache",
+        "Accept-Ranges": "bytes",
+    }
+    comunes.update(headers or {})
+
+    if no_modificado(request, etag, st.st_mtime):
+        resp: HttpResponse = HttpResponseNotModified()
+        for k, v in comunes.items():
+            resp[k] = v
+        return resp
+
+    offload = HttpResponse(content_type=content_type)
+    if _offload(path, offload):
+        # El servidor frontal resuelve Range/Content-Length sobre el archivo real.
+        offload["Content-Disposition"] = content_disposition_header(True, filename)
+        for k, v in comunes.items():
+            offload[k] = v
+        return offload
+
+    rango = None
+    if _if_range_vigente(request, etag, st.st_mtime):
+        try:
+            rango = parse_range(request.META.get("HTTP_RANGE"), st.st_size)
+        except RangoNoSatisfacible:
+            resp = HttpResponse(status=416)
+            resp["Content-Range"] = f"bytes */{st.st_size}"
+            for k, v in comunes.items():
+                resp[k] = v
+            return resp
+
+    if rango is None:
+        resp = FileResponse(path.open("rb"), as_attachment=True, filename=filename, content_type=content_type)
+    else:
+        inicio, fin = rango
+        largo = fin - inicio + 1
+        resp = StreamingHttpResponse(iter_archivo(path, inicio, largo), status=206, content_type=content_type)
+        resp["Content-Range"] = f"bytes {inicio}-{fin}/{st.st_size}"
+        resp["Content-Length"] = str(largo)
+        resp["Content-Disposition"] = content_disposition_header(True, filename)
+    for k, v in comunes.items():
+        resp[k] = v
+    return resp
@@ -0,0 +1,275 @@
+# src/api/exports.py
+from __future__ import annotations
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import gzip
+import io
+import json
+import re
+import uuid
+
+from django.conf import settings
+
+from .artifacts import ArchivoConHash, publicar
+from .models import Artefacto, ArchivoExportado
+
+# Sufijo en disco de cada variante comprimida (Content-Encoding -> extensión)
+ENCODING_SUFFIX: Dict[str, str] = {"gzip": ".gz", "zstd": ".zst"}
+
+# Preferencia del servidor ante empate de q-values
+_PREFERENCIA = ("zstd", "gzip")
+
+WRITE_BUFFER = 1024 * 1024
+
+
+def _zstd():
+    """Import lazy: zstandard es opcional."""
+    try:
+        import zstandard
+    except Exception:
+        return None
+    return zstandard
+
+
+def encodings_activos() -> List[str]:
+    """Encodings configurados en EXPORT_COMPRESSION que se pueden producir aquí."""
+    activos = []
+    for enc in getattr(settings, "EXPORT_COMPRESSION", ["gzip"]):
+        enc = enc.strip().lower()
+        if enc == "gzip" or (enc == "zstd" and _zstd() is not None):
+            activos.append(enc)
+    return activos
+
+
+def variante_path(path: Path, encoding: str) -> Path:
+    return path.with_name(path.name + ENCODING_SUFFIX[encoding])
+
+
+def es_variante(path: Path) -> bool:
+    return path.suffix in ENCODING_SUFFIX.values()
+
+
+class _Tee(io.RawIOBase):
+    """Sink binario que replica cada write en varios destinos."""
+
+    def __init__(self, destinos):
+        self._destinos = destinos
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        for d in self._destinos:
+            d.write(b)
+        return len(b)
+
+
+class SalidaExport:
+    """
+    Abre un export para escritura de texto y produce, en la misma pasada,
+    el archivo plano y sus variantes comprimidas (gzip y, si está disponible, zstd).
+
+    Todo se escribe en temporales (calculando su sha256 al vuelo) y se publica
+    al cerrar a través del almacén de artefactos: una descarga nunca ve un archivo
+    a medio escribir y un export idéntico al anterior no se reescribe.
+
+    Con ``diferir=True`` el cierre solo deja los temporales listos y la publicación
+    (que toca la DB) la hace luego ``publicar()`` desde el hilo que la llamó.
+    """
+
+    def __init__(self, path: Path, encodings: Optional[List[str]] = None,
+                 grupo: Optional[str] = None, diferir: bool = False):
+        self.path = Path(path)
+        self.encodings = encodings_activos() if encodings is None else encodings
+        self.grupo = grupo or self.path.name
+        self.diferir = diferir
+        self._destinos: List[Tuple[Path, Path, ArchivoConHash]] = []
+        self._cerrar: list = []
+        self.text: Optional[io.TextIOWrapper] = None
+
+    def __enter__(self) -> io.TextIOWrapper:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        sinks = []
+
+        sufijo = uuid.uuid4().hex  # dos cargas del mismo archivo a la vez no comparten temporales
+
+        def _tmp(final: Path) -> ArchivoConHash:
+            tmp = final.with_name(f".{final.name}.{sufijo}.tmp")
+            fh = ArchivoConHash(tmp.open("wb"))
+            self._destinos.append((tmp, final, fh))
+            self._cerrar.append(fh)
+            return fh
+
+        sinks.append(_tmp(self.path))
+        for enc in self.encodings:
+            raw = _tmp(variante_path(self.path, enc))
+            if enc == "gzip":
+                comp = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0)
+            else:
+                comp = _zstd().ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+            self._cerrar.insert(len(self._cerrar) - 1, comp)  # cerrar compresor antes que su archivo
+            sinks.append(comp)
+
+        buffered = io.BufferedWriter(_Tee(sinks), buffer_size=WRITE_BUFFER)
+        self.text = io.TextIOWrapper(buffered, encoding="utf-8", newline="")
+        return self.text
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if self.text is not None:
+                self.text.flush()
+                self.text.detach()
+        finally:
+            for fh in self._cerrar:
+                fh.close()
+        if exc_type is not None:
+            self.descartar()
+        elif not self.diferir:
+            self.publicar()
+
+    @property
+    def sha256(self) -> str:
+        """sha256 del archivo plano (disponible al cerrar)."""
+        return self._destinos[0][2].hexdigest
+
+    def publicar(self) -> None:
+        for tmp, final, fh in self._destinos:
+            publicar(tmp, final, fh.hexdigest, fh.size, Artefacto.TIPO_EXPORT, grupo=self.grupo)
+
+    def descartar(self) -> None:
+        for tmp, _, _ in self._destinos:
+            tmp.unlink(missing_ok=True)
+
+    def tamanos(self) -> Dict[str, int]:
+        """Bytes en disco de cada variante publicada ('identity' = plano)."""
+        out = {"identity": self.path.stat().st_size}
+        for enc in self.encodings:
+            out[enc] = variante_path(self.path, enc).stat().st_size
+        return out
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    prefs: Dict[str, float] = {}
+    for item in header.split(","):
+        partes = [x.strip() for x in item.split(";")]
+        if not partes[0]:
+            continue
+        q = 1.0
+        for x in partes[1:]:
+            if x.startswith("q="):
+                try:
+                    q = float(x[2:])
+                except ValueError:
+                    q = 0.0
+        prefs[partes[0].lower()] = q
+    return prefs
+
+
+def calidad(prefs: Dict[str, float], encoding: str) -> float:
+    """
+    q de ``encoding`` según un Accept-Encoding ya parseado (RFC 9110 §12.5.3): la
+    entrada propia, si no la de ``*``; sin ninguna de las dos, ``identity`` (sin
+    compresión) es aceptable y el resto no.
+    """
+    if encoding in prefs:
+        return prefs[encoding]
+    return prefs.get("*", 1.0 if encoding == "identity" else 0.0)
+
+
+def elegir_variante(path: Path, accept_encoding: str) -> Tuple[Path, str]:
+    """
+    Escoge la mejor variante precomprimida de ``path`` según Accept-Encoding.
+    Devuelve (ruta, encoding); encoding == "" significa servir el archivo plano,
+    que compite con su q de ``identity`` (a igual q gana la variante comprimida).
+    Solo se consideran variantes al menos tan nuevas como el original.
+    """
+    prefs = parse_accept_encoding(accept_encoding or "")
+    if not prefs:
+        return path, ""
+    mtime = path.stat().st_mtime
+    mejor: Tuple[float, int, Path, str] = (calidad(prefs, "identity"), -1, path, "")
+    for rank, enc in enumerate(reversed(_PREFERENCIA)):
+        q = calidad(prefs, enc)
+        if q <= 0:
+            continue
+        cand = variante_path(path, enc)
+        try:
+            if cand.stat().st_mtime < mtime:
+                continue
+        except FileNotFoundError:
+            continue
+        if (q, rank) > mejor[:2]:
+            mejor = (q, rank, cand, enc)
+    return mejor[2], mejor[3]
+
+
+# --------------------------
+# Manifiestos de exports por shards
+# --------------------------
+MANIFEST_SUFFIX = ".manifest"
+
+
+def manifiesto_path(path: Path) -> Path:
+    """CLIENTES_20250529.json -> CLIENTES_20250529.json.manifest"""
+    return path.with_name(path.name + MANIFEST_SUFFIX)
+
+
+def es_manifiesto(path: Path) -> bool:
+    return path.name.endswith(MANIFEST_SUFFIX)
+
+
+def leer_manifiesto(path: Path) -> Dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+# --------------------------
+# Catálogo de exports
+# --------------------------
+_STEM_RE = re.compile(r"^(.+)_(\d{8})$")
+
+
+def nombre_y_fecha(stem: str) -> Tuple[str, Optional[date]]:
+    """Separa NOMBRE y fecha de un stem NOMBRE_YYYYMMDD (fecha None si no aplica)."""
+    m = _STEM_RE.match(stem)
+    if not m:
+        return stem, None
+    try:
+        return m.group(1), datetime.strptime(m.group(2), "%Y%m%d").date()
+    except ValueError:
+        return stem, None
+
+
+def registrar_export(path: Path):
+    """
+    Crea/actualiza la fila del catálogo para un export recién escrito. Un
+    manifiesto se cataloga con el formato, el tamaño y las variantes del export
+    completo (suma de sus shards).
+    """
+    path = Path(path)
+    st = path.stat()
+    export = path.with_name(path.name[:-len(MANIFEST_SUFFIX)]) if es_manifiesto(path) else path
+    nombre, fecha = nombre_y_fecha(export.stem)  # A.B_20250529.csv.manifest -> A.B, 2025-05-29
+    if es_manifiesto(path):
+        m = leer_manifiesto(path)
+        formato, size, encodings, shards = m["formato"], m["bytes"], m["encodings"], len(m["shards"])
+    else:
+        formato, size, shards = path.suffix.lstrip(".").lower(), st.st_size, 0
+        encodings = {
+            enc: v.stat().st_size
+            for enc in ENCODING_SUFFIX
+            if (v := variante_path(path, enc)).is_file()
+        }
+    obj, _ = ArchivoExportado.objects.update_or_create(
+        nombre_archivo=path.name,
+        defaults={
+            "nombre": nombre,
+            "fecha": fecha,
+            "formato": formato,
+            "size": size,
+            "encodings": encodings,
+            "shards": shards,
+            "modified": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+        },
+    )
+    return obj
@@ -0,0 +1,130 @@
+# src/api/intents.py
+from __future__ import annotations
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import re
+import unicodedata
+
+# Ruta rápida: preguntas recurrentes (las mismas reglas que el prompt del agente
+# le enseña al LLM) reconocidas por plantillas con slots y traducidas a SQL
+# parametrizado, sin llamar al LLM. Si sobra alguna palabra que no se entiende,
+# no hay match y la instrucción va al agente.
+
+TELEFONO_PRINCIPAL = "telefono_principal"  # columna generada (ver Registro)
+EDAD = "EXTRACT(YEAR FROM AGE(CURRENT_DATE, fecha_nacimiento))::int AS edad"
+LIMITE_LISTADO = 50
+
+_PRIMA = r"(?:el )?(?:valor de la prima|valor_prima|valor prima|prima)"
+
+# Slots de filtro/orden: (nombre, regex). Los grupos capturan los parámetros.
+_SLOTS: List[Tuple[str, re.Pattern]] = [
+    ("edad", re.compile(r"\b(menores|mayores) de (\d{1,3}|edad)(?: anos)?\b")),
+    ("rechazados", re.compile(r"\b(?:debitos?|pagos?) rechazados?\b|\brechazos? (?:de|del) debito\b")),
+    ("dias", re.compile(r"\b(?:en |de )?(?:los )?ultimos (\d{1,4}) dias\b")),
+    ("top", re.compile(rf"\btop (\d{{1,4}}) (?:clientes |registros )?(?:por|segun|de mayor|con mayor) {_PRIMA}\b")),
+    ("top", re.compile(rf"\b(?:los )?(\d{{1,4}}) (?:clientes |registros )?con (?:mayor|mas alta|mas alto) {_PRIMA}\b")),
+]
+
+# Columnas que el usuario puede pedir (frases de varias palabras primero)
+_COLUMNAS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"\btelefonos? principal(?:es)?\b|\btelefonos?\b"), TELEFONO_PRINCIPAL),
+    (re.compile(r"\bfecha de nacimiento\b|\bfecha_nacimiento\b"), "fecha_nacimiento"),
+    (re.compile(r"\bfecha de creacion\b|\bfecha_creacion\b|\bcreated_at\b"), "created_at"),
+    (re.compile(r"\b(?:mejor canal|canal preferido|mejor_canal)\b"), "mejor_canal"),
+    (re.compile(r"\bcausal(?:es)?(?: de rechazo)?\b|\bcausal_rechazo\b"), "causal_rechazo"),
+    (re.compile(r"\bestado(?: del?)? debito\b|\bestado_debito\b"), "estado_debito"),
+    (re.compile(rf"\b{_PRIMA}\b"), "valor_prima"),
+    (re.compile(r"\bcorreos?(?: electronicos?)?\b|\bcorreo_electronico\b|\bemails?\b"), "correo_electronico"),
+    (re.compile(r"\bnombres?\b"), "nombre"),
+    (re.compile(r"\bpolizas?\b"), "poliza"),
+    (re.compile(r"\bproductos?\b"), "producto"),
+    (re.compile(r"\bedad(?:es)?\b"), EDAD),
+]
+
+# Palabras de relleno admitidas alrededor de los slots
+_RELLENO = frozenset("""
+    dame damelos muestrame muestra mostrar lista listar listame listado ver quiero necesito
+    consulta consultar trae traeme busca buscar obtener cuales quienes son hay
+    el la los las un una unos unas de del a al que con y e sus su por en para me solo
+    todos todas clientes cliente registros registro personas asegurados
+""".split())
+
+# Columnas por defecto según los slots presentes
+_DEFECTO = ["id", "nombre", "poliza"]
+_EXTRA_POR_SLOT: Dict[str, List[str]] = {
+    "edad": [EDAD],
+    "rechazados": ["estado_debito", "causal_rechazo"],
+    "dias": ["created_at"],
+    "top": ["valor_prima"],
+}
+
+
+class ConsultaIntencion(NamedTuple):
+    intencion: str      # slots reconocidos, p. ej. "edad+rechazados"
+    sql: str            # con marcadores %s
+    params: List[int]
+
+
+def normalizar(texto: str) -> str:
+    s = unicodedata.normalize("NFKD", texto)
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    s = re.sub(r"[^\w]+", " ", s)
+    return " ".join(s.split())
+
+
+def reconocer(instruccion: str) -> Optional[ConsultaIntencion]:
+    """SQL parametrizado para ``instruccion`` o None si no encaja en ninguna plantilla."""
+    texto = f" {normalizar(instruccion)} "
+    filtros: List[str] = []
+    params: List[int] = []
+    slots: List[str] = []
+    orden = "id DESC"
+    limite = LIMITE_LISTADO
+
+    for nombre, patron in _SLOTS:
+        m = patron.search(texto)
+        if not m or nombre in slots:
+            continue
+        slots.append(nombre)
+        texto = texto[:m.start()] + " " * (m.end() - m.start()) + texto[m.end():]
+        if nombre == "edad":
+            anios = 18 if m.group(2) == "edad" else int(m.group(2))
+            op = ">" if m.group(1) == "menores" else "<="
+            filtros.append(f"fecha_nacimiento {op} CURRENT_DATE - make_interval(years => %s)")
+            params.append(anios)
+        elif nombre == "rechazados":
+            filtros.append("debito_rechazado")
+        elif nombre == "dias":
+            filtros.append("created_at >= CURRENT_DATE - make_interval(days => %s)")
+            params.append(int(m.group(1)))
+        elif nombre == "top":
+            orden = "valor_prima DESC NULLS LAST"
+            limite = int(m.group(1))
+
+    if not slots:
+        return None
+
+    # Columnas en el orden en que se mencionan (los reemplazos conservan las posiciones)
+    pedidas: List[Tuple[int, str]] = []
+    for patron, expr in _COLUMNAS:
+        for m in patron.finditer(texto):
+            pedidas.append((m.start(), expr))
+        texto = patron.sub(lambda m: " " * len(m.group(0)), texto)
+    columnas: List[str] = []
+    for _, expr in sorted(pedidas):
+        if expr not in columnas:
+            columnas.append(expr)
+
+    if any(tok not in _RELLENO for tok in texto.split()):
+        return None
+
+    if not columnas:
+        columnas = list(_DEFECTO)
+        for nombre in slots:
+            columnas += [c for c in _EXTRA_POR_SLOT.get(nombre, []) if c not in columnas]
+
+    sql = f"SELECT {', '.join(columnas)} FROM api_registro"
+    if filtros:
+        sql += " WHERE " + " AND ".join(filtros)
+    sql += f" ORDER BY {orden} LIMIT %s"
+    params.append(limite)
+    return ConsultaIntencion("+".join(slots), sql, params)
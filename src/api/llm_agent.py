@@ -1,28 +1,354 @@
 # src/api/llm_agent.py
 from __future__ import annotations
+import hashlib
+import json
 import os
 import re
-from typing import Optional, Dict, Any
-
-from django.db import connection
+import sys
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Optional, Dict, Any, Iterator, List, NamedTuple, Tuple
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models.signals import post_migrate
 
 # LangChain (usar las rutas modernas estables)
 from langchain_core.tools import tool
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+from . import observabilidad
+from .caching import CacheLRU, generacion_datos
+from .intents import reconocer
+from .prompting import construir_prompt, prompt_completo
+from .routers import alias_lectura, solo_lectura
+from .models import Registro
 from .services import procesar_archivo_y_guardar
 
 
+# Palabras peligrosas de DDL/DML (como palabra completa: "DELETE\nFROM" también cuenta)
+_INSEGURAS_RE = re.compile(r"\b(insert|update|delete|merge|drop|alter|create|truncate)\b")
+
+
 def _is_safe_sql(sql: str) -> bool:
-    """Permite solo SELECT/CTE (WITH ... SELECT). Bloquea DML/DDL."""
+    """Permite solo una sentencia SELECT/CTE (WITH ... SELECT). Bloquea DML/DDL."""
+    # Una sola sentencia: fuera del ";" final no puede quedar ninguno (tampoco dentro de
+    # literales o comentarios, que aquí no se interpretan)
+    if ";" in sql.strip().rstrip(";"):
+        return False
     # Quita comentarios y normaliza
-    sql_clean = re.sub(r"--.*?$|/\*.*?\*/", "", sql, flags=re.S).strip().lower()
+    sql_clean = re.sub(r"--.*?$|/\*.*?\*/", "", sql, flags=re.S | re.M).strip().lower()
     if not (sql_clean.startswith("select") or sql_clean.startswith("with")):
         return False
-    # Palabras peligrosas de DDL/DML
-    inseguras = ("insert ", "update ", "delete ", "drop ", "alter ", "create ", "truncate ")
-    return not any(k in sql_clean for k in inseguras)
+    return _INSEGURAS_RE.search(sql_clean) is None
+
+
+# --------------------------
+# Caché de resultados SQL
+# --------------------------
+# Clave = (SQL normalizado, generación de api_registro). Mientras no haya una
+# ingesta nueva el mismo SELECT se responde desde memoria; acotada en bytes (LRU).
+# Un SELECT que depende del reloj (CURRENT_DATE, now(), AGE(x), 'today', ...) no
+# se guarda: su resultado cambia sin que haya ingesta.
+_cache_sql = CacheLRU(max_bytes=int(getattr(settings, "SQL_RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024)))
+_generacion_vista: Dict[str, Optional[int]] = {"valor": None}
+_LITERAL_RE = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+_VOLATIL_RE = re.compile(
+    r"\b(?:current_date|current_time|current_timestamp|localtime|localtimestamp)\b"
+    r"|\b(?:now|age|clock_timestamp|statement_timestamp|transaction_timestamp|timeofday|random)\s*\("
+    r"|'(?:now|today|tomorrow|yesterday)'",
+    re.I,
+)
+
+
+def normalizar_sql(sql: str) -> str:
+    """Colapsa espacios y pasa a minúsculas fuera de literales/identificadores entre comillas."""
+    partes = _LITERAL_RE.split(sql.strip().rstrip(";").strip())
+    for i in range(0, len(partes), 2):
+        partes[i] = " ".join(partes[i].split()).lower()
+    return "".join(partes)
+
+
+def _peso_filas(cols, rows) -> int:
+    """Bytes aproximados en memoria de un resultado (tuplas + valores)."""
+    total = sys.getsizeof(rows) + sum(sys.getsizeof(c) for c in cols)
+    for r in rows:
+        total += sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r)
+    return total
+
+
+def _limites_sql() -> Tuple[int, int, int]:
+    """(máximo de filas, statement_timeout en ms, filas por fetch) para las tools SQL."""
+    return (
+        int(getattr(settings, "SQL_TOOL_MAX_ROWS", 1000)),
+        int(getattr(settings, "SQL_TOOL_TIMEOUT_MS", 15000)),
+        int(getattr(settings, "SQL_TOOL_FETCH_SIZE", 500)),
+    )
+
+
+@contextmanager
+def _transaccion_lectura(alias: str):
+    """
+    Transacción de solo lectura con statement_timeout para el SQL de las tools,
+    también si el alias de lectura es "default". Dentro de una transacción ya
+    abierta (ATOMIC_REQUESTS, tests, un llamador con atomic) corre en un savepoint
+    que se revierte al salir: ni READ ONLY ni el timeout quedan en la del llamador.
+    """
+    conn = connections[alias]
+    with transaction.atomic(using=alias):
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION READ ONLY")
+            cur.execute("SELECT set_config('statement_timeout', %s, true)", [str(_limites_sql()[1])])
+        yield conn
+        # Solo se leyó: revertir no deshace nada y restaura la configuración anterior
+        transaction.set_rollback(True, using=alias)
+
+
+def _iter_acotado(sql: str, params: Optional[List[Any]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Ejecuta el SELECT en el alias de lectura (_transaccion_lectura) y lee por
+    lotes (cursor de servidor) hasta el máximo de filas; no trae a memoria lo que sobra.
+    Emite ("cols", [...]), luego ("filas", lote) por cada fetch y al final ("truncado", bool).
+    """
+    max_rows, _, fetch_size = _limites_sql()
+    with _transaccion_lectura(alias_lectura()) as conn:
+        if conn.settings_dict.get("DISABLE_SERVER_SIDE_CURSORS"):
+            cursor = conn.cursor()   # p. ej. detrás de pgbouncer en modo transacción
+        else:
+            cursor = conn.chunked_cursor()
+        with cursor as cur:
+            cur.execute(sql, params)
+            cols = [c[0] for c in cur.description] if cur.description else []
+            yield "cols", cols
+            leidas = 0
+            while cols and leidas <= max_rows:
+                lote = cur.fetchmany(min(fetch_size, max_rows + 1 - leidas))
+                if not lote:
+                    break
+                leidas += len(lote)
+                if leidas > max_rows:
+                    lote = lote[:len(lote) - (leidas - max_rows)]
+                if lote:
+                    yield "filas", lote
+    yield "truncado", leidas > max_rows
+
+
+def _leer_acotado(sql: str, params: Optional[List[Any]] = None):
+    """_iter_acotado de una vez. Devuelve (cols, rows, truncado)."""
+    cols: List[str] = []
+    rows: list = []
+    truncado = False
+    for tipo, valor in _iter_acotado(sql, params):
+        if tipo == "cols":
+            cols = valor
+        elif tipo == "filas":
+            rows.extend(valor)
+        else:
+            truncado = valor
+    return cols, rows, truncado
+
+
+# --------------------------
+# Admisión por costo (EXPLAIN)
+# --------------------------
+class ConsultaRechazada(Exception):
+    """El plan estimado de la consulta supera los umbrales de admisión."""
+
+    def __init__(self, motivo: str, plan: Dict[str, Any]):
+        super().__init__(motivo)
+        self.motivo = motivo
+        self.plan = plan
+
+
+class ResultadoSQL(NamedTuple):
+    cols: List[str]
+    rows: list
+    truncado: bool
+    sql: str  # SQL realmente ejecutado (puede ser la versión reescrita)
+
+
+def _explain(sql: str, params: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """Plan estimado (sin ejecutar la consulta), en la misma transacción acotada que la consulta."""
+    with _transaccion_lectura(alias_lectura()) as conn, conn.cursor() as cur:
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        raw = cur.fetchone()[0]
+    return (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+
+
+def resumen_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Lo que el agente necesita para reintentar: costo, filas estimadas, tipos de
+    nodo y seq scans. El agente solo conoce la vista api_registro: los scans de la
+    tabla física se reportan con ese nombre y los de las dimensiones se omiten.
+    """
+    nodos: List[str] = []
+    seq_scans: List[str] = []
+    pendientes = [plan]
+    while pendientes:
+        n = pendientes.pop()
+        if n["Node Type"] not in nodos:
+            nodos.append(n["Node Type"])
+        if n["Node Type"] == "Seq Scan":
+            tabla = n.get("Relation Name")
+            tabla = Registro._meta.db_table if tabla == observabilidad.TABLA else tabla
+            if tabla not in observabilidad.DIM_FK and tabla not in seq_scans:
+                seq_scans.append(tabla)
+        pendientes.extend(reversed(n.get("Plans", [])))
+    return {
+        "costo_total": plan["Total Cost"],
+        "filas_estimadas": plan["Plan Rows"],
+        "nodos": nodos,
+        "seq_scans": seq_scans,
+    }
+
+
+def _excede(resumen: Dict[str, Any], max_costo: float, max_filas: float) -> Optional[str]:
+    if max_costo and resumen["costo_total"] > max_costo:
+        return f"Costo estimado {resumen['costo_total']:.0f} supera el máximo {max_costo:.0f}."
+    if max_filas and resumen["filas_estimadas"] > max_filas:
+        return f"Filas estimadas {resumen['filas_estimadas']:.0f} superan el máximo {max_filas:.0f}."
+    return None
+
+
+def _admitir(sql: str, params: Optional[List[Any]] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """admitir_sql y además el plan del SQL admitido (None si no hubo que planificarlo)."""
+    max_costo = float(getattr(settings, "SQL_ADMISSION_MAX_COST", 0) or 0)
+    max_filas = float(getattr(settings, "SQL_ADMISSION_MAX_ROWS", 0) or 0)
+    if not max_costo and not max_filas:
+        return sql, None
+
+    plan = _explain(sql, params)
+    resumen = resumen_plan(plan)
+    motivo = _excede(resumen, max_costo, max_filas)
+    if motivo is None:
+        return sql, plan
+
+    if getattr(settings, "SQL_ADMISSION_MODE", "rewrite") == "rewrite":
+        max_rows = _limites_sql()[0]
+        reescrito = f"SELECT * FROM ({sql.strip().rstrip(';')}) AS consulta LIMIT {max_rows + 1}"
+        plan_reescrito = _explain(reescrito, params)
+        if _excede(resumen_plan(plan_reescrito), max_costo, max_filas) is None:
+            return reescrito, plan_reescrito
+    raise ConsultaRechazada(motivo, resumen)
+
+
+def admitir_sql(sql: str, params: Optional[List[Any]] = None) -> str:
+    """
+    Planifica el SELECT con EXPLAIN y lo admite si el costo/filas estimados están
+    bajo SQL_ADMISSION_MAX_COST / SQL_ADMISSION_MAX_ROWS (0 = sin umbral).
+    En modo "rewrite" intenta primero acotarlo con LIMIT (el plan puede cortar antes).
+    Devuelve el SQL a ejecutar o lanza ConsultaRechazada con el resumen del plan.
+    """
+    return _admitir(sql, params)[0]
+
+
+def _rechazo(sql: str, e: ConsultaRechazada) -> Dict[str, Any]:
+    # "reintentar" hace que el agente vea el rechazo y pruebe otra consulta (ver _AgenteSQL)
+    return {"ok": False, "error": e.motivo, "sql": sql, "plan": e.plan, "reintentar": True}
+
+
+def _clave_resultado(sql: str, params: Optional[List[Any]]):
+    """Clave de la caché de resultados (None si está deshabilitada o el SQL depende del reloj)."""
+    if _cache_sql.max_bytes <= 0 or _VOLATIL_RE.search(sql):
+        return None
+    with solo_lectura():
+        gen = generacion_datos(Registro._meta.db_table)  # la de los datos que se van a leer
+    if gen != _generacion_vista["valor"]:
+        # Hubo ingesta: todo lo guardado es de una generación anterior
+        if _generacion_vista["valor"] is not None:
+            _cache_sql.limpiar()
+        _generacion_vista["valor"] = gen
+    return (normalizar_sql(sql), tuple(params or ()), gen)
+
+
+def _observar(sql: str, params: Optional[List[Any]], herramienta: str, duracion_s: float,
+              filas: int, truncado: bool, plan: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Registra la ejecución para el reporte de huellas y el asesor de índices
+    (api.observabilidad). Los aciertos de la caché de resultados no llegan a la
+    base y no se registran (ver estadisticas_cache_sql).
+    """
+    if not observabilidad.habilitada():
+        return
+    if plan is None:
+        try:
+            plan = _explain(sql, params)  # sin umbrales de admisión no se había planificado
+        except Exception:
+            plan = None
+    observabilidad.registrar_ejecucion(sql, herramienta, duracion_s * 1000, filas, truncado, plan)
+
+
+def _ejecutar_select(sql: str, params: Optional[List[Any]] = None,
+                     herramienta: str = "consultar_sql_json") -> ResultadoSQL:
+    """Admite y ejecuta el SELECT (o lo toma de la caché de resultados)."""
+    clave = _clave_resultado(sql, params)
+    if clave is not None:
+        guardado = _cache_sql.get(clave)
+        if guardado is not None:
+            return guardado
+
+    sql_ejecutado, plan = _admitir(sql, params)
+    t0 = time.monotonic()
+    cols, rows, truncado = _leer_acotado(sql_ejecutado, params)
+    resultado = ResultadoSQL(cols, rows, truncado, sql_ejecutado)
+    _observar(sql_ejecutado, params, herramienta, time.monotonic() - t0, len(rows), truncado, plan)
+
+    if clave is not None:
+        _cache_sql.set(clave, resultado, peso=_peso_filas(cols, rows))
+    return resultado
+
+
+def iter_select(sql: str, params: Optional[List[Any]] = None, sql_admitido: Optional[str] = None,
+                herramienta: str = "consultar_sql_json") -> Iterator[Tuple[str, Any]]:
+    """
+    Variante por lotes de _ejecutar_select para respuestas en streaming:
+    ("sql", sql_ejecutado), ("cols", [...]), ("filas", lote)..., ("truncado", bool).
+    Lo leído (acotado por SQL_TOOL_MAX_ROWS) también alimenta la caché de resultados.
+    """
+    clave = _clave_resultado(sql, params)
+    guardado = _cache_sql.get(clave) if clave is not None else None
+    if guardado is not None:
+        _, _, fetch_size = _limites_sql()
+        yield "sql", guardado.sql
+        yield "cols", guardado.cols
+        for i in range(0, len(guardado.rows), fetch_size):
+            yield "filas", guardado.rows[i:i + fetch_size]
+        yield "truncado", guardado.truncado
+        return
+
+    plan = None
+    if sql_admitido is None:
+        sql_admitido, plan = _admitir(sql, params)
+    yield "sql", sql_admitido
+    cols: List[str] = []
+    rows: list = []
+    # Solo cuenta el tiempo dentro del cursor, no el que tarda el cliente en consumir cada lote
+    en_db = 0.0
+    lector = _iter_acotado(sql_admitido, params)
+    while True:
+        t0 = time.monotonic()
+        try:
+            tipo, valor = next(lector)
+        except StopIteration:
+            break
+        en_db += time.monotonic() - t0
+        if tipo == "cols":
+            cols = valor
+        elif tipo == "filas":
+            rows.extend(valor)
+        else:
+            _observar(sql_admitido, params, herramienta, en_db, len(rows), valor, plan)
+            if clave is not None:
+                _cache_sql.set(clave, ResultadoSQL(cols, rows, valor, sql_admitido), peso=_peso_filas(cols, rows))
+        yield tipo, valor
+
+
+def estadisticas_cache_sql() -> Dict[str, Any]:
+    return {"habilitada": _cache_sql.max_bytes > 0, "generacion": _generacion_vista["valor"], **_cache_sql.estadisticas()}
 
 
 @tool("procesar_archivo", return_direct=True)
@@ -35,11 +361,30 @@ def procesar_archivo(path: str) -> Dict[str, Any]:
         return {"ok": False, "error": str(e)}
 
 
+def _consultar_json(sql: str, params: Optional[List[Any]] = None,
+                    herramienta: str = "consultar_sql_json") -> Dict[str, Any]:
+    """Ejecuta y arma la salida JSON de consultar_sql_json (también la usa la ruta rápida)."""
+    try:
+        res = _ejecutar_select(sql, params, herramienta)
+        data = [dict(zip(res.cols, r)) for r in res.rows] if res.cols else []
+        out = {"ok": True, "sql": sql, "rows": data, "row_count": len(data), "truncated": res.truncado}
+        if params:
+            out["params"] = list(params)
+        if res.sql != sql:
+            out["sql_ejecutado"] = res.sql
+        return out
+    except ConsultaRechazada as e:
+        return _rechazo(sql, e)
+    except Exception as e:
+        return {"ok": False, "error": str(e), "sql": sql}
+
+
 @tool("consultar_sql_json", return_direct=True)
 def consultar_sql_json(sql: str) -> Dict[str, Any]:
     """
     Ejecuta SELECTs contra api_registro y devuelve filas como lista de objetos JSON.
-    Rechaza cualquier cosa que no sea SELECT/CTE.
+    Rechaza cualquier cosa que no sea SELECT/CTE. Devuelve como máximo
+    SQL_TOOL_MAX_ROWS filas (truncated=true si había más).
     """
     if not _is_safe_sql(sql):
         return {"ok": False, "error": "Solo se permiten consultas SELECT/CTE."}
@@ -47,15 +392,7 @@ def consultar_sql_json(sql: str) -> Dict[str, Any]:
     if "API_REGISTRO" not in sql.upper():
         return {"ok": False, "error": "La consulta debe apuntar a la tabla api_registro."}
 
-    try:
-        with connection.cursor() as cur:
-            cur.execute(sql)
-            cols = [c[0] for c in cur.description] if cur.description else []
-            rows = cur.fetchall()
-        data = [dict(zip(cols, r)) for r in rows] if cols else []
-        return {"ok": True, "sql": sql, "rows": data, "row_count": len(data)}
-    except Exception as e:
-        return {"ok": False, "error": str(e), "sql": sql}
+    return _consultar_json(sql)
 
 
 @tool("consultar_sql_texto", return_direct=True)
@@ -70,93 +407,70 @@ def consultar_sql_texto(sql: str) -> Dict[str, Any]:
         return {"ok": False, "error": "La consulta debe apuntar a la tabla api_registro."}
 
     try:
-        with connection.cursor() as cur:
-            cur.execute(sql)
-            cols = [c[0] for c in cur.description] if cur.description else []
-            rows = cur.fetchall()
-        header = " | ".join(cols) if cols else ""
+        res = _ejecutar_select(sql, herramienta="consultar_sql_texto")
+        header = " | ".join(res.cols) if res.cols else ""
         lines = [header] if header else []
-        for r in rows:
+        for r in res.rows:
             lines.append(" | ".join("" if v is None else str(v) for v in r))
+        if res.truncado:
+            lines.append(f"... (truncado a {len(res.rows)} filas)")
         text = "\n".join(lines)
-        return {"ok": True, "sql": sql, "text": text, "row_count": len(rows)}
+        out = {"ok": True, "sql": sql, "text": text, "row_count": len(res.rows), "truncated": res.truncado}
+        if res.sql != sql:
+            out["sql_ejecutado"] = res.sql
+        return out
+    except ConsultaRechazada as e:
+        return _rechazo(sql, e)
     except Exception as e:
         return {"ok": False, "error": str(e), "sql": sql}
 
 
 tools = [procesar_archivo, consultar_sql_json, consultar_sql_texto]
 
-_SYS = """Eres un agente de datos para una aseguradora.
-
-Herramientas:
-- procesar_archivo(path): procesa un TXT e inserta registros en DB.
-- consultar_sql_json(sql): ejecuta SELECT y devuelve JSON (usa esta por defecto).
-- consultar_sql_texto(sql): ejecuta SELECT y devuelve texto tabulado simple.
-
-Objetivo:
-- Si el usuario habla de 'procesar/cargar', usa procesar_archivo.
-- Si pregunta sobre datos, genera SELECT seguro y usa consultar_sql_json.
-- Responde SIEMPRE con JSON válido y útil.
-- Incluye: tool_used y, si es consulta: sql, rows (máx 50) y row_count.
-
-Tabla: api_registro (ver columnas en el modelo).
-Notas:
-- 'menores de 18 años': edad con CURRENT_DATE - fecha_nacimiento.
-- Limita a 50 con ORDER BY id DESC cuando aplique.
-
-Reglas de edad:
-- Mayores de 18: WHERE fecha_nacimiento <= CURRENT_DATE - INTERVAL '18 years'
-- Menores de 18: WHERE fecha_nacimiento >  CURRENT_DATE - INTERVAL '18 years'
-- Evita expresiones como (CURRENT_DATE - fecha_nacimiento) >= INTERVAL '18 years'
-
-TABLA: usa SIEMPRE api_registro.
-
-Diccionario de columnas (usa EXACTAMENTE estos nombres en SQL):
-- nombre
-- poliza
-- producto
-- valor_prima           (sinónimos del usuario: "prima", "valor de la prima")
-- correo_electronico    (sinónimos: "correo", "email")
-- created_at            (sinónimos: "fecha_creacion", "fecha de creación")
-- telefono_1, telefono_2, telefono_3
-  • Si piden "teléfono principal": usa COALESCE(NULLIF(telefono_1,''), NULLIF(telefono_2,''), NULLIF(telefono_3,'')) AS telefono_principal
-- mejor_canal           (sinónimos: "canal preferido"; para WhatsApp usa LOWER(mejor_canal) = 'whatsapp')
-- estado_debito, causal_rechazo
-  • Si piden “débitos rechazados”: filtra con (estado_debito ILIKE 'rechaz%' OR NULLIF(causal_rechazo,'') IS NOT NULL)
-  • Para “últimos N días” usa created_at >= CURRENT_DATE - INTERVAL '<N> days'
-- fecha_nacimiento      (edad: EXTRACT(YEAR FROM AGE(CURRENT_DATE, fecha_nacimiento)))
-- fecha_venta
-
-Convenciones de búsqueda de texto (muy importantes):
-- Si el usuario pide “se llama X”, “clientes llamados X”, “que contenga X”, o habla en lenguaje natural sin precisión,
-  usa coincidencia parcial:  ILIKE '%X%'  (no igualdad exacta).
-- Usa coincidencia insensible a mayúsculas y considera tildes si hay extensión unaccent:
-  preferir:  unaccent(col) ILIKE unaccent('%X%')  cuando sea posible.
-- Si el usuario pide explícitamente “exactamente X” o “igual a X”, entonces sí:  = 'X'  (o ILIKE 'X' sin %).
-- Si pide “empiece por X” => ILIKE 'X%'; “termine en X” => ILIKE '%X'.
-- Al comparar nombres, usa TRIM/btrim para evitar espacios: btrim(nombre).
-- Para productos/pólizas/correos, usa igualdad exacta (sin ILIKE/LIKE) salvo que el usuario pida otra cosa.
-
-
-Reglas de consulta:
-- Solo SELECT/CTE.
-- Si piden listados, ORDER BY id DESC y LIMIT 50 (o el límite que pidan).
-- Devuelve SIEMPRE JSON con: tool_used, sql, rows (máx 50) y row_count.
-- Si el usuario habla de "procesar" archivos, usa la herramienta procesar_archivo.
-"""
+# Prompt completo (todas las secciones de api.prompting); por petición se
+# sustituye por uno podado a las columnas/reglas relevantes (ver _entrada_agente).
+_SYS = prompt_completo()
+
+
+class _AgenteSQL(AgentExecutor):
+    """
+    Las tools son return_direct (su salida es la respuesta), salvo cuando piden
+    reintento: entonces el agente ve la observación y puede generar otra consulta.
+    """
+
+    def _get_tool_return(self, next_step_output):
+        _, observation = next_step_output
+        if isinstance(observation, dict) and observation.get("reintentar"):
+            return None
+        return super()._get_tool_return(next_step_output)
+
+
+def crear_executor(agent) -> AgentExecutor:
+    return _AgenteSQL(
+        agent=agent, tools=tools, verbose=False, handle_parsing_errors=True,
+        max_iterations=int(getattr(settings, "LLM_AGENT_MAX_ITERATIONS", 5)),
+        return_intermediate_steps=True,  # la caché NL->SQL aprende de la herramienta usada
+    )
+
+
+def construir_agente(llm) -> AgentExecutor:
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "{sistema}"),
+        ("human", "{instruccion}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ]).partial(sistema=_SYS)
+    return crear_executor(create_tool_calling_agent(llm, tools, prompt))
 
 
 _agent: Optional[AgentExecutor] = None
+_agent_lock = threading.Lock()
 
 
-def get_agent() -> AgentExecutor:
-    """
-    Crea el agente (lazy) una sola vez.
-    No se ejecuta al importar el módulo para evitar fallos en arranque.
-    """
-    global _agent
-    if _agent is not None:
-        return _agent
+def _crear_llm():
+    """Modelo según LLM_PROVIDER: "openai" (por defecto) o "stub" (local, sin red)."""
+    if getattr(settings, "LLM_PROVIDER", "openai") == "stub":
+        from .llm_stub import ChatModeloLocal
+        return ChatModeloLocal(latencia_s=float(getattr(settings, "LLM_STUB_LATENCY_S", 0)))
 
     # Import lazy para no reventar si falta el paquete en build
     try:
@@ -169,14 +483,284 @@ def get_agent() -> AgentExecutor:
     if not os.getenv("OPENAI_API_KEY"):
         raise RuntimeError("OPENAI_API_KEY no configurada en el entorno.")
 
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0,
+                      timeout=float(getattr(settings, "LLM_REQUEST_TIMEOUT_S", 60)))
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", _SYS),
-        ("human", "{instruccion}"),
-        MessagesPlaceholder(variable_name="agent_scratchpad"),
-    ])
 
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    _agent = AgentExecutor(agent=agent, tools=tools, verbose=False, handle_parsing_errors=True)
+def get_agent() -> AgentExecutor:
+    """
+    Crea el agente (lazy) una sola vez.
+    No se ejecuta al importar el módulo para evitar fallos en arranque.
+    El executor no guarda estado entre invocaciones, así que se comparte entre
+    hilos (lote concurrente); el lock solo evita crearlo dos veces.
+    """
+    global _agent
+    if _agent is not None:
+        return _agent
+
+    with _agent_lock:
+        if _agent is not None:
+            return _agent
+
+        _agent = construir_agente(_crear_llm())
     return _agent
+
+
+# --------------------------
+# Caché semántica NL -> SQL
+# --------------------------
+# Instrucciones que solo difieren en mayúsculas, tildes, espacios/puntuación o en
+# sus números ("top 10 por prima" / "Top 25 por prima.") comparten entrada: se
+# guarda la herramienta y el SQL validado con los números como parámetros, y en
+# un acierto se ejecuta directamente la herramienta sin pasar por el LLM.
+_SQL_TOOLS = {t.name: t for t in (consultar_sql_json, consultar_sql_texto)}
+_NUM_RE = re.compile(r"\d+")
+_MARCA = "\u27e8p{}\u27e9"  # ⟨p0⟩: no aparece en SQL real
+
+_cache_nl = CacheLRU(
+    max_entradas=int(getattr(settings, "LLM_CACHE_MAX_ENTRIES", 500)),
+    ttl=float(getattr(settings, "LLM_CACHE_TTL_S", 3600)),
+)
+_esquema: Dict[str, Any] = {"huella": None, "revisado": 0.0}
+_ruta_rapida: Dict[str, int] = {"hits": 0}
+_ruta_rapida_lock = threading.Lock()  # "+= 1" no es atómico entre hilos del servidor
+
+
+def _contar_ruta_rapida() -> None:
+    with _ruta_rapida_lock:
+        _ruta_rapida["hits"] += 1
+
+
+def normalizar_instruccion(instr: str) -> Tuple[str, List[str]]:
+    """Clave de caché (sin tildes, minúsculas, números como '#') y los números extraídos."""
+    s = unicodedata.normalize("NFKD", instr)
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    params = _NUM_RE.findall(s)
+    s = _NUM_RE.sub("#", s)
+    s = re.sub(r"[^\w#%]+", " ", s)
+    return " ".join(s.split()), params
+
+
+def _plantilla_sql(sql: str, params: List[str]) -> Optional[str]:
+    """
+    Sustituye en el SQL cada número de la instrucción por su marcador.
+    None si no es seguro parametrizar (números repetidos o que no aparecen en el SQL).
+    """
+    if len(set(params)) != len(params):
+        return None
+    plantilla = sql
+    for i, p in enumerate(params):
+        patron = re.compile(rf"(?<!\w){re.escape(p)}(?!\w)")
+        if not patron.search(plantilla):
+            return None
+        plantilla = patron.sub(_MARCA.format(i), plantilla)
+    return plantilla
+
+
+def _render_sql(plantilla: str, params: List[str]) -> str:
+    sql = plantilla
+    for i, p in enumerate(params):
+        sql = sql.replace(_MARCA.format(i), p)  # p son solo dígitos
+    return sql
+
+
+def _cache_habilitada() -> bool:
+    return _cache_nl.max_entradas > 0
+
+
+def _huella_esquema() -> str:
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = %s ORDER BY ordinal_position",
+            ["api_registro"],
+        )
+        cols = cur.fetchall()
+    return hashlib.sha1(repr(cols).encode("utf-8")).hexdigest()
+
+
+def _vigilar_esquema() -> None:
+    """Vacía la caché si cambiaron las columnas de api_registro (revisión cada LLM_CACHE_SCHEMA_CHECK_S)."""
+    intervalo = float(getattr(settings, "LLM_CACHE_SCHEMA_CHECK_S", 30))
+    ahora = time.monotonic()
+    if _esquema["huella"] is not None and ahora - _esquema["revisado"] < intervalo:
+        return
+    huella = _huella_esquema()
+    if _esquema["huella"] is not None and huella != _esquema["huella"]:
+        _cache_nl.limpiar()
+    _esquema.update(huella=huella, revisado=ahora)
+
+
+def invalidar_cache_nl(**kwargs) -> None:
+    """Vacía la caché NL->SQL (también se conecta a post_migrate)."""
+    _cache_nl.limpiar()
+    _esquema.update(huella=None, revisado=0.0)
+
+
+post_migrate.connect(invalidar_cache_nl, dispatch_uid="api_llm_cache_nl")
+
+
+def estadisticas_cache_nl() -> Dict[str, Any]:
+    return {"habilitada": _cache_habilitada(), **_cache_nl.estadisticas(), "ruta_rapida": _ruta_rapida["hits"]}
+
+
+def _aprender(clave: str, params: List[str], pasos) -> None:
+    """Guarda la última consulta SQL exitosa del agente como plantilla para ``clave``."""
+    for accion, observacion in reversed(pasos):
+        tool_name = getattr(accion, "tool", None)
+        if tool_name not in _SQL_TOOLS or not (isinstance(observacion, dict) and observacion.get("ok")):
+            continue
+        tool_input = getattr(accion, "tool_input", None)
+        sql = tool_input.get("sql") if isinstance(tool_input, dict) else tool_input
+        if not isinstance(sql, str) or not _is_safe_sql(sql):
+            return
+        plantilla = _plantilla_sql(sql, params)
+        if plantilla is not None:
+            _cache_nl.set(clave, {"tool": tool_name, "sql": plantilla})
+        return
+
+
+def _entrada_agente(instr: str) -> Dict[str, Any]:
+    """Entrada del agente; con LLM_PROMPT_PRUNING el system prompt se poda a la instrucción."""
+    entrada: Dict[str, Any] = {"instruccion": instr}
+    if getattr(settings, "LLM_PROMPT_PRUNING", True):
+        entrada["sistema"] = construir_prompt(instr).texto
+    return entrada
+
+
+def consultar_con_cache(instr: str, agent_factory=get_agent) -> Any:
+    """
+    Resuelve una instrucción sin LLM si es posible:
+    1) ruta rápida: plantillas de intención conocidas (api.intents) -> SQL parametrizado;
+    2) caché NL->SQL: ejecuta la herramienta SQL guardada para una instrucción equivalente;
+    3) si no, invoca al agente y, si resolvió con una herramienta SQL, aprende la plantilla.
+    """
+    if getattr(settings, "LLM_FAST_PATH", True):
+        consulta = reconocer(instr)
+        if consulta is not None:
+            obs = _consultar_json(consulta.sql, consulta.params, herramienta="intencion")
+            if obs.get("ok"):
+                _contar_ruta_rapida()
+                return {"instruccion": instr, "output": {**obs, "intencion": consulta.intencion}, "ruta": "intencion"}
+
+    if not _cache_habilitada():
+        return agent_factory().invoke(_entrada_agente(instr))
+
+    _vigilar_esquema()
+    clave, params = normalizar_instruccion(instr)
+    entrada = _cache_nl.get(clave)
+    if entrada is not None:
+        sql = _render_sql(entrada["sql"], params)
+        if _is_safe_sql(sql):
+            obs = _SQL_TOOLS[entrada["tool"]].invoke({"sql": sql})
+            if isinstance(obs, dict) and obs.get("ok"):
+                return {"instruccion": instr, "output": obs, "cache": "hit"}
+        _cache_nl.descartar(clave)
+
+    result = agent_factory().invoke(_entrada_agente(instr))
+    if isinstance(result, dict):
+        pasos = result.pop("intermediate_steps", None) or []
+        _aprender(clave, params, pasos)
+        result = {**result, "cache": "miss"}
+    return result
+
+
+# --------------------------
+# Consulta en streaming (SSE)
+# --------------------------
+def _sql_de_accion(accion) -> Optional[str]:
+    tool_input = getattr(accion, "tool_input", None)
+    sql = tool_input.get("sql") if isinstance(tool_input, dict) else tool_input
+    return sql if isinstance(sql, str) else None
+
+
+def eventos_consulta(instr: str, agent_factory=get_agent) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Misma resolución que consultar_con_cache, emitida como eventos a medida que ocurre:
+    ("progreso", {...}) -> ("herramienta", {tool, sql}) -> ("filas", {rows}) x N -> ("resumen", {...}).
+
+    Cuando el agente elige una herramienta SQL se corta su ejecución y el SELECT se
+    ejecuta aquí, emitiendo las filas según llegan del cursor (con los mismos
+    límites, admisión y caché que la herramienta).
+    """
+    t0 = time.monotonic()
+    yield "progreso", {"etapa": "inicio", "instruccion": instr}
+
+    ruta = None
+    tool_name, sql, params, sql_admitido = "consultar_sql_json", None, None, None
+    clave, nums = None, []
+
+    if getattr(settings, "LLM_FAST_PATH", True):
+        consulta = reconocer(instr)
+        if consulta is not None:
+            ruta, sql, params = "intencion", consulta.sql, consulta.params
+
+    if ruta is None and _cache_habilitada():
+        _vigilar_esquema()
+        clave, nums = normalizar_instruccion(instr)
+        entrada = _cache_nl.get(clave)
+        if entrada is not None:
+            candidato = _render_sql(entrada["sql"], nums)
+            if _is_safe_sql(candidato):
+                ruta, tool_name, sql = "cache", entrada["tool"], candidato
+
+    if ruta is None:
+        yield "progreso", {"etapa": "agente"}
+        pasos = agent_factory().stream(_entrada_agente(instr))
+        try:
+            for chunk in pasos:
+                for accion in chunk.get("actions", []):
+                    candidato = _sql_de_accion(accion)
+                    yield "herramienta", {"tool": accion.tool, "sql": candidato}
+                    if accion.tool not in _SQL_TOOLS or not candidato or not _is_safe_sql(candidato) \
+                            or "API_REGISTRO" not in candidato.upper():
+                        continue
+                    try:
+                        sql_admitido = admitir_sql(candidato)
+                    except ConsultaRechazada as e:
+                        # La herramienta lo rechazará igual y el agente reintentará: se sigue el stream
+                        yield "progreso", {"etapa": "rechazada", "motivo": e.motivo, "plan": e.plan}
+                        continue
+                    ruta, tool_name, sql = "agente", accion.tool, candidato
+                    break
+                if ruta is not None:
+                    break
+                if "output" in chunk:
+                    # Terminó sin herramienta SQL (p. ej. procesar_archivo o texto libre)
+                    yield "resumen", {"ok": True, "ruta": "agente", "output": chunk["output"],
+                                      "duracion_ms": round((time.monotonic() - t0) * 1000, 1)}
+                    return
+        finally:
+            pasos.close()  # no se ejecuta la herramienta: el SELECT corre aquí abajo
+        if ruta is None:
+            yield "resumen", {"ok": False, "ruta": "agente", "error": "El agente no produjo una consulta.",
+                              "duracion_ms": round((time.monotonic() - t0) * 1000, 1)}
+            return
+    else:
+        yield "herramienta", {"tool": tool_name, "sql": sql, "params": params, "ruta": ruta}
+
+    resumen: Dict[str, Any] = {"ok": True, "ruta": ruta, "tool": tool_name, "sql": sql, "row_count": 0}
+    try:
+        herramienta = "intencion" if ruta == "intencion" else tool_name
+        for tipo, valor in iter_select(sql, params, sql_admitido, herramienta):
+            if tipo == "sql" and valor != sql:
+                resumen["sql_ejecutado"] = valor
+            elif tipo == "cols":
+                cols = valor
+                yield "columnas", {"cols": cols}
+            elif tipo == "filas":
+                resumen["row_count"] += len(valor)
+                yield "filas", {"rows": [dict(zip(cols, r)) for r in valor]}
+            elif tipo == "truncado":
+                resumen["truncated"] = valor
+    except ConsultaRechazada as e:
+        resumen.update(ok=False, error=e.motivo, plan=e.plan)
+    except Exception as e:
+        resumen.update(ok=False, error=str(e))
+
+    if resumen["ok"] and ruta == "intencion":
+        _contar_ruta_rapida()
+    if resumen["ok"] and ruta == "agente" and clave is not None:
+        _aprender(clave, nums, [(SimpleNamespace(tool=tool_name, tool_input={"sql": sql}), {"ok": True})])
+    resumen["duracion_ms"] = round((time.monotonic() - t0) * 1000, 1)
+    yield "resumen", resumen
@@ -0,0 +1,61 @@
+# src/api/llm_stub.py
+from __future__ import annotations
+from typing import Any, List, Optional
+import itertools
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from .intents import reconocer
+
+SQL_POR_DEFECTO = "SELECT id, nombre, poliza FROM api_registro ORDER BY id DESC LIMIT 50"
+
+_ids = itertools.count(1)
+
+
+def _sql_literal(instr: str) -> str:
+    """SQL de la plantilla de intención con los parámetros (enteros) ya escritos."""
+    c = reconocer(instr)
+    if c is None:
+        return SQL_POR_DEFECTO
+    sql = c.sql
+    for p in c.params:
+        sql = sql.replace("%s", str(int(p)), 1)
+    return sql.replace("%%", "%")
+
+
+class ChatModeloLocal(BaseChatModel):
+    """
+    Modelo de chat local y determinista (LLM_PROVIDER=stub) para pruebas y
+    benchmarks sin red: responde con una llamada a consultar_sql_json usando las
+    plantillas de api.intents (o un listado por defecto), tras ``latencia_s``
+    segundos que simulan el round-trip al proveedor.
+    """
+
+    latencia_s: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "modelo-local"
+
+    def bind_tools(self, tools, **kwargs: Any) -> "ChatModeloLocal":
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latencia_s:
+            time.sleep(self.latencia_s)
+        ultimo = messages[-1]
+        if isinstance(ultimo, ToolMessage):
+            # La herramienta devolvió algo al modelo (p. ej. un rechazo): se termina con ese contenido
+            msg = AIMessage(content=str(ultimo.content))
+        else:
+            instr = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+            msg = AIMessage(content="", tool_calls=[{
+                "name": "consultar_sql_json",
+                "args": {"sql": _sql_literal(str(instr))},
+                "id": f"call_local_{next(_ids)}",
+            }])
+        return ChatResult(generations=[ChatGeneration(message=msg)])
@@ -0,0 +1,86 @@
+# src/api/lotes.py
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+import time
+
+from django.db import connections
+
+from .llm_agent import normalizar_instruccion
+
+ESPERA_S = 0.05  # granularidad con la que se vigilan los timeouts por ítem
+
+
+def _clave(instr: str):
+    # Misma normalización que la caché NL->SQL, pero conservando los números
+    texto, params = normalizar_instruccion(instr)
+    return texto, tuple(params)
+
+
+def _en_hilo(resolver: Callable[[str], Any], instr: str, inicio: Dict[str, float]) -> Any:
+    inicio["t"] = time.monotonic()
+    try:
+        return resolver(instr)
+    finally:
+        connections.close_all()  # conexiones propias del hilo del pool
+
+
+def resolver_lote(
+    instrucciones: List[str],
+    resolver: Callable[[str], Any],
+    concurrencia: int = 4,
+    timeout_s: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Resuelve varias instrucciones a la vez y devuelve un resultado por cada una, en orden.
+
+    - Las instrucciones equivalentes (misma normalización y mismos números) se
+      resuelven una sola vez; las repetidas llevan ``duplicado_de``.
+    - Como mucho ``concurrencia`` instrucciones en vuelo.
+    - ``timeout_s`` se mide desde que la instrucción empieza a ejecutarse; al
+      vencer se informa como error (el hilo no se puede interrumpir y sigue
+      ocupando su lugar del pool hasta terminar).
+    """
+    primera: Dict[Any, int] = {}
+    unicas: List[int] = []
+    for i, instr in enumerate(instrucciones):
+        clave = _clave(instr)
+        if clave not in primera:
+            primera[clave] = i
+            unicas.append(i)
+
+    resultados: Dict[int, Dict[str, Any]] = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrencia), thread_name_prefix="consulta-lote")
+    try:
+        en_curso = {}
+        for i in unicas:
+            inicio: Dict[str, float] = {}
+            en_curso[pool.submit(_en_hilo, resolver, instrucciones[i], inicio)] = (i, inicio)
+
+        while en_curso:
+            listos, _ = wait(list(en_curso), timeout=ESPERA_S, return_when=FIRST_COMPLETED)
+            ahora = time.monotonic()
+            for fut in listos:
+                i, inicio = en_curso.pop(fut)
+                ms = round((ahora - inicio.get("t", ahora)) * 1000, 1)
+                try:
+                    resultados[i] = {"ok": True, "result": fut.result(), "duracion_ms": ms}
+                except Exception as e:
+                    resultados[i] = {"ok": False, "error": str(e), "duracion_ms": ms}
+            if timeout_s:
+                for fut, (i, inicio) in list(en_curso.items()):
+                    if "t" in inicio and ahora - inicio["t"] > timeout_s:
+                        del en_curso[fut]
+                        resultados[i] = {"ok": False, "error": f"Timeout tras {timeout_s:g} s.",
+                                         "duracion_ms": round((ahora - inicio["t"]) * 1000, 1)}
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    salida = []
+    for i, instr in enumerate(instrucciones):
+        j = primera[_clave(instr)]
+        item = {"indice": i, "instruccion": instr, **resultados[j]}
+        if j != i:
+            item["duplicado_de"] = j
+        salida.append(item)
+    return salida
@@ -0,0 +1,44 @@
+# src/api/management/commands/asesor_indices.py
+from __future__ import annotations
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.observabilidad import purgar, reporte
+
+
+class Command(BaseCommand):
+    help = (
+        "Reporte de las huellas de SQL del agente con más tiempo total en base y "
+        "los índices que eliminarían sus Seq Scan sobre api_registro."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=10, help="Cantidad de huellas.")
+        parser.add_argument("--horas", type=float, default=None, help="Solo las últimas N horas.")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+        parser.add_argument("--purgar-dias", type=int, default=None,
+                            help="Antes del reporte, borra las ejecuciones con más de N días.")
+
+    def handle(self, *args, **opts):
+        if opts["purgar_dias"] is not None:
+            self.stderr.write(f"Ejecuciones purgadas: {purgar(opts['purgar_dias'])}")
+
+        rep = reporte(top=opts["top"], horas=opts["horas"])
+        if opts["json"]:
+            self.stdout.write(json.dumps(rep, ensure_ascii=False, indent=2, default=str))
+            return
+
+        self.stdout.write(f"{'huella':16}  {'ejec':>5}  {'total ms':>10}  {'prom ms':>8}  {'filas':>7}  nodos")
+        for h in rep["huellas"]:
+            self.stdout.write(
+                f"{h['huella']:16}  {h['ejecuciones']:>5}  {h['total_ms']:>10.1f}  {h['promedio_ms']:>8.1f}  "
+                f"{h['filas_promedio']:>7.1f}  {','.join(h['nodos'] or [])}"
+            )
+            self.stdout.write(f"    {h['sql'][:160]}")
+        self.stdout.write("")
+        if not rep["recomendaciones"]:
+            self.stdout.write("Sin índices recomendados.")
+        for r in rep["recomendaciones"]:
+            extra = f"  -- requiere {r['requiere']}" if r["requiere"] else ""
+            self.stdout.write(f"{r['sql']}  -- {r['total_ms']:.1f} ms en {len(r['huellas'])} huella(s){extra}")
@@ -0,0 +1,65 @@
+# src/api/management/commands/bench_consulta_lote.py
+from __future__ import annotations
+from time import perf_counter
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.llm_agent import construir_agente
+from api.llm_stub import ChatModeloLocal
+from api.lotes import resolver_lote
+
+
+def _instrucciones(n: int, duplicados: float):
+    unicas = max(1, round(n * (1 - duplicados)))
+    base = [f"menores de {18 + i} con nombre y telefono" if i % 2 else f"top {i + 1} por valor_prima"
+            for i in range(unicas)]
+    return [base[i % unicas] for i in range(n)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara instrucciones enviadas una tras otra frente a /api/consulta-llm/lote/ "
+        "(dedupe + concurrencia acotada) usando el modelo local (sin red) con latencia simulada. "
+        "Sin ruta rápida ni cachés: cada instrucción única pasa por el agente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--n", type=int, default=24, help="Instrucciones del lote.")
+        parser.add_argument("--duplicados", type=float, default=0.25, help="Fracción de instrucciones repetidas.")
+        parser.add_argument("--latencia", type=float, default=0.2, help="Latencia simulada del modelo (s).")
+        parser.add_argument("--concurrencia", default="1,4,8", help="Niveles de concurrencia, separados por coma.")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+
+    def handle(self, *args, **opts):
+        agente = construir_agente(ChatModeloLocal(latencia_s=opts["latencia"]))
+        instrucciones = _instrucciones(opts["n"], opts["duplicados"])
+
+        def resolver(instr):
+            return agente.invoke({"instruccion": instr})
+
+        t0 = perf_counter()
+        for instr in instrucciones:
+            resolver(instr)
+        secuencial = perf_counter() - t0
+        filas = [{"modo": "secuencial", "concurrencia": 1, "segundos": round(secuencial, 3), "speedup": 1.0}]
+
+        for c in [int(x) for x in opts["concurrencia"].split(",") if x.strip()]:
+            t0 = perf_counter()
+            res = resolver_lote(instrucciones, resolver, concurrencia=c)
+            dt = perf_counter() - t0
+            errores = sum(1 for r in res if not r["ok"])
+            filas.append({"modo": "lote", "concurrencia": c, "segundos": round(dt, 3),
+                          "speedup": round(secuencial / dt, 2) if dt else None, "errores": errores})
+
+        if opts["json"]:
+            self.stdout.write(json.dumps({
+                "instrucciones": len(instrucciones), "unicas": len(set(instrucciones)),
+                "latencia_s": opts["latencia"], "resultados": filas,
+            }, indent=2))
+            return
+
+        self.stdout.write(f"{len(instrucciones)} instrucciones ({len(set(instrucciones))} únicas), "
+                          f"latencia simulada {opts['latencia']}s")
+        for f in filas:
+            self.stdout.write(f"  {f['modo']:<10} c={f['concurrencia']:<3} {f['segundos']:>8.3f}s  x{f['speedup']}")
@@ -0,0 +1,186 @@
+# src/api/management/commands/bench_esquema.py
+from __future__ import annotations
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from decimal import Decimal
+from typing import Callable, Dict, List, NamedTuple
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from api import services
+from api.compacto import BIT, CANALES, texto_corto
+from api.management.commands.bench_ingesta import _base_temporal, _filas, _limpiar, insumo
+from api.models import RegistroDatos
+
+LEGADO, COMPACTO = "bench_esquema_legado", "bench_esquema_compacto"
+
+# columna compacta de RegistroDatos -> columnas del esquema anterior (las que sigue mostrando api_registro)
+ANCHAS = {
+    "periodo": {"periodo": "coalesce(periodo_texto, api_texto_corto(periodo, 1), '')::varchar(4)"},
+    "valor_asegurado_centavos": {"valor_asegurado": "(valor_asegurado_centavos / 100.0)::numeric(18, 2)"},
+    "valor_prima_centavos": {"valor_prima": "(valor_prima_centavos / 100.0)::numeric(18, 2)"},
+    "dias": {"dias": "coalesce(dias_grande, dias)::integer"},
+    "mes_a_trabajar": {
+        "mes_a_trabajar": "coalesce(mes_a_trabajar_texto, api_texto_corto(mes_a_trabajar, 2), '')::varchar(2)",
+    },
+    "canales": {c: f"(canales & {BIT[c]}) <> 0" for c in CANALES},
+}
+RESPALDOS = {"periodo_texto", "mes_a_trabajar_texto", "dias_grande"}  # ya incluidos en la columna ancha
+
+
+class Consulta(NamedTuple):
+    legado: str
+    compacto: str
+    convertir: Callable[[List[tuple]], List[tuple]]  # resultado compacto -> el del esquema anterior
+
+
+def _pesos(centavos):
+    return None if centavos is None else Decimal(centavos).scaleb(-2)
+
+
+def _periodo(filas: List[tuple]) -> List[tuple]:
+    return sorted((t if t is not None else "" if p is None else texto_corto(p, 1), n, _pesos(s))
+                  for p, t, n, s in filas)
+
+
+CONSULTAS: Dict[str, Consulta] = {
+    "suma_montos": Consulta(
+        f"SELECT sum(valor_prima), sum(valor_asegurado) FROM {LEGADO}",
+        f"SELECT sum(valor_prima_centavos), sum(valor_asegurado_centavos) FROM {COMPACTO}",
+        lambda filas: [tuple(map(_pesos, filas[0]))],
+    ),
+    "prima_por_periodo": Consulta(
+        f"SELECT periodo, count(*), sum(valor_prima) FROM {LEGADO} GROUP BY periodo",
+        f"SELECT periodo, periodo_texto, count(*), sum(valor_prima_centavos) FROM {COMPACTO} "
+        f"GROUP BY periodo, periodo_texto",
+        _periodo,
+    ),
+    "canales": Consulta(
+        f"SELECT count(*) FILTER (WHERE whatsapp), count(*) FILTER (WHERE telefono OR texto) FROM {LEGADO}",
+        f"SELECT count(*) FILTER (WHERE canales & {BIT['whatsapp']} <> 0), "
+        f"count(*) FILTER (WHERE canales & {BIT['telefono'] | BIT['texto']} <> 0) FROM {COMPACTO}",
+        lambda filas: filas,
+    ),
+}
+
+
+def _crear_copias(cur) -> None:
+    """
+    Copias UNLOGGED de api_registro_datos: una tal cual (esquema compacto) y otra
+    con las columnas anchas de antes de 0009 reconstruidas en el mismo lugar,
+    para que la posición en la fila (lo que cuesta llegar a la columna) no sesgue
+    la comparación.
+    """
+    tabla = RegistroDatos._meta.db_table
+    compactas, legado = [], []
+    for f in RegistroDatos._meta.concrete_fields:
+        columna = connection.ops.quote_name(f.column)
+        compactas.append(columna)
+        if f.column in ANCHAS:
+            legado.extend(f"{sql} AS {c}" for c, sql in ANCHAS[f.column].items())
+        elif f.column not in RESPALDOS:
+            legado.append(columna)
+    cur.execute(f"CREATE UNLOGGED TABLE {COMPACTO} AS SELECT {', '.join(compactas)} FROM {tabla}")
+    cur.execute(f"CREATE UNLOGGED TABLE {LEGADO} AS SELECT {', '.join(legado)} FROM {tabla}")
+    cur.execute(f"ANALYZE {COMPACTO}")
+    cur.execute(f"ANALYZE {LEGADO}")
+
+
+def _cronometrar(cur, sql: str, repeticiones: int):
+    cur.execute(sql)  # calienta el caché de páginas
+    filas = cur.fetchall()
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = perf_counter()
+        cur.execute(sql)
+        cur.fetchall()
+        tiempos.append(perf_counter() - t0)
+    return round(median(tiempos) * 1000, 3), filas
+
+
+def medir(repeticiones: int) -> Dict[str, object]:
+    """Tamaño y tiempo de agregación de los dos esquemas sobre las mismas filas."""
+    with connection.cursor() as cur:
+        cur.execute("SET max_parallel_workers_per_gather = 0")  # un solo proceso: tiempos comparables
+        try:
+            _crear_copias(cur)
+            cur.execute(f"SELECT count(*), pg_table_size('{LEGADO}'), pg_table_size('{COMPACTO}') FROM {COMPACTO}")
+            filas, legado, compacto = cur.fetchone()
+            res: Dict[str, object] = {
+                "filas": filas,
+                "tamano": {
+                    "legado_bytes": legado,
+                    "compacto_bytes": compacto,
+                    "reduccion": round(1 - compacto / legado, 3) if legado else None,
+                },
+                "consultas": {},
+            }
+            for nombre, c in CONSULTAS.items():
+                ms_legado, r_legado = _cronometrar(cur, c.legado, repeticiones)
+                ms_compacto, r_compacto = _cronometrar(cur, c.compacto, repeticiones)
+                res["consultas"][nombre] = {
+                    "legado_ms": ms_legado,
+                    "compacto_ms": ms_compacto,
+                    "speedup": round(ms_legado / ms_compacto, 2) if ms_compacto else None,
+                    "mismo_resultado": sorted(r_legado) == c.convertir(r_compacto),
+                }
+            return res
+        finally:
+            cur.execute(f"DROP TABLE IF EXISTS {LEGADO}, {COMPACTO}")
+            cur.execute("RESET max_parallel_workers_per_gather")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara las columnas compactas de api_registro_datos (centavos en bigint, smallint, máscara de "
+        "canales) contra las anchas de antes de la migración 0009 (numeric, varchar, booleanos), "
+        "reconstruidas como las muestra api_registro: tamaño de una tabla con cada esquema y tiempo de "
+        "agregación sobre las mismas filas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", default="100k", help="Filas a ingerir (10k, 1m o un número). Default 100k.")
+        parser.add_argument("--repeticiones", type=int, default=5, help="Corridas por consulta (se usa la mediana).")
+        parser.add_argument("--semilla", type=int, default=1)
+        parser.add_argument("--insumos", default=str(Path(tempfile.gettempdir()) / "sdata_bench"),
+                            help="Carpeta de los TXT generados (se reutilizan entre corridas).")
+        parser.add_argument("--base-actual", action="store_true",
+                            help="Usa la base configurada en vez de una base desechable (limpia lo insertado).")
+        parser.add_argument("--datos-existentes", action="store_true",
+                            help="No ingiere nada: mide las filas que ya están en la base configurada.")
+        parser.add_argument("--json", action="store_true", help="Imprime el resultado en JSON.")
+
+    def handle(self, *args, **opts):
+        if opts["datos_existentes"]:
+            if not RegistroDatos.objects.exists():
+                raise CommandError("No hay registros en la base para medir.")
+            res = medir(opts["repeticiones"])
+        else:
+            filas = _filas(opts["filas"])
+            carpeta = Path(opts["insumos"])
+            carpeta.mkdir(parents=True, exist_ok=True)
+            path = insumo(filas, opts["semilla"], carpeta)
+            with tempfile.TemporaryDirectory() as media, _base_temporal(not opts["base_actual"], opts["verbosity"]), \
+                    override_settings(MEDIA_ROOT=media, EXPORT_DIR=str(Path(media) / "exports"),
+                                      ARTIFACT_STORE_BUDGET_BYTES=0):
+                services.procesar_archivo_y_guardar(str(path))
+                try:
+                    res = medir(opts["repeticiones"])
+                finally:
+                    if opts["base_actual"]:
+                        _limpiar(path)
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(res, indent=2))
+            return
+        t = res["tamano"]
+        self.stdout.write(f"{res['filas']:,} filas: legado {t['legado_bytes'] / 2**20:.1f} MB, "
+                          f"compacto {t['compacto_bytes'] / 2**20:.1f} MB ({t['reduccion'] or 0:.0%} menos)")
+        for nombre, c in res["consultas"].items():
+            self.stdout.write(f"  {nombre:<18} legado {c['legado_ms']:>9.2f} ms  compacto {c['compacto_ms']:>9.2f} ms  "
+                              f"x{c['speedup']}  {'ok' if c['mismo_resultado'] else 'RESULTADOS DISTINTOS'}")
@@ -0,0 +1,78 @@
+# src/api/management/commands/bench_exports.py
+from __future__ import annotations
+from pathlib import Path
+from time import perf_counter
+import gzip
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.exports import ENCODING_SUFFIX, _zstd, es_variante, variante_path
+
+
+def _descomprimir(path: Path, encoding: str) -> float:
+    """Segundos que tarda un cliente en descomprimir la variante."""
+    t0 = perf_counter()
+    if encoding == "gzip":
+        with gzip.open(path, "rb") as fh:
+            while fh.read(1024 * 1024):
+                pass
+    elif encoding == "zstd":
+        with path.open("rb") as raw, _zstd().ZstdDecompressor().stream_reader(raw) as fh:
+            while fh.read(1024 * 1024):
+                pass
+    return perf_counter() - t0
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara bytes transferidos y tiempo estimado de descarga de cada export "
+        "plano frente a sus variantes precomprimidas (.gz/.zst)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("nombres", nargs="*", help="Exports a medir (default: todos los de EXPORT_DIR).")
+        parser.add_argument("--mbps", type=float, default=50.0, help="Ancho de banda simulado en Mbit/s.")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+
+    def handle(self, *args, **opts):
+        out_dir = Path(settings.EXPORT_DIR)
+        if opts["nombres"]:
+            paths = [out_dir / Path(n).name for n in opts["nombres"]]
+        else:
+            paths = sorted(p for p in out_dir.glob("*") if p.is_file() and not es_variante(p))
+
+        bytes_por_seg = opts["mbps"] * 1_000_000 / 8
+        resultados = []
+        for p in paths:
+            if not p.is_file():
+                self.stderr.write(f"No existe: {p}")
+                continue
+            base = p.stat().st_size
+            filas = [{"encoding": "identity", "bytes": base, "ratio": 1.0,
+                      "segundos": round(base / bytes_por_seg, 3)}]
+            for enc in ENCODING_SUFFIX:
+                v = variante_path(p, enc)
+                if not v.is_file() or (enc == "zstd" and _zstd() is None):
+                    continue
+                size = v.stat().st_size
+                dec = _descomprimir(v, enc)
+                filas.append({
+                    "encoding": enc,
+                    "bytes": size,
+                    "ratio": round(base / size, 2) if size else None,
+                    "segundos": round(size / bytes_por_seg + dec, 3),  # transferencia + descompresión
+                })
+            resultados.append({"export": p.name, "variantes": filas})
+
+        if opts["json"]:
+            self.stdout.write(json.dumps({"mbps": opts["mbps"], "exports": resultados}, indent=2))
+            return
+
+        for r in resultados:
+            self.stdout.write(r["export"])
+            for f in r["variantes"]:
+                self.stdout.write(
+                    f"  {f['encoding']:<9} {f['bytes']:>14,} B  x{f['ratio']:<6}  ~{f['segundos']}s @ {opts['mbps']} Mbit/s"
+                )
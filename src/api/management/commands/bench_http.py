@@ -0,0 +1,352 @@
+# src/api/management/commands/bench_http.py
+from __future__ import annotations
+from importlib.util import find_spec
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.bench_ingesta import _base_temporal
+
+Peticion = Tuple[str, str, Dict[str, str], bytes]  # método, ruta, headers, cuerpo
+
+INSTRUCCIONES = [
+    "menores de {n} con nombre y telefono",
+    "top {n} por valor_prima con nombre y poliza",
+    "rechazados de los ultimos {n} dias",
+]
+
+
+class Escenario(NamedTuple):
+    nombre: str
+    peticion: Callable[[dict, int], Optional[Peticion]]  # (contexto, n-ésima petición)
+
+
+def _upload(ctx: dict, i: int) -> Peticion:
+    limite = uuid.uuid4().hex
+    cuerpo = (
+        f"--{limite}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{ctx['upload_nombre']}\"\r\n"
+        f"Content-Type: text/plain\r\n\r\n"
+    ).encode() + ctx["upload"] + f"\r\n--{limite}--\r\n".encode()
+    return "POST", "/api/procesar-archivo/upload/", {"Content-Type": f"multipart/form-data; boundary={limite}"}, cuerpo
+
+
+def _descarga(ctx: dict, i: int) -> Optional[Peticion]:
+    if not ctx.get("export"):
+        return None
+    return "GET", f"/api/exports/descargar/{ctx['export']}", {"Accept-Encoding": "gzip"}, b""
+
+
+def _consulta(ctx: dict, i: int) -> Peticion:
+    instr = INSTRUCCIONES[i % len(INSTRUCCIONES)].format(n=18 + i % 40)
+    cuerpo = json.dumps({"instruccion": instr}).encode()
+    return "POST", "/api/consulta-llm/", {"Content-Type": "application/json"}, cuerpo
+
+
+# En este orden: el upload deja exports para el listado y la descarga
+ESCENARIOS: Dict[str, Escenario] = {e.nombre: e for e in [
+    Escenario("upload", _upload),
+    Escenario("ultimos", lambda ctx, i: ("GET", "/api/registros/ultimos/?limit=50", {}, b"")),
+    Escenario("exports", lambda ctx, i: ("GET", "/api/exports/?page_size=50", {}, b"")),
+    Escenario("descarga", _descarga),
+    Escenario("consulta_llm", _consulta),
+]}
+
+
+# --------------------------
+# Cliente HTTP/1.1 mínimo (keep-alive, Content-Length / chunked / cierre)
+# --------------------------
+class ConexionHTTP:
+    def __init__(self, host: str, puerto: int):
+        self.host, self.puerto = host, puerto
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def pedir(self, metodo: str, ruta: str, headers: Dict[str, str], cuerpo: bytes) -> Tuple[int, int]:
+        """Devuelve (status, bytes del cuerpo) tras leer la respuesta completa."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.puerto)
+        cab = {"Host": f"{self.host}:{self.puerto}", "Content-Length": str(len(cuerpo)), **headers}
+        self.writer.write(
+            f"{metodo} {ruta} HTTP/1.1\r\n".encode()
+            + "".join(f"{k}: {v}\r\n" for k, v in cab.items()).encode()
+            + b"\r\n" + cuerpo
+        )
+        await self.writer.drain()
+
+        crudo = await self.reader.readuntil(b"\r\n\r\n")
+        lineas = crudo.decode("latin-1").split("\r\n")
+        status = int(lineas[0].split(" ", 2)[1])
+        resp = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lineas[1:] if l)}
+
+        n = 0
+        if metodo == "HEAD" or status in (204, 304):
+            pass
+        elif resp.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                tam = int((await self.reader.readline()).split(b";")[0], 16)
+                if tam == 0:
+                    await self.reader.readuntil(b"\r\n")
+                    break
+                n += len(await self.reader.readexactly(tam + 2)) - 2
+        elif "content-length" in resp:
+            n = len(await self.reader.readexactly(int(resp["content-length"])))
+        else:
+            n = len(await self.reader.read())
+            resp["connection"] = "close"
+        if resp.get("connection", "").lower() == "close":
+            self.cerrar()
+        return status, n
+
+    def cerrar(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def percentil(ordenados: List[float], p: float) -> Optional[float]:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenados:
+        return None
+    k = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[k]
+
+
+async def correr_nivel(host: str, puerto: int, esc: Escenario, ctx: dict, concurrencia: int,
+                       duracion: float, peticiones: Optional[int]) -> Dict[str, object]:
+    """Carga de lazo cerrado: ``concurrencia`` usuarios, cada uno con su conexión keep-alive."""
+    latencias: List[float] = []
+    errores: Dict[str, int] = {}
+    contador = iter(range(10 ** 12))
+    fin = perf_counter() + duracion
+
+    def _error(clave: str) -> None:
+        errores[clave] = errores.get(clave, 0) + 1
+
+    async def usuario() -> None:
+        conn = ConexionHTTP(host, puerto)
+        try:
+            while True:
+                i = next(contador)
+                if (peticiones is not None and i >= peticiones) or (peticiones is None and perf_counter() >= fin):
+                    return
+                pet = esc.peticion(ctx, i)
+                if pet is None:
+                    return
+                t0 = perf_counter()
+                try:
+                    status, _ = await conn.pedir(*pet)
+                except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                    conn.cerrar()
+                    _error(type(e).__name__)
+                    continue
+                latencias.append(perf_counter() - t0)
+                if status >= 400:
+                    _error(str(status))
+        finally:
+            conn.cerrar()
+
+    t0 = perf_counter()
+    await asyncio.gather(*(usuario() for _ in range(concurrencia)))
+    dt = perf_counter() - t0
+    lat = sorted(latencias)
+
+    def ms(p: float) -> Optional[float]:
+        v = percentil(lat, p)
+        return round(v * 1000, 2) if v is not None else None
+
+    return {
+        "escenario": esc.nombre,
+        "concurrencia": concurrencia,
+        "peticiones": len(lat),
+        "errores": errores,
+        "segundos": round(dt, 3),
+        "rps": round(len(lat) / dt, 1) if dt else None,
+        "p50_ms": ms(50), "p95_ms": ms(95), "p99_ms": ms(99),
+    }
+
+
+async def _primer_export(host: str, puerto: int) -> Optional[str]:
+    """Nombre de un CSV del catálogo para el escenario 'descarga'."""
+    try:
+        reader, writer = await asyncio.open_connection(host, puerto)
+        writer.write(f"GET /api/exports/?formato=csv&page_size=1 HTTP/1.1\r\nHost: {host}\r\n"
+                     f"Connection: close\r\n\r\n".encode())
+        await writer.drain()
+        crudo = await reader.read()
+        writer.close()
+        files = json.loads(crudo.split(b"\r\n\r\n", 1)[1]).get("files") or []
+        return files[0]["name"] if files else None
+    except (OSError, ValueError, IndexError, KeyError):
+        return None
+
+
+# --------------------------
+# Servidores locales
+# --------------------------
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def comando_servidor(modo: str, puerto: int, workers: int, hilos: int) -> List[str]:
+    if modo == "wsgi":
+        return [sys.executable, "-m", "gunicorn", "backend.wsgi:application", "-b", f"127.0.0.1:{puerto}",
+                "-w", str(workers), "-k", "gthread", "--threads", str(hilos), "--timeout", "300",
+                "--log-level", "warning"]
+    if find_spec("uvicorn") is None:
+        raise CommandError("El modo asgi necesita uvicorn (pip install uvicorn).")
+    return [sys.executable, "-m", "uvicorn", "backend.asgi:application", "--host", "127.0.0.1",
+            "--port", str(puerto), "--workers", str(workers), "--no-access-log", "--log-level", "warning"]
+
+
+def entorno_servidor(media: Path, base: Optional[str]) -> Dict[str, str]:
+    """
+    Variables para el servidor: MEDIA_ROOT temporal y, con ``base``, la base desechable
+    también para el alias de lectura (sin POSTGRES_READ_*, que podrían apuntar a una réplica).
+    """
+    env = {k: v for k, v in os.environ.items() if not (base and k.startswith("POSTGRES_READ_"))}
+    env.update(MEDIA_ROOT=str(media), UPLOAD_DIR=str(media / "uploads"), EXPORT_DIR=str(media / "exports"))
+    if base:
+        env["POSTGRES_DB"] = base
+    return env
+
+
+def _esperar_servidor(proc: subprocess.Popen, puerto: int, log: Path, espera_s: float = 60) -> None:
+    limite = time.monotonic() + espera_s
+    while time.monotonic() < limite:
+        if proc.poll() is not None:
+            raise CommandError(f"El servidor terminó con código {proc.returncode}:\n"
+                               + log.read_text(errors="replace")[-2000:])
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"El servidor no respondió en {espera_s:.0f}s.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga HTTP (asyncio, sin dependencias) contra un servidor local: upload, "
+        "registros/ultimos, listado y descarga de exports y consulta-llm con el modelo stub. "
+        "Reporta p50/p95/p99 y peticiones/s por endpoint y concurrencia, y compara WSGI (gunicorn) con ASGI (uvicorn)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modos", nargs="+", choices=("wsgi", "asgi"), default=["wsgi", "asgi"],
+                            help="Servidores a levantar. Default wsgi y asgi.")
+        parser.add_argument("--url", default=None,
+                            help="Mide un servidor ya levantado (http://host:puerto) en lugar de --modos.")
+        parser.add_argument("--escenarios", nargs="+", choices=list(ESCENARIOS), default=list(ESCENARIOS))
+        parser.add_argument("--concurrencia", default="1,8,32", help="Niveles, separados por coma.")
+        parser.add_argument("--duracion", type=float, default=10.0, help="Segundos por escenario y nivel.")
+        parser.add_argument("--peticiones", type=int, default=None,
+                            help="En lugar de --duracion, total de peticiones por escenario y nivel.")
+        parser.add_argument("--workers", type=int, default=2, help="Procesos del servidor.")
+        parser.add_argument("--hilos", type=int, default=8, help="Hilos por proceso (gunicorn gthread).")
+        parser.add_argument("--filas-upload", type=int, default=200, help="Líneas del TXT que sube 'upload'.")
+        parser.add_argument("--latencia-llm", type=float, default=0.05,
+                            help="Latencia simulada del modelo stub (LLM_STUB_LATENCY_S).")
+        parser.add_argument("--base-actual", action="store_true",
+                            help="Los servidores usan la base configurada en vez de una base desechable.")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+
+    def handle(self, *args, **opts):
+        from generar_txt import Config, generar_archivo
+
+        niveles = [int(x) for x in opts["concurrencia"].split(",") if x.strip()]
+        escenarios = [ESCENARIOS[n] for n in ESCENARIOS if n in opts["escenarios"]]
+        ctx: dict = {"upload_nombre": "BENCHHTTP_20250529.txt"}
+        # Los servidores que se levantan aquí escriben (upload) en una base desechable y un MEDIA_ROOT temporal;
+        # con --url el servidor es ajeno y usa su propia configuración.
+        desechable = not opts["url"] and not opts["base_actual"]
+        with tempfile.TemporaryDirectory() as tmp, _base_temporal(desechable, opts["verbosity"]):
+            txt = Path(tmp) / ctx["upload_nombre"]
+            generar_archivo(txt, Config(filas=opts["filas_upload"], semilla=1, fecha="20250529", bloque=50_000,
+                                        gzip=False, nivel_gzip=1, tasa_longitud=0.0, tasa_fecha=0.0,
+                                        tasa_numero=0.0, tasa_acentos=0.0))
+            ctx["upload"] = txt.read_bytes()
+
+            if opts["url"]:
+                u = urlsplit(opts["url"])
+                objetivos = [("externo", u.hostname or "127.0.0.1", u.port or 80, None)]
+            else:
+                objetivos = [(m, "127.0.0.1", _puerto_libre(), m) for m in opts["modos"]]
+
+            resultados = []
+            for modo, host, puerto, lanzar in objetivos:
+                proc = None
+                if lanzar:
+                    log = Path(tmp) / f"{modo}.log"
+                    base = settings.DATABASES["default"]["NAME"] if desechable else None
+                    env = {**entorno_servidor(Path(tmp) / "media", base), "LLM_PROVIDER": "stub",
+                           "LLM_FAST_PATH": "False", "LLM_STUB_LATENCY_S": str(opts["latencia_llm"])}
+                    cmd = comando_servidor(modo, puerto, opts["workers"], opts["hilos"])
+                    with log.open("wb") as fh:
+                        proc = subprocess.Popen(cmd, cwd=settings.BASE_DIR, env=env, stdout=fh, stderr=subprocess.STDOUT)
+                    _esperar_servidor(proc, puerto, log)
+                try:
+                    for esc in escenarios:
+                        if esc.nombre == "descarga" and not ctx.get("export"):
+                            ctx["export"] = asyncio.run(_primer_export(host, puerto))
+                            if not ctx["export"]:
+                                self.stderr.write("Sin exports para 'descarga' (corre también 'upload').")
+                                continue
+                        if esc.nombre != "upload":  # calentamiento (no se mide): conexiones, cachés, imports
+                            asyncio.run(correr_nivel(host, puerto, esc, ctx, max(niveles), 0, 2 * max(niveles)))
+                        for c in niveles:
+                            r = asyncio.run(correr_nivel(host, puerto, esc, ctx, c, opts["duracion"], opts["peticiones"]))
+                            resultados.append({"modo": modo, **r})
+                            self.stderr.write(f"{modo} {esc.nombre} c={c}: {r['rps']} req/s p95={r['p95_ms']} ms")
+                finally:
+                    if proc is not None:
+                        proc.terminate()
+                        try:
+                            proc.wait(timeout=15)
+                        except subprocess.TimeoutExpired:
+                            proc.kill()
+
+        comparacion = []
+        por_clave = {(r["modo"], r["escenario"], r["concurrencia"]): r for r in resultados}
+        for (modo, esc, c), w in por_clave.items():
+            a = por_clave.get(("asgi", esc, c))
+            if modo == "wsgi" and a:
+                comparacion.append({
+                    "escenario": esc, "concurrencia": c,
+                    "rps_wsgi": w["rps"], "rps_asgi": a["rps"],
+                    "p95_wsgi_ms": w["p95_ms"], "p95_asgi_ms": a["p95_ms"],
+                    "asgi_vs_wsgi_rps": round(a["rps"] / w["rps"], 2) if w["rps"] and a["rps"] else None,
+                })
+
+        if opts["json"]:
+            self.stdout.write(json.dumps({
+                "workers": opts["workers"], "hilos": opts["hilos"], "latencia_llm_s": opts["latencia_llm"],
+                "resultados": resultados, "comparacion": comparacion,
+            }, indent=2))
+            return
+
+        self.stdout.write(f"{'modo':<8} {'escenario':<13} {'c':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+                          f"{'p99 ms':>9}  errores")
+        for r in resultados:
+            self.stdout.write(
+                f"{r['modo']:<8} {r['escenario']:<13} {r['concurrencia']:>4} {r['rps'] or 0:>9.1f} "
+                f"{r['p50_ms'] or 0:>9.1f} {r['p95_ms'] or 0:>9.1f} {r['p99_ms'] or 0:>9.1f}  {r['errores'] or '-'}"
+            )
+        for c in comparacion:
+            self.stdout.write(f"asgi/wsgi {c['escenario']} c={c['concurrencia']}: x{c['asgi_vs_wsgi_rps']} req/s, "
+                              f"p95 {c['p95_wsgi_ms']} -> {c['p95_asgi_ms']} ms")
@@ -0,0 +1,305 @@
+# src/api/management/commands/bench_ingesta.py
+from __future__ import annotations
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+import json
+import multiprocessing as mp
+import platform
+import sys
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from api import services
+from api.models import ArchivoExportado, Artefacto, RegistroDatos
+from app.parser import FixedWidthParser
+from app.transformers import BusinessTransformer
+from app.writer import OutputWriter, fila
+
+ETAPAS = ("parser", "transformer", "output_writer", "write_outputs", "procesar")
+FECHA = "20250529"
+
+
+def _filas(valor: str) -> int:
+    """'10k' -> 10000, '1m' -> 1000000, '250000' -> 250000."""
+    v = valor.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(v[-1:], 1)
+    return int(float(v[:-1] if mult > 1 else v) * mult)
+
+
+def _rss_pico_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def insumo(filas: int, semilla: int, carpeta: Path) -> Path:
+    """TXT generado con generar_txt (se reutiliza si ya existe con el mismo tamaño)."""
+    from generar_txt import LARGO_LINEA, Config, generar_archivo
+
+    path = carpeta / f"BENCH{filas}S{semilla}_{FECHA}.txt"
+    if not (path.is_file() and path.stat().st_size == filas * (LARGO_LINEA + 1)):
+        cfg = Config(filas=filas, semilla=semilla, fecha=FECHA, bloque=50_000, gzip=False, nivel_gzip=1,
+                     tasa_longitud=0.0, tasa_fecha=0.0, tasa_numero=0.0, tasa_acentos=0.0)
+        generar_archivo(path, cfg, procesos=mp.cpu_count())
+    return path
+
+
+# --------------------------
+# Etapas: cada una recorre el archivo completo y devuelve {detalle: segundos}
+# --------------------------
+def _registros(path: Path, detalle: Dict[str, float]) -> List:
+    t0 = perf_counter()
+    parser = FixedWidthParser(path)
+    transformer = BusinessTransformer(parser.yyyymmdd, path.name)
+    records = [transformer.build_record(cols) for cols in parser.iter_rows()]
+    detalle["construccion"] = perf_counter() - t0
+    return records
+
+
+def _etapa_parser(path: Path, salida: Path) -> Dict[str, float]:
+    for _ in FixedWidthParser(path).iter_rows():
+        pass
+    return {}
+
+
+def _etapa_transformer(path: Path, salida: Path) -> Dict[str, float]:
+    parser = FixedWidthParser(path)
+    transformer = BusinessTransformer(parser.yyyymmdd, path.name)
+    filas = parser.iter_rows()
+    t_parser = t_build = 0.0
+    while True:
+        t0 = perf_counter()
+        cols = next(filas, None)
+        t1 = perf_counter()
+        if cols is None:
+            break
+        transformer.build_record(cols)
+        t_parser += t1 - t0
+        t_build += perf_counter() - t1
+    return {"parser": t_parser, "build_record": t_build}
+
+
+def _etapa_output_writer(path: Path, salida: Path) -> Dict[str, float]:
+    detalle: Dict[str, float] = {}
+    records = _registros(path, detalle)
+    t0 = perf_counter()
+    OutputWriter.to_csv(records, salida / f"{path.stem}.csv")
+    t1 = perf_counter()
+    OutputWriter.to_json(records, salida / f"{path.stem}.json")
+    detalle.update(to_csv=t1 - t0, to_json=perf_counter() - t1)
+    return detalle
+
+
+def _etapa_write_outputs(path: Path, salida: Path) -> Dict[str, float]:
+    detalle: Dict[str, float] = {}
+    records = _registros(path, detalle)
+    t0 = perf_counter()
+    records = [fila(r) for r in records]
+    detalle["construccion"] += perf_counter() - t0
+    t0 = perf_counter()
+    services._write_outputs(records, path.stem)
+    detalle["_write_outputs"] = perf_counter() - t0
+    return detalle
+
+
+def _etapa_procesar(path: Path, salida: Path) -> Dict[str, float]:
+    original = services._write_outputs
+    medido = {"_write_outputs": 0.0}
+
+    def _cronometrado(records, base_name):
+        t0 = perf_counter()
+        try:
+            return original(records, base_name)
+        finally:
+            medido["_write_outputs"] += perf_counter() - t0
+
+    services._write_outputs = _cronometrado
+    try:
+        t0 = perf_counter()
+        services.procesar_archivo_y_guardar(str(path))
+        total = perf_counter() - t0
+    finally:
+        services._write_outputs = original
+    return {"parseo_transformacion_insercion": total - medido["_write_outputs"], **medido}
+
+
+_FUNCIONES: Dict[str, Callable[[Path, Path], Dict[str, float]]] = {
+    "parser": _etapa_parser,
+    "transformer": _etapa_transformer,
+    "output_writer": _etapa_output_writer,
+    "write_outputs": _etapa_write_outputs,
+    "procesar": _etapa_procesar,
+}
+
+
+def _limpiar(path: Path) -> None:
+    """Quita lo que la etapa dejó en la base (importa con --base-actual)."""
+    RegistroDatos.objects.filter(nombre_db__valor=path.name).delete()
+    ArchivoExportado.objects.filter(nombre_archivo__startswith=f"{path.stem}.").delete()
+    Artefacto.objects.filter(nombre_archivo__startswith=f"{path.stem}.").delete()
+
+
+def medir(etapa: str, path: Path, filas: int, salida: Path) -> Dict[str, object]:
+    t0 = perf_counter()
+    detalle = _FUNCIONES[etapa](path, salida)
+    dt = perf_counter() - t0
+    _limpiar(path)
+    return {
+        "segundos": round(dt, 3),
+        "filas_por_s": round(filas / dt, 1) if dt else None,
+        "rss_pico_mb": _rss_pico_mb(),
+        "detalle": {k: round(v, 3) for k, v in detalle.items()},
+    }
+
+
+def _medir_en_hijo(conn, etapa, path, filas, salida) -> None:
+    try:
+        conn.send(("ok", medir(etapa, path, filas, salida)))
+    except Exception as e:  # el padre lo convierte en CommandError
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        connections.close_all()
+        conn.close()
+
+
+def medir_aislado(etapa: str, path: Path, filas: int, salida: Path) -> Dict[str, object]:
+    """
+    Corre la etapa en un proceso hijo (fork) para que el RSS pico sea el de esa
+    etapa y no el acumulado de las anteriores.
+    """
+    connections.close_all()  # el hijo abre sus propias conexiones
+    ctx = mp.get_context("fork")
+    padre, hijo = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_medir_en_hijo, args=(hijo, etapa, path, filas, salida))
+    proc.start()
+    hijo.close()
+    try:
+        estado, res = padre.recv()
+    except EOFError:  # el hijo murió sin responder (p.ej. OOM killer)
+        estado, res = "error", f"proceso terminado con código {proc.exitcode}"
+    proc.join()
+    if estado != "ok":
+        raise CommandError(f"La etapa {etapa} falló: {res}")
+    return res
+
+
+def comparar(actual: dict, baseline: dict, umbral: float) -> List[Dict[str, object]]:
+    """Regresiones por (escenario, etapa): menos filas/s o más RSS pico que baseline ± umbral."""
+    regresiones = []
+    for esc, datos in actual["escenarios"].items():
+        base_esc = baseline.get("escenarios", {}).get(esc, {}).get("etapas", {})
+        for etapa, m in datos["etapas"].items():
+            b = base_esc.get(etapa)
+            if not b:
+                continue
+            if b.get("filas_por_s") and m["filas_por_s"] is not None \
+                    and m["filas_por_s"] < b["filas_por_s"] * (1 - umbral):
+                regresiones.append({"escenario": esc, "etapa": etapa, "metrica": "filas_por_s",
+                                    "baseline": b["filas_por_s"], "actual": m["filas_por_s"]})
+            if b.get("rss_pico_mb") and m["rss_pico_mb"] is not None \
+                    and m["rss_pico_mb"] > b["rss_pico_mb"] * (1 + umbral):
+                regresiones.append({"escenario": esc, "etapa": etapa, "metrica": "rss_pico_mb",
+                                    "baseline": b["rss_pico_mb"], "actual": m["rss_pico_mb"]})
+    return regresiones
+
+
+@contextmanager
+def _base_temporal(usar: bool, verbosity: int):
+    """Base desechable (como la del test runner): la ingesta no toca la base real."""
+    if not usar:
+        yield
+        return
+    config = setup_databases(verbosity=max(0, verbosity - 1), interactive=False, aliases={"default"})
+    try:
+        yield
+    finally:
+        connections.close_all()
+        teardown_databases(config, verbosity=max(0, verbosity - 1))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de ingesta de punta a punta (FixedWidthParser, build_record, OutputWriter, "
+        "_write_outputs y procesar_archivo_y_guardar) sobre archivos generados: filas/s, RSS pico "
+        "y tiempo por etapa, en JSON y comparado contra un baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--escenarios", nargs="+", default=["10k"],
+                            help="Tamaños en filas (10k, 1m, 10m o un número). Default 10k.")
+        parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=list(ETAPAS))
+        parser.add_argument("--semilla", type=int, default=1)
+        parser.add_argument("--insumos", default=str(Path(tempfile.gettempdir()) / "sdata_bench"),
+                            help="Carpeta de los TXT generados (se reutilizan entre corridas).")
+        parser.add_argument("--salida", default=None, help="Escribe los resultados en este JSON.")
+        parser.add_argument("--baseline", default=None, help="JSON de una corrida anterior para comparar.")
+        parser.add_argument("--umbral", type=float, default=0.10,
+                            help="Tolerancia relativa antes de marcar regresión. Default 0.10.")
+        parser.add_argument("--actualizar-baseline", action="store_true",
+                            help="Guarda esta corrida como --baseline en lugar de compararla.")
+        parser.add_argument("--base-actual", action="store_true",
+                            help="Usa la base configurada en vez de una base desechable (limpia lo insertado).")
+        parser.add_argument("--en-proceso", action="store_true",
+                            help="No aísla cada etapa en un proceso hijo (el RSS pico pasa a ser acumulado).")
+
+    def handle(self, *args, **opts):
+        if opts["actualizar_baseline"] and not opts["baseline"]:
+            raise CommandError("--actualizar-baseline requiere --baseline.")
+        aislar = not opts["en_proceso"] and "fork" in mp.get_all_start_methods()
+        carpeta = Path(opts["insumos"])
+        carpeta.mkdir(parents=True, exist_ok=True)
+
+        resultados = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "aislado": aislar,
+            "escenarios": {},
+        }
+        with tempfile.TemporaryDirectory() as media, _base_temporal(not opts["base_actual"], opts["verbosity"]), \
+                override_settings(MEDIA_ROOT=media, EXPORT_DIR=str(Path(media) / "exports"),
+                                  UPLOAD_DIR=str(Path(media) / "uploads"), ARTIFACT_STORE_BUDGET_BYTES=0):
+            for esc in opts["escenarios"]:
+                filas = _filas(esc)
+                path = insumo(filas, opts["semilla"], carpeta)
+                etapas = {}
+                for etapa in opts["etapas"]:
+                    salida = Path(media) / etapa
+                    salida.mkdir(exist_ok=True)
+                    etapas[etapa] = (medir_aislado if aislar else medir)(etapa, path, filas, salida)
+                    self.stderr.write(f"{esc} {etapa}: {etapas[etapa]['segundos']}s")
+                resultados["escenarios"][esc] = {"filas": filas, "etapas": etapas}
+
+        regresiones = []
+        base_path = Path(opts["baseline"]) if opts["baseline"] else None
+        if base_path and opts["actualizar_baseline"]:
+            base_path.parent.mkdir(parents=True, exist_ok=True)
+            base_path.write_text(json.dumps(resultados, indent=2), encoding="utf-8")
+        elif base_path:
+            if not base_path.is_file():
+                raise CommandError(f"No existe el baseline: {base_path}")
+            regresiones = comparar(resultados, json.loads(base_path.read_text(encoding="utf-8")), opts["umbral"])
+            resultados["regresiones"] = regresiones
+        if opts["salida"]:
+            Path(opts["salida"]).write_text(json.dumps(resultados, indent=2), encoding="utf-8")
+
+        for esc, datos in resultados["escenarios"].items():
+            self.stdout.write(f"{esc} ({datos['filas']:,} filas)")
+            for etapa, m in datos["etapas"].items():
+                det = "  ".join(f"{k}={v}s" for k, v in m["detalle"].items())
+                self.stdout.write(f"  {etapa:<14} {m['segundos']:>9.3f}s  {m['filas_por_s'] or 0:>11,.0f} filas/s  "
+                                  f"RSS {m['rss_pico_mb']} MB  {det}")
+        for r in regresiones:
+            self.stdout.write(f"REGRESIÓN {r['escenario']}/{r['etapa']} {r['metrica']}: "
+                              f"{r['baseline']} -> {r['actual']}")
+        if regresiones:
+            raise CommandError(f"{len(regresiones)} regresión(es) por encima de {opts['umbral']:.0%}.")
@@ -0,0 +1,63 @@
+# src/api/management/commands/catalogar_exports.py
+from __future__ import annotations
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.artifacts import directorio, registrar
+from api.exports import ENCODING_SUFFIX, es_manifiesto, es_variante, leer_manifiesto, registrar_export, variante_path
+from api.models import ArchivoExportado, Artefacto
+
+
+class Command(BaseCommand):
+    help = (
+        "Sincroniza el catálogo de exports y el almacén de artefactos con "
+        "EXPORT_DIR/UPLOAD_DIR (una sola pasada). Útil para poblarlos con "
+        "archivos anteriores al catálogo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--purgar", action="store_true",
+                            help="Elimina las entradas cuyo archivo ya no existe.")
+
+    def handle(self, *args, **opts):
+        out_dir = Path(settings.EXPORT_DIR)
+        # Los shards de un export partido pertenecen al grupo de su manifiesto
+        grupos = {}
+        for m in sorted(out_dir.glob("*")):
+            if m.is_file() and es_manifiesto(m):
+                for s in leer_manifiesto(m)["shards"]:
+                    grupos[s["archivo"]] = m.name
+
+        vistos = set()
+        for p in sorted(out_dir.glob("*")):
+            if p.is_file() and not es_variante(p) and not p.name.startswith("."):
+                grupo = grupos.get(p.name, p.name)
+                registrar(p, Artefacto.TIPO_EXPORT, grupo=grupo)
+                for enc in ENCODING_SUFFIX:
+                    v = variante_path(p, enc)
+                    if v.is_file():
+                        registrar(v, Artefacto.TIPO_EXPORT, grupo=grupo)
+                if p.name in grupos:
+                    continue
+                registrar_export(p)
+                vistos.add(p.name)
+        self.stdout.write(f"Exports catalogados: {len(vistos)}")
+
+        up_dir = Path(getattr(settings, "UPLOAD_DIR", "/app/data/uploads"))
+        uploads = set()
+        for p in sorted(up_dir.glob("*")) if up_dir.is_dir() else []:
+            if p.is_file() and not p.name.startswith("."):
+                registrar(p, Artefacto.TIPO_UPLOAD)
+                uploads.add(p.name)
+        self.stdout.write(f"Uploads registrados: {len(uploads)}")
+
+        if opts["purgar"]:
+            borrados, _ = ArchivoExportado.objects.exclude(nombre_archivo__in=vistos).delete()
+            huerfanos = [
+                a.pk for a in Artefacto.objects.all()
+                if not (directorio(a.tipo) / a.nombre_archivo).is_file()
+            ]
+            Artefacto.objects.filter(pk__in=huerfanos).delete()
+            self.stdout.write(f"Purgados: {borrados} exports, {len(huerfanos)} artefactos")
@@ -0,0 +1,19 @@
+# src/api/management/commands/purgar_ejecuciones_sql.py
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.observabilidad import purgar
+
+
+class Command(BaseCommand):
+    help = "Borra de api_ejecucionsql las ejecuciones más viejas que la retención (para correr por cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=None,
+                            help="Retención en días (por defecto SQL_OBSERVABILITY_RETENTION_DAYS).")
+
+    def handle(self, *args, **opts):
+        dias = opts["dias"] if opts["dias"] is not None else settings.SQL_OBSERVABILITY_RETENTION_DAYS
+        self.stdout.write(f"Ejecuciones purgadas: {purgar(dias)}")
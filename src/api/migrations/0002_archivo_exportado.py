@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoExportado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre_archivo', models.CharField(max_length=255, unique=True)),
+                ('nombre', models.CharField(blank=True, default='', max_length=200)),
+                ('fecha', models.DateField(blank=True, null=True)),
+                ('formato', models.CharField(blank=True, default='', max_length=16)),
+                ('size', models.BigIntegerField(default=0)),
+                ('encodings', models.JSONField(blank=True, default=dict)),
+                ('modified', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['nombre', 'fecha'], name='api_archivo_nombre_d527c1_idx'), models.Index(fields=['fecha'], name='api_archivo_fecha_cbe98e_idx'), models.Index(fields=['modified'], name='api_archivo_modifie_6fef85_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_archivo_exportado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Artefacto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('upload', 'upload'), ('export', 'export')], max_length=8)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('grupo', models.CharField(max_length=255)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField(default=0)),
+                ('hits', models.IntegerField(default=0)),
+                ('last_accessed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo', 'grupo'], name='api_artefac_tipo_124b35_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'nombre_archivo'), name='uniq_artefacto_tipo_nombre')],
+            },
+        ),
+    ]
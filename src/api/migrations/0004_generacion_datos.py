@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_artefacto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneracionDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabla', models.CharField(max_length=63, unique=True)),
+                ('generacion', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
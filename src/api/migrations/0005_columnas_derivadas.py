@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:46
+
+import django.db.models.functions.comparison
+import django.db.models.functions.datetime
+import django.db.models.functions.text
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_generacion_datos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registro',
+            name='anio_nacimiento',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.datetime.ExtractYear('fecha_nacimiento'), output_field=models.SmallIntegerField(null=True)),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='debito_rechazado',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(django.db.models.lookups.StartsWith(django.db.models.functions.text.Upper('estado_debito'), 'RECHAZ'), models.Q(('causal_rechazo', ''), _negated=True), _connector='OR'), output_field=models.BooleanField()),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='mes_nacimiento',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.datetime.ExtractMonth('fecha_nacimiento'), output_field=models.SmallIntegerField(null=True)),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='telefono_principal',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce(django.db.models.functions.comparison.NullIf('telefono_1', models.Value('')), django.db.models.functions.comparison.NullIf('telefono_2', models.Value('')), django.db.models.functions.comparison.NullIf('telefono_3', models.Value(''))), output_field=models.CharField(max_length=32, null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='registro',
+            index=models.Index(fields=['fecha_nacimiento'], name='registro_fecha_nac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registro',
+            index=models.Index(fields=['anio_nacimiento', 'mes_nacimiento'], name='registro_anio_mes_nac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registro',
+            index=models.Index(fields=['telefono_principal'], name='registro_tel_principal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registro',
+            index=models.Index(condition=models.Q(('debito_rechazado', True)), fields=['-created_at'], name='registro_rechazado_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_columnas_derivadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionSQL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('huella', models.CharField(max_length=16)),
+                ('sql', models.TextField()),
+                ('herramienta', models.CharField(blank=True, default='', max_length=32)),
+                ('duracion_ms', models.FloatField(default=0)),
+                ('filas', models.IntegerField(default=0)),
+                ('truncado', models.BooleanField(default=False)),
+                ('costo', models.FloatField(blank=True, null=True)),
+                ('nodos', models.JSONField(blank=True, default=list)),
+                ('seq_scans', models.JSONField(blank=True, default=list)),
+                ('columnas_seq', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['huella', 'created_at'], name='api_ejecuci_huella_e0d64b_idx'), models.Index(fields=['created_at'], name='api_ejecuci_created_6cb070_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_ejecucion_sql'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivoexportado',
+            name='shards',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,335 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:32
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+import django.db.models.functions.datetime
+import django.db.models.functions.text
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+# api_registro (en su orden original, sin id ni columnas generadas)
+COLUMNAS = [
+    "tipo_documento", "documento", "nombre", "producto", "poliza", "periodo", "valor_asegurado", "valor_prima",
+    "doc_cobro", "fecha_ini", "fecha_fin", "dias", "telefono_1", "telefono_2", "telefono_3", "ciudad",
+    "departamento", "fecha_venta", "fecha_nacimiento", "tipo_trans", "beneficiarios", "genero", "sucursal",
+    "tipo_cuenta", "ultimos_digitos_cuenta", "entidad_bancaria", "nombre_banco", "estado_debito", "causal_rechazo",
+    "codigo_canal", "descripcion_canal", "codigo_estrategia", "tipo_estrategia", "correo_electronico",
+    "fecha_entrega_colmena", "mes_a_trabajar", "nombre_db", "telefono", "whatsapp", "texto", "email", "fisica",
+    "mejor_canal", "contactar_al", "created_at",
+]
+GENERADAS = ["telefono_principal", "anio_nacimiento", "mes_nacimiento", "debito_rechazado"]
+DIMENSIONES = {
+    "ciudad": "api_dimciudad",
+    "departamento": "api_dimdepartamento",
+    "nombre_banco": "api_dimnombrebanco",
+    "entidad_bancaria": "api_dimentidadbancaria",
+    "producto": "api_dimproducto",
+    "sucursal": "api_dimsucursal",
+    "estado_debito": "api_dimestadodebito",
+    "mejor_canal": "api_dimmejorcanal",
+    "nombre_db": "api_dimnombredb",
+}
+PLANAS = [c for c in COLUMNAS if c not in DIMENSIONES]
+FKS = [f"{c}_id" for c in DIMENSIONES]
+NL = "\n"
+SEP = ",\n        "
+
+
+def _dim_id(c: str) -> str:
+    return "_estado" if c == "estado_debito" else f"api_dim_id('{DIMENSIONES[c]}', NEW.{c})"
+
+
+DESTINO = f"api_registro_datos (id, {', '.join(PLANAS)}, {', '.join(FKS)}, debito_rechazado)"
+RECHAZADO = "(NEW.causal_rechazo <> '' OR (SELECT rechazado FROM api_dimestadodebito WHERE id = _estado))"
+
+LLENAR_DIMENSIONES = NL.join(
+    f"INSERT INTO {t} (valor) SELECT DISTINCT {c} FROM api_registro ON CONFLICT DO NOTHING;"
+    for c, t in DIMENSIONES.items()
+)
+COPIA_SELECT = ", ".join(["r.id"] + [f"r.{c}" for c in PLANAS] + [f"{c}.id" for c in DIMENSIONES] + ["r.debito_rechazado"])
+COPIA_JOINS = NL.join(f"JOIN {t} {c} ON {c}.valor = r.{c}" for c, t in DIMENSIONES.items())
+
+VISTA_COLUMNAS = SEP.join(
+    ["r.id"] + [f"{c}.valor AS {c}" if c in DIMENSIONES else f"r.{c}" for c in COLUMNAS] + [f"r.{c}" for c in GENERADAS]
+)
+VISTA_JOINS = NL.join(f"LEFT JOIN {t} {c} ON {c}.id = r.{c}_id" for c, t in DIMENSIONES.items())
+
+INSERTAR_VALORES = SEP.join(
+    ["coalesce(NEW.id, nextval(pg_get_serial_sequence('api_registro_datos', 'id')))"]
+    + ["coalesce(NEW.created_at, now())" if c == "created_at" else f"NEW.{c}" for c in PLANAS]
+    + [_dim_id(c) for c in DIMENSIONES]
+    + [RECHAZADO]
+)
+ACTUALIZAR_SET = SEP.join(
+    ["id = NEW.id"] + [f"{c} = NEW.{c}" for c in PLANAS] + [f"{c}_id = {_dim_id(c)}" for c in DIMENSIONES]
+    + [f"debito_rechazado = {RECHAZADO}"]
+)
+
+SQL = f"""
+{LLENAR_DIMENSIONES}
+
+INSERT INTO {DESTINO}
+SELECT {COPIA_SELECT}
+FROM api_registro r
+{COPIA_JOINS};
+
+SELECT setval(pg_get_serial_sequence('api_registro_datos', 'id'), coalesce(max(id), 0) + 1, false)
+FROM api_registro_datos;
+
+DROP TABLE api_registro;
+
+-- LEFT JOIN a una PK: si la consulta no usa la columna, Postgres elimina el join
+CREATE VIEW api_registro AS
+SELECT
+        {VISTA_COLUMNAS}
+FROM api_registro_datos r
+{VISTA_JOINS};
+
+-- id del valor en su dimensión (lo crea si no existe)
+CREATE FUNCTION api_dim_id(tabla regclass, v text) RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE _id integer;
+BEGIN
+    EXECUTE format('SELECT id FROM %s WHERE valor = $1', tabla) INTO _id USING coalesce(v, '');
+    IF _id IS NULL THEN
+        EXECUTE format('INSERT INTO %s (valor) VALUES ($1) ON CONFLICT (valor) DO UPDATE SET valor = EXCLUDED.valor '
+                       'RETURNING id', tabla) INTO _id USING coalesce(v, '');
+    END IF;
+    RETURN _id;
+END $$;
+
+CREATE FUNCTION api_registro_insertar() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE _estado integer := api_dim_id('api_dimestadodebito', NEW.estado_debito);
+BEGIN
+    INSERT INTO {DESTINO}
+    VALUES (
+        {INSERTAR_VALORES}
+    )
+    RETURNING id INTO NEW.id;
+    SELECT * INTO NEW FROM api_registro WHERE id = NEW.id;
+    RETURN NEW;
+END $$;
+
+CREATE FUNCTION api_registro_actualizar() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE _estado integer := api_dim_id('api_dimestadodebito', NEW.estado_debito);
+BEGIN
+    UPDATE api_registro_datos SET
+        {ACTUALIZAR_SET}
+    WHERE id = OLD.id;
+    SELECT * INTO NEW FROM api_registro WHERE id = NEW.id;
+    RETURN NEW;
+END $$;
+
+CREATE FUNCTION api_registro_borrar() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM api_registro_datos WHERE id = OLD.id;
+    RETURN OLD;
+END $$;
+
+CREATE TRIGGER api_registro_insertar INSTEAD OF INSERT ON api_registro
+    FOR EACH ROW EXECUTE FUNCTION api_registro_insertar();
+CREATE TRIGGER api_registro_actualizar INSTEAD OF UPDATE ON api_registro
+    FOR EACH ROW EXECUTE FUNCTION api_registro_actualizar();
+CREATE TRIGGER api_registro_borrar INSTEAD OF DELETE ON api_registro
+    FOR EACH ROW EXECUTE FUNCTION api_registro_borrar();
+"""
+
+# Vuelta atrás: los datos quedan en api_registro_datos y las dimensiones hasta que
+# restaurar_tabla los copia a la tabla api_registro; después se borran con sus modelos.
+QUITAR_VISTA = """
+DROP VIEW api_registro;  -- se lleva sus triggers
+DROP FUNCTION api_registro_insertar(), api_registro_actualizar(), api_registro_borrar(), api_dim_id(regclass, text);
+"""
+RESTAURAR_SELECT = ", ".join(["r.id"] + [f"{c}.valor" if c in DIMENSIONES else f"r.{c}" for c in COLUMNAS])
+
+
+def restaurar_tabla(apps, schema_editor):
+    """Recrea api_registro como tabla (sin los índices, que vuelven con RemoveIndex) y copia las filas."""
+    schema_editor.create_model(apps.get_model("api", "Registro"))
+    schema_editor.execute(f"""
+        INSERT INTO api_registro (id, {', '.join(COLUMNAS)})
+        SELECT {RESTAURAR_SELECT}
+        FROM api_registro_datos r
+        {VISTA_JOINS}
+    """)
+    schema_editor.execute(
+        "SELECT setval(pg_get_serial_sequence('api_registro', 'id'), coalesce(max(id), 0) + 1, false) "
+        "FROM api_registro"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_archivo_exportado_shards'),
+    ]
+
+    operations = [
+        # Los índices pasan a la tabla nueva con los mismos nombres
+        migrations.RemoveIndex(model_name='registro', name='registro_fecha_nac_idx'),
+        migrations.RemoveIndex(model_name='registro', name='registro_anio_mes_nac_idx'),
+        migrations.RemoveIndex(model_name='registro', name='registro_tel_principal_idx'),
+        migrations.RemoveIndex(model_name='registro', name='registro_rechazado_idx'),
+        migrations.CreateModel(
+            name='DimCiudad',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimDepartamento',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimEntidadBancaria',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimEstadoDebito',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200, unique=True)),
+                ('rechazado', models.GeneratedField(db_persist=True, expression=django.db.models.lookups.StartsWith(django.db.models.functions.text.Upper('valor'), 'RECHAZ'), output_field=models.BooleanField())),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimMejorCanal',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimNombreBanco',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimNombreDb',
+            fields=[
+                ('valor', models.CharField(max_length=200, unique=True)),
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimProducto',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimSucursal',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RegistroDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_documento', models.CharField(blank=True, default='', max_length=10)),
+                ('documento', models.CharField(blank=True, default='', max_length=32)),
+                ('nombre', models.CharField(blank=True, default='', max_length=200)),
+                ('poliza', models.CharField(blank=True, default='', max_length=64)),
+                ('periodo', models.CharField(blank=True, default='', max_length=4)),
+                ('valor_asegurado', models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True)),
+                ('valor_prima', models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True)),
+                ('doc_cobro', models.CharField(blank=True, default='', max_length=64)),
+                ('fecha_ini', models.DateField(blank=True, null=True)),
+                ('fecha_fin', models.DateField(blank=True, null=True)),
+                ('dias', models.IntegerField(blank=True, null=True)),
+                ('telefono_1', models.CharField(blank=True, default='', max_length=32)),
+                ('telefono_2', models.CharField(blank=True, default='', max_length=32)),
+                ('telefono_3', models.CharField(blank=True, default='', max_length=32)),
+                ('fecha_venta', models.DateField(blank=True, null=True)),
+                ('fecha_nacimiento', models.DateField(blank=True, null=True)),
+                ('tipo_trans', models.CharField(blank=True, default='', max_length=8)),
+                ('beneficiarios', models.TextField(blank=True, default='')),
+                ('genero', models.CharField(blank=True, default='', max_length=4)),
+                ('tipo_cuenta', models.CharField(blank=True, default='', max_length=32)),
+                ('ultimos_digitos_cuenta', models.CharField(blank=True, default='', max_length=32)),
+                ('causal_rechazo', models.CharField(blank=True, default='', max_length=120)),
+                ('codigo_canal', models.CharField(blank=True, default='', max_length=8)),
+                ('descripcion_canal', models.CharField(blank=True, default='', max_length=200)),
+                ('codigo_estrategia', models.CharField(blank=True, default='', max_length=64)),
+                ('tipo_estrategia', models.CharField(blank=True, default='', max_length=64)),
+                ('correo_electronico', models.EmailField(blank=True, default='', max_length=254)),
+                ('fecha_entrega_colmena', models.DateField(blank=True, null=True)),
+                ('mes_a_trabajar', models.CharField(blank=True, default='', max_length=2)),
+                ('telefono', models.BooleanField(default=False)),
+                ('whatsapp', models.BooleanField(default=False)),
+                ('texto', models.BooleanField(default=False)),
+                ('email', models.BooleanField(default=False)),
+                ('fisica', models.BooleanField(default=False)),
+                ('contactar_al', models.CharField(blank=True, default='', max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('telefono_principal', models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce(django.db.models.functions.comparison.NullIf('telefono_1', models.Value('')), django.db.models.functions.comparison.NullIf('telefono_2', models.Value('')), django.db.models.functions.comparison.NullIf('telefono_3', models.Value(''))), output_field=models.CharField(max_length=32, null=True))),
+                ('anio_nacimiento', models.GeneratedField(db_persist=True, expression=django.db.models.functions.datetime.ExtractYear('fecha_nacimiento'), output_field=models.SmallIntegerField(null=True))),
+                ('mes_nacimiento', models.GeneratedField(db_persist=True, expression=django.db.models.functions.datetime.ExtractMonth('fecha_nacimiento'), output_field=models.SmallIntegerField(null=True))),
+                ('debito_rechazado', models.BooleanField(default=False, editable=False)),
+                ('ciudad', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.dimciudad')),
+                ('departamento', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.dimdepartamento')),
+                ('entidad_bancaria', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.dimentidadbancaria')),
+                ('estado_debito', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.dimestadodebito')),
+                ('mejor_canal', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.dimmejorcanal')),
+                ('nombre_banco', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.dimnombrebanco')),
+                ('nombre_db', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.dimnombredb')),
+                ('producto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.dimproducto')),
+                ('sucursal', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.dimsucursal')),
+            ],
+            options={
+                'db_table': 'api_registro_datos',
+                'indexes': [models.Index(fields=['fecha_nacimiento'], name='registro_fecha_nac_idx'), models.Index(fields=['anio_nacimiento', 'mes_nacimiento'], name='registro_anio_mes_nac_idx'), models.Index(fields=['telefono_principal'], name='registro_tel_principal_idx'), models.Index(condition=models.Q(('debito_rechazado', True)), fields=['-created_at'], name='registro_rechazado_idx')],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='registro',
+            options={'managed': False},
+        ),
+        migrations.AlterModelTable(
+            name='registro',
+            table='api_registro',
+        ),
+        # Al revertir: restaurar_tabla copia de vuelta las filas desde api_registro_datos
+        migrations.RunPython(migrations.RunPython.noop, restaurar_tabla),
+        # Copia los datos, cambia la tabla por la vista y agrega sus triggers
+        migrations.RunSQL(SQL, reverse_sql=QUITAR_VISTA),
+    ]
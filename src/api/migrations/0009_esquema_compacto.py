@@ -0,0 +1,318 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:24
+
+from django.db import migrations, models
+import logging
+
+logger = logging.getLogger("api.migrations")
+
+# api_registro (en su orden original, sin id ni columnas generadas); igual que en 0008
+COLUMNAS = [
+    "tipo_documento", "documento", "nombre", "producto", "poliza", "periodo", "valor_asegurado", "valor_prima",
+    "doc_cobro", "fecha_ini", "fecha_fin", "dias", "telefono_1", "telefono_2", "telefono_3", "ciudad",
+    "departamento", "fecha_venta", "fecha_nacimiento", "tipo_trans", "beneficiarios", "genero", "sucursal",
+    "tipo_cuenta", "ultimos_digitos_cuenta", "entidad_bancaria", "nombre_banco", "estado_debito", "causal_rechazo",
+    "codigo_canal", "descripcion_canal", "codigo_estrategia", "tipo_estrategia", "correo_electronico",
+    "fecha_entrega_colmena", "mes_a_trabajar", "nombre_db", "telefono", "whatsapp", "texto", "email", "fisica",
+    "mejor_canal", "contactar_al", "created_at",
+]
+GENERADAS = ["telefono_principal", "anio_nacimiento", "mes_nacimiento", "debito_rechazado"]
+DIMENSIONES = {
+    "ciudad": "api_dimciudad",
+    "departamento": "api_dimdepartamento",
+    "nombre_banco": "api_dimnombrebanco",
+    "entidad_bancaria": "api_dimentidadbancaria",
+    "producto": "api_dimproducto",
+    "sucursal": "api_dimsucursal",
+    "estado_debito": "api_dimestadodebito",
+    "mejor_canal": "api_dimmejorcanal",
+    "nombre_db": "api_dimnombredb",
+}
+# Canales en la máscara `canales`: el canal i es el bit i (api.compacto.CANALES)
+CANALES = ["telefono", "whatsapp", "texto", "email", "fisica"]
+PLANAS = [c for c in COLUMNAS if c not in DIMENSIONES]
+FKS = [f"{c}_id" for c in DIMENSIONES]
+NL = "\n"
+SEP = ",\n        "
+SMALLINT = "BETWEEN -32768 AND 32767"
+
+
+def _entero(v: str, ancho: int) -> str:
+    return f"api_entero_corto({v}, {ancho})"
+
+
+def _respaldo(v: str, ancho: int) -> str:
+    return f"CASE WHEN {_entero(v, ancho)} IS NULL THEN nullif({v}, '') END"
+
+
+def _mascara(valor) -> str:
+    return " | ".join(f"({valor(c)}::int << {i})" for i, c in enumerate(CANALES))
+
+
+# columna de api_registro -> {columna física: valor desde la columna lógica ``v``} en el esquema compacto
+COMPACTAS = {
+    "periodo": {"periodo": lambda v: _entero(v, 1), "periodo_texto": lambda v: _respaldo(v, 1)},
+    "valor_asegurado": {"valor_asegurado_centavos": lambda v: f"round({v} * 100)::bigint"},
+    "valor_prima": {"valor_prima_centavos": lambda v: f"round({v} * 100)::bigint"},
+    "dias": {"dias": lambda v: f"CASE WHEN {v} {SMALLINT} THEN {v} END",
+             "dias_grande": lambda v: f"CASE WHEN {v} NOT {SMALLINT} THEN {v} END"},
+    "mes_a_trabajar": {"mes_a_trabajar": lambda v: _entero(v, 2),
+                       "mes_a_trabajar_texto": lambda v: _respaldo(v, 2)},
+    "telefono": {"canales": lambda v: _mascara(lambda c: f"coalesce(NEW.{c}, false)")},
+}
+# columna de api_registro -> cómo la muestra la vista en el esquema compacto (mismo tipo que antes)
+VISTA_COMPACTA = {
+    "periodo": "coalesce(r.periodo_texto, api_texto_corto(r.periodo, 1), '')::varchar(4)",
+    "valor_asegurado": "(r.valor_asegurado_centavos / 100.0)::numeric(18, 2)",
+    "valor_prima": "(r.valor_prima_centavos / 100.0)::numeric(18, 2)",
+    "dias": "coalesce(r.dias_grande, r.dias)::integer",
+    "mes_a_trabajar": "coalesce(r.mes_a_trabajar_texto, api_texto_corto(r.mes_a_trabajar, 2), '')::varchar(2)",
+    **{c: f"(r.canales & {1 << i}) <> 0" for i, c in enumerate(CANALES)},
+}
+
+
+def _dim_id(c: str) -> str:
+    return "_estado" if c == "estado_debito" else f"api_dim_id('{DIMENSIONES[c]}', NEW.{c})"
+
+
+def _vista_y_triggers(compacta: bool) -> str:
+    """La vista api_registro y sus triggers INSTEAD OF sobre el esquema ancho (0008) o el compacto."""
+    fisicas = {}  # columna física -> valor desde NEW
+    for c in PLANAS:
+        if compacta and c in COMPACTAS:
+            fisicas.update({f: valor(f"NEW.{c}") for f, valor in COMPACTAS[c].items()})
+        elif not (compacta and c in CANALES):
+            fisicas[c] = "coalesce(NEW.created_at, now())" if c == "created_at" else f"NEW.{c}"
+
+    def vista(c: str) -> str:
+        if c in DIMENSIONES:
+            return f"{c}.valor AS {c}"
+        return f"{VISTA_COMPACTA[c]} AS {c}" if compacta and c in VISTA_COMPACTA else f"r.{c}"
+
+    destino = f"api_registro_datos (id, {', '.join(fisicas)}, {', '.join(FKS)}, debito_rechazado)"
+    rechazado = "(NEW.causal_rechazo <> '' OR (SELECT rechazado FROM api_dimestadodebito WHERE id = _estado))"
+    insertar = SEP.join(
+        ["coalesce(NEW.id, nextval(pg_get_serial_sequence('api_registro_datos', 'id')))"]
+        + list(fisicas.values()) + [_dim_id(c) for c in DIMENSIONES] + [rechazado]
+    )
+    actualizar = SEP.join(
+        ["id = NEW.id"] + [f"{f} = {v}" for f, v in fisicas.items() if f != "created_at"]
+        + ["created_at = NEW.created_at"]
+        + [f"{c}_id = {_dim_id(c)}" for c in DIMENSIONES] + [f"debito_rechazado = {rechazado}"]
+    )
+    return f"""
+-- Mismas columnas y tipos en ambos esquemas: quien lee api_registro no nota el cambio
+CREATE VIEW api_registro AS
+SELECT
+        {SEP.join(["r.id"] + [vista(c) for c in COLUMNAS] + [f"r.{c}" for c in GENERADAS])}
+FROM api_registro_datos r
+{NL.join(f"LEFT JOIN {t} {c} ON {c}.id = r.{c}_id" for c, t in DIMENSIONES.items())};
+
+CREATE OR REPLACE FUNCTION api_registro_insertar() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE _estado integer := api_dim_id('api_dimestadodebito', NEW.estado_debito);
+BEGIN
+    INSERT INTO {destino}
+    VALUES (
+        {insertar}
+    )
+    RETURNING id INTO NEW.id;
+    SELECT * INTO NEW FROM api_registro WHERE id = NEW.id;
+    RETURN NEW;
+END $$;
+
+CREATE OR REPLACE FUNCTION api_registro_actualizar() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE _estado integer := api_dim_id('api_dimestadodebito', NEW.estado_debito);
+BEGIN
+    UPDATE api_registro_datos SET
+        {actualizar}
+    WHERE id = OLD.id;
+    SELECT * INTO NEW FROM api_registro WHERE id = NEW.id;
+    RETURN NEW;
+END $$;
+
+CREATE TRIGGER api_registro_insertar INSTEAD OF INSERT ON api_registro
+    FOR EACH ROW EXECUTE FUNCTION api_registro_insertar();
+CREATE TRIGGER api_registro_actualizar INSTEAD OF UPDATE ON api_registro
+    FOR EACH ROW EXECUTE FUNCTION api_registro_actualizar();
+CREATE TRIGGER api_registro_borrar INSTEAD OF DELETE ON api_registro
+    FOR EACH ROW EXECUTE FUNCTION api_registro_borrar();
+"""
+
+
+# La vista depende de las columnas que cambian de tipo: se quita antes y se recrea al final
+FUNCIONES = """
+DROP VIEW api_registro;  -- se lleva sus triggers
+
+-- 5 con ancho 2 -> '05' (= api.compacto.texto_corto)
+CREATE FUNCTION api_texto_corto(n smallint, ancho integer) RETURNS text LANGUAGE sql IMMUTABLE AS $$
+    SELECT lpad(n::text, greatest(ancho, length(n::text)), '0')
+$$;
+
+-- '05' con ancho 2 -> 5; NULL si el texto no se reconstruye igual desde el número (= api.compacto.entero_corto)
+CREATE FUNCTION api_entero_corto(v text, ancho integer) RETURNS smallint LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN v ~ '^[0-9]{1,4}$' THEN
+        CASE WHEN api_texto_corto(v::smallint, ancho) = v THEN v::smallint END
+    END
+$$;
+"""
+QUITAR_FUNCIONES = f"""
+DROP FUNCTION api_entero_corto(text, integer), api_texto_corto(smallint, integer);
+{_vista_y_triggers(compacta=False)}
+"""
+
+# Los respaldos se llenan antes (solo las filas que los necesitan, normalmente ninguna) y los tipos
+# cambian en un solo ALTER TABLE: la tabla se reescribe una vez
+COMPACTAR = f"""
+ALTER TABLE api_registro_datos
+    ADD COLUMN periodo_texto varchar(4),
+    ADD COLUMN mes_a_trabajar_texto varchar(2),
+    ADD COLUMN dias_grande integer;
+
+UPDATE api_registro_datos SET
+    periodo_texto = {_respaldo("periodo", 1)},
+    mes_a_trabajar_texto = {_respaldo("mes_a_trabajar", 2)},
+    dias_grande = CASE WHEN dias NOT {SMALLINT} THEN dias END
+WHERE {_respaldo("periodo", 1)} IS NOT NULL
+   OR {_respaldo("mes_a_trabajar", 2)} IS NOT NULL
+   OR dias NOT {SMALLINT};
+
+ALTER TABLE api_registro_datos
+    ALTER COLUMN periodo DROP NOT NULL,
+    ALTER COLUMN periodo TYPE smallint USING {_entero("periodo", 1)},
+    ALTER COLUMN mes_a_trabajar DROP NOT NULL,
+    ALTER COLUMN mes_a_trabajar TYPE smallint USING {_entero("mes_a_trabajar", 2)},
+    ALTER COLUMN dias TYPE smallint USING CASE WHEN dias {SMALLINT} THEN dias END,
+    ALTER COLUMN valor_asegurado TYPE bigint USING round(valor_asegurado * 100),
+    ALTER COLUMN valor_prima TYPE bigint USING round(valor_prima * 100),
+    ALTER COLUMN telefono TYPE smallint USING ({_mascara(lambda c: c)})::smallint;
+
+ALTER TABLE api_registro_datos {", ".join(f"DROP COLUMN {c}" for c in CANALES[1:])};
+ALTER TABLE api_registro_datos RENAME COLUMN valor_asegurado TO valor_asegurado_centavos;
+ALTER TABLE api_registro_datos RENAME COLUMN valor_prima TO valor_prima_centavos;
+ALTER TABLE api_registro_datos RENAME COLUMN telefono TO canales;
+"""
+DESCOMPACTAR = f"""
+ALTER TABLE api_registro_datos RENAME COLUMN canales TO telefono;
+ALTER TABLE api_registro_datos RENAME COLUMN valor_prima_centavos TO valor_prima;
+ALTER TABLE api_registro_datos RENAME COLUMN valor_asegurado_centavos TO valor_asegurado;
+ALTER TABLE api_registro_datos {", ".join(f"ADD COLUMN {c} boolean NOT NULL DEFAULT false" for c in CANALES[1:])};
+
+ALTER TABLE api_registro_datos
+    ALTER COLUMN periodo TYPE varchar(4) USING coalesce(periodo_texto, api_texto_corto(periodo, 1), ''),
+    ALTER COLUMN periodo SET NOT NULL,
+    ALTER COLUMN mes_a_trabajar TYPE varchar(2)
+        USING coalesce(mes_a_trabajar_texto, api_texto_corto(mes_a_trabajar, 2), ''),
+    ALTER COLUMN mes_a_trabajar SET NOT NULL,
+    ALTER COLUMN dias TYPE integer USING coalesce(dias_grande, dias),
+    ALTER COLUMN valor_asegurado TYPE numeric(18, 2) USING valor_asegurado / 100.0,
+    ALTER COLUMN valor_prima TYPE numeric(18, 2) USING valor_prima / 100.0,
+    {SEP.join(f"ALTER COLUMN {c} TYPE boolean USING (telefono & {1 << i}) <> 0"
+              for i, c in reversed(list(enumerate(CANALES))))};
+
+ALTER TABLE api_registro_datos {", ".join(f"ALTER COLUMN {c} DROP DEFAULT" for c in CANALES[1:])};
+ALTER TABLE api_registro_datos DROP COLUMN periodo_texto, DROP COLUMN mes_a_trabajar_texto, DROP COLUMN dias_grande;
+"""
+
+
+def informar_respaldos(apps, schema_editor):
+    """Avisa cuántas filas quedaron en las columnas de respaldo (valor íntegro, pero sin el tipo compacto)."""
+    with schema_editor.connection.cursor() as cur:
+        for original, respaldo in (("periodo", "periodo_texto"), ("mes_a_trabajar", "mes_a_trabajar_texto"),
+                                   ("dias", "dias_grande")):
+            cur.execute(f"SELECT count(*), (array_agg(DISTINCT {respaldo}::text))[1:10] FROM api_registro_datos "
+                        f"WHERE {respaldo} IS NOT NULL")
+            n, ejemplos = cur.fetchone()
+            if n:
+                logger.warning("%s filas con %s que no entra en smallint: queda tal cual en %s. Ejemplos: %s",
+                               n, original, respaldo, ejemplos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_dimensiones'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FUNCIONES, reverse_sql=QUITAR_FUNCIONES),
+        migrations.RunSQL(
+            COMPACTAR,
+            reverse_sql=DESCOMPACTAR,
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='registrodatos',
+                    name='email',
+                ),
+                migrations.RemoveField(
+                    model_name='registrodatos',
+                    name='fisica',
+                ),
+                migrations.RemoveField(
+                    model_name='registrodatos',
+                    name='telefono',
+                ),
+                migrations.RemoveField(
+                    model_name='registrodatos',
+                    name='texto',
+                ),
+                migrations.RemoveField(
+                    model_name='registrodatos',
+                    name='valor_asegurado',
+                ),
+                migrations.RemoveField(
+                    model_name='registrodatos',
+                    name='valor_prima',
+                ),
+                migrations.RemoveField(
+                    model_name='registrodatos',
+                    name='whatsapp',
+                ),
+                migrations.AddField(
+                    model_name='registrodatos',
+                    name='canales',
+                    field=models.SmallIntegerField(default=0),
+                ),
+                migrations.AddField(
+                    model_name='registrodatos',
+                    name='dias_grande',
+                    field=models.IntegerField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='registrodatos',
+                    name='mes_a_trabajar_texto',
+                    field=models.CharField(blank=True, max_length=2, null=True),
+                ),
+                migrations.AddField(
+                    model_name='registrodatos',
+                    name='periodo_texto',
+                    field=models.CharField(blank=True, max_length=4, null=True),
+                ),
+                migrations.AddField(
+                    model_name='registrodatos',
+                    name='valor_asegurado_centavos',
+                    field=models.BigIntegerField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='registrodatos',
+                    name='valor_prima_centavos',
+                    field=models.BigIntegerField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='registrodatos',
+                    name='dias',
+                    field=models.SmallIntegerField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='registrodatos',
+                    name='mes_a_trabajar',
+                    field=models.SmallIntegerField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='registrodatos',
+                    name='periodo',
+                    field=models.SmallIntegerField(blank=True, null=True),
+                ),
+            ],
+        ),
+        migrations.RunSQL(_vista_y_triggers(compacta=True), reverse_sql="DROP VIEW api_registro;"),
+        migrations.RunPython(informar_respaldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:33
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_esquema_compacto'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivoexportado',
+            name='api_archivo_nombre_d527c1_idx',
+        ),
+        migrations.AddIndex(
+            model_name='archivoexportado',
+            index=models.Index(django.db.models.functions.text.Upper('nombre'), models.F('fecha'), name='archivo_nombre_upper_fecha_idx'),
+        ),
+    ]
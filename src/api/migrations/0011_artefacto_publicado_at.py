@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_archivo_nombre_upper'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artefacto',
+            name='publicado_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        # Los artefactos existentes conservan su orden LRU (hasta ahora, por creación)
+        migrations.RunSQL(
+            "UPDATE api_artefacto SET publicado_at = created_at;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,6 +1,16 @@
 from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear, NullIf, Upper
+from django.db.models.lookups import StartsWith
+from django.utils import timezone
 
 class Registro(models.Model):
+    """
+    Vista ``api_registro``: las filas de RegistroDatos con las columnas de baja
+    cardinalidad ya resueltas desde sus dimensiones, con los nombres de siempre.
+    Es lo que leen los endpoints y el agente. Se puede escribir a través de ella
+    (triggers INSTEAD OF), pero la ingesta escribe directo en RegistroDatos.
+    """
     tipo_documento = models.CharField(max_length=10, blank=True, default="")
     documento = models.CharField(max_length=32, blank=True, default="")
     nombre = models.CharField(max_length=200, blank=True, default="")
@@ -61,3 +71,297 @@ class Registro(models.Model):
 
     # id (vacío por regla) => usamos el PK autoincremental de Django
     created_at = models.DateTimeField(auto_now_add=True)
+
+    # Derivadas: columnas generadas que Postgres calcula al insertar (STORED), para
+    # que las consultas filtren/ordenen con índice en vez de evaluar la expresión por fila.
+    telefono_principal = models.GeneratedField(
+        expression=Coalesce(
+            NullIf("telefono_1", Value("")), NullIf("telefono_2", Value("")), NullIf("telefono_3", Value("")),
+        ),
+        output_field=models.CharField(max_length=32, null=True),
+        db_persist=True,
+    )
+    anio_nacimiento = models.GeneratedField(
+        expression=ExtractYear("fecha_nacimiento"),
+        output_field=models.SmallIntegerField(null=True),
+        db_persist=True,
+    )
+    mes_nacimiento = models.GeneratedField(
+        expression=ExtractMonth("fecha_nacimiento"),
+        output_field=models.SmallIntegerField(null=True),
+        db_persist=True,
+    )
+    debito_rechazado = models.GeneratedField(
+        expression=Q(StartsWith(Upper("estado_debito"), "RECHAZ")) | ~Q(causal_rechazo=""),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        managed = False  # la crea (junto con sus triggers) la migración 0008
+        db_table = "api_registro"
+
+
+# --------------------------
+# Dimensiones: un id pequeño por cada valor distinto de las columnas de baja cardinalidad
+# --------------------------
+class Dimension(models.Model):
+    id = models.SmallAutoField(primary_key=True)
+    valor = models.CharField(max_length=200, unique=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self) -> str:
+        return self.valor
+
+
+class DimCiudad(Dimension):
+    pass
+
+
+class DimDepartamento(Dimension):
+    pass
+
+
+class DimNombreBanco(Dimension):
+    pass
+
+
+class DimEntidadBancaria(Dimension):
+    pass
+
+
+class DimProducto(Dimension):
+    pass
+
+
+class DimSucursal(Dimension):
+    pass
+
+
+class DimEstadoDebito(Dimension):
+    # La regla de "débito rechazado" vive aquí: el trigger de RegistroDatos solo la consulta
+    rechazado = models.GeneratedField(
+        expression=StartsWith(Upper("valor"), "RECHAZ"),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+
+
+class DimMejorCanal(Dimension):
+    pass
+
+
+class DimNombreDb(Dimension):
+    id = models.AutoField(primary_key=True)  # un valor por archivo cargado: puede pasar de 32k
+
+
+# columna de Registro -> dimensión que guarda sus valores
+DIMENSIONES = {
+    "ciudad": DimCiudad,
+    "departamento": DimDepartamento,
+    "nombre_banco": DimNombreBanco,
+    "entidad_bancaria": DimEntidadBancaria,
+    "producto": DimProducto,
+    "sucursal": DimSucursal,
+    "estado_debito": DimEstadoDebito,
+    "mejor_canal": DimMejorCanal,
+    "nombre_db": DimNombreDb,
+}
+
+
+def _dim(modelo, indexar: bool = False):
+    return models.ForeignKey(modelo, on_delete=models.PROTECT, related_name="+", db_index=indexar)
+
+
+class RegistroDatos(models.Model):
+    """
+    Tabla física de los registros. Las columnas de DIMENSIONES se guardan como
+    FK a su dimensión (``ciudad_id``...) en vez de repetir el texto en cada fila.
+
+    Tipos compactos (migración 0009): los montos van en centavos (bigint),
+    ``periodo``/``dias``/``mes_a_trabajar`` en smallint y los cinco canales en la
+    máscara ``canales``. Lo que no se puede reconstruir igual desde el smallint
+    queda en su columna de respaldo (``periodo_texto``...), así no se pierde nada.
+    La vista api_registro los sigue mostrando como numeric(18,2), varchar, integer
+    y booleanos; las conversiones en Python están en api.compacto.
+    """
+    tipo_documento = models.CharField(max_length=10, blank=True, default="")
+    documento = models.CharField(max_length=32, blank=True, default="")
+    nombre = models.CharField(max_length=200, blank=True, default="")
+    producto = _dim(DimProducto)
+    poliza = models.CharField(max_length=64, blank=True, default="")
+    periodo = models.SmallIntegerField(null=True, blank=True)
+
+    valor_asegurado_centavos = models.BigIntegerField(null=True, blank=True)
+    valor_prima_centavos = models.BigIntegerField(null=True, blank=True)
+
+    doc_cobro = models.CharField(max_length=64, blank=True, default="")
+    fecha_ini = models.DateField(null=True, blank=True)
+    fecha_fin = models.DateField(null=True, blank=True)
+    dias = models.SmallIntegerField(null=True, blank=True)
+
+    telefono_1 = models.CharField(max_length=32, blank=True, default="")
+    telefono_2 = models.CharField(max_length=32, blank=True, default="")
+    telefono_3 = models.CharField(max_length=32, blank=True, default="")
+
+    ciudad = _dim(DimCiudad)
+    departamento = _dim(DimDepartamento)
+
+    fecha_venta = models.DateField(null=True, blank=True)
+    fecha_nacimiento = models.DateField(null=True, blank=True)
+    tipo_trans = models.CharField(max_length=8, blank=True, default="")
+    beneficiarios = models.TextField(blank=True, default="")
+
+    genero = models.CharField(max_length=4, blank=True, default="")
+    sucursal = _dim(DimSucursal)
+
+    tipo_cuenta = models.CharField(max_length=32, blank=True, default="")
+    ultimos_digitos_cuenta = models.CharField(max_length=32, blank=True, default="")
+    entidad_bancaria = _dim(DimEntidadBancaria)
+    nombre_banco = _dim(DimNombreBanco)
+    estado_debito = _dim(DimEstadoDebito)
+    causal_rechazo = models.CharField(max_length=120, blank=True, default="")
+
+    codigo_canal = models.CharField(max_length=8, blank=True, default="")
+    descripcion_canal = models.CharField(max_length=200, blank=True, default="")
+    codigo_estrategia = models.CharField(max_length=64, blank=True, default="")
+    tipo_estrategia = models.CharField(max_length=64, blank=True, default="")
+    correo_electronico = models.EmailField(blank=True, default="")
+
+    fecha_entrega_colmena = models.DateField(null=True, blank=True)
+    mes_a_trabajar = models.SmallIntegerField(null=True, blank=True)
+    nombre_db = _dim(DimNombreDb, indexar=True)  # se filtra y se borra por archivo
+
+    canales = models.SmallIntegerField(default=0)  # bit i = compacto.CANALES[i]
+
+    mejor_canal = _dim(DimMejorCanal)
+    contactar_al = models.CharField(max_length=200, blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    telefono_principal = models.GeneratedField(
+        expression=Coalesce(
+            NullIf("telefono_1", Value("")), NullIf("telefono_2", Value("")), NullIf("telefono_3", Value("")),
+        ),
+        output_field=models.CharField(max_length=32, null=True),
+        db_persist=True,
+    )
+    anio_nacimiento = models.GeneratedField(
+        expression=ExtractYear("fecha_nacimiento"),
+        output_field=models.SmallIntegerField(null=True),
+        db_persist=True,
+    )
+    mes_nacimiento = models.GeneratedField(
+        expression=ExtractMonth("fecha_nacimiento"),
+        output_field=models.SmallIntegerField(null=True),
+        db_persist=True,
+    )
+    # estado_debito ya no es texto de la fila, así que no puede ser GeneratedField: lo calcula
+    # quien escribe con DimEstadoDebito.rechazado y causal_rechazo (el cargador de api.services;
+    # para INSERT/UPDATE sobre la vista api_registro, su trigger INSTEAD OF)
+    debito_rechazado = models.BooleanField(default=False, editable=False)
+
+    # Respaldo de los tipos compactos: NULL salvo en las filas cuyo valor no cabe (ver api.compacto)
+    periodo_texto = models.CharField(max_length=4, null=True, blank=True)
+    mes_a_trabajar_texto = models.CharField(max_length=2, null=True, blank=True)
+    dias_grande = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = "api_registro_datos"
+        indexes = [
+            models.Index(fields=["fecha_nacimiento"], name="registro_fecha_nac_idx"),
+            models.Index(fields=["anio_nacimiento", "mes_nacimiento"], name="registro_anio_mes_nac_idx"),
+            models.Index(fields=["telefono_principal"], name="registro_tel_principal_idx"),
+            # "débitos rechazados en los últimos N días": solo las filas rechazadas, por fecha de carga
+            models.Index(fields=["-created_at"], condition=Q(debito_rechazado=True), name="registro_rechazado_idx"),
+        ]
+
+
+class ArchivoExportado(models.Model):
+    """Catálogo de exports en EXPORT_DIR (se actualiza al escribirlos)."""
+    nombre_archivo = models.CharField(max_length=255, unique=True)  # p.ej. CLIENTES_20250529.csv
+    nombre = models.CharField(max_length=200, blank=True, default="")  # NOMBRE de NOMBRE_YYYYMMDD
+    fecha = models.DateField(null=True, blank=True)                    # YYYYMMDD del nombre
+    formato = models.CharField(max_length=16, blank=True, default="")  # csv / json
+    size = models.BigIntegerField(default=0)
+    encodings = models.JSONField(default=dict, blank=True)            # {"gzip": bytes, "zstd": bytes}
+    shards = models.PositiveIntegerField(default=0)                  # >0: nombre_archivo es un manifiesto
+    modified = models.DateTimeField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # ?nombre= no distingue mayúsculas: el listado filtra por UPPER(nombre) = UPPER(%s)
+            models.Index(Upper("nombre"), "fecha", name="archivo_nombre_upper_fecha_idx"),
+            models.Index(fields=["fecha"]),
+            models.Index(fields=["modified"]),
+        ]
+
+
+class Artefacto(models.Model):
+    """
+    Archivo físico en UPLOAD_DIR/EXPORT_DIR registrado en el almacén de artefactos.
+    Los archivos con el mismo sha256 comparten inodo (hardlink) y el conjunto
+    se mantiene dentro de ARTIFACT_STORE_BUDGET_BYTES expulsando por LRU.
+    """
+    TIPO_UPLOAD = "upload"
+    TIPO_EXPORT = "export"
+
+    tipo = models.CharField(max_length=8, choices=[(TIPO_UPLOAD, "upload"), (TIPO_EXPORT, "export")])
+    nombre_archivo = models.CharField(max_length=255)
+    grupo = models.CharField(max_length=255)  # export principal (X.csv agrupa X.csv.gz / X.csv.zst)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField(default=0)
+
+    hits = models.IntegerField(default=0)  # descargas
+    last_accessed_at = models.DateTimeField(null=True, blank=True)
+    # Última vez que se (re)escribió: un hardlink de dedup comparte el mtime del
+    # inodo viejo, así que el LRU no puede fiarse del archivo
+    publicado_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tipo", "nombre_archivo"], name="uniq_artefacto_tipo_nombre"),
+        ]
+        indexes = [
+            models.Index(fields=["tipo", "grupo"]),
+        ]
+
+
+class GeneracionDatos(models.Model):
+    """
+    Contador por tabla que cada ingesta incrementa. Las cachés de resultados lo
+    incluyen en la clave: un resultado solo se reutiliza si no hubo cargas desde entonces.
+    """
+    tabla = models.CharField(max_length=63, unique=True)
+    generacion = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class EjecucionSQL(models.Model):
+    """
+    Una ejecución en base de las herramientas SQL del agente (o de la ruta rápida): huella
+    del SQL (literales y números reemplazados), duración, filas y resumen del plan.
+    Alimenta el reporte de huellas más caras y el asesor de índices (api.observabilidad).
+    """
+    huella = models.CharField(max_length=16)
+    sql = models.TextField()                      # muestra: último SQL ejecutado con esa huella
+    herramienta = models.CharField(max_length=32, blank=True, default="")
+    duracion_ms = models.FloatField(default=0)
+    filas = models.IntegerField(default=0)
+    truncado = models.BooleanField(default=False)
+    costo = models.FloatField(null=True, blank=True)  # costo total estimado del plan
+    nodos = models.JSONField(default=list, blank=True)          # tipos de nodo del plan
+    seq_scans = models.JSONField(default=list, blank=True)      # tablas leídas con Seq Scan
+    columnas_seq = models.JSONField(default=list, blank=True)   # [{"columna", "uso"}] sobre api_registro
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["huella", "created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
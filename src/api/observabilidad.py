@@ -0,0 +1,323 @@
+# src/api/observabilidad.py
+from __future__ import annotations
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import atexit
+import hashlib
+import logging
+import re
+import threading
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connection
+from django.db.models import Avg, Count, Max, Sum
+from django.utils import timezone
+
+from .models import DIMENSIONES, EjecucionSQL, RegistroDatos
+
+logger = logging.getLogger("api.llm")
+
+# Tabla física detrás de la vista api_registro (la que escanean los planes)
+TABLA = RegistroDatos._meta.db_table
+# dimensión -> FK en TABLA: filtrar por ciudad = filtrar por ciudad_id
+DIM_FK = {m._meta.db_table: f"{col}_id" for col, m in DIMENSIONES.items()}
+_JOIN_RE = re.compile(r"\b(\w+)\.(\w+) = (\w+)\.(\w+)\b")
+
+# --------------------------
+# Huella del SQL
+# --------------------------
+_CADENA_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMERO_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def huella_sql(sql: str) -> Tuple[str, str]:
+    """
+    (huella, SQL normalizado): minúsculas, espacios colapsados y literales/números
+    reemplazados por ``?``, así "LIMIT 10" y "LIMIT 20" comparten huella.
+    """
+    s = _CADENA_RE.sub("?", sql.strip().rstrip(";"))
+    s = _NUMERO_RE.sub("?", " ".join(s.split()).lower())
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()[:16], s
+
+
+# --------------------------
+# Análisis del plan
+# --------------------------
+_TIPO = r"\)?(?:::[a-z ]+?)?"   # cierre de paréntesis y cast opcionales: (ciudad)::text
+
+
+def _columnas_registro() -> List[str]:
+    return [f.column for f in RegistroDatos._meta.concrete_fields if f.column != "id"]
+
+
+def _uso_en_filtro(col: str, filtro: str) -> Optional[Tuple[str, str]]:
+    """(uso, clave de índice) de ``col`` en un Filter de EXPLAIN, o None si no es indexable."""
+    m = re.search(rf"\b(lower|upper)\(\(?{col}{_TIPO}\)\s*=\s", filtro)
+    if m:
+        return "igualdad", f"{m.group(1)}({col})"
+    if re.search(rf"\b{col}{_TIPO}\s*!?~~\*?\s*'%", filtro):
+        return "patron", col
+    if re.search(rf"\b{col}{_TIPO}\s*=\s", filtro):
+        return "igualdad", col
+    if re.search(rf"\b{col}{_TIPO}\s*[<>]=?\s", filtro):
+        return "rango", col
+    return None
+
+
+def _tiene_seq_scan(nodo: Dict[str, Any]) -> bool:
+    if nodo["Node Type"] == "Seq Scan" and nodo.get("Relation Name") == TABLA:
+        return True
+    return any(_tiene_seq_scan(n) for n in nodo.get("Plans", []))
+
+
+def _dimension_filtrada(nodo: Dict[str, Any], alias: str) -> bool:
+    """¿Algún nodo del subárbol lee la dimensión ``alias`` filtrando por su valor?"""
+    if nodo.get("Relation Name") in DIM_FK and nodo.get("Alias") == alias and (
+        nodo.get("Filter") or nodo.get("Index Cond")
+    ):
+        return True
+    return any(_dimension_filtrada(n, alias) for n in nodo.get("Plans", []))
+
+
+def analizar_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Tipos de nodo, tablas con Seq Scan y, para los Seq Scan sobre la tabla de
+    registros, las columnas que filtran u ordenan (candidatas a índice). Un filtro
+    por una columna de dimensión (``ciudad = 'Cali'``) llega como un join de la
+    dimensión filtrada; cuenta como igualdad sobre su FK (``ciudad_id``).
+    """
+    columnas = _columnas_registro()
+    nodos: List[str] = []
+    seq_scans: List[str] = []
+    usos: List[Dict[str, str]] = []
+
+    def agregar(columna: str, uso: str, clave: str) -> None:
+        item = {"columna": columna, "uso": uso, "clave": clave}
+        if item not in usos:
+            usos.append(item)
+
+    pendientes = [plan]
+    while pendientes:
+        n = pendientes.pop()
+        tipo = n["Node Type"]
+        if tipo not in nodos:
+            nodos.append(tipo)
+        if tipo == "Seq Scan":
+            if n.get("Relation Name") not in seq_scans:
+                seq_scans.append(n.get("Relation Name"))
+            filtro = n.get("Filter") or ""
+            if n.get("Relation Name") == TABLA and filtro:
+                for col in columnas:
+                    if re.search(rf"\b{col}\b", filtro):
+                        uso = _uso_en_filtro(col, filtro)
+                        if uso:
+                            agregar(col, uso[0], uso[1])
+        elif tipo in ("Hash Join", "Merge Join", "Nested Loop") and _tiene_seq_scan(n):
+            cond = n.get("Hash Cond") or n.get("Merge Cond") or n.get("Join Filter") or ""
+            for a1, c1, a2, c2 in _JOIN_RE.findall(cond):
+                fk, alias = (c1, a2) if c2 == "id" else (c2, a1)  # el planner escribe ambos órdenes
+                if fk in DIM_FK.values() and _dimension_filtrada(n, alias):
+                    agregar(fk, "igualdad", fk)
+        elif tipo in ("Sort", "Incremental Sort") and _tiene_seq_scan(n):
+            for clave in n.get("Sort Key", []):
+                # Por la vista: "((((r.valor_prima_centavos)::numeric / 100.0))::numeric(18,2)) DESC"
+                col = next((c for c in re.findall(r"\w+", clave) if c in columnas), None)
+                if col:
+                    agregar(col, "orden", col + (" DESC" if clave.endswith(" DESC") else ""))
+        pendientes.extend(reversed(n.get("Plans", [])))
+    return {"costo": plan.get("Total Cost"), "nodos": nodos, "seq_scans": seq_scans, "columnas_seq": usos}
+
+
+# --------------------------
+# Registro de ejecuciones
+# --------------------------
+# Las ejecuciones se acumulan en memoria y se insertan juntas (bulk_create) al
+# terminar la petición, al juntar SQL_OBSERVABILITY_BATCH o antes de un reporte:
+# la herramienta SQL no espera un INSERT por llamada.
+_pendientes: List[EjecucionSQL] = []
+_pendientes_lock = threading.Lock()
+
+
+def habilitada() -> bool:
+    return bool(getattr(settings, "SQL_OBSERVABILITY", True))
+
+
+def vaciar(**_) -> int:
+    """Inserta las ejecuciones pendientes (también al terminar cada petición y al salir). Devuelve cuántas."""
+    with _pendientes_lock:
+        lote = _pendientes[:]
+        _pendientes.clear()
+    if not lote:
+        return 0
+    try:
+        EjecucionSQL.objects.bulk_create(lote)
+    except Exception:
+        logger.warning("No se pudieron registrar %d ejecuciones SQL", len(lote), exc_info=True)
+        return 0
+    return len(lote)
+
+
+request_finished.connect(vaciar, dispatch_uid="api_observabilidad_vaciar")
+atexit.register(vaciar)
+
+
+def purgar(dias: int) -> int:
+    """Borra las ejecuciones con más de ``dias`` días. Devuelve cuántas."""
+    borradas, _ = EjecucionSQL.objects.filter(created_at__lt=timezone.now() - timedelta(days=dias)).delete()
+    return borradas
+
+
+def registrar_ejecucion(
+    sql: str,
+    herramienta: str,
+    duracion_ms: float,
+    filas: int,
+    truncado: bool = False,
+    plan: Optional[Dict[str, Any]] = None,
+) -> Optional[EjecucionSQL]:
+    """
+    Encola una ejecución (ver vaciar); los fallos se registran en el log pero nunca
+    afectan a la consulta. Se guarda el SQL normalizado, sin literales ni números:
+    los valores que filtra el agente (nombres, documentos) no quedan en la tabla.
+    """
+    if not habilitada():
+        return None
+    huella, normalizado = huella_sql(sql)
+    analisis = analizar_plan(plan) if plan else {"costo": None, "nodos": [], "seq_scans": [], "columnas_seq": []}
+    logger.info(
+        "sql agente huella=%s herramienta=%s %.1f ms filas=%d nodos=%s",
+        huella, herramienta, duracion_ms, filas, ",".join(analisis["nodos"]) or "-",
+    )
+    ejecucion = EjecucionSQL(
+        huella=huella, sql=normalizado, herramienta=herramienta, duracion_ms=round(duracion_ms, 3),
+        filas=filas, truncado=truncado, **analisis,
+    )
+    with _pendientes_lock:
+        _pendientes.append(ejecucion)
+        lleno = len(_pendientes) >= int(getattr(settings, "SQL_OBSERVABILITY_BATCH", 50))
+    if lleno:
+        vaciar()  # fuera de una petición (comandos, lotes) no hay request_finished
+    return ejecucion
+
+
+# --------------------------
+# Reporte y asesor de índices
+# --------------------------
+def huellas_mas_caras(top: int = 10, horas: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Huellas ordenadas por tiempo total en base de datos."""
+    qs = EjecucionSQL.objects.all()
+    if horas:
+        qs = qs.filter(created_at__gte=timezone.now() - timedelta(hours=horas))
+    filas = (
+        qs.values("huella")
+        .annotate(
+            ejecuciones=Count("id"),
+            total_ms=Sum("duracion_ms"),
+            promedio_ms=Avg("duracion_ms"),
+            max_ms=Max("duracion_ms"),
+            filas_promedio=Avg("filas"),
+        )
+        .order_by("-total_ms")[:top]
+    )
+    out = []
+    for f in filas:
+        muestra = (
+            qs.filter(huella=f["huella"]).order_by("-id")
+            .values("sql", "herramienta", "costo", "nodos", "seq_scans", "columnas_seq").first()
+        )
+        out.append({
+            **f,
+            "total_ms": round(f["total_ms"], 1),
+            "promedio_ms": round(f["promedio_ms"], 1),
+            "max_ms": round(f["max_ms"], 1),
+            "filas_promedio": round(f["filas_promedio"], 1),
+            **muestra,
+        })
+    return out
+
+
+def _clave_normalizada(elemento: str) -> str:
+    e = re.sub(r"\s+(asc|desc)$", "", elemento.strip(), flags=re.I)
+    e = re.sub(r"::[a-z ]+", "", e.lower())
+    return re.sub(r"[()\s]", "", e)
+
+
+def indices_existentes(tabla: str = TABLA) -> List[Tuple[str, List[str]]]:
+    """(método, claves normalizadas) de los índices no parciales de la tabla."""
+    with connection.cursor() as cur:
+        cur.execute("SELECT indexdef FROM pg_indexes WHERE tablename = %s", [tabla])
+        defs = [r[0] for r in cur.fetchall()]
+    out = []
+    for d in defs:
+        m = re.search(r"USING (\w+) \((.*)\)$", d)
+        if not m:
+            continue  # índice parcial (WHERE ...): no cubre consultas en general
+        elementos, nivel, actual = [], 0, ""
+        for c in m.group(2):
+            if c == "," and nivel == 0:
+                elementos.append(actual)
+                actual = ""
+                continue
+            nivel += c == "("
+            nivel -= c == ")"
+            actual += c
+        elementos.append(actual)
+        out.append((m.group(1), [_clave_normalizada(e) for e in elementos]))
+    return out
+
+
+def _cubierto(metodo: str, claves: List[str], existentes: List[Tuple[str, List[str]]]) -> bool:
+    buscadas = [_clave_normalizada(c) for c in claves]
+    return any(m == metodo and e[:len(buscadas)] == buscadas for m, e in existentes)
+
+
+def _propuestas(columnas_seq: List[Dict[str, str]]) -> List[Tuple[str, List[str]]]:
+    """(método, claves) que permitirían evitar el Seq Scan: igualdades, luego un rango u orden."""
+    igualdad = [u["clave"] for u in columnas_seq if u["uso"] == "igualdad"]
+    rango = next((u["clave"] for u in columnas_seq if u["uso"] == "rango"), None)
+    orden = next((u["clave"] for u in columnas_seq if u["uso"] == "orden"), None)
+    out = []
+    claves = igualdad + [c for c in (rango or orden,) if c]
+    if claves:
+        out.append(("btree", claves))
+    else:
+        out.extend(("gin", [f"{u['clave']} gin_trgm_ops"]) for u in columnas_seq if u["uso"] == "patron")
+    return out
+
+
+def _ddl(metodo: str, claves: List[str]) -> str:
+    base = "_".join(re.sub(r"\W+", "_", c.replace(" gin_trgm_ops", "").replace(" DESC", "")).strip("_") for c in claves)
+    nombre = f"{TABLA}_{base}_idx"[:63]
+    using = "" if metodo == "btree" else f" USING {metodo}"
+    return f"CREATE INDEX CONCURRENTLY {nombre} ON {TABLA}{using} ({', '.join(claves)});"
+
+
+def recomendar_indices(huellas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Índices que eliminarían los Seq Scan sobre la tabla de registros de las huellas dadas,
+    sin repetir los que ya existen; ordenados por el tiempo total que afectan.
+    """
+    existentes = indices_existentes()
+    por_ddl: Dict[str, Dict[str, Any]] = {}
+    for h in huellas:
+        if TABLA not in (h.get("seq_scans") or []):
+            continue
+        for metodo, claves in _propuestas(h.get("columnas_seq") or []):
+            if _cubierto(metodo, claves, existentes):
+                continue
+            ddl = _ddl(metodo, claves)
+            rec = por_ddl.setdefault(ddl, {
+                "tabla": TABLA, "metodo": metodo, "columnas": claves, "sql": ddl,
+                "huellas": [], "total_ms": 0.0,
+                "requiere": "CREATE EXTENSION pg_trgm" if metodo == "gin" else None,
+            })
+            rec["huellas"].append(h["huella"])
+            rec["total_ms"] = round(rec["total_ms"] + (h.get("total_ms") or 0), 1)
+    return sorted(por_ddl.values(), key=lambda r: -r["total_ms"])
+
+
+def reporte(top: int = 10, horas: Optional[float] = None) -> Dict[str, Any]:
+    vaciar()
+    huellas = huellas_mas_caras(top=top, horas=horas)
+    return {"huellas": huellas, "recomendaciones": recomendar_indices(huellas)}
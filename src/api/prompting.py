@@ -0,0 +1,293 @@
+# src/api/prompting.py
+from __future__ import annotations
+from functools import cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import hashlib
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+
+from django.conf import settings
+
+from .models import Registro
+
+logger = logging.getLogger("api.llm")
+
+# El prompt del agente se arma por secciones: la base va siempre; las reglas y
+# la documentación de columnas solo si la instrucción las menciona (palabras
+# clave/sinónimos), sin pasar de LLM_PROMPT_TOKEN_BUDGET tokens.
+
+BASE = """Eres un agente de datos para una aseguradora.
+
+Herramientas:
+- procesar_archivo(path): procesa un TXT e inserta registros en DB.
+- consultar_sql_json(sql): ejecuta SELECT y devuelve JSON (usa esta por defecto).
+- consultar_sql_texto(sql): ejecuta SELECT y devuelve texto tabulado simple.
+
+Objetivo:
+- Si el usuario habla de 'procesar/cargar', usa procesar_archivo.
+- Si pregunta sobre datos, genera SELECT seguro y usa consultar_sql_json.
+- Responde SIEMPRE con JSON válido y útil.
+- Incluye: tool_used y, si es consulta: sql, rows (máx 50) y row_count.
+
+TABLA: usa SIEMPRE api_registro (usa EXACTAMENTE los nombres de columna listados).
+
+Reglas de consulta:
+- Solo SELECT/CTE.
+- Si piden listados, ORDER BY id DESC y LIMIT 50 (o el límite que pidan).
+- Devuelve SIEMPRE JSON con: tool_used, sql, rows (máx 50) y row_count.
+- Si el usuario habla de "procesar" archivos, usa la herramienta procesar_archivo.
+- Si una herramienta responde con "reintentar": true, la consulta fue rechazada por costo
+  (ver "plan": costo, filas estimadas, nodos, seq_scans). Reescríbela más barata
+  (filtros más selectivos, LIMIT, sin productos cartesianos ni funciones sobre todas las filas) y vuelve a intentarlo.
+"""
+
+
+class Seccion(NamedTuple):
+    nombre: str
+    claves: Tuple[str, ...]   # subcadenas (sin tildes, minúsculas) que la activan
+    texto: str
+
+
+REGLAS: List[Seccion] = [
+    Seccion("edad", ("edad", "menor", "mayor", "anos", "nacimiento", "nacid", "cumple"), """Reglas de edad (fecha_nacimiento, anio_nacimiento y mes_nacimiento tienen índice):
+- Filtra por rango de fecha_nacimiento, nunca por la edad calculada:
+  Mayores de 18: WHERE fecha_nacimiento <= CURRENT_DATE - INTERVAL '18 years'
+  Menores de 18: WHERE fecha_nacimiento >  CURRENT_DATE - INTERVAL '18 years'
+  Entre 30 y 39: WHERE fecha_nacimiento >  CURRENT_DATE - INTERVAL '40 years' AND fecha_nacimiento <= CURRENT_DATE - INTERVAL '30 years'
+- Nacidos en un año o mes: anio_nacimiento = 1990 / mes_nacimiento = 3 (cumpleaños del mes: mes_nacimiento = EXTRACT(MONTH FROM CURRENT_DATE))
+- Por década o rango de años: anio_nacimiento BETWEEN 1980 AND 1989
+- Evita expresiones como (CURRENT_DATE - fecha_nacimiento) >= INTERVAL '18 years'
+- Edad en años solo para mostrarla: EXTRACT(YEAR FROM AGE(CURRENT_DATE, fecha_nacimiento)) AS edad
+"""),
+    Seccion("rechazados", ("rechaz", "debito"), """Débitos:
+- Si piden “débitos rechazados”: filtra con WHERE debito_rechazado (columna indexada; equivale a
+  estado_debito que empieza por 'rechaz' o causal_rechazo no vacía)
+"""),
+    Seccion("dias", ("ultim", "dias", "semana", "mes", "reciente", "hoy", "ayer"), """Fechas:
+- Para “últimos N días” usa created_at >= CURRENT_DATE - INTERVAL '<N> days'
+"""),
+    Seccion("telefono", ("telefon", "celular", "contacto"), """Teléfonos:
+- Si piden "teléfono principal" (o solo "teléfono"): usa la columna telefono_principal (el primer teléfono no vacío; indexada)
+"""),
+    Seccion("canal", ("whatsapp", "canal"), """Canales:
+- Para WhatsApp usa LOWER(mejor_canal) = 'whatsapp'
+"""),
+    Seccion("texto", ("llam", "contenga", "contiene", "empiece", "empieza", "termine", "termina",
+                      "exact", "igual", "busca", "nombre", "correo", "poliza", "producto"),
+            """Convenciones de búsqueda de texto (muy importantes):
+- Si el usuario pide “se llama X”, “clientes llamados X”, “que contenga X”, o habla en lenguaje natural sin precisión,
+  usa coincidencia parcial:  ILIKE '%X%'  (no igualdad exacta).
+- Usa coincidencia insensible a mayúsculas y considera tildes si hay extensión unaccent:
+  preferir:  unaccent(col) ILIKE unaccent('%X%')  cuando sea posible.
+- Si el usuario pide explícitamente “exactamente X” o “igual a X”, entonces sí:  = 'X'  (o ILIKE 'X' sin %).
+- Si pide “empiece por X” => ILIKE 'X%'; “termine en X” => ILIKE '%X'.
+- Al comparar nombres, usa TRIM/btrim para evitar espacios: btrim(nombre).
+- Para productos/pólizas/correos, usa igualdad exacta (sin ILIKE/LIKE) salvo que el usuario pida otra cosa.
+"""),
+]
+
+# Documentación y sinónimos de las columnas más consultadas; el resto se documenta
+# con su nombre y tipo, y se activa cuando la instrucción lo nombra.
+DOC_COLUMNAS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "nombre": ("nombre", ("nombre", "llama", "cliente")),
+    "poliza": ("poliza", ("poliza",)),
+    "producto": ("producto", ("producto",)),
+    "valor_prima": ('valor_prima           (sinónimos del usuario: "prima", "valor de la prima")', ("prima",)),
+    "correo_electronico": ('correo_electronico    (sinónimos: "correo", "email")', ("correo", "email", "mail")),
+    "created_at": ('created_at            (sinónimos: "fecha_creacion", "fecha de creación")',
+                   ("creacion", "creado", "cargad", "ultim", "dias")),
+    "telefono_1": ("telefono_1, telefono_2, telefono_3", ("telefon", "celular", "contacto")),
+    "telefono_principal": ("telefono_principal    (derivada: primer teléfono no vacío)", ("telefon", "celular", "contacto")),
+    "mejor_canal": ('mejor_canal           (sinónimos: "canal preferido")', ("canal", "whatsapp")),
+    "estado_debito": ("estado_debito", ("debito", "rechaz")),
+    "debito_rechazado": ("debito_rechazado      (derivada, booleana: débito rechazado)", ("debito", "rechaz")),
+    "causal_rechazo": ("causal_rechazo", ("causal", "rechaz")),
+    "fecha_nacimiento": ("fecha_nacimiento      (edad: EXTRACT(YEAR FROM AGE(CURRENT_DATE, fecha_nacimiento)))",
+                         ("edad", "nacimiento", "menor", "mayor", "anos", "cumple")),
+    "anio_nacimiento": ("anio_nacimiento, mes_nacimiento  (derivadas de fecha_nacimiento)",
+                        ("edad", "nacimiento", "nacid", "menor", "mayor", "anos", "cumple", "decada")),
+    "fecha_venta": ("fecha_venta", ("venta", "vendid")),
+    "dias": ("dias                  (días de vigencia de la póliza, no de antigüedad del registro)", ("vigencia",)),
+    "nombre_banco": ("nombre_banco, entidad_bancaria", ("banco", "bancari")),
+    "telefono": ("telefono, whatsapp, texto, email, fisica  (booleanos: canales autorizados)",
+                 ("autoriz", "whatsapp", "canal")),
+}
+# Las que se documentan cuando la instrucción no menciona ninguna columna
+COLUMNAS_DEFECTO = ("nombre", "poliza", "producto", "valor_prima", "created_at")
+# Documentadas junto con otra columna (telefono_1, nombre_banco, telefono, anio_nacimiento)
+_AGRUPADAS = {"telefono_2", "telefono_3", "entidad_bancaria", "whatsapp", "texto", "email", "fisica", "mes_nacimiento"}
+
+_TIPOS = {"DateField": "fecha", "DateTimeField": "fecha/hora", "DecimalField": "numérico",
+          "IntegerField": "entero", "SmallIntegerField": "entero", "BigAutoField": "entero", "BooleanField": "booleano"}
+
+
+def _sin_tildes(texto: str) -> str:
+    s = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in s if not unicodedata.combining(c)).lower()
+
+
+def _columnas() -> List[Tuple[str, str, Tuple[str, ...]]]:
+    """(columna, línea de documentación, claves) para cada campo de Registro."""
+    out = []
+    for f in Registro._meta.concrete_fields:
+        if f.column in _AGRUPADAS or f.column == "id":
+            continue
+        if f.column in DOC_COLUMNAS:
+            doc, claves = DOC_COLUMNAS[f.column]
+        else:
+            tipo = _TIPOS.get(f.get_internal_type())
+            doc = f"{f.column}  ({tipo})" if tipo else f.column
+            claves = (f.column, f.column.replace("_", " "))
+        out.append((f.column, f"- {doc}", claves))
+    return out
+
+
+# --------------------------
+# Tokens
+# --------------------------
+_PIEZA_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _contar_aprox(texto: str) -> int:
+    """Tokenizador offline: palabras en trozos de ~4 caracteres y cada signo como un token."""
+    return sum(max(1, math.ceil(len(p) / 4)) for p in _PIEZA_RE.findall(texto))
+
+
+# Tabla BPE de o200k_base; tiktoken la guarda en su caché con el sha1 de esta URL como nombre
+_O200K_URL = "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken"
+
+
+def _bpe_en_cache() -> bool:
+    """¿Está la tabla BPE en la caché de tiktoken? (misma búsqueda que tiktoken.load.read_file_cached)"""
+    carpeta = os.environ.get("TIKTOKEN_CACHE_DIR", os.environ.get("DATA_GYM_CACHE_DIR"))
+    if carpeta is None:
+        carpeta = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    return bool(carpeta) and os.path.exists(os.path.join(carpeta, hashlib.sha1(_O200K_URL.encode()).hexdigest()))
+
+
+@cache
+def _tiktoken():
+    """
+    Encoder de tiktoken, resuelto una sola vez por proceso. tiktoken es opcional y,
+    sin la tabla BPE en caché, get_encoding() la descargaría: en ese caso (o sin
+    tiktoken) devuelve None y se usa la aproximación, sin intentar ir a la red.
+    """
+    if not _bpe_en_cache():
+        logger.info("Tabla BPE de tiktoken no está en caché: se cuentan tokens aproximados")
+        return None
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def contar_tokens(texto: str) -> int:
+    if getattr(settings, "LLM_TOKENIZER", "aprox") == "tiktoken":
+        enc = _tiktoken()
+        if enc is not None:
+            return len(enc.encode(texto))
+    return _contar_aprox(texto)
+
+
+# --------------------------
+# Ensamblado
+# --------------------------
+class PromptArmado(NamedTuple):
+    texto: str
+    tokens: int
+    presupuesto: int
+    reglas: List[str]
+    columnas: List[str]
+    omitidas: List[str]
+
+
+_metricas: Dict[str, int] = {"prompts": 0, "tokens": 0}
+_metricas_lock = threading.Lock()
+
+
+def prompt_completo() -> str:
+    """Todas las secciones y columnas (sin poda): el prompt por defecto del agente."""
+    columnas = "\n".join(doc for _, doc, _ in _columnas())
+    reglas = "\n".join(r.texto for r in REGLAS)
+    return f"{BASE}\nDiccionario de columnas de api_registro:\n{columnas}\n\n{reglas}"
+
+
+def construir_prompt(instruccion: str, presupuesto: Optional[int] = None) -> PromptArmado:
+    """
+    Prompt con la base + las reglas y columnas relevantes para ``instruccion``,
+    añadidas por prioridad mientras quepan en ``presupuesto`` tokens.
+    """
+    if presupuesto is None:
+        presupuesto = int(getattr(settings, "LLM_PROMPT_TOKEN_BUDGET", 1200))
+    texto = _sin_tildes(instruccion)
+
+    reglas = [r for r in REGLAS if any(k in texto for k in r.claves)]
+    columnas = [(c, doc) for c, doc, claves in _columnas() if any(k in texto for k in claves)]
+    if not columnas:
+        columnas = [(c, doc) for c, doc, _ in _columnas() if c in COLUMNAS_DEFECTO]
+
+    partes = [BASE]
+    usados = contar_tokens(BASE)
+    elegidas_r: List[str] = []
+    elegidas_c: List[str] = []
+    omitidas: List[str] = []
+
+    encabezado = "\nDiccionario de columnas de api_registro:"
+    usados += contar_tokens(encabezado)
+    docs: List[str] = []
+    for c, doc in columnas:
+        t = contar_tokens(doc)
+        if usados + t <= presupuesto:
+            docs.append(doc)
+            elegidas_c.append(c)
+            usados += t
+        else:
+            omitidas.append(f"columna:{c}")
+    for r in reglas:
+        t = contar_tokens(r.texto)
+        if usados + t <= presupuesto:
+            elegidas_r.append(r.nombre)
+            usados += t
+        else:
+            omitidas.append(f"regla:{r.nombre}")
+
+    # El resto de columnas solo por nombre, si sobra presupuesto
+    resto = [c for c, _, _ in _columnas() if c not in elegidas_c]
+    otras = "- Otras columnas: " + ", ".join(resto)
+    if resto and usados + contar_tokens(otras) <= presupuesto:
+        docs.append(otras)
+        usados += contar_tokens(otras)
+    elif resto:
+        omitidas.append("otras_columnas")
+
+    partes.append(encabezado + "\n" + "\n".join(docs) + "\n")
+    partes.extend(r.texto for r in REGLAS if r.nombre in elegidas_r)
+    final = "\n".join(partes)
+    armado = PromptArmado(final, contar_tokens(final), presupuesto, elegidas_r, elegidas_c, omitidas)
+
+    with _metricas_lock:
+        _metricas["prompts"] += 1
+        _metricas["tokens"] += armado.tokens
+    logger.info(
+        "prompt consulta-llm: %d tokens (presupuesto %d) reglas=%s columnas=%s omitidas=%s",
+        armado.tokens, presupuesto, ",".join(elegidas_r) or "-", ",".join(elegidas_c) or "-",
+        ",".join(omitidas) or "-",
+    )
+    return armado
+
+
+def estadisticas_prompt() -> Dict[str, Any]:
+    n = _metricas["prompts"]
+    return {
+        "prompts": n,
+        "tokens_promedio": round(_metricas["tokens"] / n, 1) if n else None,
+        "tokens_prompt_completo": contar_tokens(prompt_completo()),
+        "presupuesto": int(getattr(settings, "LLM_PROMPT_TOKEN_BUDGET", 1200)),
+        "tokenizador": getattr(settings, "LLM_TOKENIZER", "aprox"),
+    }
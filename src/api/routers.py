@@ -0,0 +1,54 @@
+# src/api/routers.py
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Dentro de solo_lectura() las lecturas del ORM van al alias de lectura; fuera, a "default".
+_en_lectura: ContextVar[bool] = ContextVar("api_solo_lectura", default=False)
+
+
+def alias_lectura() -> str:
+    """
+    Alias para consultas de solo lectura. Es "default" si el ruteo está
+    deshabilitado o si "default" tiene una transacción abierta: dentro de ella se
+    leen sus propias escrituras, que el alias de lectura aún no ve.
+    """
+    alias = getattr(settings, "DATABASE_READ_ALIAS", None)
+    if not getattr(settings, "DATABASE_READ_ROUTING", True) or alias not in settings.DATABASES:
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+@contextmanager
+def solo_lectura() -> Iterator[str]:
+    """Envía las lecturas del ORM al alias de lectura mientras dure el bloque; devuelve el alias."""
+    token = _en_lectura.set(True)
+    try:
+        yield alias_lectura()
+    finally:
+        _en_lectura.reset(token)
+
+
+class RouterLecturas:
+    """
+    Lecturas dentro de solo_lectura() -> alias de lectura (réplica o conexiones
+    de solo lectura del mismo servidor). Escrituras y migraciones -> siempre "default".
+    """
+
+    def db_for_read(self, model, **hints):
+        return alias_lectura() if _en_lectura.get() else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
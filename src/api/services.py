@@ -3,18 +3,27 @@ from __future__ import annotations
 from datetime import date
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+import io
 import re
 import csv
 import json
+import zlib
 
 from django.conf import settings
-from django.db import transaction
+from django.db import connections, transaction
 
 from app.parser import FixedWidthParser
 from app.transformers import BusinessTransformer
 from app.constants import COLUMNS_DB
-from .models import Registro
+from app.writer import Fila, escribir_csv, escribir_json, fila, filas_posicionales
+from .models import Registro, RegistroDatos, Artefacto
+from .artifacts import aplicar_presupuesto, en_uso
+from .caching import incrementar_generacion
+from .compacto import CANALES, a_centavos, dias_corto, entero_corto, mascara
+from .dimensiones import cache as dimensiones
+from .exports import SalidaExport, manifiesto_path, registrar_export
+from . import shards
 
 BATCH_SIZE = 1000
 
@@ -62,22 +71,45 @@ def _to_decimal(s: str) -> Optional[Decimal]:
         return None
 
 
-def _write_outputs(records: List[dict], base_name: str) -> dict:
+def _write_outputs(records: List[Fila], base_name: str, compacto: Optional[bool] = None) -> dict:
+    """
+    Escribe el JSON y el CSV del archivo procesado. ``records`` son filas
+    posicionales en orden de COLUMNS_DB (también acepta dicts; en el JSON
+    conservan sus claves). El JSON sale con indent=2 salvo ``compacto``
+    (default: EXPORT_JSON_COMPACT). Con EXPORT_SHARD_MAX_ROWS/BYTES cada export
+    que no entra en un archivo se parte en shards con su manifiesto (ver api.shards).
+    """
     out_dir = Path(settings.EXPORT_DIR)
     out_dir.mkdir(parents=True, exist_ok=True)
+    if compacto is None:
+        compacto = bool(getattr(settings, "EXPORT_JSON_COMPACT", False))
 
     json_path = out_dir / f"{base_name}.json"
     csv_path = out_dir / f"{base_name}.csv"
+    # Partido o no, el grupo es el export o su manifiesto: ninguno se expulsa mientras se escribe
+    grupos = [(Artefacto.TIPO_EXPORT, p.name) for p in (json_path, csv_path, manifiesto_path(json_path),
+                                                         manifiesto_path(csv_path))]
+    with en_uso(*grupos):
+        if shards.activo():
+            res = shards.escribir_exports(records, {"json": json_path, "csv": csv_path}, compacto=compacto)
+            json_path, csv_path = res["json"]["path"], res["csv"]["path"]  # el manifiesto si se partió
+            sizes = {fmt: r["sizes"] for fmt, r in res.items()}
+            n_shards = {fmt: r["shards"] for fmt, r in res.items()}
+        else:
+            # Cada export sale con sus variantes .gz/.zst en la misma pasada
+            json_out = SalidaExport(json_path)
+            with json_out as jf:
+                escribir_json(records, jf, compacto=compacto)
 
-    with json_path.open("w", encoding="utf-8") as jf:
-        json.dump(records, jf, ensure_ascii=False, indent=2)
-
-    with csv_path.open("w", newline="", encoding="utf-8") as cf:
-        writer = csv.DictWriter(cf, fieldnames=COLUMNS_DB)
-        writer.writeheader()
-        for r in records:
-            writer.writerow({k: r.get(k, "") for k in COLUMNS_DB})
+            csv_out = SalidaExport(csv_path)
+            with csv_out as cf:
+                escribir_csv(filas_posicionales(records), cf)
 
+            registrar_export(json_path)
+            registrar_export(csv_path)
+            sizes = {"json": json_out.tamanos(), "csv": csv_out.tamanos()}
+            n_shards = {"json": 0, "csv": 0}
+        aplicar_presupuesto()
 
     rel = Path(settings.MEDIA_ROOT).resolve()
     json_rel = Path(json_path).resolve().relative_to(rel) if json_path.is_file() else None
@@ -88,6 +120,8 @@ def _write_outputs(records: List[dict], base_name: str) -> dict:
         "csv_path": str(csv_path),
         "json_url": f"{settings.MEDIA_URL}{json_rel}".replace("\\", "/") if json_rel else None,
         "csv_url": f"{settings.MEDIA_URL}{csv_rel}".replace("\\", "/")   if csv_rel  else None,
+        "sizes": sizes,
+        "shards": n_shards,
     }
 
 
@@ -99,81 +133,218 @@ def procesar_archivo_y_guardar(
     """
     Procesa el TXT, genera JSON/CSV y guarda en DB.
     Retorna el total de filas insertadas.
+
+    Escribe directo en RegistroDatos: las columnas de baja cardinalidad se
+    traducen a sus ids de dimensión con la caché en memoria y los montos,
+    periodo, dias, mes y canales a sus tipos compactos (api.compacto).
     """
     p = Path(path_txt)
     parser = FixedWidthParser(p, yyyymmdd=yyyymmdd_override)
     transformer = BusinessTransformer(parser.yyyymmdd, original_name or p.name)
+    dimensiones.sincronizar()
+    dim = dimensiones.id
 
-    records: List[dict] = []
-    buffer: List[Registro] = []
+    records: List[Fila] = []
+    buffer: List[RegistroDatos] = []
     total = 0
 
-    for cols in parser.iter_rows():
-        rec = transformer.build_record(cols).to_dict()
-        records.append(rec)
-
-        obj = Registro(
-            tipo_documento=rec.get("tipo_documento", ""),
-            documento=rec.get("documento", ""),
-            nombre=rec.get("nombre", ""),
-            producto=rec.get("producto", ""),
-            poliza=rec.get("poliza", ""),
-            periodo=rec.get("periodo", ""),
-            valor_asegurado=_to_decimal(rec.get("valor_asegurado", "")),
-            valor_prima=_to_decimal(rec.get("valor_prima", "")),
-            doc_cobro=rec.get("doc_cobro", ""),
-            fecha_ini=_to_date(rec.get("fecha_ini", "")),
-            fecha_fin=None,
-            dias=(int(rec.get("dias")) if (rec.get("dias") or "").strip().isdigit() else None),
-            telefono_1=rec.get("telefono_1", ""),
-            telefono_2=rec.get("telefono_2", ""),
-            telefono_3=rec.get("telefono_3", ""),
-            ciudad=rec.get("ciudad", ""),
-            departamento=rec.get("departamento", ""),
-            fecha_venta=_to_date(rec.get("fecha_venta", "")),
-            fecha_nacimiento=_to_date(rec.get("fecha_nacimiento", "")),
-            tipo_trans=rec.get("tipo_trans", ""),
-            beneficiarios=rec.get("beneficiarios", ""),
-            genero=rec.get("genero", ""),
-            sucursal=rec.get("sucursal", ""),
-            tipo_cuenta="",
-            ultimos_digitos_cuenta=rec.get("ultimos_digitos_cuenta", ""),
-            entidad_bancaria=rec.get("entidad_bancaria", ""),
-            nombre_banco=rec.get("nombre_banco", ""),
-            estado_debito=rec.get("estado_debito", ""),
-            causal_rechazo=rec.get("causal_rechazo", ""),
-            codigo_canal=rec.get("codigo_canal", ""),
-            descripcion_canal=rec.get("descripcion_canal", ""),
-            codigo_estrategia=rec.get("codigo_estrategia", ""),
-            tipo_estrategia=rec.get("tipo_estrategia", ""),
-            correo_electronico=rec.get("correo_electronico", ""),
-            fecha_entrega_colmena=_to_date(rec.get("fecha_entrega_colmena", "")),
-            mes_a_trabajar=rec.get("mes_a_trabajar", ""),
-            nombre_db=rec.get("nombre_db", ""),
-            telefono=(rec.get("telefono", "") == "1"),
-            whatsapp=(rec.get("whatsapp", "") == "1"),
-            texto=(rec.get("texto", "") == "1"),
-            email=(rec.get("email", "") == "1"),
-            fisica=(rec.get("fisica", "") == "1"),
-            mejor_canal=rec.get("mejor_canal", ""),
-            contactar_al=rec.get("contactar_al", ""),
-        )
-
-        buffer.append(obj)
-
-        if len(buffer) >= BATCH_SIZE:
+    try:
+        for cols in parser.iter_rows():
+            rec = transformer.build_record(cols)
+            records.append(fila(rec))
+            estado_id = dim("estado_debito", rec.estado_debito)
+            periodo, periodo_texto = entero_corto(rec.periodo, 1)
+            mes, mes_texto = entero_corto(rec.mes_a_trabajar, 2)
+            dias, dias_grande = dias_corto(int(rec.dias) if (rec.dias or "").strip().isdigit() else None)
+
+            obj = RegistroDatos(
+                tipo_documento=rec.tipo_documento,
+                documento=rec.documento,
+                nombre=rec.nombre,
+                producto_id=dim("producto", rec.producto),
+                poliza=rec.poliza,
+                periodo=periodo,
+                periodo_texto=periodo_texto,
+                valor_asegurado_centavos=a_centavos(_to_decimal(rec.valor_asegurado)),
+                valor_prima_centavos=a_centavos(_to_decimal(rec.valor_prima)),
+                doc_cobro=rec.doc_cobro,
+                fecha_ini=_to_date(rec.fecha_ini),
+                fecha_fin=None,
+                dias=dias,
+                dias_grande=dias_grande,
+                telefono_1=rec.telefono_1,
+                telefono_2=rec.telefono_2,
+                telefono_3=rec.telefono_3,
+                ciudad_id=dim("ciudad", rec.ciudad),
+                departamento_id=dim("departamento", rec.departamento),
+                fecha_venta=_to_date(rec.fecha_venta),
+                fecha_nacimiento=_to_date(rec.fecha_nacimiento),
+                tipo_trans=rec.tipo_trans,
+                beneficiarios=rec.beneficiarios,
+                genero=rec.genero,
+                sucursal_id=dim("sucursal", rec.sucursal),
+                tipo_cuenta="",
+                ultimos_digitos_cuenta=rec.ultimos_digitos_cuenta,
+                entidad_bancaria_id=dim("entidad_bancaria", rec.entidad_bancaria),
+                nombre_banco_id=dim("nombre_banco", rec.nombre_banco),
+                estado_debito_id=estado_id,
+                causal_rechazo=rec.causal_rechazo,
+                debito_rechazado=dimensiones.rechazado(estado_id) or rec.causal_rechazo != "",
+                codigo_canal=rec.codigo_canal,
+                descripcion_canal=rec.descripcion_canal,
+                codigo_estrategia=rec.codigo_estrategia,
+                tipo_estrategia=rec.tipo_estrategia,
+                correo_electronico=rec.correo_electronico,
+                fecha_entrega_colmena=_to_date(rec.fecha_entrega_colmena),
+                mes_a_trabajar=mes,
+                mes_a_trabajar_texto=mes_texto,
+                nombre_db_id=dim("nombre_db", rec.nombre_db),
+                canales=mascara(**{c: getattr(rec, c) == "1" for c in CANALES}),
+                mejor_canal_id=dim("mejor_canal", rec.mejor_canal),
+                contactar_al=rec.contactar_al,
+            )
+
+            buffer.append(obj)
+
+            if len(buffer) >= BATCH_SIZE:
+                with transaction.atomic():
+                    RegistroDatos.objects.bulk_create(buffer, batch_size=BATCH_SIZE)
+                total += len(buffer)
+                buffer.clear()
+
+        if buffer:
             with transaction.atomic():
-                Registro.objects.bulk_create(buffer, batch_size=BATCH_SIZE)
+                RegistroDatos.objects.bulk_create(buffer, batch_size=BATCH_SIZE)
             total += len(buffer)
-            buffer.clear()
-
-    if buffer:
-        with transaction.atomic():
-            Registro.objects.bulk_create(buffer, batch_size=BATCH_SIZE)
-        total += len(buffer)
+    finally:
+        # Una sola vez por archivo, con todos los lotes ya confirmados: sin contención por la fila
+        # de GeneracionDatos entre ingestas ni caché invalidada a mitad de la carga. Si la ingesta
+        # falla a medias, lo que alcanzó a confirmarse también invalida.
+        if total:
+            incrementar_generacion(Registro._meta.db_table)
 
     base_name = Path(original_name or p.name).stem
     outs = _write_outputs(records, base_name)
     procesar_archivo_y_guardar._last_outputs = outs  # type: ignore[attr-defined]
 
     return total
+
+
+# --------------------------
+# Export en streaming desde la DB
+# --------------------------
+EXPORT_STREAM_CHUNK = 2000        # filas por fetch del cursor de servidor
+EXPORT_STREAM_FLUSH = 64 * 1024   # bytes acumulados antes de emitir un trozo
+
+# Filtros admitidos en el export: parámetro -> lookup del ORM
+EXPORT_FILTROS: Dict[str, str] = {
+    "nombre_db": "nombre_db",
+    "producto": "producto",
+    "ciudad": "ciudad",
+    "departamento": "departamento",
+    "mejor_canal": "mejor_canal",
+    "estado_debito": "estado_debito",
+    "fecha_entrega_desde": "fecha_entrega_colmena__gte",
+    "fecha_entrega_hasta": "fecha_entrega_colmena__lte",
+    "creado_desde": "created_at__date__gte",
+    "creado_hasta": "created_at__date__lte",
+}
+
+EXPORT_FORMATOS = ("csv", "ndjson")
+
+
+def _valor_export(v: Any) -> str:
+    """Serializa un valor de la DB igual que los exports de la ingesta."""
+    if v is None:
+        return ""
+    if v is True:
+        return "1"
+    if v is False:
+        return ""
+    if isinstance(v, date):
+        return v.isoformat()
+    return str(v)
+
+
+def filtrar_registros(filtros: Dict[str, str]):
+    """
+    Construye el queryset del export a partir de los filtros admitidos.
+    Levanta ValueError si llega un filtro desconocido o una fecha inválida.
+    """
+    desconocidos = set(filtros) - set(EXPORT_FILTROS)
+    if desconocidos:
+        raise ValueError(f"Filtros no soportados: {', '.join(sorted(desconocidos))}")
+
+    lookups: Dict[str, Any] = {}
+    for param, valor in filtros.items():
+        lookup = EXPORT_FILTROS[param]
+        if lookup.endswith(("__gte", "__lte")):
+            d = _to_date(valor)
+            if d is None:
+                raise ValueError(f"'{param}' debe ser YYYY-MM-DD.")
+            lookups[lookup] = d
+        else:
+            lookups[lookup] = valor
+    return Registro.objects.filter(**lookups).order_by("id")
+
+
+def iter_export_registros(qs, formato: str = "csv", comprimir: bool = False) -> Iterator[bytes]:
+    """
+    Genera el export (CSV o NDJSON) en trozos de bytes, en el orden de COLUMNS_DB.
+
+    Usa un cursor con nombre del lado del servidor (``QuerySet.iterator``) dentro
+    de una transacción, para que Postgres no materialice el resultado (WITH HOLD)
+    y la memoria del worker se mantenga constante. Si ``comprimir`` es True,
+    la salida se comprime con gzip al vuelo.
+
+    La transacción (y su snapshot) vive mientras el cliente consume: entre
+    ``yield`` y ``yield`` la sesión queda "idle in transaction". Por eso fija
+    ``idle_in_transaction_session_timeout`` a EXPORT_STREAM_IDLE_TIMEOUT_MS solo
+    para esta transacción (un cliente detenido hace que Postgres corte la sesión)
+    y cierra cursor y transacción en cuanto el generador se cierra o falla:
+    StreamingHttpResponse llama a ``close()`` al terminar la respuesta o si el
+    cliente se desconecta.
+    """
+    if formato not in EXPORT_FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None
+    buf = io.StringIO()
+    writer = csv.writer(buf) if formato == "csv" else None
+
+    def _emitir() -> bytes:
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate(0)
+        return gz.compress(data) if gz else data
+
+    if writer:
+        writer.writerow(COLUMNS_DB)
+
+    idle_ms = int(getattr(settings, "EXPORT_STREAM_IDLE_TIMEOUT_MS", 15000))
+    with transaction.atomic(using=qs.db):
+        if idle_ms:
+            with connections[qs.db].cursor() as cur:
+                cur.execute("SELECT set_config('idle_in_transaction_session_timeout', %s, true)", [str(idle_ms)])
+        filas = qs.values_list(*COLUMNS_DB).iterator(chunk_size=EXPORT_STREAM_CHUNK)
+        try:
+            for row in filas:
+                vals = [_valor_export(v) for v in row]
+                if writer:
+                    writer.writerow(vals)
+                else:
+                    buf.write(json.dumps(dict(zip(COLUMNS_DB, vals)), ensure_ascii=False))
+                    buf.write("\n")
+                if buf.tell() >= EXPORT_STREAM_FLUSH:
+                    chunk = _emitir()
+                    if chunk:
+                        yield chunk
+        finally:
+            # Cierra el cursor con nombre antes de salir del atomic (rollback/commit)
+            filas.close()
+
+    chunk = _emitir()
+    if gz:
+        chunk += gz.flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,260 @@
+# src/api/shards.py
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from itertools import chain, islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import csv
+import io
+import json
+
+from django.conf import settings
+
+from app.constants import COLUMNS_DB
+from app.writer import LOTE, Registro, a_fila, objeto_json
+from .artifacts import expulsar_grupo, podar_grupo
+from .exports import SalidaExport, manifiesto_path, registrar_export, variante_path
+from .models import Artefacto
+
+MANIFEST_VERSION = 1
+
+
+def limites() -> Tuple[int, int]:
+    """(EXPORT_SHARD_MAX_ROWS, EXPORT_SHARD_MAX_BYTES); 0 = sin límite."""
+    return (
+        int(getattr(settings, "EXPORT_SHARD_MAX_ROWS", 0) or 0),
+        int(getattr(settings, "EXPORT_SHARD_MAX_BYTES", 0) or 0),
+    )
+
+
+def activo() -> bool:
+    return any(limites())
+
+
+def shard_path(path: Path, indice: int) -> Path:
+    """CLIENTES_20250529.json -> CLIENTES_20250529-00001.json (conserva la extensión)."""
+    return path.with_name(f"{path.stem}-{indice:05d}{path.suffix}")
+
+
+# --------------------------
+# Serialización: una pieza de bytes por fila + el marco de cada formato
+# --------------------------
+class Marco(NamedTuple):
+    cabecera: bytes
+    separador: bytes
+    cierre: bytes
+    vacio: bytes  # archivo completo cuando no hay filas
+
+
+def marco(formato: str) -> Marco:
+    if formato == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerow(COLUMNS_DB)
+        cabecera = buf.getvalue().encode("utf-8")
+        return Marco(cabecera, b"", b"", cabecera)
+    if formato == "ndjson":
+        return Marco(b"", b"", b"", b"")
+    return Marco(b"[\n", b",\n", b"\n]", b"[]")
+
+
+class _Lineas(list):
+    """Destino de csv.writer: cada writerow llega en un único write."""
+    write = list.append
+
+
+def _lotes(it: Iterable, n: int = LOTE) -> Iterator[list]:
+    it = iter(it)
+    while lote := list(islice(it, n)):
+        yield lote
+
+
+def piezas(records: Iterable[Registro], formato: str, compacto: bool = False) -> Iterator[bytes]:
+    """Cada fila serializada (sin el marco): lo mismo que escriben los writers de app.writer."""
+    if formato == "csv":
+        lineas = _Lineas()
+        w = csv.writer(lineas)
+        for lote in _lotes(records):
+            w.writerows(map(a_fila, lote))
+            yield from [l.encode("utf-8") for l in lineas]
+            lineas.clear()
+    elif formato == "ndjson":
+        for r in records:
+            yield (objeto_json(r, compacto=True) + "\n").encode("utf-8")
+    else:
+        for r in records:
+            yield objeto_json(r, compacto).encode("utf-8")
+
+
+# --------------------------
+# Corte en shards
+# --------------------------
+class Shard:
+    __slots__ = ("indice", "desde", "filas", "bytes", "piezas")
+
+    def __init__(self, indice: int, desde: int):
+        self.indice = indice
+        self.desde = desde
+        self.filas = 0
+        self.bytes = 0
+        self.piezas: List[bytes] = []
+
+
+def cortar(filas: Iterable[bytes], m: Marco, max_filas: int = 0, max_bytes: int = 0) -> Iterator[Shard]:
+    """
+    Reparte las filas serializadas en shards de a lo sumo ``max_filas`` filas y
+    ``max_bytes`` bytes (marco incluido). Una fila que sola supera ``max_bytes`` va
+    en su propio shard. Siempre produce al menos un shard.
+    """
+    fijo = len(m.cabecera) + len(m.cierre)
+    sep = len(m.separador)
+    actual = Shard(1, 0)
+    for p in filas:
+        n = actual.filas
+        if n and ((max_filas and n >= max_filas) or (max_bytes and fijo + actual.bytes + sep * n + len(p) > max_bytes)):
+            yield actual
+            actual = Shard(actual.indice + 1, actual.desde + n)
+        actual.piezas.append(p)
+        actual.filas += 1
+        actual.bytes += len(p)
+    yield actual
+
+
+def _escribir(shard: Shard, path: Path, m: Marco, grupo: Optional[str], diferir: bool) -> SalidaExport:
+    """Escribe un shard (plano + variantes comprimidas); corre en un hilo del pool."""
+    out = SalidaExport(path, grupo=grupo, diferir=diferir)
+    with out as fh:
+        b = fh.buffer
+        if not shard.piezas:
+            b.write(m.vacio)
+        else:
+            b.write(m.cabecera)
+            for i in range(0, len(shard.piezas), LOTE):
+                if i:
+                    b.write(m.separador)
+                b.write(m.separador.join(shard.piezas[i:i + LOTE]))
+            b.write(m.cierre)
+    shard.piezas = []  # libera la memoria del shard apenas se escribe
+    return out
+
+
+def _descartar(futuros: List[Future]) -> None:
+    for f in futuros:
+        f.cancel()
+    wait(futuros)
+    for f in futuros:
+        if not f.cancelled() and f.exception() is None:
+            f.result().descartar()
+
+
+# --------------------------
+# Export por shards + manifiesto
+# --------------------------
+def escribir_por_shards(
+    records: Iterable[Registro],
+    path: Path,
+    formato: str,
+    ex: ThreadPoolExecutor,
+    compacto: bool = False,
+    max_filas: int = 0,
+    max_bytes: int = 0,
+    en_vuelo: int = 4,
+) -> Dict[str, object]:
+    """
+    Escribe ``records`` en shards ``NOMBRE-00001.ext`` (en los hilos de ``ex``, como
+    mucho ``en_vuelo`` shards en memoria a la vez) y publica el manifiesto
+    ``NOMBRE.ext.manifest``. Si todo cabe en un shard se escribe un único archivo
+    normal en ``path``. Devuelve {"path", "shards", "sizes"}.
+    """
+    path = Path(path)
+    m = marco(formato)
+    mpath = manifiesto_path(path)
+    tipo = Artefacto.TIPO_EXPORT
+
+    cortes = cortar(piezas(records, formato, compacto), m, max_filas, max_bytes)
+    primero = next(cortes)
+    segundo = next(cortes, None)
+    if segundo is None:
+        out = _escribir(primero, path, m, None, diferir=False)
+        if Artefacto.objects.filter(tipo=tipo, grupo=mpath.name).exists():
+            expulsar_grupo(tipo, mpath.name)  # antes estaba partido
+        registrar_export(path)
+        return {"path": path, "shards": 0, "sizes": out.tamanos()}
+
+    trabajos: List[Tuple[int, int, Future]] = []
+    pendientes: deque = deque()
+    try:
+        for shard in chain((primero, segundo), cortes):
+            f = ex.submit(_escribir, shard, shard_path(path, shard.indice), m, mpath.name, True)
+            trabajos.append((shard.desde, shard.filas, f))
+            pendientes.append(f)
+            if len(pendientes) >= en_vuelo:
+                pendientes.popleft().result()
+        salidas = [f.result() for _, _, f in trabajos]
+    except BaseException:
+        _descartar([f for _, _, f in trabajos])
+        raise
+
+    entradas = []
+    conservar = {mpath.name}
+    for (desde, filas, _), out in zip(trabajos, salidas):
+        out.publicar()
+        tam = out.tamanos()
+        entradas.append({
+            "archivo": out.path.name,
+            "filas_desde": desde,
+            "filas_hasta": desde + filas,
+            "filas": filas,
+            "bytes": tam.pop("identity"),
+            "sha256": out.sha256,
+            "encodings": tam,
+            "download_path": f"/api/exports/descargar/{out.path.name}",
+        })
+        conservar.add(out.path.name)
+        conservar.update(variante_path(out.path, enc).name for enc in out.encodings)
+
+    comunes = set.intersection(*(set(e["encodings"]) for e in entradas))
+    manifiesto = {
+        "version": MANIFEST_VERSION,
+        "export": path.name,
+        "formato": formato,
+        "filas": sum(e["filas"] for e in entradas),
+        "bytes": sum(e["bytes"] for e in entradas),
+        "encodings": {enc: sum(e["encodings"][enc] for e in entradas) for enc in sorted(comunes)},
+        "limites": {"filas": max_filas, "bytes": max_bytes},
+        "shards": entradas,
+    }
+    # El manifiesto se publica al final: nunca apunta a un shard que no exista
+    with SalidaExport(mpath, encodings=[]) as fh:
+        json.dump(manifiesto, fh, ensure_ascii=False, indent=2)
+
+    podar_grupo(tipo, mpath.name, conservar)  # shards sobrantes de un export anterior más grande
+    if Artefacto.objects.filter(tipo=tipo, grupo=path.name).exists():
+        expulsar_grupo(tipo, path.name)  # antes era un solo archivo
+    registrar_export(mpath)
+    return {
+        "path": mpath,
+        "shards": len(entradas),
+        "sizes": {"identity": manifiesto["bytes"], **manifiesto["encodings"]},
+    }
+
+
+def escribir_exports(
+    records: List[Registro],
+    destinos: Dict[str, Path],
+    compacto: bool = False,
+) -> Dict[str, Dict[str, object]]:
+    """
+    Un export por formato ({"json": path, "csv": path}) con los límites de
+    EXPORT_SHARD_MAX_ROWS/BYTES. Los formatos comparten el pool de
+    EXPORT_SHARD_WORKERS hilos: mientras se serializa un shard se escriben y
+    comprimen los anteriores.
+    """
+    max_filas, max_bytes = limites()
+    hilos = max(1, int(getattr(settings, "EXPORT_SHARD_WORKERS", 4) or 1))
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="export-shard") as ex:
+        return {
+            fmt: escribir_por_shards(records, p, fmt, ex, compacto=compacto, max_filas=max_filas,
+                                     max_bytes=max_bytes, en_vuelo=hilos)
+            for fmt, p in destinos.items()
+        }
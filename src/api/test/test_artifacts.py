@@ -0,0 +1,141 @@
+from django.db import connections
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+import os
+import tempfile
+
+from api.artifacts import _LOCK_ARTEFACTOS, aplicar_presupuesto, en_uso, uso_fisico
+from api.models import ArchivoExportado, Artefacto
+from api.services import _write_outputs
+
+
+def _records(n: int, nombre: str = "Cliente"):
+    return [{"nombre": f"{nombre} {i}", "poliza": "POL1234"} for i in range(n)]
+
+
+class ArtifactStoreTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        media = Path(self.tmp.name)
+        self.export_dir = media / "outputs"
+        self.settings = override_settings(MEDIA_ROOT=str(media), EXPORT_DIR=str(self.export_dir),
+                                          UPLOAD_DIR=str(media / "uploads"), EXPORT_COMPRESSION=["gzip"])
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.tmp.cleanup()
+
+    def test_dedup_por_contenido(self):
+        _write_outputs(_records(50), "A_20250529")
+        _write_outputs(_records(50), "B_20250529")
+        a, b = self.export_dir / "A_20250529.csv", self.export_dir / "B_20250529.csv"
+        self.assertEqual(a.stat().st_ino, b.stat().st_ino)
+
+        stats = APIClient().get("/api/exports/stats/").data
+        self.assertTrue(stats["ok"])
+        self.assertGreater(stats["ahorro_dedup_bytes"], 0)
+        self.assertEqual(stats["por_tipo"]["export"]["archivos"], 8)  # 2 x (csv, json, csv.gz, json.gz)
+
+    def test_reescritura_identica_no_toca_el_archivo(self):
+        _write_outputs(_records(10), "A_20250529")
+        p = self.export_dir / "A_20250529.csv"
+        mtime = p.stat().st_mtime_ns
+        _write_outputs(_records(10), "A_20250529")
+        self.assertEqual(p.stat().st_mtime_ns, mtime)
+        _write_outputs(_records(11), "A_20250529")
+        self.assertNotEqual(p.stat().st_mtime_ns, mtime)
+
+    def test_lru_por_descargas(self):
+        client = APIClient()
+        _write_outputs(_records(300, "Viejo"), "VIEJO_20250101")
+        _write_outputs(_records(300, "Medio"), "MEDIO_20250102")
+        client.get("/api/exports/descargar/VIEJO_20250101.csv")  # VIEJO pasa a ser el más reciente
+
+        uso = sum(a.size for a in Artefacto.objects.all())
+        with override_settings(ARTIFACT_STORE_BUDGET_BYTES=uso):
+            _write_outputs(_records(300, "Nuevo"), "NUEVO_20250103")
+
+        vivos = set(ArchivoExportado.objects.values_list("nombre", flat=True))
+        self.assertIn("VIEJO", vivos)
+        self.assertIn("NUEVO", vivos)
+        self.assertNotIn("MEDIO", vivos)
+        self.assertFalse((self.export_dir / "MEDIO_20250102.csv").exists())
+        self.assertEqual(Artefacto.objects.get(nombre_archivo="VIEJO_20250101.csv").hits, 1)
+
+    def test_hits_solo_por_descargas_reales(self):
+        client = APIClient()
+        url = "/api/exports/descargar/A_20250529.csv"
+        _write_outputs(_records(50), "A_20250529")
+
+        def hits():
+            a = Artefacto.objects.get(nombre_archivo="A_20250529.csv")
+            return a.hits, a.last_accessed_at
+
+        etag = client.get(url)["ETag"]
+        primero = hits()
+        self.assertEqual(primero[0], 1)
+        client.get(url, HTTP_IF_NONE_MATCH=etag)        # revalidación (304)
+        client.get(url, HTTP_RANGE="bytes=100-199")     # trozo de una descarga en paralelo
+        client.get(url, HTTP_RANGE="bytes=-10")
+        client.get(url, HTTP_RANGE="bytes=999999-")     # 416
+        self.assertEqual(hits(), primero)
+        client.get(url, HTTP_RANGE="bytes=0-99")         # primer trozo: descarga nueva
+        self.assertEqual(hits()[0], 2)
+        with override_settings(EXPORT_SENDFILE="x-accel"):
+            client.get(url, HTTP_RANGE="bytes=100-")
+            self.assertEqual(hits()[0], 2)
+            client.get(url)
+            self.assertEqual(hits()[0], 3)
+
+    def _fechar(self, nombre: str, anio: int):
+        """Lleva el grupo (catálogo y archivos) a enero de ``anio``."""
+        fecha = datetime(anio, 1, 1, tzinfo=timezone.utc)
+        Artefacto.objects.filter(nombre_archivo__startswith=nombre).update(created_at=fecha, publicado_at=fecha)
+        for p in self.export_dir.glob(f"{nombre}*"):
+            os.utime(p, (fecha.timestamp(), fecha.timestamp()))
+
+    def test_lru_por_publicacion_y_no_por_mtime(self):
+        _write_outputs(_records(300, "Otro"), "NUEVO_20250103")
+        _write_outputs(_records(300, "Viejo"), "VIEJO_20250101")
+        _write_outputs(_records(300, "Medio"), "MEDIO_20250102")
+        for nombre, anio in (("NUEVO", 2019), ("VIEJO", 2020), ("MEDIO", 2021)):
+            self._fechar(nombre, anio)
+        # NUEVO se reescribe hoy con el contenido de VIEJO: queda como hardlink al inodo de 2020
+        _write_outputs(_records(300, "Viejo"), "NUEVO_20250103")
+        nuevo = self.export_dir / "NUEVO_20250103.csv"
+        self.assertEqual(nuevo.stat().st_ino, (self.export_dir / "VIEJO_20250101.csv").stat().st_ino)
+        self.assertGreater(nuevo.stat().st_mtime, datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+
+        # El uso se descuenta sin releer el catálogo por cada grupo expulsado
+        with override_settings(ARTIFACT_STORE_BUDGET_BYTES=uso_fisico() - 1), \
+                patch("api.artifacts.uso_fisico", side_effect=AssertionError("O(N²)")):
+            # VIEJO no libera nada (NUEVO comparte su contenido); MEDIO.json (escrito antes que el csv) sí
+            self.assertEqual(aplicar_presupuesto(), 3)
+        vivos = set(Artefacto.objects.filter(nombre_archivo=F("grupo")).values_list("grupo", flat=True))
+        self.assertEqual(vivos, {"NUEVO_20250103.csv", "NUEVO_20250103.json", "MEDIO_20250102.csv"})
+        self.assertTrue(nuevo.is_file())
+
+    def test_no_expulsa_grupos_en_uso(self):
+        _write_outputs(_records(300, "Viejo"), "VIEJO_20250101")
+        _write_outputs(_records(300, "Medio"), "MEDIO_20250102")
+        self._fechar("VIEJO", 2020)
+        self._fechar("MEDIO", 2021)
+        otra = connections.create_connection("default")  # otra petición que lee VIEJO.csv
+        try:
+            with otra.cursor() as cur:
+                cur.execute("SELECT pg_advisory_lock_shared(%s, hashtext(%s))",
+                            [_LOCK_ARTEFACTOS, "export:VIEJO_20250101.csv"])
+            with override_settings(ARTIFACT_STORE_BUDGET_BYTES=1), \
+                    en_uso(("export", "MEDIO_20250102.csv")):  # la operación en curso de este hilo
+                aplicar_presupuesto()
+        finally:
+            otra.close()
+        vivos = set(Artefacto.objects.filter(nombre_archivo=F("grupo")).values_list("grupo", flat=True))
+        self.assertEqual(vivos, {"VIEJO_20250101.csv", "MEDIO_20250102.csv"})
+        self.assertTrue((self.export_dir / "VIEJO_20250101.csv").is_file())
@@ -0,0 +1,61 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase
+from django.test.utils import override_settings
+from pathlib import Path
+from unittest.mock import patch
+import io
+import json
+import tempfile
+
+from api import llm_agent
+from api.management.commands.bench_http import comando_servidor, entorno_servidor, percentil
+
+
+class BenchHttpTests(LiveServerTestCase):
+    databases = {"default", "lectura"}
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        media = Path(self._tmp.name)
+        self._override = override_settings(MEDIA_ROOT=str(media), EXPORT_DIR=str(media / "exports"),
+                                           UPLOAD_DIR=str(media / "uploads"), LLM_PROVIDER="stub")
+        self._override.enable()
+        llm_agent._cache_sql.limpiar()
+
+    def tearDown(self):
+        self._override.disable()
+        self._tmp.cleanup()
+
+    def test_escenarios_contra_servidor(self):
+        out = io.StringIO()
+        with patch.object(llm_agent, "_agent", None):
+            call_command("bench_http", "--url", self.live_server_url, "--concurrencia", "1,3", "--peticiones", "6",
+                         "--filas-upload", "20", "--json", stdout=out, stderr=io.StringIO())
+        res = json.loads(out.getvalue())
+        por = {(r["escenario"], r["concurrencia"]): r for r in res["resultados"]}
+        self.assertEqual({e for e, _ in por}, {"upload", "ultimos", "exports", "descarga", "consulta_llm"})
+        for r in res["resultados"]:
+            self.assertEqual((r["peticiones"], r["errores"]), (6, {}), r)
+            self.assertLessEqual(r["p50_ms"], r["p95_ms"])
+            self.assertLessEqual(r["p95_ms"], r["p99_ms"])
+        self.assertEqual(res["comparacion"], [])  # solo se compara con wsgi y asgi en la misma corrida
+
+    def test_percentil_y_servidores(self):
+        lat = [float(i) for i in range(1, 101)]
+        self.assertEqual((percentil(lat, 50), percentil(lat, 95), percentil(lat, 99)), (50.0, 95.0, 99.0))
+        self.assertIsNone(percentil([], 50))
+        self.assertIn("gthread", comando_servidor("wsgi", 8001, 2, 4))
+        with patch("api.management.commands.bench_http.find_spec", return_value=None), \
+                self.assertRaisesMessage(CommandError, "uvicorn"):
+            comando_servidor("asgi", 8001, 2, 4)
+
+    def test_entorno_aislado(self):
+        media = Path(self._tmp.name) / "media"
+        with patch.dict("os.environ", {"POSTGRES_DB": "real", "POSTGRES_READ_HOST": "replica"}):
+            env = entorno_servidor(media, "test_real")
+            actual = entorno_servidor(media, None)
+        self.assertEqual((env["POSTGRES_DB"], env["MEDIA_ROOT"]), ("test_real", str(media)))
+        self.assertEqual(env["EXPORT_DIR"], str(media / "exports"))
+        self.assertNotIn("POSTGRES_READ_HOST", env)  # la base desechable no existe en la réplica
+        self.assertEqual((actual["POSTGRES_DB"], actual["POSTGRES_READ_HOST"]), ("real", "replica"))
@@ -0,0 +1,36 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from pathlib import Path
+import io
+import json
+import tempfile
+
+from api.models import ArchivoExportado, Registro
+
+
+class BenchIngestaTests(TestCase):
+    def _correr(self, tmp, *extra):
+        call_command("bench_ingesta", "--escenarios", "200", "--base-actual", "--en-proceso",
+                     "--insumos", tmp, *extra, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_resultados_y_regresiones(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            salida, baseline = Path(tmp) / "r.json", Path(tmp) / "base.json"
+            self._correr(tmp, "--salida", str(salida), "--baseline", str(baseline), "--actualizar-baseline")
+            res = json.loads(salida.read_text(encoding="utf-8"))
+            etapas = res["escenarios"]["200"]["etapas"]
+            self.assertEqual(list(etapas), ["parser", "transformer", "output_writer", "write_outputs", "procesar"])
+            self.assertGreater(etapas["procesar"]["filas_por_s"], 0)
+            self.assertEqual(set(etapas["procesar"]["detalle"]), {"parseo_transformacion_insercion", "_write_outputs"})
+            self.assertEqual(json.loads(baseline.read_text(encoding="utf-8"))["escenarios"], res["escenarios"])
+            # Lo insertado por la ingesta se limpia
+            self.assertFalse(Registro.objects.exists())
+            self.assertFalse(ArchivoExportado.objects.exists())
+
+            # Un baseline 10x más rápido marca regresión y el comando sale con error
+            base = json.loads(baseline.read_text(encoding="utf-8"))
+            base["escenarios"]["200"]["etapas"]["parser"]["filas_por_s"] *= 10
+            baseline.write_text(json.dumps(base), encoding="utf-8")
+            with self.assertRaisesMessage(CommandError, "regresión"):
+                self._correr(tmp, "--etapas", "parser", "--baseline", str(baseline))
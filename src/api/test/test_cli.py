@@ -0,0 +1,72 @@
+from django.test import SimpleTestCase
+from contextlib import redirect_stdout
+from pathlib import Path
+import io
+import json
+import tempfile
+
+from app.cli import expandir_entradas, nombres_salida, run_cli
+from app.parser import FixedWidthParser
+from app.transformers import BusinessTransformer
+from app.writer import OutputWriter
+from generar_txt import Config, generar_archivo
+
+
+class CliTests(SimpleTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.entrada = self.tmp / "in"
+        for i, nombre in enumerate(("A_20250529.txt", "B_20250530.txt")):
+            generar_archivo(self.entrada / nombre, Config(
+                filas=50 + i * 25, semilla=i, fecha="20250529", bloque=1000, gzip=False, nivel_gzip=1,
+                tasa_longitud=0.0, tasa_fecha=0.0, tasa_numero=0.0, tasa_acentos=0.0))
+        (self.entrada / "notas.txt").write_text("no es un insumo")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _correr(self, *args):
+        with redirect_stdout(io.StringIO()) as out:
+            run_cli([*args, "--sin-progreso"])
+        return out.getvalue()
+
+    def test_expandir_entradas(self):
+        a = self.entrada / "A_20250529.txt"
+        self.assertEqual([p.name for p in expandir_entradas([str(self.entrada)])], ["A_20250529.txt", "B_20250530.txt"])
+        self.assertEqual(expandir_entradas([str(self.entrada / "A_*.txt"), str(a)]), [a.resolve()])
+
+    def test_por_archivo_en_paralelo(self):
+        salida = self.tmp / "out"
+        out = self._correr(str(self.entrada), "--salida", str(salida), "--formatos", "csv", "ndjson", "--workers", "2")
+        self.assertIn("Registros procesados: 125 de 2 archivo(s)", out)
+        self.assertIn("memoria pico", out)
+        ndjson = (salida / "B_20250530.ndjson").read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(ndjson), 75)
+        self.assertEqual(json.loads(ndjson[0])["fecha_entrega_colmena"], "2025-05-30")
+        self.assertEqual(len((salida / "A_20250529.csv").read_text(encoding="utf-8").splitlines()), 51)
+
+    def test_nombres_de_salida(self):
+        salida = self.tmp / "out"
+        self._correr(str(self.entrada / "A_20250529.txt"), "--salida", str(salida))
+        self.assertEqual(sorted(p.name for p in salida.iterdir()), ["salida.csv", "salida.json"])  # como antes
+
+        otra = self.tmp / "otra" / "A_20250529.txt"
+        otra.parent.mkdir()
+        otra.write_bytes((self.entrada / "A_20250529.txt").read_bytes())
+        archivos = expandir_entradas([str(self.entrada), str(otra)])
+        self.assertEqual(nombres_salida(archivos), ["A_20250529", "B_20250530", "A_20250529_2"])
+
+    def test_combinado_igual_a_output_writer(self):
+        records = []
+        for p in expandir_entradas([str(self.entrada)]):
+            parser = FixedWidthParser(p)
+            t = BusinessTransformer(parser.yyyymmdd, p.name)
+            records += [t.build_record(c) for c in parser.iter_rows()]
+        OutputWriter.to_json(records, self.tmp / "esperado.json")
+        OutputWriter.to_csv(records, self.tmp / "esperado.csv")
+
+        self._correr(str(self.entrada / "*_2025*.txt"), "--combinar", "TODO", "--salida", str(self.tmp / "out"))
+        for fmt in ("json", "csv"):
+            self.assertEqual((self.tmp / "out" / f"TODO.{fmt}").read_bytes(),
+                             (self.tmp / f"esperado.{fmt}").read_bytes())
@@ -0,0 +1,44 @@
+from django.db import connection
+from django.test import TestCase
+from datetime import date
+
+from api.models import Registro
+
+
+class ColumnasDerivadasTests(TestCase):
+    def setUp(self):
+        self.a = Registro.objects.create(nombre="A", nombre_db="A_20250529.txt", telefono_1="", telefono_2="3001",
+                                         telefono_3="3002", fecha_nacimiento=date(1990, 3, 15),
+                                         estado_debito="RECHAZADO")
+        self.b = Registro.objects.create(nombre="B", nombre_db="A_20250529.txt", estado_debito="aprobado",
+                                         causal_rechazo="Fondos insuficientes")
+        self.c = Registro.objects.create(nombre="C", nombre_db="A_20250529.txt", telefono_1="3100",
+                                         estado_debito="aprobado")
+
+    def test_valores_calculados_por_la_base(self):
+        a = Registro.objects.get(pk=self.a.pk)
+        self.assertEqual((a.telefono_principal, a.anio_nacimiento, a.mes_nacimiento, a.debito_rechazado),
+                         ("3001", 1990, 3, True))
+        b = Registro.objects.get(pk=self.b.pk)
+        self.assertEqual((b.telefono_principal, b.anio_nacimiento, b.debito_rechazado), (None, None, True))
+        self.assertFalse(Registro.objects.get(pk=self.c.pk).debito_rechazado)
+
+        # Se recalculan al actualizar las columnas de origen
+        Registro.objects.filter(pk=self.c.pk).update(telefono_1="", telefono_3="3200", estado_debito="Rechazo")
+        c = Registro.objects.get(pk=self.c.pk)
+        self.assertEqual((c.telefono_principal, c.debito_rechazado), ("3200", True))
+
+    def test_filtros_usan_indices(self):
+        with connection.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+            planes = {}
+            for nombre, where in (
+                ("rechazados", "debito_rechazado AND created_at >= CURRENT_DATE - INTERVAL '30 days'"),
+                ("anio", "anio_nacimiento BETWEEN 1980 AND 1995"),
+                ("telefono", "telefono_principal = '3001'"),
+            ):
+                cur.execute(f"EXPLAIN SELECT id FROM api_registro WHERE {where}")
+                planes[nombre] = "\n".join(r[0] for r in cur.fetchall())
+        self.assertIn("registro_rechazado_idx", planes["rechazados"])
+        self.assertIn("registro_anio_mes_nac_idx", planes["anio"])
+        self.assertIn("registro_tel_principal_idx", planes["telefono"])
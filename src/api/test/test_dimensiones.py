@@ -0,0 +1,73 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from pathlib import Path
+import tempfile
+
+from app.parser import FixedWidthParser
+from app.transformers import BusinessTransformer
+from api.dimensiones import CacheDimensiones
+from api.models import DIMENSIONES, DimCiudad, DimEstadoDebito, Registro, RegistroDatos
+from api.services import procesar_archivo_y_guardar
+from generar_txt import Config, generar_archivo
+
+
+def _explain(sql):
+    with connection.cursor() as cur:
+        cur.execute("EXPLAIN " + sql)
+        return "\n".join(f[0] for f in cur.fetchall())
+
+
+class DimensionesTests(TestCase):
+    def test_ingesta_normaliza_y_la_vista_conserva_las_columnas(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            txt = Path(tmp) / "DIM_20250529.txt"
+            generar_archivo(txt, Config(filas=200, semilla=3, fecha="20250529", bloque=64, gzip=False, nivel_gzip=1,
+                                        tasa_longitud=0.0, tasa_fecha=0.0, tasa_numero=0.0, tasa_acentos=0.0))
+            parser = FixedWidthParser(txt)
+            t = BusinessTransformer(parser.yyyymmdd, txt.name)
+            esperados = [t.build_record(cols) for cols in parser.iter_rows()]
+            with override_settings(MEDIA_ROOT=tmp, EXPORT_DIR=str(Path(tmp) / "out")):
+                self.assertEqual(procesar_archivo_y_guardar(str(txt)), 200)
+
+        # Un valor distinto = una fila de dimensión, no una por registro
+        for col, modelo in DIMENSIONES.items():
+            self.assertEqual(set(modelo.objects.values_list("valor", flat=True)),
+                             {getattr(r, col) for r in esperados}, col)
+
+        leidos = list(Registro.objects.order_by("id").values(*DIMENSIONES, "causal_rechazo", "debito_rechazado"))
+        self.assertEqual([{c: f[c] for c in DIMENSIONES} for f in leidos],
+                         [{c: getattr(r, c) for c in DIMENSIONES} for r in esperados])
+        for f in leidos:
+            regla = f["estado_debito"].upper().startswith("RECHAZ") or f["causal_rechazo"] != ""
+            self.assertEqual(f["debito_rechazado"], regla)
+
+        # Un segundo archivo solo consulta las dimensiones una vez (la caché resuelve el resto)
+        cache = CacheDimensiones()
+        with CaptureQueriesContext(connection) as q:
+            cache.sincronizar()
+            cache.id("ciudad", esperados[0].ciudad)
+        self.assertEqual(len(q), 2)  # UNION ALL de valores + estados rechazados
+
+    def test_escrituras_por_la_vista(self):
+        r = Registro.objects.create(nombre="Ana", ciudad="Cali", estado_debito="Rechazado", nombre_db="A_20250529.txt")
+        r.refresh_from_db()
+        self.assertEqual((r.ciudad, r.debito_rechazado), ("Cali", True))
+        fisica = RegistroDatos.objects.select_related("ciudad").get(pk=r.pk)
+        self.assertEqual((fisica.ciudad.valor, fisica.nombre), ("Cali", "Ana"))
+
+        Registro.objects.create(nombre="Luis", ciudad="Cali", nombre_db="A_20250529.txt")
+        self.assertEqual(DimCiudad.objects.filter(valor="Cali").count(), 1)
+
+        Registro.objects.filter(pk=r.pk).update(ciudad="Pasto", estado_debito="Aprobado")
+        r.refresh_from_db()
+        self.assertEqual((r.ciudad, r.debito_rechazado), ("Pasto", False))
+        self.assertTrue(DimEstadoDebito.objects.get(valor="Rechazado").rechazado)
+
+        Registro.objects.filter(nombre_db="A_20250529.txt").delete()
+        self.assertFalse(RegistroDatos.objects.exists())
+
+    def test_la_vista_omite_joins_que_no_usa(self):
+        self.assertNotIn("api_dim", _explain("SELECT count(*) FROM api_registro"))
+        self.assertNotIn("api_dim", _explain("SELECT nombre, valor_prima FROM api_registro WHERE fecha_venta > '2024-01-01'"))
+        self.assertIn("api_dimciudad", _explain("SELECT nombre FROM api_registro WHERE ciudad = 'Cali'"))
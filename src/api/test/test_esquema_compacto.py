@@ -0,0 +1,136 @@
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from decimal import Decimal
+from pathlib import Path
+import io
+import json
+import tempfile
+
+from app.parser import FixedWidthParser
+from app.transformers import BusinessTransformer
+from api.compacto import BIT, CANALES, a_centavos, dias_corto, entero_corto, mascara
+from api.models import Registro, RegistroDatos
+from api.services import _to_decimal, procesar_archivo_y_guardar
+from generar_txt import Config, generar_archivo
+
+
+def _cfg(filas):
+    return Config(filas=filas, semilla=5, fecha="20250529", bloque=64, gzip=False, nivel_gzip=1,
+                  tasa_longitud=0.0, tasa_fecha=0.0, tasa_numero=0.0, tasa_acentos=0.0)
+
+
+class ConversionesTests(SimpleTestCase):
+    def test_centavos_redondean_como_numeric(self):
+        self.assertEqual([a_centavos(Decimal(v)) for v in ("1234.50", "1.005", "-2.505", "0")], [123450, 101, -251, 0])
+        self.assertIsNone(a_centavos(None))
+
+    def test_enteros_cortos_con_respaldo(self):
+        self.assertEqual(entero_corto("05", 2), (5, None))
+        self.assertEqual(entero_corto("3", 1), (3, None))
+        # Lo que no se reconstruye igual desde el smallint va tal cual al respaldo
+        for texto, ancho in (("5", 2), ("3A", 1), (" 7", 2), ("007", 2), ("-1", 1)):
+            self.assertEqual(entero_corto(texto, ancho), (None, texto))
+        self.assertEqual(entero_corto("", 2), (None, None))
+        self.assertEqual(dias_corto(30), (30, None))
+        self.assertEqual(dias_corto(40000), (None, 40000))
+        self.assertEqual(dias_corto(None), (None, None))
+
+    def test_mascara(self):
+        self.assertEqual(mascara(telefono=True, email=True, texto=False), 0b01001)
+
+
+class EsquemaCompactoTests(TestCase):
+    def test_columnas_compactas_siguen_a_las_originales(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            txt = Path(tmp) / "COMP_20250529.txt"
+            generar_archivo(txt, _cfg(150))
+            parser = FixedWidthParser(txt)
+            t = BusinessTransformer(parser.yyyymmdd, txt.name)
+            esperados = [t.build_record(cols) for cols in parser.iter_rows()]
+            with override_settings(MEDIA_ROOT=tmp, EXPORT_DIR=str(Path(tmp) / "out")):
+                procesar_archivo_y_guardar(str(txt))
+
+        campos = ("periodo", "valor_asegurado", "valor_prima", "mes_a_trabajar") + CANALES
+        self.assertEqual(list(Registro.objects.order_by("id").values_list(*campos)), [
+            (r.periodo, _to_decimal(r.valor_asegurado), _to_decimal(r.valor_prima), r.mes_a_trabajar)
+            + tuple(getattr(r, c) == "1" for c in CANALES)
+            for r in esperados
+        ])
+        # El cargador escribe directo el esquema compacto, sin pasar por los respaldos
+        for f, r in zip(RegistroDatos.objects.order_by("id"), esperados):
+            self.assertEqual(f.valor_prima_centavos, a_centavos(_to_decimal(r.valor_prima)))
+            self.assertEqual(f.valor_asegurado_centavos, a_centavos(_to_decimal(r.valor_asegurado)))
+            self.assertEqual((f.periodo, f.periodo_texto), (int(r.periodo), None))
+            self.assertEqual((f.mes_a_trabajar, f.mes_a_trabajar_texto), (5, None))
+            self.assertEqual((f.dias, f.dias_grande), (int(r.dias), None))
+            self.assertEqual(f.canales, mascara(**{c: getattr(r, c) == "1" for c in CANALES}))
+
+    def test_texto_no_numerico_se_conserva(self):
+        r = Registro.objects.create(nombre="Ana", periodo="3", valor_prima=Decimal("1234.50"), dias=40000,
+                                    mes_a_trabajar="05", whatsapp=True, email=True, nombre_db="A_20250529.txt")
+        Registro.objects.filter(pk=r.pk).update(valor_asegurado=Decimal("10.005"), email=False, periodo="X1")
+        r.refresh_from_db()
+        self.assertEqual((r.periodo, r.valor_prima, r.valor_asegurado, r.dias, r.whatsapp, r.email),
+                         ("X1", Decimal("1234.50"), Decimal("10.01"), 40000, True, False))
+        fisica = RegistroDatos.objects.values_list(
+            "periodo", "periodo_texto", "valor_prima_centavos", "valor_asegurado_centavos", "dias", "dias_grande",
+            "mes_a_trabajar", "mes_a_trabajar_texto", "canales",
+        ).get(pk=r.pk)
+        self.assertEqual(fisica, (None, "X1", 123450, 1001, None, 40000, 5, None, BIT["whatsapp"]))
+        # '5' no es '05': el mes sin cero a la izquierda se conserva en el respaldo
+        Registro.objects.filter(pk=r.pk).update(mes_a_trabajar="5", periodo="", dias=7)
+        r.refresh_from_db()
+        self.assertEqual((r.mes_a_trabajar, r.periodo, r.dias), ("5", "", 7))
+        self.assertEqual(RegistroDatos.objects.values_list(
+            "mes_a_trabajar", "mes_a_trabajar_texto", "periodo", "periodo_texto", "dias", "dias_grande",
+        ).get(pk=r.pk), (None, "5", None, None, 7, None))
+
+    def test_bench_esquema(self):
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            call_command("bench_esquema", "--filas", "300", "--repeticiones", "1", "--base-actual", "--json",
+                         "--insumos", tmp, stdout=out, stderr=io.StringIO())
+        res = json.loads(out.getvalue())
+        self.assertEqual(res["filas"], 300)
+        self.assertLessEqual(res["tamano"]["compacto_bytes"], res["tamano"]["legado_bytes"])  # por páginas de 8 kB
+        self.assertEqual(set(res["consultas"]), {"suma_montos", "prima_por_periodo", "canales"})
+        self.assertTrue(all(c["mismo_resultado"] for c in res["consultas"].values()))
+        self.assertFalse(RegistroDatos.objects.exists())  # --base-actual limpia lo insertado
+
+
+class MigracionesReversiblesTests(TransactionTestCase):
+    """0009 y 0008 se pueden revertir (api_registro vuelve a ser tabla) sin perder filas."""
+
+    def _filas(self):
+        with connection.cursor() as cur:
+            cur.execute("SELECT id, nombre, ciudad, periodo, valor_prima, email, debito_rechazado "
+                        "FROM api_registro ORDER BY id")
+            return cur.fetchall()
+
+    def test_ida_y_vuelta(self):
+        Registro.objects.create(nombre="Ana", ciudad="Cali", periodo="3A", valor_prima=Decimal("12.50"), email=True,
+                                estado_debito="RECHAZADO", nombre_db="A_20250529.txt")
+        Registro.objects.create(nombre="Luis", ciudad="Pasto", periodo="2", nombre_db="A_20250529.txt")
+        antes = self._filas()
+        ejecutor = MigrationExecutor(connection)
+        final = ejecutor.loader.graph.leaf_nodes("api")
+        with self.assertLogs("api.migrations", "WARNING") as logs:  # al volver a aplicar 0009
+            try:
+                ejecutor.migrate([("api", "0007_archivo_exportado_shards")])
+                with connection.cursor() as cur:
+                    cur.execute("SELECT relkind FROM pg_class WHERE relname = 'api_registro'")
+                    self.assertEqual(cur.fetchone(), ("r",))
+                    cur.execute("SELECT count(*) FROM pg_class WHERE relname LIKE 'api_dim%' "
+                                "OR relname = 'api_registro_datos'")
+                    self.assertEqual(cur.fetchone(), (0,))
+                self.assertEqual(self._filas(), antes)
+            finally:
+                ejecutor.loader.build_graph()
+                ejecutor.migrate(final)
+        self.assertIn("1 filas con periodo que no entra en smallint: queda tal cual en periodo_texto", logs.output[0])
+        self.assertEqual(self._filas(), antes)
+        fisica = RegistroDatos.objects.values_list("periodo", "periodo_texto", "valor_prima_centavos", "canales")
+        self.assertEqual(fisica.get(nombre="Ana"), (None, "3A", 1250, BIT["email"]))
@@ -0,0 +1,88 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from pathlib import Path
+import gzip
+import tempfile
+
+from api.exports import SalidaExport, _zstd
+from api.services import _write_outputs
+
+
+class ExportsComprimidosTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.media = Path(self.tmp.name)
+        self.export_dir = self.media / "outputs"
+        self.settings = override_settings(MEDIA_ROOT=str(self.media), EXPORT_DIR=str(self.export_dir),
+                                          EXPORT_COMPRESSION=["gzip", "zstd"])
+        self.settings.enable()
+        records = [{"nombre": f"Cliente {i}", "poliza": "POL1234", "mejor_canal": "texto"} for i in range(200)]
+        self.outs = _write_outputs(records, "CLIENTES_20250529")
+
+    def tearDown(self):
+        self.settings.disable()
+        self.tmp.cleanup()
+
+    def test_variantes_en_la_misma_pasada(self):
+        csv_path = self.export_dir / "CLIENTES_20250529.csv"
+        plano = csv_path.read_bytes()
+        self.assertEqual(gzip.decompress((self.export_dir / "CLIENTES_20250529.csv.gz").read_bytes()), plano)
+        if _zstd() is not None:
+            zst = (self.export_dir / "CLIENTES_20250529.csv.zst").read_bytes()
+            self.assertEqual(_zstd().ZstdDecompressor().decompress(zst, max_output_size=len(plano)), plano)
+        self.assertLess(self.outs["sizes"]["csv"]["gzip"], self.outs["sizes"]["csv"]["identity"])
+        self.assertFalse(list(self.export_dir.glob(".*.tmp")))
+
+    def test_escrituras_simultaneas_del_mismo_export(self):
+        path = self.export_dir / "DOBLE_20250529.csv"
+        with SalidaExport(path) as a, SalidaExport(path) as b:
+            a.write("primero\n")
+            b.write("segundo\n")
+        self.assertEqual(path.read_text(encoding="utf-8"), "primero\n")  # b publica primero y a lo reemplaza
+        self.assertEqual(gzip.decompress(Path(f"{path}.gz").read_bytes()), b"primero\n")
+        self.assertFalse(list(self.export_dir.glob(".*.tmp")))
+
+    def test_negociacion_accept_encoding(self):
+        client = APIClient()
+        url = "/api/exports/descargar/CLIENTES_20250529.json"
+        r = client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", r["Vary"])
+        body = gzip.decompress(b"".join(r.streaming_content))
+        self.assertEqual(body, (self.export_dir / "CLIENTES_20250529.json").read_bytes())
+
+        r = client.get(url, HTTP_ACCEPT_ENCODING="identity")
+        self.assertFalse(r.has_header("Content-Encoding"))
+
+        if _zstd() is not None:
+            r = client.get(url, HTTP_ACCEPT_ENCODING="gzip, zstd")
+            self.assertEqual(r["Content-Encoding"], "zstd")
+            r = client.get(url, HTTP_ACCEPT_ENCODING="gzip;q=1, zstd;q=0.5")
+            self.assertEqual(r["Content-Encoding"], "gzip")
+
+    def test_q_de_identity_y_comodin(self):
+        client = APIClient()
+        url = "/api/exports/descargar/CLIENTES_20250529.json"
+        # El archivo plano compite con su q: aquí lo prefiere el cliente
+        r = client.get(url, HTTP_ACCEPT_ENCODING="identity;q=1, gzip;q=0.5, zstd;q=0.5")
+        self.assertFalse(r.has_header("Content-Encoding"))
+        r = client.get(url, HTTP_ACCEPT_ENCODING="identity;q=0.1, gzip;q=0.5, zstd;q=0")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        # "*;q=0" excluye lo que no se nombra, incluido identity
+        r = client.get(url, HTTP_ACCEPT_ENCODING="gzip, *;q=0")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        r = client.get(url, HTTP_ACCEPT_ENCODING="*;q=0")
+        self.assertEqual(r.status_code, 406)
+        r = client.get(url, HTTP_ACCEPT_ENCODING="br, identity;q=0")
+        self.assertEqual(r.status_code, 406)
+        r = client.get(url, HTTP_ACCEPT_ENCODING="br, *;q=0, identity")
+        self.assertFalse(r.has_header("Content-Encoding"))
+        self.assertEqual(r.status_code, 200)
+
+    def test_listado_oculta_variantes(self):
+        r = APIClient().get("/api/exports/")
+        nombres = [f["name"] for f in r.data["files"]]
+        self.assertEqual(sorted(nombres), ["CLIENTES_20250529.csv", "CLIENTES_20250529.json"])
+        self.assertIn("gzip", r.data["files"][0]["encodings"])
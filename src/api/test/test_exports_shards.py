@@ -0,0 +1,110 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from pathlib import Path
+import csv
+import gzip
+import hashlib
+import io
+import json
+import tempfile
+
+from app.constants import COLUMNS_DB
+from app.writer import escribir_csv, escribir_json
+from api.models import ArchivoExportado, Artefacto
+from api.services import _write_outputs
+from api.shards import cortar, marco, piezas
+
+
+def _filas(n):
+    return [tuple(f"C{i}" if c == "nombre" else ("línea\n2" if c == "direccion" and i % 7 == 0 else "")
+                  for c in COLUMNS_DB) for i in range(n)]
+
+
+class ExportsShardsTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.media = Path(self.tmp.name)
+        self.export_dir = self.media / "outputs"
+        self.override = override_settings(MEDIA_ROOT=str(self.media), EXPORT_DIR=str(self.export_dir),
+                                          EXPORT_COMPRESSION=["gzip"], EXPORT_SHARD_MAX_ROWS=40,
+                                          EXPORT_SHARD_MAX_BYTES=0, EXPORT_SHARD_WORKERS=3)
+        self.override.enable()
+        self.filas = _filas(130)
+
+    def tearDown(self):
+        self.override.disable()
+        self.tmp.cleanup()
+
+    def test_piezas_iguales_a_los_writers(self):
+        for fmt, escribir in (("csv", escribir_csv), ("json", escribir_json)):
+            buf = io.StringIO(newline="")
+            escribir(self.filas, buf)
+            m = marco(fmt)
+            cuerpo = m.separador.join(piezas(self.filas, fmt))
+            self.assertEqual(m.cabecera + cuerpo + m.cierre, buf.getvalue().encode("utf-8"))
+
+    def test_cortar_respeta_limite_de_bytes(self):
+        m = marco("json")
+        shards = list(cortar(piezas(self.filas, "json"), m, max_bytes=4000))
+        self.assertGreater(len(shards), 1)
+        self.assertEqual(sum(s.filas for s in shards), 130)
+        for s in shards:
+            total = len(m.cabecera) + len(m.cierre) + s.bytes + len(m.separador) * (s.filas - 1)
+            self.assertLessEqual(total, 4000)
+
+    def test_shards_y_manifiesto(self):
+        outs = _write_outputs(self.filas, "CLIENTES_20250529")
+        self.assertEqual(outs["shards"], {"json": 4, "csv": 4})
+        self.assertTrue(outs["csv_path"].endswith("CLIENTES_20250529.csv.manifest"))
+        self.assertFalse((self.export_dir / "CLIENTES_20250529.csv").exists())
+
+        m = json.loads((self.export_dir / "CLIENTES_20250529.csv.manifest").read_text())
+        self.assertEqual((m["formato"], m["filas"]), ("csv", 130))
+        self.assertEqual([(s["filas_desde"], s["filas_hasta"]) for s in m["shards"]],
+                         [(0, 40), (40, 80), (80, 120), (120, 130)])
+        leidas = []
+        for s in m["shards"]:
+            datos = (self.export_dir / s["archivo"]).read_bytes()
+            self.assertEqual((len(datos), hashlib.sha256(datos).hexdigest()), (s["bytes"], s["sha256"]))
+            self.assertEqual(gzip.decompress((self.export_dir / (s["archivo"] + ".gz")).read_bytes()), datos)
+            filas = list(csv.reader(io.StringIO(datos.decode("utf-8"), newline="")))
+            self.assertEqual(filas[0], list(COLUMNS_DB))  # cada shard es un CSV completo
+            leidas += filas[1:]
+        self.assertEqual([tuple(f) for f in leidas], self.filas)
+
+        j = json.loads((self.export_dir / "CLIENTES_20250529.json.manifest").read_text())
+        objetos = sum((json.loads((self.export_dir / s["archivo"]).read_bytes()) for s in j["shards"]), [])
+        self.assertEqual([o["nombre"] for o in objetos], [f"C{i}" for i in range(130)])
+
+        cat = ArchivoExportado.objects.get(nombre_archivo="CLIENTES_20250529.csv.manifest")
+        self.assertEqual((cat.formato, cat.shards, cat.size), ("csv", 4, m["bytes"]))
+        self.assertEqual(Artefacto.objects.filter(grupo=cat.nombre_archivo).count(), 9)  # manifiesto + 4 + 4 .gz
+
+    def test_vistas_entienden_el_manifiesto(self):
+        _write_outputs(self.filas, "CLIENTES_20250529")
+        client = APIClient()
+        r = client.get("/api/exports/?formato=csv")
+        self.assertEqual([(f["name"], f["shards"]) for f in r.data["files"]],
+                         [("CLIENTES_20250529.csv.manifest", 4)])
+
+        r = client.get("/api/exports/descargar/CLIENTES_20250529.csv")
+        self.assertEqual((r.status_code, r["Content-Type"], r["X-Export-Shards"]), (200, "application/json", "4"))
+        m = json.loads(b"".join(r.streaming_content))
+        r = client.get(m["shards"][1]["download_path"], HTTP_RANGE="bytes=0-9")
+        self.assertEqual(r.status_code, 206)
+        a = Artefacto.objects.get(nombre_archivo="CLIENTES_20250529.csv.manifest")
+        self.assertEqual(a.hits, 2)  # manifiesto + shard cuentan para el mismo grupo
+
+    def test_reexport_poda_shards_y_vuelve_a_un_archivo(self):
+        _write_outputs(self.filas, "CLIENTES_20250529")
+        _write_outputs(self.filas[:70], "CLIENTES_20250529")
+        self.assertEqual(sorted(p.name for p in self.export_dir.glob("CLIENTES_20250529-*.csv")),
+                         ["CLIENTES_20250529-00001.csv", "CLIENTES_20250529-00002.csv"])
+
+        _write_outputs(self.filas[:10], "CLIENTES_20250529")
+        self.assertTrue((self.export_dir / "CLIENTES_20250529.csv").is_file())
+        self.assertFalse(list(self.export_dir.glob("CLIENTES_20250529-*")))
+        self.assertFalse(list(self.export_dir.glob("*.manifest")))
+        self.assertEqual(sorted(ArchivoExportado.objects.values_list("nombre_archivo", flat=True)),
+                         ["CLIENTES_20250529.csv", "CLIENTES_20250529.json"])
@@ -0,0 +1,79 @@
+from django.test import SimpleTestCase
+from contextlib import redirect_stdout
+from itertools import accumulate
+from pathlib import Path
+import gzip
+import io
+import re
+import tempfile
+
+from app.parser import FixedWidthParser
+from app.transformers import BusinessTransformer
+from generar_txt import LARGO_LINEA, WIDTHS, Config, generar_archivo, main
+
+# Valor asegurado (signo o dígito + dígitos), prima y días bien formados
+_NUMERICAS = {5: re.compile(r"\S\d*\s*"), 6: re.compile(r"\d+(\.\d+)?\s*"), 9: re.compile(r"\d*\s*")}
+_INICIO = [0, *accumulate(WIDTHS)]
+
+
+def _cfg(**kw):
+    base = dict(filas=300, semilla=7, fecha="20250529", bloque=64, gzip=False, nivel_gzip=1,
+                tasa_longitud=0.0, tasa_fecha=0.0, tasa_numero=0.0, tasa_acentos=0.0)
+    return Config(**{**base, **kw})
+
+
+class GeneradorTxtTests(SimpleTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _main(self, *argv):
+        with redirect_stdout(io.StringIO()) as out:
+            main(list(argv))
+        return out.getvalue()
+
+    def test_determinista_y_parseable(self):
+        a, b = self.tmp / "A_20250529.txt", self.tmp / "B_20250529.txt"
+        m = generar_archivo(a, _cfg())
+        generar_archivo(b, _cfg(), procesos=2)
+        self.assertEqual(m["filas"], 300)
+        self.assertEqual(a.read_bytes(), b.read_bytes())  # no depende del número de procesos
+        generar_archivo(b, _cfg(semilla=8))
+        self.assertNotEqual(a.read_bytes(), b.read_bytes())
+
+        lineas = a.read_text(encoding="utf-8").splitlines()
+        self.assertEqual({len(l) for l in lineas}, {LARGO_LINEA})
+        t = BusinessTransformer("20250529", a.name)
+        registros = [t.build_record(c) for c in FixedWidthParser(a).iter_rows()]
+        self.assertEqual(len(registros), 300)
+        self.assertTrue(all(r.fecha_venta and r.fecha_venta <= "2025-05-29" for r in registros))
+
+    def test_gzip_y_anomalias(self):
+        plano, comprimido = self.tmp / "P_20250529.txt", self.tmp / "P_20250529.txt.gz"
+        for salida in (plano, comprimido):
+            out = self._main("-n", "500", "--semilla", "3", "--bloque", "100", "-j", "1", "-o", str(salida),
+                             "--tasa-longitud", "0.2", "--tasa-fecha", "0.1", "--tasa-acentos", "0.5")
+            self.assertIn("Archivo generado", out)
+        self.assertEqual(gzip.decompress(comprimido.read_bytes()), plano.read_bytes())
+
+        lineas = plano.read_text(encoding="utf-8").splitlines()
+        malas = sum(len(l) != LARGO_LINEA for l in lineas)
+        self.assertTrue(60 <= malas <= 140, malas)
+        self.assertTrue(any(ch in plano.read_text(encoding="utf-8") for ch in "áéíóú"))
+
+    def test_tasa_numero(self):
+        def corruptas(path):
+            return sum(
+                any(not r.fullmatch(l[_INICIO[c]:_INICIO[c + 1]]) for c, r in _NUMERICAS.items())
+                for l in path.read_text(encoding="utf-8").splitlines()
+            )
+
+        limpio, sucio = self.tmp / "L_20250529.txt", self.tmp / "S_20250529.txt"
+        self._main("-n", "1000", "--semilla", "5", "-j", "1", "-o", str(limpio))
+        self._main("-n", "1000", "--semilla", "5", "-j", "1", "-o", str(sucio), "--tasa-numero", "0.2")
+        self.assertEqual(corruptas(limpio), 0)
+        # ~20% de las líneas con un número malo; "999…9" parece un número, así que se detectan ~6/7 (~171)
+        self.assertTrue(120 <= corruptas(sucio) <= 220, corruptas(sucio))
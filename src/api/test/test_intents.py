@@ -0,0 +1,60 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+from unittest.mock import MagicMock, patch
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+from api import llm_agent
+from api.intents import TELEFONO_PRINCIPAL, reconocer
+from api.models import Registro
+
+
+class ReconocerIntencionTests(TestCase):
+    def test_plantillas(self):
+        c = reconocer("Muéstrame los menores de 18: nombre y teléfono.")
+        self.assertEqual(c.intencion, "edad")
+        self.assertEqual(
+            c.sql,
+            f"SELECT nombre, {TELEFONO_PRINCIPAL} FROM api_registro "
+            "WHERE fecha_nacimiento > CURRENT_DATE - make_interval(years => %s) ORDER BY id DESC LIMIT %s",
+        )
+        self.assertEqual(c.params, [18, 50])
+
+        c = reconocer("Dame los 10 clientes con mayor valor_prima, con nombre y póliza")
+        self.assertEqual((c.intencion, c.params), ("top", [10]))
+        self.assertIn("ORDER BY valor_prima DESC NULLS LAST", c.sql)
+
+        c = reconocer("débitos rechazados en los últimos 30 días")
+        self.assertEqual((c.intencion, c.params), ("rechazados+dias", [30, 50]))
+        self.assertIn("WHERE debito_rechazado AND created_at >=", c.sql)
+
+    def test_sin_match_va_al_agente(self):
+        self.assertIsNone(reconocer("Dame los clientes"))
+        self.assertIsNone(reconocer("clientes menores de 18 que se llamen Ana"))
+        self.assertIsNone(reconocer("top 10 por ciudad"))
+
+
+class RutaRapidaViewTests(TestCase):
+    def setUp(self):
+        llm_agent._cache_sql.limpiar()
+        Registro.objects.create(nombre="Niño", nombre_db="A_20250529.txt", fecha_nacimiento=date(2015, 1, 1),
+                                telefono_2="3001234567", valor_prima=Decimal("5"))
+        Registro.objects.create(nombre="Adulto", nombre_db="A_20250529.txt", fecha_nacimiento=date(1980, 1, 1),
+                                valor_prima=Decimal("9"))
+
+    def test_sin_llamadas_al_llm(self):
+        agent = MagicMock()
+        with patch("api.views.get_agent", return_value=agent):
+            r = APIClient().post("/api/consulta-llm/", {"instruccion": "menores de edad con nombre y telefono"},
+                                 format="json")
+        agent.invoke.assert_not_called()
+        out = r.data["output"]
+        self.assertEqual(out["ruta"], "intencion")
+        self.assertEqual(out["output"]["rows"], [{"nombre": "Niño", "telefono_principal": "3001234567"}])
+
+    def test_contador_entre_hilos(self):
+        antes = llm_agent.estadisticas_cache_nl()["ruta_rapida"]
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: [llm_agent._contar_ruta_rapida() for _ in range(5000)], range(8)))
+        self.assertEqual(llm_agent.estadisticas_cache_nl()["ruta_rapida"], antes + 40000)
@@ -0,0 +1,132 @@
+from django.test import SimpleTestCase
+from pathlib import Path
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import unittest
+
+from app.constants import INTERN_CAMPOS
+from app.parser import FixedWidthParser
+from app.transformers import BusinessTransformer, InternPool
+from generar_txt import Config, generar_archivo
+
+# Muestra que se mide con tracemalloc; el resultado se proyecta a OBJETIVO filas
+FILAS = int(os.environ.get("INTERN_TEST_MUESTRA", "10000"))
+OBJETIVO = 1_000_000
+# Medición real sobre un archivo de N filas, cada variante en su propio proceso
+# (~1.6 GB de TXT y ~2 GB de RAM para 1M):
+#   INTERN_TEST_FILAS=1000000 python manage.py test api.test.test_intern
+FILAS_COMPLETO = int(os.environ.get("INTERN_TEST_FILAS", "0"))
+
+# Bytes que retiene la lista de registros según el RSS del proceso (sin tracemalloc, que a 1M
+# filas pesaría más que los propios registros)
+_SCRIPT_RSS = """
+import gc, os, sys
+from pathlib import Path
+from app.parser import FixedWidthParser
+from app.transformers import BusinessTransformer
+
+def rss():
+    with open("/proc/self/statm") as fh:
+        return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+path = Path(sys.argv[1])
+parser = FixedWidthParser(path)
+t = BusinessTransformer(parser.yyyymmdd, path.name, intern_max=int(sys.argv[2]))
+gc.collect()
+antes = rss()
+records = [t.build_record(cols) for cols in parser.iter_rows()]
+gc.collect()
+print(len(records), rss() - antes)
+"""
+
+
+def _generar(path: Path, filas: int) -> Path:
+    generar_archivo(path, Config(filas=filas, semilla=11, fecha="20250529", bloque=50_000, gzip=False, nivel_gzip=1,
+                                 tasa_longitud=0.0, tasa_fecha=0.0, tasa_numero=0.0, tasa_acentos=0.0), procesos=4)
+    return path
+
+
+def _memoria_retenida(path: Path, intern_max: int, filas: int) -> int:
+    """Bytes que siguen vivos (según tracemalloc) con las primeras ``filas`` del archivo en una lista."""
+    tracemalloc.start()
+    try:
+        parser = FixedWidthParser(path)
+        t = BusinessTransformer(parser.yyyymmdd, path.name, intern_max=intern_max)
+        records = [t.build_record(cols) for cols, _ in zip(parser.iter_rows(), range(filas))]
+        actual, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del records
+    return actual
+
+
+class InternPoolTests(SimpleTestCase):
+    def test_comparte_objetos_y_respeta_el_tope(self):
+        pool = InternPool(max_valores=2)
+        a = pool["".join(["Ca", "li"])]
+        self.assertIs(pool["".join(["Cal", "i"])], a)
+        pool["Pasto"]
+        tercero = "".join(["Tu", "nja"])
+        self.assertIs(pool[tercero], tercero)  # pool lleno: pasa tal cual y no se guarda
+        self.assertEqual((len(pool), "Tunja" in pool), (2, False))
+        self.assertEqual(len(InternPool(0)), 0)
+
+
+class TransformerInternTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = _generar(Path(cls._tmp.name) / "INTERN_20250529.txt", FILAS)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+        super().tearDownClass()
+
+    def _registros(self, intern_max, n=2000):
+        parser = FixedWidthParser(self.path)
+        t = BusinessTransformer(parser.yyyymmdd, self.path.name, intern_max=intern_max)
+        return [t.build_record(cols) for cols, _ in zip(parser.iter_rows(), range(n))]
+
+    def test_mismos_registros_con_menos_copias(self):
+        con, sin = self._registros(4096), self._registros(0)
+        self.assertEqual(con, sin)
+        for campo in INTERN_CAMPOS + ("fecha_entrega_colmena", "mes_a_trabajar", "nombre_db"):
+            valores = [getattr(r, campo) for r in con]
+            self.assertEqual(len({id(v) for v in valores}), len(set(valores)), campo)
+
+    def _proyeccion(self, intern_max: int) -> float:
+        """
+        Bytes a OBJETIVO filas: lo medido con la muestra más lo que cuesta cada fila
+        entre la mitad y el total de la muestra. Mientras los pools siguen creciendo
+        esa pendiente los incluye, así que con internado la proyección es por exceso.
+        """
+        mitad = _memoria_retenida(self.path, intern_max, FILAS // 2)
+        total = _memoria_retenida(self.path, intern_max, FILAS)
+        por_fila = (total - mitad) / (FILAS - FILAS // 2)
+        return total + por_fila * (OBJETIVO - FILAS)
+
+    def test_tracemalloc_reduce_memoria_retenida(self):
+        sin, con = self._proyeccion(0), self._proyeccion(4096)
+        self.assertLess(con, sin * 0.75,
+                        f"{OBJETIVO} filas (proyectado desde {FILAS}): {sin / 2**20:.0f} MB -> {con / 2**20:.0f} MB")
+
+
+@unittest.skipUnless(FILAS_COMPLETO and os.path.exists("/proc/self/statm"), "medición completa: INTERN_TEST_FILAS=N")
+class InternArchivoCompletoTests(SimpleTestCase):
+    def _retenido(self, path: Path, intern_max: int) -> int:
+        src = Path(__file__).resolve().parents[2]
+        out = subprocess.run([sys.executable, "-c", _SCRIPT_RSS, str(path), str(intern_max)],
+                             cwd=src, capture_output=True, text=True, check=True).stdout.split()
+        self.assertEqual(int(out[0]), FILAS_COMPLETO)
+        return int(out[1])
+
+    def test_rss_reduce_memoria_retenida(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = _generar(Path(tmp) / "INTERN_20250529.txt", FILAS_COMPLETO)
+            sin, con = self._retenido(path, 0), self._retenido(path, 4096)
+        self.assertLess(con, sin * 0.75, f"{FILAS_COMPLETO} filas: {sin / 2**20:.0f} MB -> {con / 2**20:.0f} MB")
@@ -0,0 +1,57 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from langchain_core.agents import AgentAction
+from langchain_core.runnables import RunnableLambda
+
+from api import llm_agent
+from api.models import Registro
+
+CARA = "SELECT a.id FROM api_registro a CROSS JOIN api_registro b CROSS JOIN api_registro c"
+BARATA = "SELECT id FROM api_registro ORDER BY id DESC LIMIT 5"
+
+
+class AdmisionPorCostoTests(TestCase):
+    def setUp(self):
+        llm_agent._cache_sql.limpiar()
+        Registro.objects.create(nombre="Ana", nombre_db="A_20250529.txt")
+        # Umbral entre ambas consultas (las estimaciones dependen de las estadísticas de la tabla)
+        cara = llm_agent.resumen_plan(llm_agent._explain(CARA))["costo_total"]
+        barata = llm_agent.resumen_plan(llm_agent._explain(BARATA))["costo_total"]
+        self.assertLess(barata, cara)
+        self.umbral = (cara + barata) / 2
+
+    def test_resumen_plan(self):
+        r = llm_agent.resumen_plan(llm_agent._explain(CARA))
+        self.assertIn("Nested Loop", r["nodos"])
+        self.assertEqual(r["seq_scans"], ["api_registro"])
+        self.assertGreater(r["filas_estimadas"], 100)
+
+    def test_rechazo_devuelve_plan(self):
+        with override_settings(SQL_ADMISSION_MAX_COST=self.umbral, SQL_ADMISSION_MAX_ROWS=0, SQL_ADMISSION_MODE="reject"):
+            r = llm_agent.consultar_sql_json.invoke({"sql": CARA})
+            self.assertFalse(r["ok"])
+            self.assertTrue(r["reintentar"])
+            self.assertGreater(r["plan"]["costo_total"], self.umbral)
+
+            r = llm_agent.consultar_sql_json.invoke({"sql": BARATA})
+            self.assertTrue(r["ok"])
+
+    @override_settings(SQL_ADMISSION_MAX_COST=0, SQL_ADMISSION_MAX_ROWS=100, SQL_ADMISSION_MODE="rewrite",
+                       SQL_TOOL_MAX_ROWS=10)
+    def test_reescritura_con_limit(self):
+        r = llm_agent.consultar_sql_texto.invoke({"sql": CARA})
+        self.assertTrue(r["ok"])
+        self.assertTrue(r["sql_ejecutado"].endswith("LIMIT 11"))
+        self.assertEqual(r["row_count"], 1)
+
+    def test_agente_reintenta_tras_rechazo(self):
+        def decidir(entrada):
+            sql = BARATA if entrada["intermediate_steps"] else CARA
+            return [AgentAction("consultar_sql_json", {"sql": sql}, "")]
+
+        with override_settings(SQL_ADMISSION_MAX_COST=self.umbral, SQL_ADMISSION_MODE="reject"):
+            result = llm_agent.crear_executor(RunnableLambda(decidir)).invoke({"instruccion": "x"})
+        self.assertEqual(len(result["intermediate_steps"]), 2)
+        self.assertTrue(result["intermediate_steps"][0][1]["reintentar"])
+        self.assertTrue(result["output"]["ok"])
+        self.assertEqual(result["output"]["sql"], BARATA)
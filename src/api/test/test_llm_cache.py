@@ -0,0 +1,65 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from unittest.mock import MagicMock, patch
+from decimal import Decimal
+
+from langchain_core.agents import AgentAction
+
+from api import llm_agent
+from api.models import Registro
+
+
+def _agente_sql(sql):
+    """Agente falso que 'resuelve' con consultar_sql_json y el SQL indicado."""
+    obs = llm_agent.consultar_sql_json.invoke({"sql": sql})
+    agent = MagicMock()
+    agent.invoke.return_value = {
+        "instruccion": "x",
+        "output": obs,
+        "intermediate_steps": [(AgentAction("consultar_sql_json", {"sql": sql}, ""), obs)],
+    }
+    return agent
+
+
+@override_settings(LLM_FAST_PATH=False)
+class CacheNLSQLTests(TestCase):
+    def setUp(self):
+        llm_agent.invalidar_cache_nl()
+        for i, prima in enumerate(("10.00", "30.00", "20.00")):
+            Registro.objects.create(nombre=f"C{i}", nombre_db="A_20250529.txt", valor_prima=Decimal(prima))
+        self.client = APIClient()
+
+    def test_normalizacion(self):
+        a = llm_agent.normalizar_instruccion("Top 10 por valor_prima, con PÓLIZA")
+        b = llm_agent.normalizar_instruccion("  top 25 por   valor_prima con poliza. ")
+        self.assertEqual(a[0], b[0])
+        self.assertEqual((a[1], b[1]), (["10"], ["25"]))
+
+    def test_acierto_no_llama_al_llm_y_reparametriza(self):
+        agent = _agente_sql("SELECT nombre FROM api_registro ORDER BY valor_prima DESC LIMIT 2")
+        with patch("api.views.get_agent", return_value=agent):
+            r1 = self.client.post("/api/consulta-llm/", {"instruccion": "Top 2 por valor_prima"}, format="json")
+            r2 = self.client.post("/api/consulta-llm/", {"instruccion": "top 1 por Valor_Prima"}, format="json")
+
+        self.assertEqual(agent.invoke.call_count, 1)
+        self.assertEqual(r1.data["output"]["cache"], "miss")
+        self.assertNotIn("intermediate_steps", r1.data["output"])
+        out = r2.data["output"]
+        self.assertEqual(out["cache"], "hit")
+        self.assertEqual(out["output"]["sql"], "SELECT nombre FROM api_registro ORDER BY valor_prima DESC LIMIT 1")
+        self.assertEqual(out["output"]["rows"], [{"nombre": "C1"}])
+
+        stats = self.client.get("/api/consulta-llm/cache/").data
+        self.assertEqual((stats["hits"], stats["misses"], stats["entradas"]), (1, 1, 1))
+
+    def test_invalidacion_por_cambio_de_esquema(self):
+        agent = _agente_sql("SELECT nombre FROM api_registro ORDER BY id DESC LIMIT 5")
+        with override_settings(LLM_CACHE_SCHEMA_CHECK_S=0), \
+                patch("api.views.get_agent", return_value=agent):
+            self.client.post("/api/consulta-llm/", {"instruccion": "ultimos 5"}, format="json")
+            with patch.object(llm_agent, "_huella_esquema", return_value="otra"):
+                r = self.client.post("/api/consulta-llm/", {"instruccion": "ultimos 5"}, format="json")
+
+        self.assertEqual(r.data["output"]["cache"], "miss")
+        self.assertEqual(agent.invoke.call_count, 2)
@@ -0,0 +1,83 @@
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from decimal import Decimal
+import threading
+import time
+
+from api import llm_agent
+from api.lotes import resolver_lote
+from api.models import Registro
+
+
+class ResolverLoteTests(SimpleTestCase):
+    def test_orden_dedupe_y_concurrencia_acotada(self):
+        lock = threading.Lock()
+        estado = {"en_vuelo": 0, "max": 0, "llamadas": 0}
+
+        def resolver(instr):
+            with lock:
+                estado["en_vuelo"] += 1
+                estado["llamadas"] += 1
+                estado["max"] = max(estado["max"], estado["en_vuelo"])
+            time.sleep(0.05)
+            with lock:
+                estado["en_vuelo"] -= 1
+            return instr.upper()
+
+        instr = [f"consulta {i}" for i in range(6)] + ["Consulta  0.", "consulta 5"]
+        res = resolver_lote(instr, resolver, concurrencia=2)
+
+        self.assertEqual([r["indice"] for r in res], list(range(8)))
+        self.assertEqual(res[3]["result"], "CONSULTA 3")
+        self.assertEqual((res[6]["duplicado_de"], res[6]["result"]), (0, "CONSULTA 0"))
+        self.assertEqual(res[7]["duplicado_de"], 5)
+        self.assertEqual(estado["llamadas"], 6)
+        self.assertEqual(estado["max"], 2)
+
+    def test_timeout_por_item(self):
+        def resolver(instr):
+            if instr == "lenta":
+                time.sleep(0.5)
+            if instr == "falla":
+                raise ValueError("sin datos")
+            return "ok"
+
+        res = resolver_lote(["rapida", "lenta", "falla"], resolver, concurrencia=3, timeout_s=0.1)
+        self.assertTrue(res[0]["ok"])
+        self.assertFalse(res[1]["ok"])
+        self.assertIn("Timeout", res[1]["error"])
+        self.assertEqual(res[2]["error"], "sin datos")
+
+
+@override_settings(LLM_PROVIDER="stub", LLM_FAST_PATH=False)
+class LoteViewModeloLocalTests(TransactionTestCase):
+    databases = {"default", "lectura"}  # fuera de TestCase las herramientas SQL leen del alias de lectura
+
+    def setUp(self):
+        llm_agent._agent = None
+        llm_agent.invalidar_cache_nl()
+        llm_agent._cache_sql.limpiar()
+        for i, prima in enumerate(("10", "30", "20")):
+            Registro.objects.create(nombre=f"C{i}", nombre_db="A_20250529.txt", valor_prima=Decimal(prima))
+
+    def tearDown(self):
+        llm_agent._agent = None
+
+    def test_lote_con_modelo_local(self):
+        r = APIClient().post("/api/consulta-llm/lote/", {"instrucciones": [
+            "top 2 por valor_prima", "Top 2 por valor_prima.", "top 1 por valor_prima",
+        ]}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual((r.data["total"], r.data["unicas"]), (3, 2))
+        res = r.data["resultados"]
+        self.assertEqual([x["nombre"] for x in res[0]["output"]["output"]["rows"]], ["C1", "C2"])
+        self.assertEqual(res[1]["duplicado_de"], 0)
+        self.assertEqual([x["nombre"] for x in res[2]["output"]["output"]["rows"]], ["C1"])
+
+    def test_validacion(self):
+        r = APIClient().post("/api/consulta-llm/lote/", {"instrucciones": []}, format="json")
+        self.assertEqual(r.status_code, 400)
+        with override_settings(LLM_BATCH_MAX_ITEMS=1):
+            r = APIClient().post("/api/consulta-llm/lote/", {"instrucciones": ["a", "b"]}, format="json")
+        self.assertEqual(r.status_code, 400)
@@ -0,0 +1,85 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from pathlib import Path
+import tempfile
+from unittest import mock
+
+from api import llm_agent
+from api.caching import CacheLRU, generacion_datos
+from api.models import GeneracionDatos, Registro
+from api.services import procesar_archivo_y_guardar
+
+LINEA = "CC" + "12345".ljust(15) + "ANA PEREZ".ljust(60)
+
+
+class CacheResultadosSQLTests(TestCase):
+    def setUp(self):
+        llm_agent._cache_sql.limpiar()
+        Registro.objects.create(nombre="Ana", nombre_db="A_20250529.txt")
+
+    def test_mismo_select_no_vuelve_a_la_db(self):
+        r1 = llm_agent.consultar_sql_json.invoke({"sql": "SELECT nombre FROM api_registro"})
+        # Solo se consulta la generación (una por llamada); el SELECT sale de memoria (también para la tool de texto)
+        with self.assertNumQueries(2):
+            r2 = llm_agent.consultar_sql_json.invoke({"sql": "select   nombre\nFROM api_registro;"})
+            r3 = llm_agent.consultar_sql_texto.invoke({"sql": "SELECT nombre FROM api_registro"})
+        self.assertEqual(r1["rows"], r2["rows"])
+        self.assertEqual(r3["text"], "nombre\nAna")
+        # Los literales no se normalizan
+        self.assertNotEqual(llm_agent.normalizar_sql("SELECT 'A  b'"), llm_agent.normalizar_sql("SELECT 'a b'"))
+
+    def test_sql_que_depende_del_reloj_no_se_guarda(self):
+        sql = "SELECT CURRENT_DATE AS hoy, count(*) AS n FROM api_registro"
+        with connection.cursor() as cur:
+            # La fecha de la sesión se "congela" y luego avanza cambiando la zona horaria (UTC-12 -> UTC+14);
+            # TestCase revierte el SET al terminar
+            cur.execute("SET TIME ZONE 'Etc/GMT+12'")
+            antes = llm_agent.consultar_sql_json.invoke({"sql": sql})["rows"][0]["hoy"]
+            cur.execute("SET TIME ZONE 'Etc/GMT-14'")
+            despues = llm_agent.consultar_sql_json.invoke({"sql": sql})["rows"][0]["hoy"]
+        self.assertGreater(despues, antes)
+        self.assertEqual(len(llm_agent._cache_sql), 0)
+        for volatil in ("SELECT nombre FROM api_registro WHERE created_at >= now() - interval '1 day'",
+                        "SELECT EXTRACT(YEAR FROM AGE(fecha_nacimiento)) FROM api_registro",
+                        "SELECT nombre FROM api_registro WHERE fecha_venta = 'today'"):
+            self.assertIsNone(llm_agent._clave_resultado(volatil, None), volatil)
+        self.assertIsNotNone(llm_agent._clave_resultado("SELECT fecha_venta FROM api_registro", None))
+
+    def test_ingesta_invalida(self):
+        sql = "SELECT count(*) AS n FROM api_registro"
+        self.assertEqual(llm_agent.consultar_sql_json.invoke({"sql": sql})["rows"], [{"n": 1}])
+        gen = generacion_datos("api_registro")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            txt = Path(tmp) / "CARGA_20250529.txt"
+            txt.write_text(LINEA + "\n" + LINEA + "\n", encoding="utf-8")
+            with override_settings(MEDIA_ROOT=tmp, EXPORT_DIR=str(Path(tmp) / "out")):
+                insertados = procesar_archivo_y_guardar(str(txt))
+
+        self.assertGreater(generacion_datos("api_registro"), gen)
+        self.assertEqual(llm_agent.consultar_sql_json.invoke({"sql": sql})["rows"], [{"n": 1 + insertados}])
+
+    @mock.patch("api.services.BATCH_SIZE", 2)
+    def test_una_generacion_por_archivo(self):
+        gen = generacion_datos("api_registro")
+        tabla = GeneracionDatos._meta.db_table
+        with tempfile.TemporaryDirectory() as tmp:
+            txt = Path(tmp) / "CARGA_20250529.txt"
+            txt.write_text((LINEA + "\n") * 5, encoding="utf-8")
+            with override_settings(MEDIA_ROOT=tmp, EXPORT_DIR=str(Path(tmp) / "out")), \
+                    CaptureQueriesContext(connection) as q:
+                self.assertEqual(procesar_archivo_y_guardar(str(txt)), 5)  # 3 lotes
+        self.assertEqual(sum(tabla in c["sql"] and c["sql"].startswith("UPDATE") for c in q.captured_queries), 1)
+        self.assertEqual(generacion_datos("api_registro"), gen + 1)
+
+    def test_expulsion_por_bytes(self):
+        c = CacheLRU(max_bytes=100)
+        c.set("a", 1, peso=60)
+        c.set("b", 2, peso=30)
+        c.get("a")                            # "b" pasa a ser el menos usado
+        c.set("c", 3, peso=30)
+        self.assertIsNone(c.get("b"))
+        self.assertEqual((c.get("a"), c.get("c")), (1, 3))
+        self.assertFalse(c.set("d", 4, peso=101))
+        self.assertEqual(c.estadisticas()["bytes"], 90)
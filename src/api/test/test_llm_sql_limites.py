@@ -0,0 +1,34 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from api import llm_agent
+from api.models import Registro
+
+
+@override_settings(SQL_TOOL_MAX_ROWS=3, SQL_TOOL_FETCH_SIZE=2)
+class LimitesSQLTests(TestCase):
+    def setUp(self):
+        llm_agent._cache_sql.limpiar()
+        for i in range(5):
+            Registro.objects.create(nombre=f"C{i}", nombre_db="A_20250529.txt")
+
+    def test_tope_de_filas_json(self):
+        r = llm_agent.consultar_sql_json.invoke({"sql": "SELECT nombre FROM api_registro ORDER BY id"})
+        self.assertTrue(r["ok"])
+        self.assertEqual(r["row_count"], 3)
+        self.assertTrue(r["truncated"])
+        self.assertEqual([x["nombre"] for x in r["rows"]], ["C0", "C1", "C2"])
+
+        r = llm_agent.consultar_sql_json.invoke({"sql": "SELECT nombre FROM api_registro ORDER BY id LIMIT 3"})
+        self.assertFalse(r["truncated"])
+
+    def test_tope_de_filas_texto(self):
+        r = llm_agent.consultar_sql_texto.invoke({"sql": "SELECT nombre FROM api_registro ORDER BY id DESC"})
+        self.assertTrue(r["truncated"])
+        self.assertEqual(r["text"].splitlines(), ["nombre", "C4", "C3", "C2", "... (truncado a 3 filas)"])
+
+    @override_settings(SQL_TOOL_TIMEOUT_MS=50)
+    def test_statement_timeout(self):
+        r = llm_agent.consultar_sql_json.invoke({"sql": "SELECT pg_sleep(1) FROM api_registro"})
+        self.assertFalse(r["ok"])
+        self.assertIn("statement timeout", r["error"])
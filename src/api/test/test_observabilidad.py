@@ -0,0 +1,129 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from io import StringIO
+
+from api import llm_agent, observabilidad
+from api.models import EjecucionSQL, Registro
+from api.observabilidad import analizar_plan, huella_sql, recomendar_indices
+
+
+def _seq_scan(filtro, **extra):
+    return {"Node Type": "Seq Scan", "Relation Name": "api_registro_datos", "Alias": "r", "Filter": filtro,
+            "Total Cost": 100.0, **extra}
+
+
+class AnalisisPlanTests(TestCase):
+    def test_huella_ignora_literales(self):
+        a, _ = huella_sql("SELECT nombre FROM api_registro WHERE ciudad = 'Cali' LIMIT 10")
+        b, norm = huella_sql("select nombre  from api_registro where ciudad = 'Bogotá' limit 20;")
+        self.assertEqual(a, b)
+        self.assertEqual(norm, "select nombre from api_registro where ciudad = ? limit ?")
+
+    def test_columnas_y_recomendaciones(self):
+        # ... WHERE fecha_venta >= ... AND ciudad = 'Cali' ORDER BY valor_prima DESC sobre la vista
+        plan = {"Node Type": "Limit", "Total Cost": 120.0, "Plans": [{
+            "Node Type": "Sort", "Sort Key": ["((((r.valor_prima_centavos)::numeric / 100.0))::numeric(18,2)) DESC"],
+            "Plans": [{
+                "Node Type": "Hash Join", "Hash Cond": "(r.ciudad_id = ciudad.id)",
+                "Plans": [
+                    _seq_scan("(fecha_venta >= '2024-01-01'::date)"),
+                    {"Node Type": "Hash", "Plans": [{
+                        "Node Type": "Index Scan", "Relation Name": "api_dimciudad", "Alias": "ciudad",
+                        "Index Cond": "((valor)::text = 'Cali'::text)",
+                    }]},
+                ],
+            }],
+        }]}
+        a = analizar_plan(plan)
+        self.assertEqual(a["nodos"], ["Limit", "Sort", "Hash Join", "Seq Scan", "Hash", "Index Scan"])
+        self.assertEqual(a["seq_scans"], ["api_registro_datos"])
+        self.assertEqual({(u["columna"], u["uso"]) for u in a["columnas_seq"]},
+                         {("fecha_venta", "rango"), ("ciudad_id", "igualdad"), ("valor_prima_centavos", "orden")})
+
+        trigrama = analizar_plan(_seq_scan("((nombre)::text ~~* '%ana%'::text)"))
+        cubierto = analizar_plan(_seq_scan("(fecha_nacimiento > '2000-01-01'::date)"))  # ya tiene índice
+        recs = recomendar_indices([
+            {"huella": "h1", "total_ms": 50.0, **a},
+            {"huella": "h2", "total_ms": 20.0, **trigrama},
+            {"huella": "h3", "total_ms": 90.0, **cubierto},
+        ])
+        self.assertEqual([r["sql"] for r in recs], [
+            "CREATE INDEX CONCURRENTLY api_registro_datos_ciudad_id_fecha_venta_idx"
+            " ON api_registro_datos (ciudad_id, fecha_venta);",
+            "CREATE INDEX CONCURRENTLY api_registro_datos_nombre_idx"
+            " ON api_registro_datos USING gin (nombre gin_trgm_ops);",
+        ])
+        self.assertEqual(recs[1]["requiere"], "CREATE EXTENSION pg_trgm")
+
+
+class RegistroEjecucionesTests(TestCase):
+    def setUp(self):
+        llm_agent._cache_sql.limpiar()
+        observabilidad._pendientes.clear()
+        Registro.objects.create(nombre="Ana", ciudad="Cali", nombre_db="A_20250529.txt")
+        Registro.objects.create(nombre="Luis", ciudad="Pasto", nombre_db="A_20250529.txt")
+
+    def test_herramientas_registran_y_reportan(self):
+        for ciudad in ("Cali", "Pasto", "Cali"):
+            llm_agent._cache_sql.limpiar()  # los aciertos de caché no llegan a la base ni se registran
+            llm_agent.consultar_sql_json.invoke({"sql": f"SELECT nombre FROM api_registro WHERE ciudad = '{ciudad}'"})
+        with CaptureQueriesContext(connection) as q:
+            llm_agent.consultar_sql_texto.invoke({"sql": "SELECT count(*) FROM api_registro"})
+        # El INSERT no va en la llamada: se difiere hasta vaciar() (fin de la petición)
+        self.assertFalse(any("api_ejecucionsql" in c["sql"] for c in q.captured_queries))
+        self.assertFalse(EjecucionSQL.objects.exists())
+        self.assertEqual(observabilidad.vaciar(), 4)
+
+        ejecuciones = EjecucionSQL.objects.order_by("id")
+        self.assertEqual(ejecuciones.count(), 4)
+        e = ejecuciones.first()
+        self.assertEqual((e.herramienta, e.filas), ("consultar_sql_json", 1))
+        self.assertEqual(e.sql, "select nombre from api_registro where ciudad = ?")  # sin literales
+        self.assertIn("Seq Scan", e.nodos)
+        self.assertEqual(ejecuciones.last().herramienta, "consultar_sql_texto")
+
+        client = APIClient()
+        self.assertIn(client.get("/api/consulta-llm/observabilidad/").status_code, (401, 403))
+        client.force_authenticate(User.objects.create_user("comun", password="x"))
+        self.assertEqual(client.get("/api/consulta-llm/observabilidad/").status_code, 403)
+        client.force_authenticate(User.objects.create_user("staff", password="x", is_staff=True))
+        r = client.get("/api/consulta-llm/observabilidad/?top=5")
+        self.assertEqual(r.status_code, 200)
+        por_huella = {h["huella"]: h for h in r.data["huellas"]}
+        self.assertEqual(por_huella[e.huella]["ejecuciones"], 3)
+        self.assertIn("api_registro_datos (ciudad_id)", r.data["recomendaciones"][0]["sql"])
+
+        out = StringIO()
+        call_command("asesor_indices", stdout=out)
+        self.assertIn("CREATE INDEX CONCURRENTLY api_registro_datos_ciudad_id_idx", out.getvalue())
+
+    @override_settings(SQL_OBSERVABILITY_BATCH=2)
+    def test_lote_lleno_se_inserta(self):
+        for n in range(3):
+            llm_agent.consultar_sql_json.invoke({"sql": f"SELECT nombre FROM api_registro LIMIT {n + 1}"})
+        self.assertEqual(EjecucionSQL.objects.count(), 2)
+        self.assertEqual(len(observabilidad._pendientes), 1)
+
+    @override_settings(SQL_OBSERVABILITY=False)
+    def test_deshabilitada(self):
+        llm_agent.consultar_sql_json.invoke({"sql": "SELECT nombre FROM api_registro"})
+        observabilidad.vaciar()
+        self.assertFalse(EjecucionSQL.objects.exists())
+
+    @override_settings(SQL_OBSERVABILITY_RETENTION_DAYS=30)
+    def test_purga_por_retencion(self):
+        vieja = EjecucionSQL.objects.create(huella="a" * 16, sql="select ?", herramienta="consultar_sql_json",
+                                           duracion_ms=1.0, filas=1)
+        EjecucionSQL.objects.filter(pk=vieja.pk).update(created_at=timezone.now() - timedelta(days=31))
+        EjecucionSQL.objects.create(huella="b" * 16, sql="select ?", herramienta="consultar_sql_json",
+                                    duracion_ms=1.0, filas=1)
+        out = StringIO()
+        call_command("purgar_ejecuciones_sql", stdout=out)
+        self.assertIn("Ejecuciones purgadas: 1", out.getvalue())
+        self.assertEqual(list(EjecucionSQL.objects.values_list("huella", flat=True)), ["b" * 16])
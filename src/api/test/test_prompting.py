@@ -0,0 +1,65 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from unittest.mock import MagicMock, patch
+import os
+import tempfile
+
+from api import llm_agent, prompting
+from api.prompting import construir_prompt, contar_tokens, prompt_completo
+
+
+class ConstruirPromptTests(TestCase):
+    def test_solo_secciones_relevantes(self):
+        p = construir_prompt("débitos rechazados en los últimos 30 días")
+        self.assertEqual(p.reglas, ["rechazados", "dias"])
+        self.assertIn("estado_debito", p.columnas)
+        self.assertIn("WHERE debito_rechazado", p.texto)
+        self.assertNotIn("Reglas de edad", p.texto)
+        self.assertNotIn("Teléfonos:", p.texto)
+        self.assertIn("TABLA: usa SIEMPRE api_registro", p.texto)
+        self.assertLess(p.tokens, contar_tokens(prompt_completo()))
+
+        p = construir_prompt("Muéstrame los menores de edad con su teléfono")
+        self.assertEqual(p.reglas, ["edad", "telefono"])
+        self.assertIn("fecha_nacimiento", p.columnas)
+        self.assertIn("anio_nacimiento", p.columnas)
+        self.assertIn("telefono_principal", p.columnas)
+
+    def test_presupuesto(self):
+        completo = construir_prompt("menores de edad con teléfono y correo", presupuesto=10_000)
+        self.assertEqual(completo.omitidas, [])
+        ajustado = construir_prompt("menores de edad con teléfono y correo", presupuesto=completo.tokens - 40)
+        self.assertLessEqual(ajustado.tokens, ajustado.presupuesto)
+        self.assertTrue(ajustado.omitidas)
+
+    @override_settings(LLM_FAST_PATH=False)
+    def test_agente_recibe_prompt_podado(self):
+        agent = MagicMock()
+        agent.invoke.return_value = {"output": "ok"}
+        llm_agent.consultar_con_cache("clientes de la ciudad Cali", lambda: agent)
+        entrada = agent.invoke.call_args.args[0]
+        self.assertEqual(entrada["instruccion"], "clientes de la ciudad Cali")
+        self.assertIn("ciudad", entrada["sistema"])
+        self.assertNotIn("Reglas de edad", entrada["sistema"])
+
+
+@override_settings(LLM_TOKENIZER="tiktoken")
+class ContarTokensTests(TestCase):
+    def setUp(self):
+        prompting._tiktoken.cache_clear()
+        self.addCleanup(prompting._tiktoken.cache_clear)
+
+    def test_sin_tabla_bpe_no_va_a_la_red(self):
+        with tempfile.TemporaryDirectory() as vacia, patch.dict(os.environ, {"TIKTOKEN_CACHE_DIR": vacia}), \
+                patch("tiktoken.get_encoding", side_effect=AssertionError("descarga")) as get_encoding, \
+                patch("tiktoken.load.read_file", side_effect=AssertionError("descarga")):
+            self.assertEqual(contar_tokens("clientes de Cali"), prompting._contar_aprox("clientes de Cali"))
+        get_encoding.assert_not_called()
+
+    def test_encoder_se_resuelve_una_vez(self):
+        enc = MagicMock()
+        enc.encode.side_effect = lambda texto: texto.split()
+        with patch.object(prompting, "_bpe_en_cache", return_value=True), \
+                patch("tiktoken.get_encoding", return_value=enc) as get_encoding:
+            self.assertEqual([contar_tokens("uno dos"), contar_tokens("uno dos tres")], [2, 3])
+        get_encoding.assert_called_once_with("o200k_base")
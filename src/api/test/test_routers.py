@@ -0,0 +1,82 @@
+from django.db import DatabaseError, connections, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api import llm_agent
+from api.models import Registro
+from api.routers import alias_lectura, solo_lectura
+
+
+class RouterLecturasTests(TransactionTestCase):
+    databases = {"default", "lectura"}
+
+    def setUp(self):
+        llm_agent._cache_sql.limpiar()
+        Registro.objects.create(nombre="Ana", nombre_db="A_20250529.txt")
+
+    def test_ruteo(self):
+        self.assertEqual(Registro.objects.all().db, "default")
+        with solo_lectura() as alias:
+            self.assertEqual(alias, "lectura")
+            self.assertEqual(Registro.objects.all().db, "lectura")
+            # Las escrituras (ingesta incluida) van siempre al primario
+            Registro.objects.create(nombre="Luis", nombre_db="A_20250529.txt")
+            with transaction.atomic():
+                # Con una transacción abierta en el primario se leen sus propias escrituras
+                self.assertEqual(Registro.objects.all().db, "default")
+        with override_settings(DATABASE_READ_ROUTING=False), solo_lectura():
+            self.assertEqual(Registro.objects.all().db, "default")
+        self.assertEqual(Registro.objects.count(), 2)
+
+    def test_herramientas_y_lecturas_en_alias_de_lectura(self):
+        with CaptureQueriesContext(connections["lectura"]) as lectura, \
+                CaptureQueriesContext(connections["default"]) as primario:
+            r = llm_agent.consultar_sql_json.invoke({"sql": "SELECT nombre FROM api_registro"})
+            resp = APIClient().get("/api/registros/ultimos/?limit=5")
+        self.assertEqual(r["rows"], [{"nombre": "Ana"}])
+        self.assertEqual(resp.data["rows"][0]["nombre"], "Ana")
+        leidas = " ".join(q["sql"] for q in lectura.captured_queries)
+        self.assertIn("SELECT nombre FROM api_registro", leidas)
+        self.assertIn('FROM "api_registro" ORDER BY', leidas)
+        # En el primario solo queda el registro de la ejecución (api.observabilidad)
+        self.assertFalse([q for q in primario.captured_queries if q["sql"].startswith("SELECT nombre")])
+
+    def test_transaccion_de_solo_lectura(self):
+        self.assertEqual(alias_lectura(), "lectura")
+        with self.assertRaisesMessage(DatabaseError, "read-only"):
+            llm_agent._leer_acotado("SELECT nextval('api_registro_datos_id_seq')")
+        # Aunque el ruteo esté deshabilitado, la transacción de la herramienta es de solo lectura
+        with override_settings(DATABASE_READ_ROUTING=False), self.assertRaisesMessage(DatabaseError, "read-only"):
+            llm_agent._leer_acotado("SELECT nextval('api_registro_datos_id_seq')")
+        self.assertEqual(Registro.objects.count(), 1)
+
+    @override_settings(DATABASE_READ_ROUTING=False)
+    def test_herramienta_dentro_de_una_transaccion_abierta(self):
+        with transaction.atomic(), connections["default"].cursor() as cur:
+            cur.execute("SHOW statement_timeout")
+            timeout = cur.fetchone()[0]
+            r = llm_agent.consultar_sql_json.invoke(
+                {"sql": "SELECT nextval('api_registro_datos_id_seq') FROM api_registro"})
+            self.assertFalse(r["ok"])
+            self.assertIn("read-only", r["error"])
+            # Ni READ ONLY ni el timeout de la herramienta quedan en la transacción del llamador
+            cur.execute("SHOW transaction_read_only")
+            self.assertEqual(cur.fetchone()[0], "off")
+            cur.execute("SHOW statement_timeout")
+            self.assertEqual(cur.fetchone()[0], timeout)
+            Registro.objects.create(nombre="Luis", nombre_db="A_20250529.txt")
+        self.assertEqual(Registro.objects.count(), 2)
+
+    @override_settings(DATABASE_READ_ROUTING=False)
+    def test_varias_sentencias_no_pasan(self):
+        for sql in ("SELECT nombre FROM api_registro; DELETE\nFROM api_registro",
+                    "SELECT nombre FROM api_registro -- x\n; DELETE FROM api_registro",
+                    "WITH b AS (DELETE\nFROM api_registro RETURNING id) SELECT id FROM b"):
+            self.assertFalse(llm_agent._is_safe_sql(sql), sql)
+            self.assertFalse(llm_agent.consultar_sql_json.invoke({"sql": sql})["ok"], sql)
+        self.assertTrue(llm_agent._is_safe_sql("SELECT nombre FROM api_registro;"))
+        # El EXPLAIN de la admisión corre en la misma transacción de solo lectura que la consulta
+        with self.assertRaisesMessage(DatabaseError, "read-only"):
+            llm_agent._explain("SELECT 1; DELETE FROM api_registro")
+        self.assertEqual(Registro.objects.count(), 1)
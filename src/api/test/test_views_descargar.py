@@ -0,0 +1,73 @@
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from pathlib import Path
+import tempfile
+
+from api.downloads import servir_archivo
+
+
+class DescargarExportViewTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.export_dir = Path(self.tmp.name)
+        (self.export_dir / "X_20250529.csv").write_bytes(b"0123456789abcdef")
+        self.client = APIClient()
+        self.url = "/api/exports/descargar/X_20250529.csv"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _body(self, r) -> bytes:
+        return b"".join(r.streaming_content)
+
+    def test_etag_304(self):
+        with override_settings(EXPORT_DIR=str(self.export_dir)):
+            r = self.client.get(self.url)
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(self._body(r), b"0123456789abcdef")
+            etag = r["ETag"]
+            r2 = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(r2.status_code, 304)
+            r3 = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=r["Last-Modified"])
+            self.assertEqual(r3.status_code, 304)
+
+    def test_rangos(self):
+        with override_settings(EXPORT_DIR=str(self.export_dir)):
+            r = self.client.get(self.url, HTTP_RANGE="bytes=2-5")
+            self.assertEqual(r.status_code, 206)
+            self.assertEqual(r["Content-Range"], "bytes 2-5/16")
+            self.assertEqual(self._body(r), b"2345")
+
+            r = self.client.get(self.url, HTTP_RANGE="bytes=-3")
+            self.assertEqual(self._body(r), b"def")
+
+            r = self.client.get(self.url, HTTP_RANGE="bytes=99-")
+            self.assertEqual(r.status_code, 416)
+
+            # If-Range con ETag viejo => archivo completo
+            r = self.client.get(self.url, HTTP_RANGE="bytes=2-5", HTTP_IF_RANGE='"viejo"')
+            self.assertEqual(r.status_code, 200)
+
+    def test_offload_x_accel(self):
+        with override_settings(EXPORT_DIR=str(self.export_dir), EXPORT_SENDFILE="x-accel",
+                               EXPORT_ACCEL_PREFIX="/protected-exports/"):
+            r = self.client.get(self.url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["X-Accel-Redirect"], "/protected-exports/X_20250529.csv")
+        self.assertEqual(r.content, b"")
+
+    def test_content_disposition_escapado(self):
+        # Comillas y no-ASCII en el nombre: filename*=utf-8'' en las tres ramas (200, 206 y offload)
+        path = self.export_dir / "X_20250529.csv"
+        nombre = 'reporte "Q1" año.csv'
+        esperado = "attachment; filename*=utf-8''reporte%20%22Q1%22%20a%C3%B1o.csv"
+        rf = RequestFactory()
+        self.assertEqual(servir_archivo(rf.get("/"), path, nombre, "text/csv")["Content-Disposition"], esperado)
+        r = servir_archivo(rf.get("/", HTTP_RANGE="bytes=2-5"), path, nombre, "text/csv")
+        self.assertEqual((r.status_code, r["Content-Disposition"]), (206, esperado))
+        with override_settings(EXPORT_DIR=str(self.export_dir), EXPORT_SENDFILE="x-accel",
+                               EXPORT_ACCEL_PREFIX="/protected-exports/"):
+            r = servir_archivo(rf.get("/"), path, nombre, "text/csv")
+        self.assertEqual(r["X-Accel-Redirect"], "/protected-exports/X_20250529.csv")
+        self.assertEqual(r["Content-Disposition"], esperado)
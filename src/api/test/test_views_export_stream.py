@@ -0,0 +1,84 @@
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import override_settings
+from unittest import mock
+from rest_framework.test import APIClient
+from datetime import date
+from decimal import Decimal
+import csv
+import gzip
+import io
+import json
+
+from api.models import Registro
+from api.services import iter_export_registros
+from app.constants import COLUMNS_DB
+
+
+class ExportStreamViewTests(TestCase):
+    def setUp(self):
+        Registro.objects.create(nombre="Ana", nombre_db="A_20250529.txt", valor_prima=Decimal("100.50"),
+                                fecha_nacimiento=date(1990, 1, 2), texto=True, mejor_canal="texto")
+        Registro.objects.create(nombre="Luis", nombre_db="A_20250529.txt")
+        Registro.objects.create(nombre="Eva", nombre_db="B_20250530.txt")
+        self.client = APIClient()
+
+    def _body(self, r) -> bytes:
+        return b"".join(r.streaming_content)
+
+    def test_csv_columnas_y_filtro(self):
+        r = self.client.get("/api/exports/stream/?nombre_db=A_20250529.txt")
+        self.assertEqual(r.status_code, 200)
+        rows = list(csv.reader(io.StringIO(self._body(r).decode("utf-8"))))
+        self.assertEqual(rows[0], COLUMNS_DB)
+        self.assertEqual(len(rows), 3)
+        first = dict(zip(COLUMNS_DB, rows[1]))
+        self.assertEqual(first["nombre"], "Ana")
+        self.assertEqual(first["valor_prima"], "100.50")
+        self.assertEqual(first["fecha_nacimiento"], "1990-01-02")
+        self.assertEqual(first["texto"], "1")
+        self.assertEqual(first["email"], "")
+
+    def test_ndjson_gzip(self):
+        r = self.client.get("/api/exports/stream/?formato=ndjson", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        lines = gzip.decompress(self._body(r)).decode("utf-8").splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(list(json.loads(lines[0]).keys()), COLUMNS_DB)
+
+    def test_filtro_invalido(self):
+        r = self.client.get("/api/exports/stream/?color=rojo")
+        self.assertEqual(r.status_code, 400)
+        r = self.client.get("/api/exports/stream/?creado_desde=ayer")
+        self.assertEqual(r.status_code, 400)
+
+    @mock.patch("api.services.EXPORT_STREAM_FLUSH", 1)
+    @override_settings(EXPORT_STREAM_IDLE_TIMEOUT_MS=4321)
+    def test_cerrar_el_stream_cierra_cursor_y_transaccion(self):
+        qs = Registro.objects.order_by("id")
+        conn = connections[qs.db]
+        antes = len(conn.savepoint_ids)
+        gen = iter_export_registros(qs)
+        next(gen)  # encabezado + primera fila: el cursor con nombre está abierto
+        self.assertEqual(len(conn.savepoint_ids), antes + 1)
+        with conn.cursor() as cur:
+            cur.execute("SHOW idle_in_transaction_session_timeout")
+            self.assertEqual(cur.fetchone()[0], "4321ms")
+            cur.execute("SELECT count(*) FROM pg_cursors WHERE NOT is_holdable")
+            self.assertEqual(cur.fetchone()[0], 1)
+        gen.close()  # cliente desconectado a mitad de la descarga
+        self.assertEqual(len(conn.savepoint_ids), antes)
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM pg_cursors WHERE NOT is_holdable")
+            self.assertEqual(cur.fetchone()[0], 0)
+
+    @mock.patch("api.services.EXPORT_STREAM_FLUSH", 1)
+    def test_respuesta_cerrada_cierra_el_generador(self):
+        conn = connections[Registro.objects.all().db]
+        antes = len(conn.savepoint_ids)
+        r = self.client.get("/api/exports/stream/")
+        next(iter(r.streaming_content))
+        self.assertEqual(len(conn.savepoint_ids), antes + 1)
+        r.close()
+        self.assertEqual(len(conn.savepoint_ids), antes)
@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from datetime import date, datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+import io
+import tempfile
+
+from api.exports import registrar_export
+from api.models import ArchivoExportado
+
+
+class ExportsCatalogoTests(TestCase):
+    def setUp(self):
+        for i, (nombre, fecha) in enumerate([("CLIENTES", date(2025, 5, 29)), ("CLIENTES", date(2025, 5, 30)),
+                                             ("PRUEBA", date(2025, 5, 29))]):
+            for fmt in ("csv", "json"):
+                ArchivoExportado.objects.create(
+                    nombre_archivo=f"{nombre}_{fecha:%Y%m%d}.{fmt}", nombre=nombre, fecha=fecha, formato=fmt,
+                    size=100 * (i + 1), modified=datetime(2025, 6, 1, i, tzinfo=timezone.utc),
+                )
+        self.client = APIClient()
+
+    def test_no_recorre_directorio(self):
+        with patch.object(Path, "glob", side_effect=AssertionError("no debe escanear")):
+            r = self.client.get("/api/exports/")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["total"], 6)
+
+    def test_paginacion_filtros_y_orden(self):
+        r = self.client.get("/api/exports/?page_size=4&page=2&ordering=nombre_archivo")
+        self.assertEqual(r.data["pages"], 2)
+        self.assertEqual(r.data["count"], 2)
+        self.assertEqual([f["name"] for f in r.data["files"]], ["PRUEBA_20250529.csv", "PRUEBA_20250529.json"])
+
+        r = self.client.get("/api/exports/?nombre=clientes&fecha=20250530&formato=csv")
+        self.assertEqual([f["name"] for f in r.data["files"]], ["CLIENTES_20250530.csv"])
+
+        r = self.client.get("/api/exports/?fecha_hasta=2025-05-29&ordering=-size")
+        self.assertEqual(r.data["files"][0]["name"].split(".")[0], "PRUEBA_20250529")
+
+        self.assertEqual(self.client.get("/api/exports/?ordering=hack").status_code, 400)
+        self.assertEqual(self.client.get("/api/exports/?fecha=ayer").status_code, 400)
+
+    def test_catalogar_exports_backfill(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / "VIEJO_20240101.csv").write_text("a\n")
+            (Path(tmp) / "VIEJO_20240101.csv.gz").write_bytes(b"x")
+            with override_settings(EXPORT_DIR=tmp, UPLOAD_DIR=str(Path(tmp) / "uploads")):
+                call_command("catalogar_exports", "--purgar", stdout=io.StringIO())
+        self.assertEqual(list(ArchivoExportado.objects.values_list("nombre_archivo", flat=True)),
+                         ["VIEJO_20240101.csv"])
+        a = ArchivoExportado.objects.get()
+        self.assertEqual((a.nombre, a.fecha, a.encodings), ("VIEJO", date(2024, 1, 1), {"gzip": 1}))
+
+    def test_filtro_por_nombre_usa_el_indice(self):
+        with connection.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+        with self.assertNumQueries(2) as q:  # count y página
+            r = self.client.get("/api/exports/?nombre=Clientes")
+        self.assertEqual(r.data["total"], 4)
+        sql = next(c["sql"] for c in q.captured_queries if "COUNT(*)" in c["sql"])
+        with connection.cursor() as cur:
+            cur.execute("EXPLAIN " + sql)
+            plan = "\n".join(f[0] for f in cur.fetchall())
+        self.assertIn("archivo_nombre_upper_fecha_idx", plan)
+
+    def test_nombre_con_puntos(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for nombre in ("CLIENTES.V2_20250601.csv", "CLIENTES.V2_20250601.json.manifest"):
+                (Path(tmp) / nombre).write_text('{"formato": "json", "bytes": 1, "encodings": {}, "shards": []}')
+                registrar_export(Path(tmp) / nombre)
+        self.assertEqual(
+            list(ArchivoExportado.objects.filter(fecha=date(2025, 6, 1)).order_by("nombre_archivo")
+                 .values_list("nombre", "fecha", "formato")),
+            [("CLIENTES.V2", date(2025, 6, 1), "csv"), ("CLIENTES.V2", date(2025, 6, 1), "json")],
+        )
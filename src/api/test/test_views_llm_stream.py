@@ -0,0 +1,58 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from unittest.mock import patch
+from decimal import Decimal
+import json
+
+from api import llm_agent
+from api.llm_stub import ChatModeloLocal
+from api.models import Registro
+
+
+def _eventos(r):
+    """Parsea el cuerpo text/event-stream en [(evento, data)]."""
+    cuerpo = b"".join(r.streaming_content).decode("utf-8")
+    out = []
+    for bloque in cuerpo.strip().split("\n\n"):
+        campos = dict(linea.split(": ", 1) for linea in bloque.splitlines())
+        out.append((campos["event"], json.loads(campos["data"])))
+    return out
+
+
+@override_settings(SQL_TOOL_FETCH_SIZE=2)
+class ConsultaLLMStreamTests(TestCase):
+    def setUp(self):
+        llm_agent.invalidar_cache_nl()
+        llm_agent._cache_sql.limpiar()
+        for i in range(5):
+            Registro.objects.create(nombre=f"C{i}", nombre_db="A_20250529.txt", valor_prima=Decimal(i))
+        self.client = APIClient()
+
+    def test_ruta_rapida_filas_por_lotes(self):
+        r = self.client.get("/api/consulta-llm/stream/", {"instruccion": "top 5 por valor_prima con nombre"})
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r["Content-Type"].startswith("text/event-stream"))
+        ev = _eventos(r)
+        tipos = [e for e, _ in ev]
+        self.assertEqual(tipos, ["progreso", "herramienta", "columnas", "filas", "filas", "filas", "resumen"])
+        filas = [x["nombre"] for e, d in ev if e == "filas" for x in d["rows"]]
+        self.assertEqual(filas, ["C4", "C3", "C2", "C1", "C0"])
+        self.assertEqual(ev[-1][1]["row_count"], 5)
+        self.assertEqual(ev[-1][1]["ruta"], "intencion")
+
+    @override_settings(LLM_FAST_PATH=False)
+    def test_agente_emite_herramienta_y_sql(self):
+        agente = llm_agent.construir_agente(ChatModeloLocal())
+        # El cuerpo se genera al consumirlo: patch y settings deben seguir activos
+        with self.settings(SQL_TOOL_MAX_ROWS=3), patch("api.views.get_agent", return_value=agente):
+            r = self.client.post("/api/consulta-llm/stream/", {"instruccion": "Dame los clientes"}, format="json")
+            ev = _eventos(r)
+        herramienta = dict(ev)["herramienta"]
+        self.assertEqual(herramienta["tool"], "consultar_sql_json")
+        self.assertIn("FROM api_registro", herramienta["sql"])
+        resumen = ev[-1][1]
+        self.assertEqual((resumen["ruta"], resumen["row_count"], resumen["truncated"]), ("agente", 3, True))
+
+    def test_falta_instruccion(self):
+        self.assertEqual(self.client.post("/api/consulta-llm/stream/", {}, format="json").status_code, 400)
@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+from pathlib import Path
+import csv
+import io
+import json
+import tempfile
+
+from app.constants import COLUMNS_DB
+from app.domain import Record
+from app.writer import OutputWriter, StreamWriter, escribir_json, fila
+
+
+def _records(n):
+    return [Record(nombre=f'Ana "{i}" Pérez\\', ciudad="Bogotá\tD.C.", telefono_1=str(3000000000 + i),
+                   mejor_canal="texto", nombre_db="A_20250529.txt") for i in range(n)]
+
+
+class OutputWriterTests(SimpleTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_misma_salida_que_dictwriter_y_json_dump(self):
+        recs = _records(2500)  # más de un lote
+        esperado_csv = io.StringIO(newline="")
+        w = csv.DictWriter(esperado_csv, fieldnames=COLUMNS_DB)
+        w.writeheader()
+        w.writerows(r.to_dict() for r in recs)
+        esperado_json = json.dumps([r.to_dict() for r in recs], ensure_ascii=False, indent=2)
+
+        OutputWriter.to_csv(recs, self.tmp / "a.csv")
+        OutputWriter.to_json(recs, self.tmp / "a.json")
+        self.assertEqual((self.tmp / "a.csv").read_bytes().decode("utf-8"), esperado_csv.getvalue())
+        self.assertEqual((self.tmp / "a.json").read_text(encoding="utf-8"), esperado_json)
+
+        # Tuplas posicionales y StreamWriter producen lo mismo
+        with StreamWriter(self.tmp / "b.json", "json") as sw:
+            for r in recs:
+                sw.write(fila(r))
+        self.assertEqual((self.tmp / "b.json").read_text(encoding="utf-8"), esperado_json)
+
+        OutputWriter.to_json([], self.tmp / "vacio.json")
+        self.assertEqual((self.tmp / "vacio.json").read_text(encoding="utf-8"), "[]")
+
+    def test_json_compacto(self):
+        recs = _records(3)
+        OutputWriter.to_json(recs, self.tmp / "c.json", compacto=True)
+        texto = (self.tmp / "c.json").read_text(encoding="utf-8")
+        self.assertEqual(json.loads(texto), [r.to_dict() for r in recs])
+        self.assertEqual(len(texto.splitlines()), 5)  # "[", un objeto por línea, "]"
+        self.assertNotIn('": "', texto)
+
+    def test_dicts_conservan_sus_claves(self):
+        buf = io.StringIO()
+        escribir_json([{"nombre": "Ana"}, fila(_records(1)[0])], buf)
+        datos = json.loads(buf.getvalue())
+        self.assertEqual(datos[0], {"nombre": "Ana"})
+        self.assertEqual(list(datos[1]), COLUMNS_DB)
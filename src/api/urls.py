@@ -5,8 +5,14 @@ from .views import (
     ProcesarArchivoPathView,
     UltimosRegistrosView,
     ConsultaLLMView,
+    ConsultaLLMLoteView,
+    ConsultaLLMStreamView,
+    EstadisticasCacheLLMView,
+    ObservabilidadSQLView,
     ListarExportsView,
     DescargarExportView,
+    ExportarRegistrosStreamView,
+    EstadisticasArtefactosView,
 )
 
 from drf_spectacular.views import (
@@ -21,9 +27,15 @@ urlpatterns = [
     path("procesar-archivo/", ProcesarArchivoPathView.as_view(), name="procesar_archivo_path"),
     path("registros/ultimos/", UltimosRegistrosView.as_view(), name="ultimos_registros"),
     path("consulta-llm/", ConsultaLLMView.as_view(), name="consulta_llm"),
+    path("consulta-llm/lote/", ConsultaLLMLoteView.as_view(), name="consulta_llm_lote"),
+    path("consulta-llm/stream/", ConsultaLLMStreamView.as_view(), name="consulta_llm_stream"),
+    path("consulta-llm/cache/", EstadisticasCacheLLMView.as_view(), name="consulta_llm_cache"),
+    path("consulta-llm/observabilidad/", ObservabilidadSQLView.as_view(), name="consulta_llm_observabilidad"),
 
     # Exports
     path("exports/", ListarExportsView.as_view(), name="exports_list"),
+    path("exports/stats/", EstadisticasArtefactosView.as_view(), name="exports_stats"),
+    path("exports/stream/", ExportarRegistrosStreamView.as_view(), name="exports_stream"),
     path("exports/descargar/<str:filename>", DescargarExportView.as_view(), name="exports_download"),
 
     # Swagger/Redoc (sin prefijo extra)
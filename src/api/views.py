@@ -1,13 +1,19 @@
 # src/api/views.py
 from __future__ import annotations
 
+from datetime import date, datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional
+import json
 import mimetypes
+import uuid
 from time import time as _now
 
 from django.conf import settings
-from django.http import FileResponse, Http404
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Value
+from django.db.models.functions import Upper
+from django.http import Http404, StreamingHttpResponse
 from django.utils.http import http_date
 
 from rest_framework import status, serializers, permissions
@@ -21,10 +27,32 @@ from drf_spectacular.utils import (
     OpenApiExample,
     inline_serializer,
 )
-
-from .models import Registro
-from .services import procesar_archivo_y_guardar
-from .llm_agent import get_agent  # 👈 getter lazy
+from drf_spectacular.types import OpenApiTypes
+
+from .models import Registro, ArchivoExportado, Artefacto
+from .artifacts import ArchivoConHash, aplicar_presupuesto, en_uso, estadisticas, publicar, registrar_acceso
+from .services import (
+    procesar_archivo_y_guardar,
+    filtrar_registros,
+    iter_export_registros,
+    EXPORT_FILTROS,
+    EXPORT_FORMATOS,
+)
+from .downloads import es_descarga_nueva, servir_archivo
+from .exports import (
+    calidad, elegir_variante, es_manifiesto, leer_manifiesto, manifiesto_path, parse_accept_encoding,
+)
+from .llm_agent import (  # 👈 getter lazy
+    get_agent,
+    consultar_con_cache,
+    eventos_consulta,
+    estadisticas_cache_nl,
+    estadisticas_cache_sql,
+)
+from .lotes import resolver_lote
+from .observabilidad import reporte as reporte_sql
+from .prompting import estadisticas_prompt
+from .routers import alias_lectura, solo_lectura
 from app.parser import normalize_filename
 
 
@@ -37,6 +65,22 @@ def _upload_dir() -> Path:
     return upload_dir
 
 
+def _acepta_gzip(request) -> bool:
+    """True si el cliente anuncia gzip en Accept-Encoding (y no con q=0)."""
+    return calidad(parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", "")), "gzip") > 0
+
+
+def _parse_fecha(s: str) -> Optional[date]:
+    """Acepta YYYYMMDD o YYYY-MM-DD."""
+    s = (s or "").strip()
+    for fmt in ("%Y%m%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
 def _serialize_registro(r: Registro) -> Dict[str, Any]:
     return {
         "id": r.id,
@@ -96,6 +140,8 @@ class ExportsSerializer(serializers.Serializer):
     csv_path = serializers.CharField(required=False, allow_null=True)
     json_url = serializers.CharField(required=False, allow_null=True)
     csv_url = serializers.CharField(required=False, allow_null=True)
+    sizes = serializers.DictField(required=False)
+    shards = serializers.DictField(child=serializers.IntegerField(), required=False)
 
 
 class UploadRequestSerializer(serializers.Serializer):
@@ -140,22 +186,68 @@ class ConsultaLLMResponseSerializer(serializers.Serializer):
     output = serializers.DictField(required=False)
 
 
+class ConsultaLLMLoteRequestSerializer(serializers.Serializer):
+    instrucciones = serializers.ListField(child=serializers.CharField(), allow_empty=False,
+                                          help_text="Instrucciones en lenguaje natural.")
+
+
+class ConsultaLLMLoteItemSerializer(serializers.Serializer):
+    indice = serializers.IntegerField()
+    instruccion = serializers.CharField()
+    ok = serializers.BooleanField()
+    output = serializers.DictField(required=False)
+    error = serializers.CharField(required=False)
+    duracion_ms = serializers.FloatField()
+    duplicado_de = serializers.IntegerField(required=False)
+
+
+class ConsultaLLMLoteResponseSerializer(serializers.Serializer):
+    ok = serializers.BooleanField()
+    total = serializers.IntegerField()
+    unicas = serializers.IntegerField()
+    resultados = serializers.ListField(child=ConsultaLLMLoteItemSerializer())
+
+
 class FileMetaSerializer(serializers.Serializer):
     name = serializers.CharField()
+    nombre = serializers.CharField()
+    fecha = serializers.DateField(allow_null=True)
     size = serializers.IntegerField()
     modified = serializers.CharField()
+    encodings = serializers.DictField(child=serializers.IntegerField(), required=False)
+    shards = serializers.IntegerField(help_text="0 = un solo archivo; >0 = download_url entrega el manifiesto.")
     download_url = serializers.CharField()
 
 
 class ListExportsResponseSerializer(serializers.Serializer):
     ok = serializers.BooleanField()
     count = serializers.IntegerField()
+    total = serializers.IntegerField()
+    page = serializers.IntegerField()
+    page_size = serializers.IntegerField()
+    pages = serializers.IntegerField()
     files = serializers.ListField(child=FileMetaSerializer())
 
 
 # --------------------------
 # Vistas
 # --------------------------
+def _salida_agente(result: Any) -> Dict[str, Any]:
+    if isinstance(result, str):
+        return {"text": result}
+    if isinstance(result, dict):
+        return result
+    return {"result": str(result)}
+
+
+class SoloLecturaMixin:
+    """Las lecturas del ORM de la vista van al alias de lectura (ver api.routers)."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with solo_lectura():
+            return super().dispatch(request, *args, **kwargs)
+
+
 class ProcesarArchivoUploadView(APIView):
     """
     Sube un archivo, normaliza el nombre a NOMBRE_YYYYMMDD.txt y procesa.
@@ -187,19 +279,26 @@ class ProcesarArchivoUploadView(APIView):
             return Response({"detail": f"Error normalizando nombre: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
         dest_path = upload_dir / normalized_name
-        with dest_path.open("wb+") as dst:
-            for chunk in file_obj.chunks():
-                dst.write(chunk)
-
-        try:
-            insertados = procesar_archivo_y_guardar(
-                str(dest_path),
-                yyyymmdd_override=fecha,
-                original_name=file_obj.name,
-            )
-        except Exception as e:
-            return Response({"detail": f"Error procesando archivo: {e}"}, status=status.HTTP_400_BAD_REQUEST)
-
+        # Temporal propio de la petición: dos uploads con el mismo nombre no escriben el mismo archivo
+        tmp_path = upload_dir / f".{normalized_name}.{uuid.uuid4().hex}.tmp"
+        # El upload no se expulsa (ni aquí ni en otra petición) hasta terminar de procesarlo
+        with en_uso((Artefacto.TIPO_UPLOAD, dest_path.name)):
+            with ArchivoConHash(tmp_path.open("wb")) as dst:
+                for chunk in file_obj.chunks():
+                    dst.write(chunk)
+            # Dedup por contenido: un upload idéntico a otro queda como hardlink
+            publicar(tmp_path, dest_path, dst.hexdigest, dst.size, Artefacto.TIPO_UPLOAD)
+
+            try:
+                insertados = procesar_archivo_y_guardar(
+                    str(dest_path),
+                    yyyymmdd_override=fecha,
+                    original_name=file_obj.name,
+                )
+            except Exception as e:
+                return Response({"detail": f"Error procesando archivo: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+            aplicar_presupuesto()
         outs = getattr(procesar_archivo_y_guardar, "_last_outputs", {})
         return Response(
             {"ok": True, "saved_as": str(dest_path), "insertados": insertados, "exports": outs},
@@ -246,7 +345,7 @@ class ProcesarArchivoPathView(APIView):
         return Response({"ok": True, "insertados": insertados, "exports": outs}, status=status.HTTP_200_OK)
 
 
-class UltimosRegistrosView(APIView):
+class UltimosRegistrosView(SoloLecturaMixin, APIView):
     """
     Devuelve los últimos N registros insertados.
     """
@@ -302,73 +401,355 @@ class ConsultaLLMView(APIView):
             return Response({"detail": "Falta 'instruccion' (string)."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            result = get_agent().invoke({"instruccion": instr})
+            result = consultar_con_cache(instr, get_agent)
         except Exception as e:
             return Response({"ok": False, "detail": f"Error ejecutando el agente: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
-        if isinstance(result, str):
-            payload: Dict[str, Any] = {"ok": True, "instruccion": instr, "output": {"text": result}}
-        elif isinstance(result, dict):
-            payload = {"ok": True, "instruccion": instr, "output": result}
-        else:
-            payload = {"ok": True, "instruccion": instr, "output": {"result": str(result)}}
-
+        payload: Dict[str, Any] = {"ok": True, "instruccion": instr, "output": _salida_agente(result)}
         return Response(payload, status=status.HTTP_200_OK)
 
 
-class ListarExportsView(APIView):
+def _sse(instr: str) -> Iterator[str]:
+    """Serializa los eventos de eventos_consulta en formato text/event-stream."""
+    try:
+        for evento, data in eventos_consulta(instr, get_agent):
+            yield f"event: {evento}\ndata: {json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'detail': f'Error ejecutando el agente: {e}'}, ensure_ascii=False)}\n\n"
+
+
+class ConsultaLLMStreamView(APIView):
+    """
+    Igual que /api/consulta-llm/ pero como Server-Sent Events: progreso del agente
+    (herramienta elegida, SQL generado), filas por lotes a medida que salen del
+    cursor y al final un evento ``resumen``. POST con JSON o GET ?instruccion= (EventSource).
+    """
+    parser_classes = (JSONParser,)
+    permission_classes = (permissions.AllowAny,)
+
+    def _responder(self, instr: Any):
+        if not instr or not isinstance(instr, str):
+            return Response({"detail": "Falta 'instruccion' (string)."}, status=status.HTTP_400_BAD_REQUEST)
+        resp = StreamingHttpResponse(_sse(instr), content_type="text/event-stream; charset=utf-8")
+        resp["Cache-Control"] = "no-cache"
+        resp["X-Accel-Buffering"] = "no"  # que Nginx no acumule el stream
+        return resp
+
+    @extend_schema(
+        tags=["Consultas"],
+        parameters=[OpenApiParameter(name="instruccion", required=True, type=str, location=OpenApiParameter.QUERY)],
+        responses={(200, "text/event-stream"): OpenApiTypes.STR},
+    )
+    def get(self, request, *args, **kwargs):
+        return self._responder(request.query_params.get("instruccion"))
+
+    @extend_schema(
+        tags=["Consultas"],
+        request=ConsultaLLMRequestSerializer,
+        responses={(200, "text/event-stream"): OpenApiTypes.STR},
+    )
+    def post(self, request, *args, **kwargs):
+        return self._responder(request.data.get("instruccion"))
+
+
+class ConsultaLLMLoteView(APIView):
+    """
+    Resuelve una lista de instrucciones en paralelo (concurrencia acotada por
+    LLM_BATCH_CONCURRENCY y timeout por instrucción LLM_BATCH_TIMEOUT_S).
+    Las instrucciones repetidas se resuelven una sola vez; los resultados
+    vuelven en el mismo orden que las instrucciones.
+    """
+    parser_classes = (JSONParser,)
+    permission_classes = (permissions.AllowAny,)
+
+    @extend_schema(
+        tags=["Consultas"],
+        request=ConsultaLLMLoteRequestSerializer,
+        responses={200: ConsultaLLMLoteResponseSerializer},
+        examples=[
+            OpenApiExample(
+                "Ejemplo: reporte",
+                value={"instrucciones": ["menores de 18 con nombre y teléfono", "top 10 por valor_prima"]},
+                request_only=True,
+            ),
+        ],
+    )
+    def post(self, request, *args, **kwargs):
+        ser = ConsultaLLMLoteRequestSerializer(data=request.data)
+        if not ser.is_valid():
+            return Response({"detail": ser.errors}, status=status.HTTP_400_BAD_REQUEST)
+        instrucciones = ser.validated_data["instrucciones"]
+        maximo = int(getattr(settings, "LLM_BATCH_MAX_ITEMS", 100))
+        if len(instrucciones) > maximo:
+            return Response({"detail": f"Máximo {maximo} instrucciones por lote."}, status=status.HTTP_400_BAD_REQUEST)
+
+        resultados = resolver_lote(
+            instrucciones,
+            lambda instr: consultar_con_cache(instr, get_agent),
+            concurrencia=int(getattr(settings, "LLM_BATCH_CONCURRENCY", 4)),
+            timeout_s=float(getattr(settings, "LLM_BATCH_TIMEOUT_S", 90)) or None,
+        )
+        for item in resultados:
+            if "result" in item:
+                item["output"] = _salida_agente(item.pop("result"))
+
+        return Response({
+            "ok": True,
+            "total": len(resultados),
+            "unicas": sum(1 for r in resultados if "duplicado_de" not in r),
+            "resultados": resultados,
+        }, status=status.HTTP_200_OK)
+
+
+class ListarExportsView(SoloLecturaMixin, APIView):
     """
     Lista los archivos exportados (CSV/JSON) disponibles para descarga.
+    Lee el catálogo (ArchivoExportado); nunca recorre EXPORT_DIR. Un export
+    partido aparece una vez (su manifiesto) con el total de bytes y de shards.
     """
     permission_classes = (permissions.AllowAny,)
 
+    ORDENES = ("nombre_archivo", "nombre", "fecha", "size", "modified")
+
     @extend_schema(
         tags=["Exports"],
+        parameters=[
+            OpenApiParameter(name="nombre", description="NOMBRE exacto (sin distinguir mayúsculas).",
+                             required=False, type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name="fecha", description="YYYYMMDD o YYYY-MM-DD.",
+                             required=False, type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name="fecha_desde", required=False, type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name="fecha_hasta", required=False, type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name="formato", description="csv / json.",
+                             required=False, type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name="ordering", description="nombre_archivo, nombre, fecha, size o modified "
+                             "(prefijo '-' = descendente). Default -modified.",
+                             required=False, type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name="page", description="Página (desde 1).",
+                             required=False, type=int, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name="page_size", description="Filas por página (1–500). Default 50.",
+                             required=False, type=int, location=OpenApiParameter.QUERY),
+        ],
         responses={200: ListExportsResponseSerializer},
     )
     def get(self, request, *args, **kwargs):
-        out_dir = Path(settings.EXPORT_DIR)
-        out_dir.mkdir(parents=True, exist_ok=True)
-        files = []
-        for p in sorted(out_dir.glob("*")):
-            if p.is_file():
-                stat = p.stat()
-                files.append({
-                    "name": p.name,
-                    "size": stat.st_size,
-                    "modified": http_date(stat.st_mtime),
-                    "download_url": request.build_absolute_uri(
-                        f"/api/exports/descargar/{p.name}"
-                    ),
-                })
-        return Response({"ok": True, "count": len(files), "files": files}, status=200)
+        qp = request.query_params
+        qs = ArchivoExportado.objects.all()
+
+        if qp.get("nombre"):
+            # Misma expresión que el índice archivo_nombre_upper_fecha_idx (iexact no lo usaría)
+            qs = qs.alias(nombre_upper=Upper("nombre")).filter(nombre_upper=Upper(Value(qp["nombre"])))
+        if qp.get("formato"):
+            qs = qs.filter(formato=qp["formato"].lower())
+        for param, lookup in (("fecha", "fecha"), ("fecha_desde", "fecha__gte"), ("fecha_hasta", "fecha__lte")):
+            if qp.get(param):
+                d = _parse_fecha(qp[param])
+                if d is None:
+                    return Response({"detail": f"'{param}' debe ser YYYYMMDD o YYYY-MM-DD."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                qs = qs.filter(**{lookup: d})
+
+        ordering = qp.get("ordering", "-modified")
+        if ordering.lstrip("-") not in self.ORDENES:
+            return Response({"detail": f"'ordering' debe ser uno de: {', '.join(self.ORDENES)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        qs = qs.order_by(ordering, "id")
+
+        try:
+            page = max(1, int(qp.get("page", 1)))
+        except ValueError:
+            page = 1
+        try:
+            page_size = int(qp.get("page_size", 50))
+        except ValueError:
+            page_size = 50
+        page_size = max(1, min(page_size, 500))
+
+        total = qs.count()
+        inicio = (page - 1) * page_size
+        files = [
+            {
+                "name": a.nombre_archivo,
+                "nombre": a.nombre,
+                "fecha": a.fecha.isoformat() if a.fecha else None,
+                "size": a.size,
+                "modified": http_date(a.modified.timestamp()),
+                "encodings": a.encodings,
+                "shards": a.shards,
+                "download_url": request.build_absolute_uri(
+                    f"/api/exports/descargar/{a.nombre_archivo}"
+                ),
+            }
+            for a in qs[inicio:inicio + page_size]
+        ]
+        return Response({
+            "ok": True,
+            "count": len(files),
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "pages": (total + page_size - 1) // page_size,
+            "files": files,
+        }, status=200)
 
 
 class DescargarExportView(APIView):
     """
     Descarga un archivo exportado por nombre.
+    Soporta ETag/Last-Modified (304), rangos de bytes (206), variantes
+    precomprimidas según Accept-Encoding y offload al servidor frontal
+    (X-Accel-Redirect / X-Sendfile).
+
+    Si el export está partido en shards, pedirlo por su nombre (o por
+    NOMBRE.ext.manifest) entrega el manifiesto JSON: cada shard se descarga
+    luego por su nombre, en paralelo y con Range si hace falta.
     """
     permission_classes = (permissions.AllowAny,)
 
     @extend_schema(
         tags=["Exports"],
         parameters=[OpenApiParameter(name="filename", required=True, type=str, location=OpenApiParameter.PATH)],
-        responses={200: {"content": {"application/octet-stream": {}}}},
+        responses={
+            200: {"content": {"application/octet-stream": {}}},
+            206: {"content": {"application/octet-stream": {}}},
+            304: None,
+            406: None,
+            416: None,
+        },
     )
     def get(self, request, filename: str, *args, **kwargs):
         safe = Path(filename).name  # evita path traversal
         p = Path(settings.EXPORT_DIR) / safe
+        if not p.is_file() and manifiesto_path(p).is_file():
+            p = manifiesto_path(p)
         if not p.exists() or not p.is_file():
             raise Http404("Archivo no encontrado")
 
-        ctype, _ = mimetypes.guess_type(p.name)
-        resp = FileResponse(
-            p.open("rb"),
-            as_attachment=True,
-            filename=p.name,
-            content_type=ctype or "application/octet-stream",
-        )
-        resp["Last-Modified"] = http_date(p.stat().st_mtime)
+        if es_manifiesto(p):
+            headers = {"X-Export-Shards": str(len(leer_manifiesto(p)["shards"]))}
+            return self._contar(request, p, servir_archivo(request, p, p.name, "application/json", headers=headers))
+        ctype, enc = mimetypes.guess_type(p.name)
+        if enc:
+            # Descarga directa de una variante (.gz/.zst): se entrega tal cual
+            ctype = {"gzip": "application/gzip"}.get(enc, "application/octet-stream")
+
+        # Negociación: se sirve la variante precomprimida que prefiera el cliente
+        accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        servido, encoding = elegir_variante(p, accept_encoding)
+        if not encoding and calidad(parse_accept_encoding(accept_encoding), "identity") <= 0:
+            # "identity;q=0" o "*;q=0" sin una variante aceptable
+            return Response({"detail": "Ninguna codificación aceptable para este archivo."},
+                            status=status.HTTP_406_NOT_ACCEPTABLE, headers={"Vary": "Accept-Encoding"})
+        headers = {"X-Generated-At": http_date(_now()), "Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return self._contar(request, p, servir_archivo(
+            request, servido, p.name, ctype or "application/octet-stream",
+            headers=headers, variante=encoding,
+        ))
+
+    @staticmethod
+    def _contar(request, p: Path, resp):
+        # Hit y orden LRU solo por descargas reales: ni 304 ni los rangos que siguen al primero
+        if es_descarga_nueva(request, resp):
+            registrar_acceso(Artefacto.TIPO_EXPORT, p.name)
+        return resp
+
+
+class ExportarRegistrosStreamView(SoloLecturaMixin, APIView):
+    """
+    Exporta en streaming (CSV/NDJSON) un subconjunto filtrado de api_registro,
+    leyendo con un cursor del lado del servidor (memoria constante).
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    @extend_schema(
+        tags=["Exports"],
+        parameters=[
+            OpenApiParameter(name="formato", description="csv (default) o ndjson.",
+                             required=False, type=str, location=OpenApiParameter.QUERY),
+        ] + [
+            OpenApiParameter(name=f, required=False, type=str, location=OpenApiParameter.QUERY)
+            for f in EXPORT_FILTROS
+        ],
+        responses={200: {"content": {"text/csv": {}, "application/x-ndjson": {}}}},
+    )
+    def get(self, request, *args, **kwargs):
+        formato = request.query_params.get("formato", "csv").lower()
+        if formato not in EXPORT_FORMATOS:
+            return Response({"detail": "El campo 'formato' debe ser csv o ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+        filtros = {k: v for k, v in request.query_params.items() if k != "formato"}
+        try:
+            # El stream se consume fuera de dispatch: se fija el alias de lectura en el queryset
+            qs = filtrar_registros(filtros).using(alias_lectura())
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        comprimir = _acepta_gzip(request)
+        ctype = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson; charset=utf-8"
+        resp = StreamingHttpResponse(iter_export_registros(qs, formato, comprimir=comprimir), content_type=ctype)
+        resp["Content-Disposition"] = f'attachment; filename="registros.{formato}"'
         resp["Cache-Control"] = "no-store"
+        resp["Vary"] = "Accept-Encoding"
         resp["X-Generated-At"] = http_date(_now())
+        if comprimir:
+            resp["Content-Encoding"] = "gzip"
         return resp
+
+
+class EstadisticasArtefactosView(SoloLecturaMixin, APIView):
+    """
+    Uso de disco del almacén de artefactos (uploads + exports), ahorro por
+    deduplicación, presupuesto configurado y descargas por archivo.
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    @extend_schema(tags=["Exports"], responses={200: serializers.DictField()})
+    def get(self, request, *args, **kwargs):
+        return Response({"ok": True, **estadisticas()}, status=status.HTTP_200_OK)
+
+
+class EstadisticasCacheLLMView(SoloLecturaMixin, APIView):
+    """
+    Métricas de la caché NL->SQL que atiende /api/consulta-llm/ sin pasar por el LLM
+    y de la caché de resultados de las herramientas SQL (``resultados_sql``),
+    más el tamaño medio del prompt podado que se envía al modelo (``prompt``).
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    @extend_schema(tags=["Consultas"], responses={200: serializers.DictField()})
+    def get(self, request, *args, **kwargs):
+        return Response(
+            {"ok": True, **estadisticas_cache_nl(), "resultados_sql": estadisticas_cache_sql(),
+             "prompt": estadisticas_prompt()},
+            status=status.HTTP_200_OK,
+        )
+
+
+class ObservabilidadSQLView(SoloLecturaMixin, APIView):
+    """
+    Huellas de SQL del agente con más tiempo total en base (ejecuciones, duración,
+    filas, nodos del plan) y los índices que eliminarían sus Seq Scan sobre api_registro.
+    Solo para staff: describe qué consulta el agente y el esquema de la base.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    @extend_schema(
+        tags=["Consultas"],
+        parameters=[
+            OpenApiParameter(name="top", description="Cantidad de huellas (1–100). Default 10.",
+                             required=False, type=int, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name="horas", description="Solo ejecuciones de las últimas N horas.",
+                             required=False, type=float, location=OpenApiParameter.QUERY),
+        ],
+        responses={200: serializers.DictField()},
+    )
+    def get(self, request, *args, **kwargs):
+        try:
+            top = int(request.query_params.get("top", 10))
+            horas = float(request.query_params["horas"]) if request.query_params.get("horas") else None
+        except ValueError:
+            return Response({"detail": "'top' y 'horas' deben ser numéricos."}, status=status.HTTP_400_BAD_REQUEST)
+        top = max(1, min(top, 100))
+        return Response({"ok": True, **reporte_sql(top=top, horas=horas)}, status=status.HTTP_200_OK)
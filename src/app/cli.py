@@ -1,30 +1,230 @@
 from __future__ import annotations
 import argparse
+import glob
+import multiprocessing as mp
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import List
+from queue import Empty
+from typing import Callable, Dict, List, Optional
+from .constants import FILENAME_RE
 from .parser import FixedWidthParser
 from .transformers import BusinessTransformer
-from .writer import OutputWriter
+from .writer import FORMATOS, StreamWriter, combinar_partes, fila
 
-def run_cli() -> None:
+AVISO_CADA = 20_000  # filas entre avisos de progreso de cada archivo
+
+
+def expandir_entradas(entradas: List[str]) -> List[Path]:
+    """Archivos, globs o carpetas (de ellas, solo NOMBRE_YYYYMMDD.txt) -> rutas únicas ordenadas."""
+    vistos: Dict[Path, None] = {}
+    for e in entradas:
+        p = Path(e)
+        if p.is_dir():
+            hallados = [h for h in sorted(p.iterdir()) if h.is_file() and FILENAME_RE.match(h.name)]
+        elif glob.has_magic(e):
+            hallados = [Path(h) for h in sorted(glob.glob(e, recursive=True)) if Path(h).is_file()]
+        else:
+            hallados = [p]
+        for h in hallados:
+            vistos.setdefault(h.resolve(), None)
+    return list(vistos)
+
+
+def nombres_salida(archivos: List[Path]) -> List[str]:
+    """
+    Nombre base de la salida de cada archivo. Una sola entrada conserva el nombre de
+    siempre (``salida``); con varias se usa el stem y, si se repite (el mismo nombre en
+    otra carpeta), se le agrega ``_2``, ``_3``... en el orden de las entradas.
+    """
+    if len(archivos) == 1:
+        return ["salida"]
+    usados: Dict[str, int] = {}
+    nombres = []
+    for p in archivos:
+        n = usados[p.stem] = usados.get(p.stem, 0) + 1
+        nombres.append(p.stem if n == 1 else f"{p.stem}_{n}")
+    return nombres
+
+
+def _rss_pico_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def procesar_archivo(
+    path: Path,
+    destinos: Dict[str, Path],
+    fecha: Optional[str] = None,
+    parte: bool = False,
+    avisar: Optional[Callable[[str, int], None]] = None,
+    compacto: bool = False,
+) -> Dict[str, object]:
+    """Parser -> transformer -> writers en streaming: la memoria no crece con el archivo."""
+    t0 = time.perf_counter()
+    parser = FixedWidthParser(path, yyyymmdd=fecha)
+    transformer = BusinessTransformer(parser.yyyymmdd, path.name)
+    writers = [StreamWriter(p, fmt, parte=parte, compacto=compacto) for fmt, p in destinos.items()]
+    filas = 0
+    try:
+        for cols in parser.iter_rows():
+            rec = fila(transformer.build_record(cols))  # una sola tupla para todos los formatos
+            for w in writers:
+                w.write(rec)
+            filas += 1
+            if avisar and filas % AVISO_CADA == 0:
+                avisar(path.name, AVISO_CADA)
+    finally:
+        for w in writers:
+            w.close()
+    if avisar and filas % AVISO_CADA:
+        avisar(path.name, filas % AVISO_CADA)
+    dt = time.perf_counter() - t0
+    return {
+        "archivo": path.name,
+        "filas": filas,
+        "segundos": round(dt, 3),
+        "filas_por_s": round(filas / dt, 1) if dt else 0.0,
+        "rss_pico_mb": _rss_pico_mb(),
+        "salidas": {fmt: str(p) for fmt, p in destinos.items()},
+    }
+
+
+# --------------------------
+# Workers (procesos): cada archivo en un proceso nuevo, así el RSS pico es el de ese archivo
+# --------------------------
+_cola = None
+
+
+def _init_worker(cola) -> None:
+    global _cola
+    _cola = cola
+
+
+def _procesar_en_worker(path: Path, destinos: Dict[str, Path], fecha: Optional[str], parte: bool, compacto: bool):
+    return procesar_archivo(path, destinos, fecha, parte, avisar=lambda nombre, n: _cola.put(n), compacto=compacto)
+
+
+class Progreso:
+    """Línea de progreso en stderr (se reescribe solo si es una terminal)."""
+    def __init__(self, total_archivos: int, activo: bool = True):
+        self.total = total_archivos
+        self.hechos = 0
+        self.filas = 0
+        self.t0 = time.perf_counter()
+        self.activo = activo and sys.stderr.isatty()
+
+    def sumar(self, n: int) -> None:
+        self.filas += n
+        self.pintar()
+
+    def pintar(self) -> None:
+        if not self.activo:
+            return
+        dt = time.perf_counter() - self.t0
+        sys.stderr.write(f"\r⏳ {self.hechos}/{self.total} archivos · {self.filas:,} filas · "
+                         f"{self.filas / dt if dt else 0:,.0f} filas/s   ")
+        sys.stderr.flush()
+
+    def archivo_listo(self, res: Dict[str, object]) -> None:
+        self.hechos += 1
+        if self.activo:
+            sys.stderr.write("\r\033[K")
+        pico = f"{res['rss_pico_mb']} MB" if res["rss_pico_mb"] is not None else "n/d"
+        print(f"✅ [{self.hechos}/{self.total}] {res['archivo']}: {res['filas']:,} filas en {res['segundos']}s "
+              f"({res['filas_por_s']:,.0f} filas/s, memoria pico {pico})")
+        self.pintar()
+
+
+def run_cli(argv: Optional[List[str]] = None) -> None:
     ap = argparse.ArgumentParser(
-        description="ETL Fase 1: TXT ancho fijo -> JSON/CSV"
-    )
-    ap.add_argument("input", help="Ruta del archivo PRUEBA_YYYYMMDD.txt")
-    ap.add_argument("--out-csv", default="out/salida.csv", help="Ruta CSV de salida")
-    ap.add_argument("--out-json", default="out/salida.json", help="Ruta JSON de salida")
-    args = ap.parse_args()
-
-    parser = FixedWidthParser(args.input)
-    transformer = BusinessTransformer(
-        filename_stem_date=parser.yyyymmdd,
-        filename_full=Path(args.input).name
+        description="ETL Fase 1: TXT ancho fijo -> CSV/NDJSON/JSON (streaming, varios archivos en paralelo)"
     )
+    ap.add_argument("entradas", nargs="+",
+                    help="Archivos NOMBRE_YYYYMMDD.txt, globs ('data/*.txt') o carpetas")
+    ap.add_argument("--salida", default="out", help="Carpeta de salida. Default out/")
+    ap.add_argument("--formatos", nargs="+", choices=FORMATOS, default=["csv", "json"],
+                    help="Formatos a escribir. Default csv json")
+    ap.add_argument("--combinar", metavar="NOMBRE", default=None,
+                    help="Una sola salida por formato (NOMBRE.csv, ...) en lugar de una por archivo")
+    ap.add_argument("--workers", type=int, default=1, help="Archivos procesados en paralelo. Default 1")
+    ap.add_argument("--fecha", default=None, help="YYYYMMDD para todos los archivos (override del nombre)")
+    ap.add_argument("--json-compacto", action="store_true",
+                    help="JSON con un objeto compacto por línea (en vez de indent=2)")
+    ap.add_argument("--sin-progreso", action="store_true", help="No muestra la línea de progreso")
+    ap.add_argument("--out-csv", default=None, help="Ruta CSV combinada (compatibilidad)")
+    ap.add_argument("--out-json", default=None, help="Ruta JSON combinada (compatibilidad)")
+    args = ap.parse_args(argv)
+
+    archivos = expandir_entradas(args.entradas)
+    if not archivos:
+        ap.error("No se encontraron archivos de entrada.")
+    faltan = [p for p in archivos if not p.is_file()]
+    if faltan:
+        ap.error(f"No existe: {faltan[0]}")
+
+    salida = Path(args.salida)
+    formatos = list(dict.fromkeys(args.formatos))
+    combinados: Dict[str, Path] = {}
+    if args.out_csv or args.out_json:
+        combinados = {fmt: Path(p) for fmt, p in (("csv", args.out_csv), ("json", args.out_json)) if p}
+    elif args.combinar:
+        combinados = {fmt: salida / f"{args.combinar}.{fmt}" for fmt in formatos}
+
+    tmp = tempfile.TemporaryDirectory(prefix="etl_partes_") if combinados else None
+    if tmp:
+        destinos = [{fmt: Path(tmp.name) / f"{i:05d}.{fmt}" for fmt in combinados} for i in range(len(archivos))]
+    else:
+        destinos = [{fmt: salida / f"{n}.{fmt}" for fmt in formatos} for n in nombres_salida(archivos)]
+
+    progreso = Progreso(len(archivos), activo=not args.sin_progreso)
+    resultados: List[Dict[str, object]] = []
+    t0 = time.perf_counter()
+    try:
+        if args.workers <= 1 or len(archivos) == 1:
+            for p, d in zip(archivos, destinos):
+                res = procesar_archivo(p, d, args.fecha, parte=bool(tmp), avisar=lambda _, n: progreso.sumar(n),
+                                       compacto=args.json_compacto)
+                resultados.append(res)
+                progreso.archivo_listo(res)
+        else:
+            ctx = mp.get_context("spawn")
+            cola = ctx.Queue()
+            with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx, max_tasks_per_child=1,
+                                     initializer=_init_worker, initargs=(cola,)) as ex:
+                pendientes = {ex.submit(_procesar_en_worker, p, d, args.fecha, bool(tmp), args.json_compacto)
+                              for p, d in zip(archivos, destinos)}
+                while pendientes:
+                    listos, pendientes = wait(pendientes, timeout=0.5, return_when=FIRST_COMPLETED)
+                    try:
+                        while True:
+                            progreso.sumar(cola.get_nowait())
+                    except Empty:
+                        pass
+                    for f in listos:
+                        res = f.result()
+                        resultados.append(res)
+                        progreso.archivo_listo(res)
 
-    records = [transformer.build_record(row) for row in parser.iter_rows()]
-    OutputWriter.to_csv(records, args.out_csv)
-    OutputWriter.to_json(records, args.out_json)
+        if tmp:
+            for fmt, destino in combinados.items():
+                combinar_partes([d[fmt] for d in destinos], destino, fmt)
+    finally:
+        if tmp:
+            tmp.cleanup()
 
-    print(f"✅ Registros procesados: {len(records)}")
-    print(f"📄 CSV:  {Path(args.out_csv).resolve()}")
-    print(f"🧩 JSON: {Path(args.out_json).resolve()}")
+    dt = time.perf_counter() - t0
+    total = sum(int(r["filas"]) for r in resultados)
+    print(f"✅ Registros procesados: {total:,} de {len(archivos)} archivo(s) en {dt:.2f}s "
+          f"({total / dt if dt else 0:,.0f} filas/s)")
+    if combinados:
+        for fmt, p in combinados.items():
+            print(f"📄 {fmt.upper()}: {p.resolve()}")
+    else:
+        print(f"📂 Salidas en: {salida.resolve()}")
@@ -63,6 +63,18 @@ PHR_FISICA:   Final[tuple[str, ...]] = ("correspondencia fisica", "correspondenc
 # ------------------------------
 CHANNEL_PRIORITY: Final[List[str]] = ["texto", "email", "telefono", "whatsapp", "fisica"]
 
+# ------------------------------
+# Internado de strings en BusinessTransformer
+# Campos de baja cardinalidad: cada valor distinto se guarda una sola vez por
+# archivo, hasta INTERN_MAX_VALORES valores por campo (después pasan tal cual).
+# ------------------------------
+INTERN_CAMPOS: Final[Tuple[str, ...]] = (
+    "tipo_documento", "producto", "periodo", "dias", "fecha_ini", "ciudad", "departamento",
+    "fecha_venta", "fecha_nacimiento", "tipo_trans", "genero", "sucursal",
+    "entidad_bancaria", "nombre_banco", "estado_debito",
+)
+INTERN_MAX_VALORES: Final[int] = 4096
+
 __all__ = [
     "FILENAME_RE",
     "INTERVALS", "WIDTHS",
@@ -70,4 +82,5 @@ __all__ = [
     "PHRASE_TELEFONO", "PHRASE_WHATSAPP", "PHRASE_TEXTO", "PHRASE_EMAIL", "PHRASE_FISICA",
     "PHR_TELEFONO", "PHR_WHATS", "PHR_TEXTO", "PHR_EMAIL", "PHR_FISICA",
     "CHANNEL_PRIORITY",
+    "INTERN_CAMPOS", "INTERN_MAX_VALORES",
 ]
@@ -1,11 +1,11 @@
 # src/app/transformers.py
 from __future__ import annotations
 import unicodedata
-from typing import List
+from typing import Dict, List
 from .domain import Record
 from .constants import (
     PHR_TELEFONO, PHR_WHATS, PHR_TEXTO, PHR_EMAIL, PHR_FISICA,
-    CHANNEL_PRIORITY,
+    CHANNEL_PRIORITY, INTERN_CAMPOS, INTERN_MAX_VALORES,
 )
 
 def _norm(s: str) -> str:
@@ -25,14 +25,43 @@ def _first_phone(p1: str, p2: str, p3: str) -> str:
             return p
     return ""
 
+class InternPool(dict):
+    """
+    Pool acotado de strings: ``pool[s]`` devuelve la primera copia igual a ``s``
+    que vio, así miles de registros comparten un solo objeto por valor. Guarda a
+    lo sumo ``max_valores`` valores; con el pool lleno los nuevos pasan tal cual
+    (un campo que resulta de alta cardinalidad no lo hace crecer sin límite).
+    Es un dict: los aciertos no ejecutan código Python, solo ``__missing__``.
+    """
+    __slots__ = ("max_valores",)
+
+    def __init__(self, max_valores: int = INTERN_MAX_VALORES):
+        super().__init__()
+        self.max_valores = max_valores
+
+    def __missing__(self, s: str) -> str:
+        if len(self) < self.max_valores:
+            self[s] = s
+        return s
+
+
 class BusinessTransformer:
     """
     Aplica reglas del enunciado para mapear las 22 columnas del TXT a las
     columnas destino y calcula flags de canales, mejor_canal y contactar_al.
+
+    Los campos de INTERN_CAMPOS pasan por un InternPool por campo (``intern_max``
+    valores cada uno; 0 = sin internado) y los valores que solo dependen del
+    archivo se calculan una vez: la lista de registros de un archivo grande no
+    carga millones de copias del mismo string.
     """
-    def __init__(self, yyyymmdd: str, file_name: str):
+    def __init__(self, yyyymmdd: str, file_name: str, intern_max: int = INTERN_MAX_VALORES):
         self.yyyymmdd = yyyymmdd
         self.file_name = file_name
+        # fecha_entrega_colmena y mes_a_trabajar desde self.yyyymmdd (iguales en todas las filas)
+        self.fecha_entrega = f"{yyyymmdd[0:4]}-{yyyymmdd[4:6]}-{yyyymmdd[6:8]}"
+        self.mes = yyyymmdd[4:6]
+        self.pools: Dict[str, InternPool] = {c: InternPool(intern_max) for c in INTERN_CAMPOS}
 
     def build_record(self, cols: List[str]) -> Record:
         # --- normalización defensiva ---
@@ -70,23 +99,25 @@ class BusinessTransformer:
             c22, # preferencias texto libre
         ) = cols
 
+        i = self.pools
+
         # Producto / póliza
-        producto = (c5[:5] or "").strip()
+        producto = i["producto"][(c5[:5] or "").strip()]
         poliza = (c5[5:] or "").strip()
 
         # Periodo y valor_asegurado
-        periodo = (c6[:1] or "").strip()
+        periodo = i["periodo"][(c6[:1] or "").strip()]
         valor_asegurado = (c6[1:] or "").strip()
 
         # Fechas en bloque 16
-        fecha_venta      = (c16[0:10]  or "").strip()
-        fecha_nacimiento = (c16[10:20] or "").strip()
-        tipo_trans       = (c16[20:23] or "").strip()
+        fecha_venta      = i["fecha_venta"][(c16[0:10] or "").strip()]
+        fecha_nacimiento = i["fecha_nacimiento"][(c16[10:20] or "").strip()]
+        tipo_trans       = i["tipo_trans"][(c16[20:23] or "").strip()]
         beneficiarios    = (c16[23:]   or "").strip()
 
         # Genero y sucursal (col17)
-        genero   = (c17[:1] or "").strip()
-        sucursal = (c17[1:] or "").strip()
+        genero   = i["genero"][(c17[:1] or "").strip()]
+        sucursal = i["sucursal"][(c17[1:] or "").strip()]
 
         # Flags desde "preferencias" (c22)
         preferencias = c22 or ""
@@ -115,12 +146,8 @@ class BusinessTransformer:
             # En este dataset base el correo puede venir vacío.
             pass
 
-        # fecha_entrega_colmena y mes_a_trabajar desde self.yyyymmdd
-        fec = f"{self.yyyymmdd[0:4]}-{self.yyyymmdd[4:6]}-{self.yyyymmdd[6:8]}"
-        mes = self.yyyymmdd[4:6]
-
         return Record(
-            tipo_documento=c2.strip(),
+            tipo_documento=i["tipo_documento"][c2.strip()],
             documento=c3.strip(),
             nombre=c4.strip(),
             producto=producto,
@@ -129,14 +156,14 @@ class BusinessTransformer:
             valor_asegurado=valor_asegurado,
             valor_prima=c7.strip(),
             doc_cobro=c8.strip(),
-            fecha_ini=(c9.strip()[:10] if c9.strip() else ""),
+            fecha_ini=i["fecha_ini"][c9.strip()[:10]],
             fecha_fin="",
-            dias=c10.strip(),
+            dias=i["dias"][c10.strip()],
             telefono_1=c11.strip(),
             telefono_2=c12.strip(),
             telefono_3=c13.strip(),
-            ciudad=c14.strip(),
-            departamento=c15.strip(),
+            ciudad=i["ciudad"][c14.strip()],
+            departamento=i["departamento"][c15.strip()],
             fecha_venta=fecha_venta,
             fecha_nacimiento=fecha_nacimiento,
             tipo_trans=tipo_trans,
@@ -145,17 +172,17 @@ class BusinessTransformer:
             sucursal=sucursal,
             tipo_cuenta="",
             ultimos_digitos_cuenta=c18.strip(),
-            entidad_bancaria=c19.strip(),
-            nombre_banco=c20.strip(),
-            estado_debito=c21.strip(),
+            entidad_bancaria=i["entidad_bancaria"][c19.strip()],
+            nombre_banco=i["nombre_banco"][c20.strip()],
+            estado_debito=i["estado_debito"][c21.strip()],
             causal_rechazo="",
             codigo_canal="",
             descripcion_canal="",
             codigo_estrategia="",
             tipo_estrategia="",
             correo_electronico="",
-            fecha_entrega_colmena=fec,
-            mes_a_trabajar=mes,
+            fecha_entrega_colmena=self.fecha_entrega,
+            mes_a_trabajar=self.mes,
             id="",
             nombre_db=self.file_name,
             telefono=telefono_f,
@@ -1,25 +1,211 @@
 from __future__ import annotations
-import csv, json
+import csv, json, shutil
+from json.encoder import encode_basestring
+from operator import attrgetter
 from pathlib import Path
-from typing import Iterable, List, Dict
+from typing import IO, Any, Iterable, Iterator, List, Dict, Sequence, Tuple, Union
 from .constants import COLUMNS_DB
 from .domain import Record
 
+FORMATOS = ("csv", "ndjson", "json")
+BUFFER = 1024 * 1024   # bytes del buffer de los archivos de salida
+LOTE = 2000            # filas que se acumulan antes de cada write
+
+Fila = Tuple[Any, ...]
+Registro = Union[Record, Dict[str, Any], Sequence[Any]]
+
+# Record -> tupla en el orden de COLUMNS_DB (sin la copia profunda de asdict)
+fila = attrgetter(*COLUMNS_DB)
+
+
+def a_fila(r: Registro) -> Fila:
+    """Acepta Record, dict (puede venir incompleto) o una tupla ya posicional."""
+    if type(r) is tuple:
+        return r
+    if isinstance(r, dict):
+        return tuple(r.get(k, "") for k in COLUMNS_DB)
+    return fila(r)
+
+
+def filas_posicionales(records: Iterable[Registro]) -> Iterator[Fila]:
+    return (a_fila(r) for r in records)
+
+
+# --------------------------
+# JSON: los objetos se arman a mano (claves pre-codificadas, valores con el
+# codificador en C); la salida es idéntica a json.dump(..., ensure_ascii=False)
+# --------------------------
+_CLAVES_INDENT = [f"    {encode_basestring(k)}: " for k in COLUMNS_DB]
+_CLAVES_COMPACTO = [f"{encode_basestring(k)}:" for k in COLUMNS_DB]
+
+
+def _valor(v: Any) -> str:
+    return encode_basestring(v) if type(v) is str else json.dumps(v, ensure_ascii=False)
+
+
+def objeto_json(t: Registro, compacto: bool = False) -> str:
+    """
+    Un registro como objeto JSON: indentado como un elemento de array con indent=2, o
+    compacto. Un dict se serializa con sus propias claves (como hacía json.dump).
+    """
+    if isinstance(t, dict):
+        if compacto:
+            return json.dumps(t, ensure_ascii=False, separators=(",", ":"))
+        return "  " + json.dumps(t, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+    if type(t) is not tuple:
+        t = fila(t)
+    if compacto:
+        return "{" + ",".join([k + _valor(v) for k, v in zip(_CLAVES_COMPACTO, t)]) + "}"
+    return "  {\n" + ",\n".join([k + _valor(v) for k, v in zip(_CLAVES_INDENT, t)]) + "\n  }"
+
+
+def escribir_csv(filas: Iterable[Fila], fh: IO[str], encabezado: bool = True) -> int:
+    w = csv.writer(fh)
+    if encabezado:
+        w.writerow(COLUMNS_DB)
+    n = 0
+    lote: List[Fila] = []
+    for t in filas:
+        lote.append(t)
+        if len(lote) >= LOTE:
+            w.writerows(lote)
+            n += len(lote)
+            lote.clear()
+    w.writerows(lote)
+    return n + len(lote)
+
+
+def escribir_json(filas: Iterable[Registro], fh: IO[str], compacto: bool = False, parte: bool = False) -> int:
+    """
+    Array JSON de objetos, uno por elemento separado por ",\\n". Con ``parte=True``
+    omite los corchetes (para ``combinar_partes``).
+    """
+    n = 0
+    lote: List[str] = []
+    for t in filas:
+        lote.append(objeto_json(t, compacto))
+        if len(lote) >= LOTE:
+            n = _vaciar_json(fh, lote, n, parte)
+    if lote:
+        n = _vaciar_json(fh, lote, n, parte)
+    if not parte:
+        fh.write("\n]" if n else "[]")
+    return n
+
+
+def _vaciar_json(fh: IO[str], lote: List[str], n: int, parte: bool) -> int:
+    if n:
+        fh.write(",\n")
+    elif not parte:
+        fh.write("[\n")
+    fh.write(",\n".join(lote))
+    n += len(lote)
+    lote.clear()
+    return n
+
+
+def escribir_ndjson(filas: Iterable[Fila], fh: IO[str]) -> int:
+    n = 0
+    lote: List[str] = []
+    for t in filas:
+        lote.append(objeto_json(t, compacto=True))
+        if len(lote) >= LOTE:
+            fh.write("\n".join(lote) + "\n")
+            n += len(lote)
+            lote.clear()
+    if lote:
+        fh.write("\n".join(lote) + "\n")
+    return n + len(lote)
+
+
 class OutputWriter:
     @staticmethod
-    def to_csv(records: Iterable[Record], path: str | Path) -> None:
+    def to_csv(records: Iterable[Registro], path: str | Path) -> None:
         p = Path(path)
         p.parent.mkdir(parents=True, exist_ok=True)
-        with p.open("w", newline="", encoding="utf-8") as fh:
-            w = csv.DictWriter(fh, fieldnames=COLUMNS_DB)
-            w.writeheader()
-            for r in records:
-                w.writerow(r.to_dict())
+        with p.open("w", newline="", encoding="utf-8", buffering=BUFFER) as fh:
+            escribir_csv(filas_posicionales(records), fh)
 
     @staticmethod
-    def to_json(records: Iterable[Record], path: str | Path) -> None:
+    def to_json(records: Iterable[Registro], path: str | Path, compacto: bool = False) -> None:
+        """Por defecto, array con indent=2 (formato histórico); ``compacto`` = un objeto sin espacios por línea."""
         p = Path(path)
         p.parent.mkdir(parents=True, exist_ok=True)
-        data = [r.to_dict() for r in records]
-        with p.open("w", encoding="utf-8") as fh:
-            json.dump(data, fh, ensure_ascii=False, indent=2)
+        with p.open("w", encoding="utf-8", buffering=BUFFER) as fh:
+            escribir_json(records, fh, compacto=compacto)
+
+
+class StreamWriter:
+    """
+    Escribe registros uno a uno (sin armar la lista completa) en csv, ndjson o json.
+    El json sale idéntico al de ``OutputWriter.to_json`` (array con indent=2, o
+    compacto). Con ``parte=True`` omite el encabezado CSV y los corchetes JSON,
+    para luego unir varias partes con ``combinar_partes``.
+    """
+    def __init__(self, path: str | Path, formato: str, parte: bool = False, compacto: bool = False):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.formato = formato
+        self.parte = parte
+        self.compacto = compacto
+        self.filas = 0
+        self._lote: List[Fila] = []
+        self._fh: IO[str] = self.path.open("w", newline="", encoding="utf-8", buffering=BUFFER)
+        if formato == "csv" and not parte:
+            csv.writer(self._fh).writerow(COLUMNS_DB)
+
+    def write(self, r: Registro) -> None:
+        self._lote.append(a_fila(r))
+        if len(self._lote) >= LOTE:
+            self._vaciar()
+
+    def _vaciar(self) -> None:
+        if not self._lote:
+            return
+        if self.formato == "csv":
+            escribir_csv(self._lote, self._fh, encabezado=False)
+        elif self.formato == "ndjson":
+            escribir_ndjson(self._lote, self._fh)
+        else:
+            if self.filas:
+                self._fh.write(",\n")
+            elif not self.parte:
+                self._fh.write("[\n")
+            escribir_json(self._lote, self._fh, compacto=self.compacto, parte=True)
+        self.filas += len(self._lote)
+        self._lote.clear()
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        self._vaciar()
+        if self.formato == "json" and not self.parte:
+            self._fh.write("\n]" if self.filas else "[]")
+        self._fh.close()
+
+    def __enter__(self) -> "StreamWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def combinar_partes(partes: List[Path], destino: str | Path, formato: str) -> None:
+    """Une en orden las partes de ``StreamWriter(parte=True)`` en un solo archivo."""
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    llenas = [p for p in partes if p.stat().st_size]
+    with destino.open("w", newline="", encoding="utf-8") as out:
+        if formato == "csv":
+            csv.writer(out).writerow(COLUMNS_DB)
+        elif formato == "json":
+            out.write("[\n" if llenas else "[]")
+        for i, p in enumerate(llenas):
+            if formato == "json" and i:
+                out.write(",\n")
+            with p.open("r", newline="", encoding="utf-8") as fh:
+                shutil.copyfileobj(fh, out, BUFFER)
+        if formato == "json" and llenas:
+            out.write("\n]")
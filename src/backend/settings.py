@@ -108,6 +108,35 @@ DATABASES = {
     }
 }
 
+# Alias de solo lectura para las herramientas SQL del agente y los endpoints de lectura
+# (ver api/routers.py). Por defecto es el mismo servidor con sus propias conexiones,
+# transacciones de solo lectura y statement_timeout; POSTGRES_READ_* lo apuntan a una réplica.
+# La ingesta y cualquier escritura van siempre a "default".
+DATABASE_READ_ALIAS = "lectura"
+DATABASE_READ_ROUTING = os.getenv("DATABASE_READ_ROUTING", "True").lower() in ("true", "1", "t")
+DATABASE_READ_STATEMENT_TIMEOUT_MS = int(os.getenv("DATABASE_READ_STATEMENT_TIMEOUT_MS", "30000"))
+DATABASES[DATABASE_READ_ALIAS] = {
+    **DATABASES["default"],
+    "NAME": os.getenv("POSTGRES_READ_DB", DATABASES["default"]["NAME"]),
+    "USER": os.getenv("POSTGRES_READ_USER", DATABASES["default"]["USER"]),
+    "PASSWORD": os.getenv("POSTGRES_READ_PASSWORD", DATABASES["default"]["PASSWORD"]),
+    "HOST": os.getenv("POSTGRES_READ_HOST", DATABASES["default"]["HOST"]),
+    "PORT": os.getenv("POSTGRES_READ_PORT", DATABASES["default"]["PORT"]),
+    "CONN_MAX_AGE": int(os.getenv("POSTGRES_READ_CONN_MAX_AGE", "60")),
+    "OPTIONS": {
+        **DATABASES["default"]["OPTIONS"],
+        "options": (
+            "-c default_transaction_read_only=on "
+            f"-c statement_timeout={DATABASE_READ_STATEMENT_TIMEOUT_MS} "
+            # Las consultas largas en la réplica no frenan el vacuum del primario
+            "-c idle_in_transaction_session_timeout=60000"
+        ),
+    },
+    # En tests usa la base de prueba de "default" (una réplica no tiene base de prueba propia)
+    "TEST": {"MIRROR": "default"},
+}
+DATABASE_ROUTERS = ["api.routers.RouterLecturas"]
+
 # ========================
 # AUTENTICACIÓN
 # ========================
@@ -147,6 +176,92 @@ MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", BASE_DIR / "media"))
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", MEDIA_ROOT / "uploads"))
 EXPORT_DIR = Path(os.getenv("EXPORT_DIR", MEDIA_ROOT / "exports"))
 
+# Variantes comprimidas que se generan junto a cada export (zstd solo si está instalado "zstandard")
+EXPORT_COMPRESSION = [e.strip() for e in os.getenv("EXPORT_COMPRESSION", "gzip,zstd").split(",") if e.strip()]
+
+# JSON de la ingesta: False = array con indent=2 (formato histórico); True = un objeto compacto por línea
+EXPORT_JSON_COMPACT = os.getenv("EXPORT_JSON_COMPACT", "False").lower() in ("true", "1", "t")
+
+# Exports por shards: se parten en archivos de a lo sumo N filas y/o N bytes, con un
+# manifiesto NOMBRE.ext.manifest (rango de filas, tamaño y sha256 de cada shard). 0 = sin límite;
+# con ambos en 0 cada export es un solo archivo.
+EXPORT_SHARD_MAX_ROWS = int(os.getenv("EXPORT_SHARD_MAX_ROWS", "0"))
+EXPORT_SHARD_MAX_BYTES = int(os.getenv("EXPORT_SHARD_MAX_BYTES", "0"))
+# Hilos que escriben (y comprimen) shards mientras se serializan los siguientes
+EXPORT_SHARD_WORKERS = int(os.getenv("EXPORT_SHARD_WORKERS", "4"))
+
+# /api/exports/stream/ mantiene una transacción abierta mientras el cliente descarga.
+# Si la sesión queda inactiva (cliente lento o detenido) más de N ms, Postgres la corta
+# y libera el snapshot. Se aplica solo a esa transacción. 0 = usa el valor del servidor.
+EXPORT_STREAM_IDLE_TIMEOUT_MS = int(os.getenv("EXPORT_STREAM_IDLE_TIMEOUT_MS", "15000"))
+
+# Presupuesto de disco (bytes) para uploads + exports; al superarlo se expulsan
+# los artefactos descargados hace más tiempo (LRU). 0 = sin límite.
+ARTIFACT_STORE_BUDGET_BYTES = int(os.getenv("ARTIFACT_STORE_BUDGET_BYTES", "0"))
+
+# Descarga de exports: delegar la transferencia de bytes al servidor web frontal.
+# "" = la sirve Django, "x-accel" = Nginx (X-Accel-Redirect), "x-sendfile" = Apache/lighttpd.
+EXPORT_SENDFILE = os.getenv("EXPORT_SENDFILE", "").lower()
+# Location interna de Nginx que apunta a EXPORT_DIR (solo para "x-accel")
+EXPORT_ACCEL_PREFIX = os.getenv("EXPORT_ACCEL_PREFIX", "/protected-exports/")
+
+# Caché NL->SQL de /api/consulta-llm/ (en memoria por proceso). 0 entradas = deshabilitada.
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500"))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+# Cada cuánto (s) se compara la huella del esquema de api_registro para invalidar la caché
+LLM_CACHE_SCHEMA_CHECK_S = float(os.getenv("LLM_CACHE_SCHEMA_CHECK_S", "30"))
+# Ruta rápida: preguntas conocidas (edad, débitos rechazados, últimos N días, top N por prima)
+# se traducen a SQL con plantillas locales, sin llamar al LLM
+LLM_FAST_PATH = os.getenv("LLM_FAST_PATH", "True").lower() in ("true", "1", "t")
+# Caché de resultados de las herramientas SQL del agente (bytes, LRU). 0 = deshabilitada.
+# Se invalida sola: la clave incluye la generación de datos que incrementa cada ingesta.
+SQL_RESULT_CACHE_MAX_BYTES = int(os.getenv("SQL_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Límites de ejecución de las herramientas SQL del agente (los impone el servidor, no el prompt)
+SQL_TOOL_MAX_ROWS = int(os.getenv("SQL_TOOL_MAX_ROWS", "1000"))
+SQL_TOOL_TIMEOUT_MS = int(os.getenv("SQL_TOOL_TIMEOUT_MS", "15000"))
+SQL_TOOL_FETCH_SIZE = int(os.getenv("SQL_TOOL_FETCH_SIZE", "500"))
+# Admisión por costo: cada SELECT del agente se planifica con EXPLAIN antes de ejecutarse.
+# Umbrales sobre el costo total y las filas estimadas (0 = sin umbral).
+# "rewrite" intenta acotarlo con LIMIT antes de rechazar; "reject" rechaza directamente.
+SQL_ADMISSION_MAX_COST = float(os.getenv("SQL_ADMISSION_MAX_COST", "500000"))
+SQL_ADMISSION_MAX_ROWS = float(os.getenv("SQL_ADMISSION_MAX_ROWS", "1000000"))
+SQL_ADMISSION_MODE = os.getenv("SQL_ADMISSION_MODE", "rewrite").lower()
+# Iteraciones máximas del agente (incluye reintentos tras un rechazo por costo)
+LLM_AGENT_MAX_ITERATIONS = int(os.getenv("LLM_AGENT_MAX_ITERATIONS", "5"))
+# Modelo del agente: "openai" o "stub" (modelo local determinista para pruebas/benchmarks sin red)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+LLM_STUB_LATENCY_S = float(os.getenv("LLM_STUB_LATENCY_S", "0"))
+LLM_REQUEST_TIMEOUT_S = float(os.getenv("LLM_REQUEST_TIMEOUT_S", "60"))
+# Lote de instrucciones (/api/consulta-llm/lote/)
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+LLM_BATCH_TIMEOUT_S = float(os.getenv("LLM_BATCH_TIMEOUT_S", "90"))
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "100"))
+# Prompt del agente podado por instrucción: solo las columnas/reglas relevantes,
+# sin pasar de LLM_PROMPT_TOKEN_BUDGET tokens. LLM_TOKENIZER: "aprox" (offline) o
+# "tiktoken" (requiere la tabla BPE en caché local; si no está, cae a "aprox").
+LLM_PROMPT_PRUNING = os.getenv("LLM_PROMPT_PRUNING", "True").lower() in ("true", "1", "t")
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "1200"))
+LLM_TOKENIZER = os.getenv("LLM_TOKENIZER", "aprox").lower()
+# Registro de cada SELECT de las herramientas SQL (huella, duración, filas, plan) en api_ejecucionsql,
+# base de GET /api/consulta-llm/observabilidad/ y de `manage.py asesor_indices`
+SQL_OBSERVABILITY = os.getenv("SQL_OBSERVABILITY", "True").lower() in ("true", "1", "t")
+# Ejecuciones que se acumulan en memoria antes de insertarlas juntas (también al terminar cada petición)
+SQL_OBSERVABILITY_BATCH = int(os.getenv("SQL_OBSERVABILITY_BATCH", "50"))
+# `manage.py purgar_ejecuciones_sql` borra las ejecuciones más viejas que esto (por cron)
+SQL_OBSERVABILITY_RETENTION_DAYS = int(os.getenv("SQL_OBSERVABILITY_RETENTION_DAYS", "30"))
+
+# ========================
+# LOGGING
+# ========================
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "api": {"handlers": ["console"], "level": os.getenv("API_LOG_LEVEL", "INFO"), "propagate": False},
+    },
+}
+
 # ========================
 # DRF CONFIG
 # ========================
@@ -1,14 +1,29 @@
+"""
+Generador de archivos TXT de ancho fijo (1615 chars, 22 columnas) para pruebas de carga.
+
+    python generar_txt.py --filas 10000000 --semilla 7 --fecha 20250529 --gzip
+    python generar_txt.py -n 200000 -o data/CARGA_20250601.txt --tasa-fecha 0.01 --tasa-acentos 0.2
+
+- Determinista: misma semilla + filas + --bloque => mismo archivo, con cualquier --procesos.
+- Rápido: los valores de texto (nombres, ciudades, sucursales) salen de pools
+  precalculados con Faker una sola vez; cada bloque se genera por columnas
+  (``Random.choices`` con k=filas) y en paralelo con multiprocessing.
+- ``--gzip`` (o salida .gz): cada bloque se comprime en su proceso; el archivo
+  es una concatenación de miembros gzip, válida para gzip/zcat/``gzip.open``.
+- Anomalías opcionales (tasas 0–1) para reproducir los caminos lentos del ETL:
+  longitudes de línea erróneas, fechas y números mal formados, acentos.
+"""
+from __future__ import annotations
+import argparse
+import gzip
+import multiprocessing as mp
+import os
 import random
-from datetime import datetime, timedelta
+import sys
+import time
+from datetime import date, datetime, timedelta
 from pathlib import Path
-
-from faker import Faker
-
-fake = Faker("es_CO")
-
-# ----- Configuración -----
-OUTPUT_PATH = Path("PRUEBAS_20250529.txt")  # nombre y fecha del archivo
-NUM_REGISTROS = 80
+from typing import Dict, List, NamedTuple, Optional
 
 # Intervalos exactos (longitudes) según el enunciado
 # (0-10),(10-13),(13-28),(28-128),(128-143),(143-165),(165-187),
@@ -21,6 +36,7 @@ WIDTHS = [
     50, 50, 123, 54, 20, 7,
     40, 10, 990
 ]
+LARGO_LINEA = sum(WIDTHS)  # 1615
 
 # Preferencias posibles (tal cual frases del enunciado)
 PREFERENCIAS = [
@@ -46,142 +62,255 @@ DEPARTAMENTOS = [
     "Santander","Sucre","Tolima","Valle del Cauca","Vaupés","Vichada","Arauca","Amazonas"
 ]
 
+TIPOS_DOC = ["CC", "CE", "TI"]
+PRODUCTOS = ["VIDA", "AUTO", "HOGAR", "SALU", "DENT"]
+TIPOS_TRANS = ["001", "002", "003"]
+GENEROS = ["M", "F"]
+ENTIDADES = ["BBVA", "Bcol", "Davv", "BCS", "BPOP", "AVVl", "FNA"]
+BANCOS = ["Banco Principal", "Banco Central", "Banco del Norte"]
+ESTADOS_DEBITO = ["OK", "ERR", "PEND"]
+
+# Tamaño de los pools de Faker (se eligen con reemplazo)
+POOL_NOMBRES = 5000
+POOL_CIUDADES = 600
+POOL_SUCURSALES = 1500
+
+# Anomalías
+FECHAS_MALAS = ["2024-13-45", "31/02/2024", "20240101  ", "xxxx-xx-xx", "2024-02-30", "          "]
+NUMEROS_MALOS = ["12O000", "1,234,567", "-", "N/A", "1.2.3", "  98 765", "9" * 22]
+_ACENTOS = str.maketrans("aeiouAEIOUnN", "áéíóúÁÉÍÓÚñÑ")
+
+
+class Config(NamedTuple):
+    filas: int
+    semilla: int
+    fecha: str            # YYYYMMDD
+    bloque: int
+    gzip: bool
+    nivel_gzip: int
+    tasa_longitud: float
+    tasa_fecha: float
+    tasa_numero: float
+    tasa_acentos: float
+
+
 def fit(value: str, width: int) -> str:
     """
     Ajusta el valor a 'width' caracteres: trunca si es más largo o
     rellena con espacios a la derecha si es más corto.
     """
-    v = (value or "")
-    if len(v) > width:
-        return v[:width]
-    return v.ljust(width)
-
-def rand_date(start: str, end: str) -> str:
-    sd = datetime.strptime(start, "%Y-%m-%d")
-    ed = datetime.strptime(end, "%Y-%m-%d")
-    delta = (ed - sd).days
-    return (sd + timedelta(days=random.randint(0, delta))).strftime("%Y-%m-%d")
-
-def generar_linea() -> str:
-    # Col1 (desconocida en reglas) -> dejamos vacío (10 espacios)
-    col1 = ""
-
-    # Col2: tipo_documento (pero en reglas dice que tipo_documento es "columna 2", aquí col2 es DOC TIPO)
-    # OJO: según enunciado, tipo_documento sale de "columna 2", documento de "columna 3", nombre de "columna 4".
-    # Por lo tanto, col2, col3, col4 deben mapear a esos 3 respectivamente.
-    tipo_documento = random.choice(["CC","CE","TI"])
-
-    # Col3: documento (numérico corto en ancho 15 segun intervalos? No, ojo: ancho de col3 es 15.)
-    # El intervalo 13-28 => 15. Usaremos un ID de 8-10 dígitos y lo ajustamos.
-    documento = str(random.randint(10_000_000, 99_999_999))
-
-    # Col4: nombre (intervalo 28-128 => 100)
-    nombre = fake.name()
-
-    # Col5: producto+poliza (intervalo 128-143 => 15)
-    # Reglas: producto = 5 primeros, póliza = el resto
-    # Aquí guardamos ambos juntos, p.ej. "VIDA1POL000123"
-    prod = random.choice(["VIDA","AUTO","HOGAR","SALU","DENT"])
-    producto_poliza = (prod + str(random.randint(0,9)) + f"POL{random.randint(1000,9999)}")
-
-    # Col6: periodo + valor_asegurado (intervalo 143-165 => 22)
-    # periodo = primer caracter; valor_asegurado = el resto
-    periodo = str(random.randint(1,9))
-    valor_asegurado = str(random.randint(5_000_000, 50_000_000))
-
-    # Col7: valor_prima (intervalo 165-187 => 22)
-    valor_prima = str(random.randint(80_000, 900_000))
-
-    # Col8: doc_cobro (187-201 => 14)
-    doc_cobro = f"DOC{random.randint(1000,9999)}"
-
-    # Col9: fecha_ini (201-221 => 20)
-    fecha_ini = rand_date("2023-01-01","2025-08-31")
-
-    # Col10: dias (221-226 => 5)
-    dias = str(random.randint(30, 365))
-
-    # Col11-13: teléfonos (15 cada una)
-    telefono_1 = str(random.randint(3000000000, 3999999999))
-    telefono_2 = str(random.randint(3000000000, 3999999999))
-    telefono_3 = str(random.randint(3000000000, 3999999999))
-
-    # Col14: ciudad (50)
-    ciudad = fake.city()
-
-    # Col15: departamento (50) — usamos lista fija
-    departamento = random.choice(DEPARTAMENTOS)
-
-    # Col16: bloque (123) => 10 chars f_venta + 10 f_nac + 3 tipo_trans + resto beneficiarios
-    fecha_venta = rand_date("2023-01-01","2025-08-31")       # 10
-    fecha_nac = rand_date("1970-01-01","2007-12-31")         # 10
-    tipo_trans = random.choice(["001","002","003"])          # 3
-    beneficiarios = fake.name()                               # resto
-    bloque_16 = f"{fecha_venta}{fecha_nac}{tipo_trans}{beneficiarios}"
-
-    # Col17: genero + sucursal (54) => 1 char + resto
-    genero = random.choice(["M","F"])
-    sucursal = fake.company()
-
-    # Col18: ultimos_digitos_cuenta (20)
-    ultimos_digitos_cuenta = str(random.randint(1000,9999))
-
-    # Col19: entidad_bancaria (7)
-    entidad_bancaria = random.choice(["BBVA","Bcol","Davv","BCS","BPOP","AVVl","FNA"])
-
-    # Col20: nombre_banco (40)
-    nombre_banco = random.choice(["Banco Principal","Banco Central","Banco del Norte"])
-
-    # Col21: estado_debito (10)
-    estado_debito = random.choice(["OK","ERR","PEND"])
-
-    # Col22: preferencias (990) — frases del enunciado
-    preferencias = random.choice(PREFERENCIAS)
-
-    # ---- Ajuste a cada ancho ----
-    values = [
-        col1,
-        tipo_documento,
-        documento,
-        nombre,
-        producto_poliza,
-        periodo + valor_asegurado,   # col6 empaqueta ambos
-        valor_prima,
-        doc_cobro,
-        fecha_ini,
-        dias,
-        telefono_1,
-        telefono_2,
-        telefono_3,
-        ciudad,
-        departamento,
-        bloque_16,
-        genero + " " + sucursal,
-        ultimos_digitos_cuenta,
-        entidad_bancaria,
-        nombre_banco,
-        estado_debito,
-        preferencias,
+    return f"{value or '':<{width}.{width}}"
+
+
+def _rango_fechas(desde: date, hasta: date) -> List[str]:
+    return [(desde + timedelta(days=i)).isoformat() for i in range((hasta - desde).days + 1)]
+
+
+# --------------------------
+# Pools (uno por proceso, idénticos para la misma semilla)
+# --------------------------
+_pools: Dict[str, List[str]] = {}
+
+
+def construir_pools(semilla: int, fecha: str) -> Dict[str, List[str]]:
+    """Valores precalculados y ya ajustados a su ancho cuando es posible."""
+    from faker import Faker  # import lazy: solo el generador lo necesita
+
+    fake = Faker("es_CO")
+    fake.seed_instance(semilla)
+    corte = datetime.strptime(fecha, "%Y%m%d").date()
+    nombres = [fake.name() for _ in range(POOL_NOMBRES)]
+    return {
+        "nombres": nombres,
+        "nombres_fit": [fit(n, WIDTHS[3]) for n in nombres],
+        "ciudades": [fit(fake.city(), WIDTHS[13]) for _ in range(POOL_CIUDADES)],
+        "sucursales": [fake.company() for _ in range(POOL_SUCURSALES)],
+        "departamentos": [fit(d, WIDTHS[14]) for d in DEPARTAMENTOS],
+        "tipos_doc": [fit(t, WIDTHS[1]) for t in TIPOS_DOC],
+        "entidades": [fit(e, WIDTHS[18]) for e in ENTIDADES],
+        "bancos": [fit(b, WIDTHS[19]) for b in BANCOS],
+        "estados": [fit(e, WIDTHS[20]) for e in ESTADOS_DEBITO],
+        "preferencias": [fit(p, WIDTHS[21]) for p in PREFERENCIAS],
+        # Ventas/inicio: ~2,7 años hasta la fecha del archivo; nacimientos: 17 a 55 años antes
+        "fechas_venta": _rango_fechas(corte - timedelta(days=970), corte),
+        "fechas_nac": _rango_fechas(corte - timedelta(days=55 * 365), corte - timedelta(days=17 * 365)),
+    }
+
+
+def _init_proceso(cfg: Config) -> None:
+    _pools.update(construir_pools(cfg.semilla, cfg.fecha))
+
+
+# --------------------------
+# Generación por bloques
+# --------------------------
+def _numeros(rng: random.Random, a: int, b: int, k: int, width: int) -> List[str]:
+    return [f"{x:<{width}}" for x in rng.choices(range(a, b + 1), k=k)]
+
+
+def generar_bloque(cfg: Config, indice: int) -> List[str]:
+    """Líneas (sin salto) del bloque ``indice``; depende solo de la semilla y del índice."""
+    p = _pools
+    n = min(cfg.bloque, cfg.filas - indice * cfg.bloque)
+    rng = random.Random(f"{cfg.semilla}:{indice}")
+    ch = rng.choices
+
+    col1 = [" " * WIDTHS[0]] * n
+    tipo_doc = ch(p["tipos_doc"], k=n)
+    documento = _numeros(rng, 10_000_000, 99_999_999, n, WIDTHS[2])
+    nombre = ch(p["nombres_fit"], k=n)
+    producto_poliza = [
+        fit(f"{prod}{d}POL{pol}", WIDTHS[4])
+        for prod, d, pol in zip(ch(PRODUCTOS, k=n), ch("0123456789", k=n), ch(range(1000, 10000), k=n))
     ]
-
-    fixed = [fit(v, w) for v, w in zip(values, WIDTHS)]
-    line = "".join(fixed)
-    # Seguridad: cada línea debe tener exactamente 1615 chars
-    if len(line) != 1615:
-        # Si por alguna razón se desfasó (acentos no deberían afectar, pero por si acaso),
-        # recortamos o rellenamos al tamaño final.
-        if len(line) > 1615:
-            line = line[:1615]
+    periodo_valor = [
+        fit(f"{per}{val}", WIDTHS[5])
+        for per, val in zip(ch("123456789", k=n), ch(range(5_000_000, 50_000_001), k=n))
+    ]
+    valor_prima = _numeros(rng, 80_000, 900_000, n, WIDTHS[6])
+    doc_cobro = [f"DOC{x:<{WIDTHS[7] - 3}}" for x in ch(range(1000, 10000), k=n)]
+    fecha_ini = [f"{f:<{WIDTHS[8]}}" for f in ch(p["fechas_venta"], k=n)]
+    dias = _numeros(rng, 30, 365, n, WIDTHS[9])
+    tel1 = _numeros(rng, 3000000000, 3999999999, n, WIDTHS[10])
+    tel2 = _numeros(rng, 3000000000, 3999999999, n, WIDTHS[11])
+    tel3 = _numeros(rng, 3000000000, 3999999999, n, WIDTHS[12])
+    ciudad = ch(p["ciudades"], k=n)
+    departamento = ch(p["departamentos"], k=n)
+    bloque16 = [
+        fit(f"{fv}{fn}{tt}{ben}", WIDTHS[15])
+        for fv, fn, tt, ben in zip(ch(p["fechas_venta"], k=n), ch(p["fechas_nac"], k=n),
+                                   ch(TIPOS_TRANS, k=n), ch(p["nombres"], k=n))
+    ]
+    genero_sucursal = [fit(f"{g} {s}", WIDTHS[16]) for g, s in zip(ch(GENEROS, k=n), ch(p["sucursales"], k=n))]
+    ultimos = _numeros(rng, 1000, 9999, n, WIDTHS[17])
+    entidad = ch(p["entidades"], k=n)
+    banco = ch(p["bancos"], k=n)
+    estado = ch(p["estados"], k=n)
+    preferencias = ch(p["preferencias"], k=n)
+
+    columnas = [
+        col1, tipo_doc, documento, nombre, producto_poliza, periodo_valor, valor_prima, doc_cobro,
+        fecha_ini, dias, tel1, tel2, tel3, ciudad, departamento, bloque16, genero_sucursal,
+        ultimos, entidad, banco, estado, preferencias,
+    ]
+    _anomalias(cfg, rng, columnas, n)
+    lineas = ["".join(fila) for fila in zip(*columnas)]
+    if cfg.tasa_longitud:
+        for i in _muestra(rng, n, cfg.tasa_longitud):
+            delta = rng.randint(1, 40)
+            lineas[i] = lineas[i][:-delta] if rng.random() < 0.5 else lineas[i] + "X" * delta
+    return lineas
+
+
+def _muestra(rng: random.Random, n: int, tasa: float) -> List[int]:
+    return [i for i in range(n) if rng.random() < tasa]
+
+
+def _anomalias(cfg: Config, rng: random.Random, columnas: List[List[str]], n: int) -> None:
+    """Reemplaza valores en sitio (sin cambiar el ancho de columna)."""
+    if cfg.tasa_fecha:
+        for i in _muestra(rng, n, cfg.tasa_fecha):
+            mala = rng.choice(FECHAS_MALAS)
+            if rng.random() < 0.5:
+                columnas[8][i] = fit(mala, WIDTHS[8])                                  # fecha_ini
+            else:
+                b = columnas[15][i]
+                columnas[15][i] = (b[:10] + fit(mala, 10) + b[20:]) if rng.random() < 0.5 \
+                    else (fit(mala, 10) + b[10:])                                     # nacimiento / venta
+    if cfg.tasa_numero:
+        for i in _muestra(rng, n, cfg.tasa_numero):
+            malo = rng.choice(NUMEROS_MALOS)
+            col = rng.choice((5, 6, 9))  # valor asegurado, prima, días
+            columnas[col][i] = fit(columnas[5][i][:1] + malo if col == 5 else malo, WIDTHS[col])
+    if cfg.tasa_acentos:
+        for i in _muestra(rng, n, cfg.tasa_acentos):
+            for col in (3, 13, 16):      # nombre, ciudad, sucursal
+                columnas[col][i] = columnas[col][i].translate(_ACENTOS)
+
+
+def _bloque_bytes(args) -> bytes:
+    cfg, indice = args
+    datos = ("\n".join(generar_bloque(cfg, indice)) + "\n").encode("utf-8")
+    return gzip.compress(datos, compresslevel=cfg.nivel_gzip, mtime=0) if cfg.gzip else datos
+
+
+# --------------------------
+# Archivo
+# --------------------------
+def ruta_por_defecto(fecha: str, comprimir: bool) -> Path:
+    return Path(f"PRUEBAS_{fecha}.txt" + (".gz" if comprimir else ""))
+
+
+def generar_archivo(salida: Path, cfg: Config, procesos: int = 1) -> Dict[str, float]:
+    """Escribe el archivo y devuelve métricas (filas, segundos, filas/s, bytes)."""
+    salida = Path(salida)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    bloques = [(cfg, i) for i in range((cfg.filas + cfg.bloque - 1) // cfg.bloque)]
+    tmp = salida.with_name(salida.name + ".tmp")
+    t0 = time.perf_counter()
+    with tmp.open("wb") as f:
+        if procesos <= 1 or len(bloques) <= 1:
+            _init_proceso(cfg)
+            for b in bloques:
+                f.write(_bloque_bytes(b))
         else:
-            line = line.ljust(1615)
-    return line + "\n"
+            # imap conserva el orden de los bloques: el archivo no depende del número de procesos
+            with mp.get_context("spawn" if sys.platform == "win32" else None).Pool(
+                procesos, initializer=_init_proceso, initargs=(cfg,)
+            ) as pool:
+                for datos in pool.imap(_bloque_bytes, bloques):
+                    f.write(datos)
+    os.replace(tmp, salida)
+    dt = time.perf_counter() - t0
+    return {
+        "filas": cfg.filas,
+        "segundos": round(dt, 3),
+        "filas_por_s": round(cfg.filas / dt, 1) if dt else 0.0,
+        "bytes": salida.stat().st_size,
+    }
+
+
+def _tasa(valor: str) -> float:
+    t = float(valor)
+    if not 0 <= t <= 1:
+        raise argparse.ArgumentTypeError("la tasa debe estar entre 0 y 1")
+    return t
+
+
+def _fecha(valor: str) -> str:
+    datetime.strptime(valor, "%Y%m%d")
+    return valor
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Genera un TXT de ancho fijo (1615 chars/línea) para pruebas de carga.")
+    ap.add_argument("-n", "--filas", type=int, default=80, help="Cantidad de líneas. Default 80.")
+    ap.add_argument("-s", "--semilla", type=int, default=0, help="Semilla (misma semilla => mismo archivo).")
+    ap.add_argument("--fecha", type=_fecha, default="20250529",
+                    help="YYYYMMDD del nombre del archivo; las fechas de venta terminan en ella.")
+    ap.add_argument("-o", "--salida", default=None, help="Ruta de salida. Default PRUEBAS_<fecha>.txt[.gz].")
+    ap.add_argument("-j", "--procesos", type=int, default=os.cpu_count() or 1, help="Procesos generadores.")
+    ap.add_argument("--bloque", type=int, default=50_000, help="Líneas por bloque de trabajo. Default 50000.")
+    ap.add_argument("--gzip", action="store_true", help="Comprime la salida (implícito si termina en .gz).")
+    ap.add_argument("--nivel-gzip", type=int, default=1, choices=range(1, 10), metavar="1-9",
+                    help="Nivel de compresión (default 1: prioriza velocidad).")
+    ap.add_argument("--tasa-longitud", type=_tasa, default=0.0, help="Líneas con largo distinto de 1615.")
+    ap.add_argument("--tasa-fecha", type=_tasa, default=0.0, help="Fechas mal formadas.")
+    ap.add_argument("--tasa-numero", type=_tasa, default=0.0, help="Números mal formados.")
+    ap.add_argument("--tasa-acentos", type=_tasa, default=0.0, help="Nombres/ciudades/sucursales con tildes y ñ.")
+    args = ap.parse_args(argv)
+
+    comprimir = args.gzip or (args.salida or "").endswith(".gz")
+    salida = Path(args.salida) if args.salida else ruta_por_defecto(args.fecha, comprimir)
+    cfg = Config(
+        filas=args.filas, semilla=args.semilla, fecha=args.fecha, bloque=max(1, args.bloque),
+        gzip=comprimir, nivel_gzip=args.nivel_gzip, tasa_longitud=args.tasa_longitud,
+        tasa_fecha=args.tasa_fecha, tasa_numero=args.tasa_numero, tasa_acentos=args.tasa_acentos,
+    )
+    m = generar_archivo(salida, cfg, procesos=max(1, args.procesos))
+    print(f"✅ Archivo generado: {salida.resolve()}")
+    print(f"📄 Registros: {m['filas']}  ({m['segundos']} s, {m['filas_por_s']:.0f} filas/s, {m['bytes']} bytes)")
 
-def generar_archivo(num=NUM_REGISTROS):
-    with OUTPUT_PATH.open("w", encoding="utf-8") as f:
-        for _ in range(num):
-            f.write(generar_linea())
-    print(f"✅ Archivo generado: {OUTPUT_PATH.resolve()}")
-    print(f"📄 Registros: {num}")
 
 if __name__ == "__main__":
-    generar_archivo()
+    main()